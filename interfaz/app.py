@@ -1,36 +1,79 @@
 # app.py — GymLite
+import secrets
+import time
 import streamlit as st
 
 # Configuracion antes de cualquier otro st.*
 st.set_page_config(page_title="GymLite", page_icon="🏋️", layout="wide")
 
 # Imports de dominio
-from auth_local import ensure_db, verify_user, create_user, change_password, has_role
+from auth_local import (
+    ensure_db, attempt_login, create_user, change_password, has_role,
+    create_session, resume_session, revoke_session,
+    issue_resume_token, consume_resume_token, RESUME_TTL_SECONDS,
+)
 
 from database import ensure_full_schema, init_db_data
-try:
-    # Intento de import desde carpeta 'views' 
-    from views import dashboard, socios, clases, pagos
-except Exception:
-    # En algunos setups las paginas pueden estar en 'pages'
-    from pages import dashboard, socios, clases, pagos
+import mantenimiento
 
 import navbar
+from page_loader import load_page_render
 
 # Asegura que la DB y usuario admin existan
 ensure_db(seed_admin=True)
 
-# Asegura esquema y datos iniciales de la base
+# Asegura esquema (migraciones versionadas) y datos iniciales de la base.
+# Solo el primer run del proceso toca la DB; los reruns son no-op.
 ensure_full_schema()
 init_db_data()
 
+# Hilo de tareas periódicas (estados de suscripciones, retención); una vez por proceso
+mantenimiento.iniciar()
+
 # Estado de autenticacion en session_state
 if "auth" not in st.session_state:
     st.session_state.auth = {"ok": False, "username": None, "role": None}
 
+# El token de sesion solo vive en session_state. La URL lleva un token de
+# reanudacion de un solo uso (ver auth_local.issue_resume_token) para retomar
+# la sesion al recargar la pagina sin volver a pasar por bcrypt; se renueva a
+# mitad de su vigencia mientras la sesion se usa.
+def publicar_reanudacion(token: str):
+    st.query_params["sid"] = issue_resume_token(token)
+    st.session_state.auth["sid_emitido"] = time.time()
+
+if not st.session_state.auth["ok"] and "sid" in st.query_params:
+    resumed = consume_resume_token(st.query_params["sid"])
+    if resumed:
+        user, token = resumed
+        st.session_state.auth = {"ok": True, "username": user["username"], "role": user["role"], "token": token}
+        publicar_reanudacion(token)
+    else:
+        del st.query_params["sid"]
+elif st.session_state.auth["ok"] and st.session_state.auth.get("token"):
+    # Una sesion abierta se revalida en cada rerun (LRU + generacion compartida,
+    # sin DB ni bcrypt): un logout o cambio de contrasena en otro worker la cierra
+    if not resume_session(st.session_state.auth["token"]):
+        st.query_params.pop("sid", None)
+        st.session_state.auth = {"ok": False, "username": None, "role": None}
+    elif time.time() - st.session_state.auth.get("sid_emitido", 0) > RESUME_TTL_SECONDS / 2:
+        publicar_reanudacion(st.session_state.auth["token"])
 
 ENFORCE_RBAC = False  
 
+# ==============================
+#   Registro de paginas (carga diferida)
+# ==============================
+# Cada pagina se importa recien cuando se selecciona por primera vez
+# (ver page_loader.py): la pantalla de login no paga pandas / plotly.
+# pagina -> modulo de la vista y roles permitidos
+PAGES = {
+    "Dashboard": {"module": "dashboard", "roles": ("viewer", "editor", "admin")},
+    "Socios":    {"module": "socios",    "roles": ("editor", "admin")},
+    "Clases":    {"module": "clases",    "roles": ("viewer", "editor", "admin")},
+    "Pagos":     {"module": "pagos",     "roles": ("admin",)},
+}
+
 # ==============================
 #   Estilos globales
 # ==============================
@@ -50,6 +93,18 @@ main .block-container {
 # ==============================
 #   Login pantalla completa
 # ==============================
+def client_id() -> str:
+    # Identifica al cliente para limitar intentos de login: IP si Streamlit
+    # la expone, si no un id aleatorio por sesion del navegador
+    ctx = getattr(st, "context", None)
+    ip = getattr(ctx, "ip_address", None) if ctx is not None else None
+    if ip:
+        return f"ip:{ip}"
+    if "client_id" not in st.session_state:
+        st.session_state.client_id = f"ses:{secrets.token_hex(8)}"
+    return st.session_state.client_id
+
+
 def full_screen_login():
     # Estilos y layout para la pantalla de login 
     st.markdown("""
@@ -89,15 +144,18 @@ def full_screen_login():
             p = st.text_input("Contraseña", type="password")
             ok = st.form_submit_button("🔑 Entrar", width='stretch')
         if ok:
-            user = verify_user(u, p)
+            # attempt_login aplica limites de intentos antes de llegar a bcrypt
+            user, err = attempt_login(u, p, client=client_id())
             if user:
-                # Guarda info minima de sesion
-                st.session_state.auth = {"ok": True, "username": user["username"], "role": user["role"]}
+                # Guarda info minima de sesion y un token para retomarla
+                token = create_session(user)
+                st.session_state.auth = {"ok": True, "username": user["username"], "role": user["role"], "token": token}
+                publicar_reanudacion(token)
                 st.session_state["TopNav__active"] = "Dashboard"
                 st.success(f"Bienvenido, {user['username']}")
                 st.rerun()
             else:
-                st.error("Usuario o contrasena incorrectos")
+                st.error(err)
 
     else:
         # Registro basico de usuario
@@ -163,7 +221,9 @@ def session_bar():
             unsafe_allow_html=True
         )
         if st.button("🚪 Cerrar sesiÃ³n", width='stretch'):
-            # Resetea autenticacion y recarga la app
+            # Revoca el token, resetea autenticacion y recarga la app
+            revoke_session(st.session_state.auth.get("token"))
+            st.query_params.pop("sid", None)
             st.session_state.auth = {"ok": False, "username": None, "role": None}
             st.rerun()
 
@@ -180,22 +240,14 @@ def main():
     # Muestra barra de sesion arriba
     session_bar()
 
-    # pagina -> funcion render y roles permitidos
-    PAGES = {
-        "Dashboard": {"fn": dashboard.render, "roles": ("viewer", "editor", "admin")},
-        "Socios":    {"fn": socios.render,    "roles": ("editor", "admin")},
-        "Clases":    {"fn": clases.render,    "roles": ("viewer", "editor", "admin")},
-        "Pagos":     {"fn": pagos.render,     "roles": ("admin",)},
-    }
-
     selected = navbar.top_nav(options=list(PAGES.keys()), default_index=0, key="TopNav")
 
     # Verifica permisos para la pagina seleccionada
     guard(allowed_roles=PAGES[selected]["roles"])
 
     st.title("GymLite")
-    # Llama la funcion render de la pagina
-    PAGES[selected]["fn"]()
+    # Importa la pagina (solo la primera vez) y llama su funcion render
+    load_page_render(PAGES[selected]["module"])()
 
 
 if __name__ == "__main__":
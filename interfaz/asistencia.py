@@ -0,0 +1,211 @@
+# asistencia.py — Check-in de socios a clases con escritura agrupada (group commit)
+#
+# En la recepción se escanea el RUT (o el id) del socio al llegar a la clase:
+#
+#   ok, checkin, err = asistencia.registrar_asistencia("12345678-9", id_clase)
+#
+# - Con reserva confirmada se marca Reserva.asistio = 1 (actualización puntual por
+#   el índice único (id_socio, id_clase) de Reserva).
+# - Sin reserva (socio que llega directo) se crea la reserva ya con asistencia si
+#   SIN_RESERVA está activo; los triggers de 0003 rechazan la entrada si no quedan
+#   cupos (CUPOS_AGOTADOS) o si el socio no tiene una suscripción vigente.
+# - Sólo se aceptan check-ins desde ANTES_MIN minutos antes del inicio de la clase
+#   hasta su término.
+#
+# Al comienzo de una clase llegan decenas de socios en un par de minutos. Cada
+# llamada deja su check-in en una cola y espera el resultado; un único hilo
+# escritor por proceso toma lo que haya en la cola (hasta LOTE_MAX, esperando a lo
+# más ESPERA_MS por más) y lo confirma en una sola transacción: un commit y una
+# invalidación de la caché compartida por lote en vez de uno por socio. Cada
+# check-in es una sola sentencia de escritura, así que si un trigger la rechaza
+# SQLite deshace sólo esa sentencia y el resto del lote se confirma igual.
+from __future__ import annotations
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+
+import consultas
+import database
+
+LOTE_MAX = int(os.environ.get("GYMLITE_CHECKIN_LOTE", "64"))
+ESPERA_MS = int(os.environ.get("GYMLITE_CHECKIN_ESPERA_MS", "2"))
+ANTES_MIN = int(os.environ.get("GYMLITE_CHECKIN_ANTES_MIN", "60"))
+SIN_RESERVA = os.environ.get("GYMLITE_CHECKIN_SIN_RESERVA", "1") != "0"
+TIMEOUT = 10.0   # segundos que espera registrar_asistencia() el commit de su lote
+
+
+class CheckIn(NamedTuple):
+    id_reserva: int
+    id_socio: int
+    id_clase: int
+    sin_reserva: bool   # True si la reserva se creó en el check-in
+
+
+class _Pedido(NamedTuple):
+    socio: Union[int, str]   # id_socio o RUT
+    id_clase: int
+    ahora: int
+    resultado: Future
+
+
+consultas.registrar("asistencia.socio_por_rut", "SELECT id_socio FROM Socio WHERE RUT = ?")
+consultas.registrar("asistencia.clase", "SELECT inicio, fin FROM Clase WHERE id_clase = ?")
+# Reserva confirmada: actualización puntual por (id_socio, id_clase)
+consultas.registrar("asistencia.marcar", """
+    UPDATE Reserva SET asistio = 1
+    WHERE id_socio = ? AND id_clase = ? AND estado_reserva = 'confirmada'
+    RETURNING id_reserva
+""")
+# Sin reserva confirmada: los triggers BEFORE INSERT (cupos y vigencia) corren
+# también cuando el INSERT termina en el UPDATE de una reserva pendiente/cancelada
+consultas.registrar("asistencia.sin_reserva", """
+    INSERT INTO Reserva (id_socio, id_clase, estado_reserva, asistio)
+    VALUES (?, ?, 'confirmada', 1)
+    ON CONFLICT (id_socio, id_clase) DO UPDATE SET estado_reserva = 'confirmada', asistio = 1
+    RETURNING id_reserva
+""")
+consultas.registrar("asistencia.clases_abiertas", """
+    SELECT c.id_clase, c.nombre, c.fecha_hora, c.duracion_min, c.cupo_max,
+           (SELECT COUNT(*) FROM Reserva r
+            WHERE r.id_clase = c.id_clase AND r.estado_reserva = 'confirmada') AS reservas,
+           (SELECT COUNT(*) FROM Reserva r
+            WHERE r.id_clase = c.id_clase AND r.estado_reserva = 'confirmada' AND r.asistio = 1) AS asistentes
+    FROM Clase c
+    WHERE c.inicio <= :ahora + :antes
+      AND c.inicio > :ahora - 60 * (SELECT MAX(duracion_min) FROM Clase)
+      AND c.fin >= :ahora
+    ORDER BY c.inicio, c.id_clase
+""")
+
+
+# ============================================================
+# ESCRITOR: un hilo por proceso, una transacción por lote
+# ============================================================
+
+_cola: "queue.Queue[_Pedido]" = queue.Queue()
+_hilo: Optional[threading.Thread] = None
+_lock = threading.Lock()
+
+
+def _id_socio(c: sqlite3.Connection, socio: Union[int, str]) -> Optional[int]:
+    if isinstance(socio, int):
+        return socio
+    fila = consultas.una(c, "asistencia.socio_por_rut", (socio,))
+    return fila[0] if fila else None
+
+
+def _checkin(c: sqlite3.Connection, p: _Pedido, clases: Dict[int, Optional[Tuple[int, int]]]) -> CheckIn:
+    id_socio = _id_socio(c, p.socio)
+    if id_socio is None:
+        raise LookupError("Error: SOCIO_NO_ENCONTRADO")
+    if p.id_clase not in clases:
+        fila = consultas.una(c, "asistencia.clase", (p.id_clase,))
+        clases[p.id_clase] = (fila[0], fila[1]) if fila else None
+    clase = clases[p.id_clase]
+    if clase is None:
+        raise LookupError("Error: CLASE_NO_ENCONTRADA")
+    inicio, fin = clase
+    if not inicio - 60 * ANTES_MIN <= p.ahora <= fin:
+        raise LookupError("Error: FUERA_DE_HORARIO")
+
+    filas = consultas.todas(c, "asistencia.marcar", (id_socio, p.id_clase))
+    if filas:
+        return CheckIn(filas[0][0], id_socio, p.id_clase, False)
+    if not SIN_RESERVA:
+        raise LookupError("Error: SIN_RESERVA")
+    filas = consultas.todas(c, "asistencia.sin_reserva", (id_socio, p.id_clase))
+    return CheckIn(filas[0][0], id_socio, p.id_clase, True)
+
+
+def _aplicar(lote: List[_Pedido]):
+    """Confirma `lote` en una transacción y resuelve el Future de cada pedido."""
+    resultados = []
+    clases: Dict[int, Optional[Tuple[int, int]]] = {}
+    try:
+        with database.get_conn() as c:
+            c.execute("BEGIN IMMEDIATE")
+            for p in lote:
+                try:
+                    resultados.append((True, _checkin(c, p, clases), None))
+                except (LookupError, sqlite3.IntegrityError) as e:
+                    resultados.append((False, None, str(e)))
+            c.execute("COMMIT")
+    except Exception as e:
+        # Nada del lote quedó escrito (release() hace rollback si quedó abierta)
+        print(f"Error al registrar asistencias: {e}")
+        resultados = [(False, None, str(e))] * len(lote)
+    for p, r in zip(lote, resultados):
+        p.resultado.set_result(r)
+
+
+def _bucle():
+    while True:
+        lote = [_cola.get()]
+        limite = time.perf_counter() + ESPERA_MS / 1000
+        while len(lote) < LOTE_MAX:
+            try:
+                lote.append(_cola.get_nowait())
+            except queue.Empty:
+                restante = limite - time.perf_counter()
+                if restante <= 0:
+                    break
+                try:
+                    lote.append(_cola.get(timeout=restante))
+                except queue.Empty:
+                    break
+        _aplicar(lote)
+
+
+def _asegurar_hilo():
+    global _hilo
+    if _hilo is not None and _hilo.is_alive():
+        return
+    with _lock:
+        if _hilo is None or not _hilo.is_alive():
+            _hilo = threading.Thread(target=_bucle, name="asistencia", daemon=True)
+            _hilo.start()
+
+
+# ============================================================
+# API
+# ============================================================
+
+def _socio(identificador: Union[int, str]) -> Union[int, str]:
+    # Números sin guion son id de socio; lo demás se busca como RUT
+    if isinstance(identificador, int):
+        return identificador
+    texto = str(identificador).strip()
+    return int(texto) if texto.isdigit() else texto.upper()
+
+
+def encolar_asistencia(identificador: Union[int, str], id_clase: int) -> Future:
+    """Deja el check-in en la cola del escritor; el Future entrega (ok, CheckIn, error)."""
+    _asegurar_hilo()
+    pedido = _Pedido(_socio(identificador), int(id_clase), database._ahora_epoch(), Future())
+    _cola.put(pedido)
+    return pedido.resultado
+
+
+def registrar_asistencia(
+    identificador: Union[int, str], id_clase: int, timeout: float = TIMEOUT,
+) -> Tuple[bool, Optional[CheckIn], Optional[str]]:
+    """Check-in por RUT o id de socio; espera el commit de su lote. Devuelve (ok, CheckIn, error)."""
+    if not str(identificador).strip():
+        return False, None, "Error: SOCIO_NO_ENCONTRADO"
+    try:
+        return encolar_asistencia(identificador, id_clase).result(timeout)
+    except Exception as e:
+        print(f"Error al registrar asistencia: {e}")
+        return False, None, str(e) or "Tiempo de espera agotado"
+
+
+def clases_abiertas() -> List[Dict]:
+    """Clases que aceptan check-in ahora, con reservas y asistentes registrados."""
+    with database.get_read_conn() as c:
+        rows = consultas.todas(c, "asistencia.clases_abiertas",
+                               {"ahora": database._ahora_epoch(), "antes": 60 * ANTES_MIN})
+        return [dict(r) for r in rows]
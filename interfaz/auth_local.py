@@ -1,98 +1,546 @@
-# auth_local.py — Autenticacion local (SQLite + bcrypt) para Streamlit
-import sqlite3
-import time
-from typing import Optional
-import bcrypt
-
-DB_PATH = "users.db"   # Archivo de la base de datos dentro del proyecto
-
-# Esquema de la tabla principal de usuarios.
-# Se crean campos basicos: usuario, contrasena en hash, rol y estado.
-SCHEMA = """
-CREATE TABLE IF NOT EXISTS users (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    username TEXT UNIQUE NOT NULL,
-    password_hash BLOB NOT NULL,
-    role TEXT NOT NULL DEFAULT 'viewer',   -- 'admin' | 'editor' | 'viewer'
-    is_active INTEGER NOT NULL DEFAULT 1,
-    created_at INTEGER NOT NULL
-);
-"""
-
-def _conn():
-    # Conexion simple para no repetir codigo
-    return sqlite3.connect(DB_PATH)
-
-def ensure_db(seed_admin: bool = True):
-    with _conn() as con:
-        con.execute(SCHEMA)
-
-        # Si la base esta vacia, se crea un usuario admin por defecto.
-        # Esto evita que la app quede sin forma de ingresar la primera vez.
-        if seed_admin:
-            c = con.execute("SELECT COUNT(*) FROM users").fetchone()[0]
-            if c == 0:
-                create_user("admin", "Admin1234!", role="admin")
-
-def create_user(username: str, password: str, role: str = "viewer") -> int:
-    # Se genera el hash de la contrasena usando bcrypt
-    pw_hash = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt())
-
-    with _conn() as con:
-        # Insercion del usuario en la base
-        cur = con.execute(
-            "INSERT INTO users (username, password_hash, role, is_active, created_at) VALUES (?,?,?,?,?)",
-            (username, pw_hash, role, 1, int(time.time()))
-        )
-        return cur.lastrowid
-
-def get_user(username: str) -> Optional[tuple]:
-    # Obtiene la fila del usuario por nombre
-    with _conn() as con:
-        row = con.execute(
-            "SELECT id, username, password_hash, role, is_active FROM users WHERE username=?",
-            (username,)
-        ).fetchone()
-    return row
-
-def verify_user(username: str, password: str) -> Optional[dict]:
-    # Validacion de login: recupera al usuario y compara hashes
-    row = get_user(username)
-    if not row:
-        return None
-
-    uid, uname, pw_hash, role, is_active = row
-
-    # Usuario desactivado -> no entra
-    if not is_active:
-        return None
-
-    # bcrypt compara el password ingresado con el hash guardado
-    if bcrypt.checkpw(password.encode("utf-8"), pw_hash):
-        return {"id": uid, "username": uname, "role": role}
-
-    return None
-
-def change_password(username: str, new_password: str) -> bool:
-    # Actualiza la contrasena con un nuevo hash
-    pw_hash = bcrypt.hashpw(new_password.encode("utf-8"), bcrypt.gensalt())
-    with _conn() as con:
-        res = con.execute(
-            "UPDATE users SET password_hash=? WHERE username=?",
-            (pw_hash, username)
-        )
-        return res.rowcount > 0
-
-def set_role(username: str, role: str) -> bool:
-    # Actualiza el rol del usuario (admin/editor/viewer)
-    with _conn() as con:
-        res = con.execute("UPDATE users SET role=? WHERE username=?", (role, username))
-        return res.rowcount > 0
-
-# Sistema simple de niveles de permisos.
-# Cada rol tiene un nivel numerico para comparar acceso.
-_ROLE_ORDER = {"viewer": 0, "editor": 1, "admin": 2}
-
-def has_role(user_role: str, allowed=("viewer","editor","admin")) -> bool:
-    # Verifica si el rol del usuario tiene nivel suficiente para entrar.
-    return _ROLE_ORDER.get(user_role, -1) >= min(_ROLE_ORDER.get(r, 99) for r in allowed)
+# auth_local.py — Autenticacion local (SQLite + bcrypt) para Streamlit
+import hashlib
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional, Tuple
+import bcrypt
+
+from cache_compartido import CacheCompartida
+from db_pool import get_pool
+
+# Archivo de la base de datos de usuarios, junto a este modulo.
+# Ruta absoluta: no depende del directorio desde donde se lance la app.
+DB_PATH = str(Path(__file__).resolve().parent / "users.db")
+
+# Costo (work factor) de bcrypt. Los hashes con otro costo se re-generan
+# de forma transparente en el siguiente login exitoso.
+BCRYPT_ROUNDS = int(os.environ.get("GYMLITE_BCRYPT_ROUNDS", "12"))
+
+# Vigencia de un token de sesion y tamaño del cache LRU en memoria
+SESSION_TTL_SECONDS = int(os.environ.get("GYMLITE_SESSION_TTL_HOURS", "12")) * 3600
+SESSION_CACHE_SIZE = 1024
+# Vigencia de un token de reanudacion (el que viaja en la URL): de un solo uso
+RESUME_TTL_SECONDS = int(os.environ.get("GYMLITE_RESUME_TTL_MINUTES", "15")) * 60
+
+# Limites de intentos de login (token bucket): capacidad y segundos por ficha.
+# Los buckets viven en memoria de cada proceso: con N workers (multiproceso.py)
+# el tope efectivo es N veces este. El limite comun a todos los workers es el
+# bloqueo progresivo, que se guarda en users.db.
+LOGIN_USER_BURST, LOGIN_USER_REFILL_S = 5, 30.0       # por nombre de usuario
+LOGIN_CLIENT_BURST, LOGIN_CLIENT_REFILL_S = 20, 3.0   # por cliente (IP / sesion)
+LOGIN_BUCKETS_MAX = 10_000                            # buckets recordados en memoria
+
+# Bloqueo progresivo: tras N fallos seguidos, bloqueo base que se duplica
+LOCKOUT_THRESHOLD = 5
+LOCKOUT_BASE_SECONDS = 30
+LOCKOUT_MAX_SECONDS = 3600
+# Un fallo posterior a esta pausa sin fallos vuelve a contar desde 1
+LOCKOUT_RESET_SECONDS = int(os.environ.get("GYMLITE_LOCKOUT_RESET_MINUTES", "15")) * 60
+
+# bcrypt se ejecuta en un pool acotado: limita cuantos hashes corren a la vez
+# en el proceso (evita picos de CPU cuando muchos terminales ingresan juntos).
+# El hilo del script igual espera el resultado (.result()); lo que se gana es
+# el tope de concurrencia, no un hilo libre.
+_HASH_POOL = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("GYMLITE_HASH_WORKERS", "2")),
+    thread_name_prefix="bcrypt",
+)
+
+# Esquema de la tabla principal de usuarios.
+# Se crean campos basicos: usuario, contrasena en hash, rol y estado.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT UNIQUE NOT NULL,
+    password_hash BLOB NOT NULL,
+    role TEXT NOT NULL DEFAULT 'viewer',   -- 'admin' | 'editor' | 'viewer'
+    is_active INTEGER NOT NULL DEFAULT 1,
+    created_at INTEGER NOT NULL
+);
+"""
+
+# Sesiones del lado servidor: se guarda solo el sha256 del token,
+# nunca el token en claro.
+SESSIONS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    token_hash TEXT PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    created_at INTEGER NOT NULL,
+    expires_at INTEGER NOT NULL,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+"""
+SESSIONS_INDEX = "CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions(expires_at);"
+
+# Tokens de reanudacion: el token de sesion nunca va en la URL; en su lugar
+# va uno de un solo uso y corta vida que, al usarse, se canjea por una sesion
+# nueva. Cada sesion tiene a lo sumo uno vigente (el ultimo emitido).
+RESUME_SCHEMA = """
+CREATE TABLE IF NOT EXISTS session_resume (
+    token_hash TEXT PRIMARY KEY,
+    session_hash TEXT NOT NULL UNIQUE,
+    expires_at INTEGER NOT NULL,
+    FOREIGN KEY (session_hash) REFERENCES sessions(token_hash) ON DELETE CASCADE
+);
+"""
+
+# Fallos de login consecutivos y bloqueo vigente por usuario
+LOGIN_FAILURES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS login_failures (
+    user_id INTEGER PRIMARY KEY,
+    failures INTEGER NOT NULL DEFAULT 0,
+    locked_until INTEGER NOT NULL DEFAULT 0,
+    last_failure INTEGER NOT NULL,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+"""
+
+def _conn():
+    # Conexion del pool compartido con database.py (WAL, reutilizada entre logins)
+    return get_pool(DB_PATH).acquire()
+
+_db_lista = False   # True cuando el esquema ya se verifico en este proceso
+
+def ensure_db(seed_admin: bool = True):
+    # Se ejecuta una sola vez por proceso; los reruns de Streamlit lo saltan
+    global _db_lista
+    if _db_lista:
+        return
+    with _conn() as con:
+        con.execute(SCHEMA)
+        con.execute(SESSIONS_SCHEMA)
+        con.execute(SESSIONS_INDEX)
+        con.execute(RESUME_SCHEMA)
+        con.execute(LOGIN_FAILURES_SCHEMA)
+
+        # Si la base esta vacia, se crea un usuario admin por defecto.
+        # Esto evita que la app quede sin forma de ingresar la primera vez.
+        if seed_admin:
+            c = con.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+            if c == 0:
+                create_user("admin", "Admin1234!", role="admin")
+    _db_lista = True
+
+def _hash_password(password: str) -> bytes:
+    # Hash bcrypt con el costo configurado, calculado en el pool
+    return _HASH_POOL.submit(
+        bcrypt.hashpw, password.encode("utf-8"), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
+    ).result()
+
+def _check_password(password: str, pw_hash: bytes) -> bool:
+    return _HASH_POOL.submit(bcrypt.checkpw, password.encode("utf-8"), pw_hash).result()
+
+def _hash_rounds(pw_hash: bytes) -> int:
+    # Formato bcrypt: $2b$<costo>$<salt+hash>
+    try:
+        return int(pw_hash.split(b"$")[2])
+    except (IndexError, ValueError):
+        return -1
+
+def create_user(username: str, password: str, role: str = "viewer") -> int:
+    # Se genera el hash de la contrasena usando bcrypt
+    pw_hash = _hash_password(password)
+
+    with _conn() as con:
+        # Insercion del usuario en la base
+        cur = con.execute(
+            "INSERT INTO users (username, password_hash, role, is_active, created_at) VALUES (?,?,?,?,?)",
+            (username, pw_hash, role, 1, int(time.time()))
+        )
+        return cur.lastrowid
+
+# Consulta fija: cada conexion del pool la prepara una sola vez (cache de sentencias)
+_GET_USER_SQL = "SELECT id, username, password_hash, role, is_active FROM users WHERE username=?"
+
+def get_user(username: str) -> Optional[tuple]:
+    # Obtiene la fila del usuario por nombre
+    with _conn() as con:
+        row = con.execute(_GET_USER_SQL, (username,)).fetchone()
+    return row
+
+def verify_user(username: str, password: str) -> Optional[dict]:
+    # Validacion de login: recupera al usuario y compara hashes.
+    # Sin limites de intentos; el formulario de login usa attempt_login().
+    row = get_user(username)
+    if not row:
+        return None
+    return _verify_row(row, password)
+
+def _verify_row(row: tuple, password: str) -> Optional[dict]:
+    uid, uname, pw_hash, role, is_active = row
+    if isinstance(pw_hash, str):
+        pw_hash = pw_hash.encode("utf-8")
+
+    # Usuario desactivado -> no entra
+    if not is_active:
+        return None
+
+    # bcrypt compara el password ingresado con el hash guardado
+    if not _check_password(password, pw_hash):
+        return None
+
+    # Rehash transparente si el hash guardado usa otro costo
+    if _hash_rounds(pw_hash) != BCRYPT_ROUNDS:
+        with _conn() as con:
+            con.execute("UPDATE users SET password_hash=? WHERE id=?", (_hash_password(password), uid))
+
+    return {"id": uid, "username": uname, "role": role}
+
+def change_password(username: str, new_password: str) -> bool:
+    # Actualiza la contrasena con un nuevo hash
+    pw_hash = _hash_password(new_password)
+    with _conn() as con:
+        res = con.execute(
+            "UPDATE users SET password_hash=? WHERE username=?",
+            (pw_hash, username)
+        )
+        changed = res.rowcount > 0
+    if changed:
+        # Un cambio de contrasena invalida todas las sesiones abiertas
+        revoke_user_sessions(username)
+    return changed
+
+def set_role(username: str, role: str) -> bool:
+    # Actualiza el rol del usuario (admin/editor/viewer)
+    with _conn() as con:
+        res = con.execute("UPDATE users SET role=? WHERE username=?", (role, username))
+        changed = res.rowcount > 0
+    if changed:
+        # Las sesiones siguen vigentes, pero el rol cacheado debe releerse
+        # (tambien en los demas procesos)
+        _session_cache_drop_user(username)
+        _sesiones_modificadas()
+    return changed
+
+# ==============================
+#   Sesiones (tokens del lado servidor)
+# ==============================
+# Permite retomar una sesion (p. ej. al recargar la pagina o tras reiniciar
+# el servidor) sin volver a pasar por bcrypt. El token en claro solo lo
+# conoce el cliente; aqui se guarda su sha256 en la tabla sessions y en un
+# cache LRU en memoria para que la validacion no toque la DB.
+#
+# El LRU es de cada proceso: con varios workers (multiproceso.py) un logout o
+# un cambio de contrasena en uno no lo veria el resto. Por eso cada revocacion
+# sube la generacion "sesiones" en la cache compartida 'users_cache.db' y el
+# LRU se vacia cuando la generacion que lee ya no es la suya.
+_session_cache: "OrderedDict[str, dict]" = OrderedDict()
+_session_lock = threading.Lock()
+_session_gen: Optional[int] = None   # generacion con la que se lleno el LRU
+
+_cache_sesiones_actual: Optional[CacheCompartida] = None
+
+def _cache_sesiones() -> CacheCompartida:
+    global _cache_sesiones_actual
+    with _session_lock:
+        if _cache_sesiones_actual is None:
+            ruta = Path(DB_PATH)
+            _cache_sesiones_actual = CacheCompartida(ruta.with_name(f"{ruta.stem}_cache.db"))
+        return _cache_sesiones_actual
+
+def _sesiones_generacion() -> Optional[int]:
+    try:
+        return _cache_sesiones().generacion("sesiones")
+    except sqlite3.Error as e:
+        print(f"Error al leer la generacion de sesiones: {e}")
+        return None
+
+def _sesiones_modificadas():
+    # Avisa a los demas procesos que descarten su LRU de sesiones
+    try:
+        _cache_sesiones().invalidar(("sesiones",))
+    except sqlite3.Error as e:
+        print(f"Error al invalidar las sesiones en cache: {e}")
+
+def _token_hash(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+def _session_cache_put(token_hash: str, session: dict):
+    with _session_lock:
+        _session_cache[token_hash] = session
+        _session_cache.move_to_end(token_hash)
+        while len(_session_cache) > SESSION_CACHE_SIZE:
+            _session_cache.popitem(last=False)
+
+def _session_cache_get(token_hash: str) -> Optional[dict]:
+    global _session_gen
+    gen = _sesiones_generacion()
+    with _session_lock:
+        # Otro proceso revoco sesiones (o no se pudo saber): se relee la DB
+        if gen is None or gen != _session_gen:
+            _session_cache.clear()
+            _session_gen = gen
+            return None
+        session = _session_cache.get(token_hash)
+        if session is not None:
+            _session_cache.move_to_end(token_hash)
+        return session
+
+def _session_cache_drop_user(username: str):
+    with _session_lock:
+        for key in [k for k, s in _session_cache.items() if s["username"] == username]:
+            del _session_cache[key]
+
+def create_session(user: dict) -> str:
+    # Crea un token de sesion para un usuario ya verificado y lo devuelve
+    token = secrets.token_urlsafe(32)
+    token_hash = _token_hash(token)
+    now = int(time.time())
+    expires_at = now + SESSION_TTL_SECONDS
+    with _conn() as con:
+        # Limpieza barata de sesiones vencidas (usa idx_sessions_expires)
+        con.execute("DELETE FROM sessions WHERE expires_at < ?", (now,))
+        con.execute(
+            "INSERT INTO sessions (token_hash, user_id, created_at, expires_at) VALUES (?,?,?,?)",
+            (token_hash, user["id"], now, expires_at)
+        )
+    _session_cache_put(token_hash, {
+        "id": user["id"], "username": user["username"], "role": user["role"], "expires_at": expires_at,
+    })
+    return token
+
+def resume_session(token: Optional[str]) -> Optional[dict]:
+    # Valida un token sin bcrypt: primero el LRU, luego la tabla sessions
+    if not token:
+        return None
+    token_hash = _token_hash(token)
+    now = int(time.time())
+
+    session = _session_cache_get(token_hash)
+    if session is None:
+        with _conn() as con:
+            row = con.execute(
+                """
+                SELECT u.id, u.username, u.role, s.expires_at
+                FROM sessions s JOIN users u ON u.id = s.user_id
+                WHERE s.token_hash=? AND u.is_active=1
+                """,
+                (token_hash,)
+            ).fetchone()
+        if not row:
+            return None
+        session = {"id": row[0], "username": row[1], "role": row[2], "expires_at": row[3]}
+        _session_cache_put(token_hash, session)
+
+    if session["expires_at"] < now:
+        revoke_session(token)
+        return None
+    return {"id": session["id"], "username": session["username"], "role": session["role"]}
+
+def issue_resume_token(token: str) -> str:
+    """
+    Token de un solo uso para retomar la sesion `token` al recargar la pagina.
+    Reemplaza al anterior de la misma sesion: una URL vieja deja de servir.
+    """
+    resume = secrets.token_urlsafe(32)
+    now = int(time.time())
+    with _conn() as con:
+        con.execute("DELETE FROM session_resume WHERE expires_at < ?", (now,))
+        con.execute(
+            """
+            INSERT INTO session_resume (token_hash, session_hash, expires_at) VALUES (?,?,?)
+            ON CONFLICT(session_hash) DO UPDATE SET token_hash = excluded.token_hash, expires_at = excluded.expires_at
+            """,
+            (_token_hash(resume), _token_hash(token), now + RESUME_TTL_SECONDS)
+        )
+    return resume
+
+def consume_resume_token(resume: Optional[str]) -> Optional[Tuple[dict, str]]:
+    """
+    Canjea un token de reanudacion: lo borra (solo sirve una vez) y, si su
+    sesion sigue vigente, la reemplaza por una nueva. Devuelve (usuario, token
+    de la sesion nueva) o None.
+    """
+    if not resume:
+        return None
+    now = int(time.time())
+    with _conn() as con:
+        # fetchall: la sentencia con RETURNING debe terminar antes de la siguiente
+        rows = con.execute(
+            "DELETE FROM session_resume WHERE token_hash=? RETURNING session_hash, expires_at",
+            (_token_hash(resume),)
+        ).fetchall()
+        if not rows or rows[0][1] < now:
+            return None
+        row = rows[0]
+        user = con.execute(
+            """
+            SELECT u.id, u.username, u.role
+            FROM sessions s JOIN users u ON u.id = s.user_id
+            WHERE s.token_hash=? AND s.expires_at >= ? AND u.is_active=1
+            """,
+            (row[0], now)
+        ).fetchone()
+    if not user:
+        return None
+    _revoke_hash(row[0])
+    user = {"id": user[0], "username": user[1], "role": user[2]}
+    return user, create_session(user)
+
+def revoke_session(token: Optional[str]):
+    # Cierra una sesion (logout)
+    if not token:
+        return
+    _revoke_hash(_token_hash(token))
+
+def _revoke_hash(token_hash: str):
+    with _session_lock:
+        _session_cache.pop(token_hash, None)
+    with _conn() as con:
+        con.execute("DELETE FROM sessions WHERE token_hash=?", (token_hash,))
+    _sesiones_modificadas()
+
+def revoke_user_sessions(username: str):
+    # Cierra todas las sesiones de un usuario
+    _session_cache_drop_user(username)
+    with _conn() as con:
+        con.execute(
+            "DELETE FROM sessions WHERE user_id = (SELECT id FROM users WHERE username=?)",
+            (username,)
+        )
+    _sesiones_modificadas()
+
+# Sistema simple de niveles de permisos.
+# Cada rol tiene un nivel numerico para comparar acceso.
+_ROLE_ORDER = {"viewer": 0, "editor": 1, "admin": 2}
+
+def has_role(user_role: str, allowed=("viewer","editor","admin")) -> bool:
+    # Verifica si el rol del usuario tiene nivel suficiente para entrar.
+    return _ROLE_ORDER.get(user_role, -1) >= min(_ROLE_ORDER.get(r, 99) for r in allowed)
+
+# ==============================
+#   Limites de intentos de login
+# ==============================
+# Un formulario de login sin limites permite forzar bcrypt a costo completo
+# una y otra vez. attempt_login() aplica, en orden de costo creciente:
+#   1. token bucket por cliente y por nombre de usuario (solo memoria, por proceso)
+#   2. bloqueo progresivo por usuario guardado en users.db (los fallos
+#      seguidos se olvidan tras LOCKOUT_RESET_SECONDS sin fallar)
+#   3. recien entonces bcrypt (en el pool acotado)
+class _TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, capacity: int):
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def take(self, capacity: int, refill_seconds: float) -> bool:
+        now = time.monotonic()
+        self.tokens = min(capacity, self.tokens + (now - self.updated) / refill_seconds)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+_user_buckets: "OrderedDict[str, _TokenBucket]" = OrderedDict()
+_client_buckets: "OrderedDict[str, _TokenBucket]" = OrderedDict()
+_throttle_lock = threading.Lock()
+
+_login_metrics = {
+    "attempts": 0,
+    "success": 0,
+    "failed": 0,
+    "throttled_client": 0,
+    "throttled_user": 0,
+    "locked_out": 0,
+    "bcrypt_checks": 0,
+}
+
+def _bump(metric: str):
+    with _throttle_lock:
+        _login_metrics[metric] += 1
+
+def _take_token(buckets: "OrderedDict[str, _TokenBucket]", key: str, capacity: int, refill_seconds: float) -> bool:
+    with _throttle_lock:
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = _TokenBucket(capacity)
+            # Se olvidan los buckets mas antiguos para acotar la memoria
+            while len(buckets) > LOGIN_BUCKETS_MAX:
+                buckets.popitem(last=False)
+        else:
+            buckets.move_to_end(key)
+        return bucket.take(capacity, refill_seconds)
+
+def login_metrics() -> dict:
+    # Copia de los contadores de intentos de login de este proceso
+    with _throttle_lock:
+        return dict(_login_metrics)
+
+def _lockout_seconds(failures: int) -> int:
+    if failures < LOCKOUT_THRESHOLD:
+        return 0
+    return min(LOCKOUT_BASE_SECONDS * 2 ** (failures - LOCKOUT_THRESHOLD), LOCKOUT_MAX_SECONDS)
+
+def _register_failure(user_id: int, now: int):
+    with _conn() as con:
+        con.execute(
+            """
+            INSERT INTO login_failures (user_id, failures, locked_until, last_failure)
+            VALUES (?, 1, 0, ?)
+            ON CONFLICT(user_id) DO UPDATE SET
+                failures = CASE WHEN excluded.last_failure - last_failure > ? THEN 1 ELSE failures + 1 END,
+                last_failure = excluded.last_failure
+            """,
+            (user_id, now, LOCKOUT_RESET_SECONDS)
+        )
+        failures = con.execute("SELECT failures FROM login_failures WHERE user_id=?", (user_id,)).fetchone()[0]
+        lock = _lockout_seconds(failures)
+        if lock:
+            con.execute("UPDATE login_failures SET locked_until=? WHERE user_id=?", (now + lock, user_id))
+
+def attempt_login(username: str, password: str, client: Optional[str] = None) -> Tuple[Optional[dict], Optional[str]]:
+    """
+    Login con limites de intentos. Devuelve (usuario, None) si es correcto
+    o (None, mensaje) si se rechaza. Los rechazos por limite no ejecutan bcrypt.
+    """
+    _bump("attempts")
+    username = (username or "").strip()
+
+    if client and not _take_token(_client_buckets, client, LOGIN_CLIENT_BURST, LOGIN_CLIENT_REFILL_S):
+        _bump("throttled_client")
+        return None, "Demasiados intentos desde este equipo. Espera unos segundos."
+    if not _take_token(_user_buckets, username.lower(), LOGIN_USER_BURST, LOGIN_USER_REFILL_S):
+        _bump("throttled_user")
+        return None, "Demasiados intentos para este usuario. Espera unos segundos."
+
+    now = int(time.time())
+    with _conn() as con:
+        row = con.execute(
+            """
+            SELECT u.id, u.username, u.password_hash, u.role, u.is_active, COALESCE(f.locked_until, 0)
+            FROM users u LEFT JOIN login_failures f ON f.user_id = u.id
+            WHERE u.username=?
+            """,
+            (username,)
+        ).fetchone()
+
+    if not row:
+        _bump("failed")
+        return None, "Usuario o contrasena incorrectos"
+
+    locked_until = row[5]
+    if locked_until > now:
+        _bump("locked_out")
+        return None, f"Usuario bloqueado temporalmente. Intenta en {locked_until - now} s."
+
+    _bump("bcrypt_checks")
+    user = _verify_row(row[:5], password)
+    if not user:
+        _bump("failed")
+        if row[4]:
+            _register_failure(row[0], now)
+        return None, "Usuario o contrasena incorrectos"
+
+    _bump("success")
+    with _conn() as con:
+        con.execute("DELETE FROM login_failures WHERE user_id=?", (row[0],))
+    return user, None
+
@@ -0,0 +1,93 @@
+# benchmarks/_comun.py — Utilidades compartidas por los scripts de benchmark
+# Los benchmarks se ejecutan desde la carpeta interfaz/:
+#   python benchmarks/bench_startup.py
+from __future__ import annotations
+import contextlib
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Permite importar database.py / auth_local.py sin instalar nada
+INTERFAZ_DIR = Path(__file__).resolve().parent.parent
+if str(INTERFAZ_DIR) not in sys.path:
+    sys.path.insert(0, str(INTERFAZ_DIR))
+
+
+@contextlib.contextmanager
+def db_temporal(nombre: str = "GymLite_bench.db"):
+    """Apunta database.py a una DB temporal vacía (nunca toca GymLite.db)."""
+    import database
+    anterior = database.DB_PATH
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = Path(tmp) / nombre
+        database.set_db_path(ruta)
+        try:
+            yield ruta
+        finally:
+            database.set_db_path(anterior)
+
+
+def cronometrar(fn, repeticiones: int = 1) -> dict:
+    """Ejecuta fn N veces y devuelve min/mediana/max en milisegundos."""
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        fn()
+        tiempos.append((time.perf_counter() - t0) * 1000)
+    return {
+        "min_ms": min(tiempos),
+        "med_ms": statistics.median(tiempos),
+        "max_ms": max(tiempos),
+    }
+
+
+def imprimir(titulo: str, filas: list[tuple[str, dict]]):
+    print(f"\n== {titulo} ==")
+    for etiqueta, t in filas:
+        print(f"  {etiqueta:<45} min {t['min_ms']:9.3f} ms | med {t['med_ms']:9.3f} ms | max {t['max_ms']:9.3f} ms")
+
+
+def poblar(n_socios: int = 1000, n_pagos: int = 0, seed: int = 7):
+    """
+    Inserta datos sintéticos en la DB actual de database.py (ya migrada):
+    planes, socios con una suscripción activa cada uno y n_pagos pagos.
+    """
+    import random
+    from datetime import date, timedelta
+
+    import database
+
+    rnd = random.Random(seed)
+    hoy = date.today()
+    metodos = ("transferencia", "webpay", "tarjeta", "efectivo")
+    with database.get_conn() as c:
+        c.execute("BEGIN")
+        if not c.execute("SELECT 1 FROM Plan LIMIT 1").fetchone():
+            c.executemany(
+                "INSERT INTO Plan (nombre_plan, precio, duracion_meses) VALUES (?,?,?)",
+                [("Plan Mensual", 24500, 1), ("Plan Trimestral", 66000, 3),
+                 ("Plan Semestral", 120000, 6), ("Plan Anual", 210000, 12)],
+            )
+        base = c.execute("SELECT COALESCE(MAX(id_socio), 0) FROM Socio").fetchone()[0]
+        c.executemany(
+            "INSERT INTO Socio (RUT, nombre, apellido_p, apellido_m, fecha_nac, telefono, direccion) VALUES (?,?,?,?,?,?,?)",
+            [(f"{10_000_000 + base + i}-{i % 10}", f"Nombre{base + i}", f"Apellido{i % 997}", "Bench",
+              "1990-01-01", f"9{i:08d}" if i % 3 else None, f"Calle {i}" if i % 2 else None)
+             for i in range(n_socios)],
+        )
+        c.executemany(
+            "INSERT INTO Suscripcion (id_socio, id_plan, fecha_inicio, fecha_fin, estado_sus) VALUES (?,?,?,?, 'activa')",
+            [(base + i + 1, 1 + i % 4, (hoy - timedelta(days=30)).isoformat(), (hoy + timedelta(days=335)).isoformat())
+             for i in range(n_socios)],
+        )
+        primera_sus = c.execute("SELECT MIN(id_suscripcion) FROM Suscripcion").fetchone()[0]
+        total_sus = c.execute("SELECT COUNT(*) FROM Suscripcion").fetchone()[0]
+        c.executemany(
+            "INSERT INTO Pago (id_suscripcion, fecha_pago, monto, metodo_pago, estado_pago, num_comprobante) VALUES (?,?,?,?, 'completado', ?)",
+            [(primera_sus + rnd.randrange(total_sus), (hoy - timedelta(days=rnd.randrange(1500))).isoformat(),
+              rnd.choice((24500, 66000, 120000, 210000)), rnd.choice(metodos), f"BENCH-{i}")
+             for i in range(n_pagos)],
+        )
+        c.execute("COMMIT")
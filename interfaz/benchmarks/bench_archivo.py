@@ -0,0 +1,76 @@
+# benchmarks/bench_archivo.py — Listados diarios con 5 años de historial, antes y después de archivar
+from __future__ import annotations
+import random
+import time
+from datetime import datetime, timedelta
+
+from _comun import cronometrar, db_temporal, imprimir, poblar
+
+ANIOS = 5
+N_ENTRENADORES = 12
+CLASES_POR_DIA = 4          # por entrenador
+RESERVAS_POR_CLASE = 3
+DIAS_FUTUROS = 14
+
+
+def _preparar():
+    import database
+    database.ensure_full_schema()
+    poblar(n_socios=2000)
+    rnd = random.Random(5)
+    base = datetime.now().replace(hour=8, minute=0, second=0, microsecond=0)
+    with database.get_conn() as c:
+        c.execute("BEGIN")
+        c.executemany(
+            "INSERT INTO Entrenador (RUT, nombre, apellido, fecha_nac, especialidad) VALUES (?,?,?,?,?)",
+            [(f"{20_000_000 + i}-{i % 10}", f"Coach{i}", "Bench", "1990-01-01", "General") for i in range(N_ENTRENADORES)],
+        )
+        c.execute("INSERT INTO Tipo (nombre) VALUES ('TipoBench')")
+        c.executemany("""
+            INSERT INTO Clase (id_entrenador, id_tipo, nombre, descripcion, fecha_hora, duracion_min, cupo_max)
+            VALUES (?,?,?,?,?,?,?)
+        """, [(ent, 1, f"Clase {ent}-{k}", None,
+               (base + timedelta(days=dia, hours=3 * k)).strftime("%Y-%m-%d %H:%M:%S"), 60, 20)
+              for dia in range(-365 * ANIOS, DIAS_FUTUROS)
+              for ent in range(1, N_ENTRENADORES + 1)
+              for k in range(CLASES_POR_DIA)])
+        c.execute("""
+            INSERT OR IGNORE INTO Reserva (id_socio, id_clase, fecha_reserva, estado_reserva, asistio)
+            SELECT 1 + (c.id_clase * 7 + k.n * 131) % 2000, c.id_clase, c.fecha_hora, 'confirmada', (c.id_clase + k.n) % 2
+            FROM Clase c, (SELECT 0 AS n UNION ALL SELECT 1 UNION ALL SELECT 2) k
+        """)
+        c.execute("COMMIT")
+        return c.execute("SELECT COUNT(*) FROM Clase").fetchone()[0], c.execute("SELECT COUNT(*) FROM Reserva").fetchone()[0]
+
+
+def _medir(etiqueta):
+    import database
+    return [
+        (f"{etiqueta}: get_all_proximas_clases", cronometrar(database.get_all_proximas_clases, 10)),
+        (f"{etiqueta}: get_clases_disponibles", cronometrar(database.get_clases_disponibles, 10)),
+        (f"{etiqueta}: get_all_clases_pasadas", cronometrar(database.get_all_clases_pasadas, 3)),
+        (f"{etiqueta}: get_all_clases", cronometrar(database.get_all_clases, 3)),
+        (f"{etiqueta}: get_clases_by_type_stats", cronometrar(database.get_clases_by_type_stats, 10)),
+    ]
+
+
+def main():
+    import database
+    with db_temporal():
+        n_clases, n_reservas = _preparar()
+        print(f"{n_clases:,} clases, {n_reservas:,} reservas ({ANIOS} años)")
+        filas = _medir("5 años")
+        t0 = time.perf_counter()
+        ok, n, err = database.archivar_clases(90)
+        assert ok, err
+        print(f"archivar_clases(90): {n:,} clases en {(time.perf_counter() - t0):.1f} s")
+        filas += _medir("tras archivar")
+        filas.append(("pasadas + archivo (incluir_archivo=True)",
+                      cronometrar(lambda: database.get_all_clases_pasadas(incluir_archivo=True), 3)))
+        filas.append(("get_asistencia_historica (archivo pre-agregado)",
+                      cronometrar(database.get_asistencia_historica, 3)))
+    imprimir("Listados de clases", filas)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# benchmarks/bench_asistencia.py — Check-ins por segundo: una transacción por check-in vs group commit (asistencia.py)
+from __future__ import annotations
+import random
+import statistics
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+
+from _comun import db_temporal, poblar
+
+N_CLASES = 4
+RESERVAS_POR_CLASE = 500
+SIN_RESERVA_POR_CLASE = 100
+CLIENTES = 32            # sesiones/escáneres registrando a la vez
+OBJETIVO_POR_SEGUNDO = 500
+
+
+def _preparar():
+    import database
+    ahora = datetime.now().replace(microsecond=0).isoformat(sep=" ")
+    cupo = RESERVAS_POR_CLASE + SIN_RESERVA_POR_CLASE
+    with database.get_conn() as c:
+        c.execute("BEGIN")
+        c.execute("INSERT INTO Tipo (nombre) VALUES ('Funcional')")
+        for i in range(N_CLASES):
+            c.execute(
+                "INSERT INTO Entrenador (RUT, nombre, apellido, fecha_nac, especialidad) VALUES (?,?,?,?,?)",
+                (f"2000000{i}-{i}", f"Entrenador{i}", "Bench", "1985-01-01", "Funcional"),
+            )
+            c.execute(
+                "INSERT INTO Clase (id_entrenador, id_tipo, nombre, fecha_hora, duracion_min, cupo_max) "
+                "VALUES (?, 1, ?, ?, 60, ?)",
+                (i + 1, f"Clase {i}", ahora, cupo),
+            )
+        c.executemany(
+            "INSERT INTO Reserva (id_socio, id_clase) VALUES (?, ?)",
+            [(1 + i * cupo + j, 1 + i) for i in range(N_CLASES) for j in range(RESERVAS_POR_CLASE)],
+        )
+        c.execute("COMMIT")
+        ruts = dict(c.execute("SELECT id_socio, RUT FROM Socio"))
+    # Mitad por RUT y mitad por id; los últimos de cada clase llegan sin reserva
+    checkins = [
+        (ruts[s] if j % 2 else s, 1 + i)
+        for i in range(N_CLASES) for j in range(cupo) for s in (1 + i * cupo + j,)
+    ]
+    random.Random(3).shuffle(checkins)
+    return checkins
+
+
+def _reiniciar():
+    import database
+    with database.get_conn() as c:
+        c.execute("BEGIN")
+        c.execute("DELETE FROM Reserva WHERE (id_socio - 1) % ? >= ?",
+                  (RESERVAS_POR_CLASE + SIN_RESERVA_POR_CLASE, RESERVAS_POR_CLASE))
+        c.execute("UPDATE Reserva SET asistio = 0")
+        c.execute("COMMIT")
+
+
+def _medir(checkins, registrar) -> dict:
+    latencias = []
+
+    def _uno(pedido):
+        t0 = time.perf_counter()
+        ok, _, err = registrar(*pedido)
+        latencias.append((time.perf_counter() - t0) * 1000)
+        assert ok, err
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(CLIENTES) as ex:
+        list(ex.map(_uno, checkins))
+    total = time.perf_counter() - t0
+    latencias.sort()
+    return {
+        "por_segundo": len(checkins) / total,
+        "p50_ms": statistics.median(latencias),
+        "p99_ms": latencias[int(len(latencias) * 0.99)],
+    }
+
+
+def main():
+    import asistencia
+    import database
+    with db_temporal():
+        database.ensure_full_schema()
+        poblar(n_socios=N_CLASES * (RESERVAS_POR_CLASE + SIN_RESERVA_POR_CLASE))
+        checkins = _preparar()
+
+        def _una_transaccion(socio, id_clase):
+            # Sin agrupar: cada check-in con su propia transacción (mismo SQL)
+            pedido = asistencia._Pedido(asistencia._socio(socio), id_clase, database._ahora_epoch(), Future())
+            asistencia._aplicar([pedido])
+            return pedido.resultado.result()
+
+        resultados = []
+        # NORMAL es lo que usa db_pool (WAL sin fsync por commit); FULL sincroniza
+        # el WAL en cada commit, como un disco donde cada transacción cuesta un fsync
+        for sincronizacion in ("NORMAL", "FULL"):
+            with database.get_conn() as c:
+                c.execute(f"PRAGMA synchronous={sincronizacion}")
+            for etiqueta, registrar in (
+                ("una transacción por check-in", _una_transaccion),
+                (f"group commit (lote {asistencia.LOTE_MAX}, espera {asistencia.ESPERA_MS} ms)",
+                 asistencia.registrar_asistencia),
+            ):
+                _reiniciar()
+                resultados.append((f"{etiqueta}, {sincronizacion}", _medir(checkins, registrar)))
+                with database.get_read_conn() as c:
+                    asistentes = c.execute("SELECT COUNT(*) FROM Reserva WHERE asistio = 1").fetchone()[0]
+                assert asistentes == len(checkins), asistentes
+
+    print(f"\n== Check-in ({len(checkins):,} socios en {N_CLASES} clases, {CLIENTES} clientes, "
+          f"{SIN_RESERVA_POR_CLASE} sin reserva por clase) ==")
+    for etiqueta, r in resultados:
+        estado = "OK" if r["por_segundo"] >= OBJETIVO_POR_SEGUNDO else "bajo el objetivo"
+        print(f"  {etiqueta:<52} {r['por_segundo']:8.0f} check-ins/s | p50 {r['p50_ms']:7.2f} ms | "
+              f"p99 {r['p99_ms']:7.2f} ms  [{estado}: {OBJETIVO_POR_SEGUNDO}/s]")
+
+
+if __name__ == "__main__":
+    main()
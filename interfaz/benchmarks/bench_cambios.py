@@ -0,0 +1,123 @@
+# benchmarks/bench_cambios.py — Registro de cambios (cambios.py): costo de los triggers,
+# lectura incremental vs releer las tablas, compactación y exportación JSONL
+from __future__ import annotations
+import io
+import random
+import time
+
+from _comun import cronometrar, db_temporal, imprimir, poblar
+
+N_SOCIOS = 50_000
+N_PAGOS = 500_000
+N_INSERTS = 50_000
+N_MODIFICACIONES = 1_000
+
+_TABLAS = ("Socio", "Suscripcion", "Pago", "Reserva")
+
+
+def _insertar_pagos(n: int) -> float:
+    import database
+    t0 = time.perf_counter()
+    with database.get_conn() as c:
+        c.execute("BEGIN")
+        c.executemany(
+            "INSERT INTO Pago (id_suscripcion, monto, metodo_pago) VALUES (?, 24500, 'efectivo')",
+            [(1 + i % N_SOCIOS,) for i in range(n)],
+        )
+        c.execute("COMMIT")
+    return (time.perf_counter() - t0) * 1000
+
+
+def _modificar(rnd: random.Random, n: int):
+    # Lo que cambia entre dos lecturas de un sistema externo: pagos nuevos y socios editados
+    import database
+    with database.get_conn() as c:
+        c.execute("BEGIN")
+        for _ in range(n // 2):
+            c.execute("UPDATE Socio SET telefono = ? WHERE id_socio = ?",
+                      (f"9{rnd.randrange(10 ** 8):08d}", rnd.randint(1, N_SOCIOS)))
+        c.executemany("INSERT INTO Pago (id_suscripcion, monto, metodo_pago) VALUES (?, 24500, 'tarjeta')",
+                      [(rnd.randint(1, N_SOCIOS),) for _ in range(n - n // 2)])
+        c.execute("COMMIT")
+
+
+def _contar() -> int:
+    import database
+    with database.get_read_conn() as c:
+        return c.execute("SELECT COUNT(*) FROM Cambio").fetchone()[0]
+
+
+def main():
+    import cambios
+    import database
+    rnd = random.Random(5)
+    with db_temporal():
+        database.ensure_full_schema()
+        poblar(n_socios=N_SOCIOS, n_pagos=N_PAGOS)
+
+        # Triggers: la misma carga de pagos con y sin la anotación en Cambio
+        con_registro = _insertar_pagos(N_INSERTS)
+        with database.get_conn() as c:
+            triggers = [r[0] for r in c.execute(
+                "SELECT sql FROM sqlite_master WHERE name IN ('trg_cambio_pago_ins', 'trg_cambio_pago_del')")]
+            c.execute("DROP TRIGGER trg_cambio_pago_ins")
+            c.execute("DROP TRIGGER trg_cambio_pago_del")
+            ultimo = c.execute("SELECT MAX(id_pago) FROM Pago").fetchone()[0]
+        sin_registro = _insertar_pagos(N_INSERTS)
+        with database.get_conn() as c:
+            # Los pagos de la carga sin registro no se anotaron: se quitan antes de reponer los triggers
+            c.execute("DELETE FROM Pago WHERE id_pago > ?", (ultimo,))
+            for sql in triggers:
+                c.execute(sql)
+        print(f"\n  {N_INSERTS:,} pagos en una transacción: {sin_registro:.0f} ms sin registro, "
+              f"{con_registro:.0f} ms con registro de cambios")
+
+        ok, borrados, err = cambios.compactar()
+        assert ok, err
+        with database.get_read_conn() as c:
+            seq = c.execute("SELECT MAX(seq) FROM Cambio").fetchone()[0]
+
+        # Lectura de un sistema externo: sólo lo que cambió vs todas las tablas
+        _modificar(rnd, N_MODIFICACIONES)
+
+        def _incremental():
+            pagina = cambios.cambios_desde(seq, N_MODIFICACIONES)
+            assert len(pagina["cambios"]) == N_MODIFICACIONES and not pagina["hay_mas"]
+
+        def _tablas_completas():
+            with database.get_read_conn() as c:
+                for tabla in _TABLAS:
+                    c.execute(f"SELECT * FROM {tabla}").fetchall()
+
+        filas = [
+            (f"cambios_desde ({N_MODIFICACIONES:,} cambios)", cronometrar(_incremental, 10)),
+            ("releer Socio+Suscripcion+Pago+Reserva", cronometrar(_tablas_completas, 3)),
+        ]
+
+        # Compactación tras muchas modificaciones repetidas de las mismas filas
+        for _ in range(20):
+            _modificar(rnd, 10_000)
+        antes = _contar()
+        t0 = time.perf_counter()
+        ok, borrados, err = cambios.compactar()
+        assert ok, err
+        t_compactar = (time.perf_counter() - t0) * 1000
+        despues = _contar()
+        with database.get_read_conn() as c:
+            vivas = sum(c.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in _TABLAS)
+        assert despues == vivas, "tras compactar debe quedar un cambio por fila viva"
+
+        salida = io.StringIO()
+        t0 = time.perf_counter()
+        n, _, resincronizar = cambios.exportar_jsonl(salida, 0, 5000)
+        t_exportar = (time.perf_counter() - t0) * 1000
+        assert n == vivas and not resincronizar
+
+        imprimir(f"Registro de cambios ({vivas:,} filas vivas)", filas)
+        print(f"  compactar(): {antes:,} -> {despues:,} cambios en {t_compactar:.0f} ms")
+        print(f"  exportación JSONL desde 0: {n:,} cambios en {t_exportar:.0f} ms "
+              f"({len(salida.getvalue()) / 2 ** 20:.0f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# benchmarks/bench_clases.py — Listado de clases de la vista: lista completa + filtro en Python vs motor SQL paginado
+#
+# Antes la vista leía todas las clases del listado, filtraba ventana/texto en
+# Python y recortaba la página. Con database.listar_clases el filtro, el orden
+# y la página se resuelven en una sola sentencia indexada (+ contar_clases).
+from __future__ import annotations
+
+from _comun import cronometrar, db_temporal, imprimir
+from bench_archivo import _preparar
+
+TAM_PAGINA = 25
+
+
+def main():
+    import database
+    from database import FiltroClases
+    with db_temporal():
+        n_clases, n_reservas = _preparar()
+        print(f"{n_clases:,} clases, {n_reservas:,} reservas")
+
+        def _en_python(filtro_py, pagina=0):
+            clases = [c for c in database.get_all_clases_pasadas() if filtro_py(c)]
+            return len(clases), clases[pagina * TAM_PAGINA:(pagina + 1) * TAM_PAGINA]
+
+        def _motor(filtro, pagina=0):
+            return database.contar_clases(filtro), database.listar_clases(
+                filtro._replace(pagina=pagina, por_pagina=TAM_PAGINA))
+
+        pasadas = FiltroClases(cuando="pasadas", orden="desc")
+        mes = pasadas._replace(id_entrenador=3, desde="2024-01-01", hasta="2024-01-31")
+        texto = pasadas._replace(texto="clase 7-")
+        casos = (
+            ("pasadas, página 1", lambda c: True, pasadas, 0),
+            ("pasadas, página 200", lambda c: True, pasadas, 199),
+            ("entrenador + un mes", lambda c: "2024-01-01" <= c["fecha_hora"][:10] <= "2024-01-31"
+             and c["entrenador"] == "Coach2 Bench", mes, 0),
+            ("texto 'clase 7-'", lambda c: "clase 7-" in c["nombre"].lower(), texto, 0),
+        )
+        filas = []
+        database.CACHE_TTL = 0
+        for etiqueta, filtro_py, filtro, pagina in casos:
+            assert _en_python(filtro_py, pagina)[0] == _motor(filtro, pagina)[0]
+            filas.append((f"{etiqueta}: lista completa + Python", cronometrar(lambda: _en_python(filtro_py, pagina), 3)))
+            filas.append((f"{etiqueta}: listar_clases", cronometrar(lambda: _motor(filtro, pagina), 10)))
+        database.CACHE_TTL = 30
+        _motor(pasadas, 199)
+        filas.append(("pasadas, página 200: caché compartida", cronometrar(lambda: _motor(pasadas, 199), 10)))
+        imprimir(f"Página de {TAM_PAGINA} clases", filas)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# benchmarks/bench_conciliacion.py — Conciliación de pagos: consulta ad hoc vs corrida por lotes con punto de control (conciliacion.py)
+from __future__ import annotations
+import random
+import statistics
+import time
+from datetime import date, timedelta
+
+from _comun import cronometrar, db_temporal, imprimir, poblar
+
+N_SOCIOS = 50_000
+SUSCRIPCIONES_POR_SOCIO = 10
+PRECIOS = {1: 24500, 2: 66000, 3: 120000, 4: 210000}
+
+# Lo que se escribiría sin el job: todo de una vez, agrupando todos los pagos
+_SQL_AD_HOC = """
+    SELECT s.id_suscripcion,
+           COALESCE(SUM(CASE WHEN g.estado_pago = 'completado' THEN g.monto END), 0) - p.precio AS diferencia
+    FROM Suscripcion s
+    JOIN Plan p ON p.id_plan = s.id_plan
+    LEFT JOIN Pago g ON g.id_suscripcion = s.id_suscripcion
+    WHERE s.estado_sus <> 'cancelada'
+    GROUP BY s.id_suscripcion
+    HAVING ABS(diferencia) > 1
+"""
+
+
+def _pagos(id_suscripcion: int, precio: int, rnd: random.Random):
+    # Mayoría pagada exacta; algunas sin pago, en cuotas, parciales (con saldo pendiente) o con sobrepago
+    x = rnd.random()
+    if x < 0.03:
+        return []
+    if x < 0.06:
+        return [(id_suscripcion, precio // 2, "completado"), (id_suscripcion, precio - precio // 2, "pendiente")]
+    if x < 0.08:
+        return [(id_suscripcion, precio, "completado"), (id_suscripcion, precio, "completado")]
+    if x < 0.10:
+        return [(id_suscripcion, precio // 2, "completado"), (id_suscripcion, precio - precio // 2, "completado")]
+    if x < 0.11:
+        return [(id_suscripcion, precio, "rechazado")]
+    return [(id_suscripcion, precio, "completado")]
+
+
+def _poblar(rnd: random.Random) -> int:
+    import database
+    poblar(n_socios=N_SOCIOS)
+    hoy = date.today()
+    with database.get_conn() as c:
+        c.execute("BEGIN")
+        c.executemany(
+            "INSERT INTO Suscripcion (id_socio, id_plan, fecha_inicio, fecha_fin, estado_sus) VALUES (?,?,?,?,?)",
+            [(1 + i % N_SOCIOS, 1 + i % 4, (hoy - timedelta(days=3650 - i // N_SOCIOS * 365)).isoformat(),
+              (hoy - timedelta(days=3600 - i // N_SOCIOS * 365)).isoformat(),
+              "cancelada" if i % 97 == 0 else "vencida")
+             for i in range(N_SOCIOS * (SUSCRIPCIONES_POR_SOCIO - 1))],
+        )
+        c.execute("DELETE FROM Pago")
+        pagos = []
+        for id_suscripcion, id_plan in c.execute("SELECT id_suscripcion, id_plan FROM Suscripcion").fetchall():
+            pagos += _pagos(id_suscripcion, PRECIOS[id_plan], rnd)
+        c.executemany(
+            "INSERT INTO Pago (id_suscripcion, monto, metodo_pago, estado_pago) VALUES (?, ?, 'efectivo', ?)", pagos,
+        )
+        c.execute("COMMIT")
+        return len(pagos)
+
+
+def main():
+    import conciliacion
+    import database
+    with db_temporal():
+        database.ensure_full_schema()
+        n_pagos = _poblar(random.Random(13))
+
+        t0 = time.perf_counter()
+        with database.get_read_conn() as c:
+            ad_hoc = dict(c.execute(_SQL_AD_HOC).fetchall())
+        t_ad_hoc = (time.perf_counter() - t0) * 1000
+
+        def _resultados():
+            with database.get_read_conn() as c:
+                return dict(c.execute("SELECT id_suscripcion, diferencia FROM ConciliacionResultado").fetchall())
+
+        # Corrida interrumpida a los 10 lotes y retomada desde el punto de control
+        ok, _, err = conciliacion.conciliar(max_lotes=10)
+        assert ok, err
+        ok, _, err = conciliacion.conciliar()
+        assert ok, err
+        assert _resultados() == ad_hoc, "la corrida retomada no coincide con la consulta ad hoc"
+
+        # Corrida completa medida lote a lote (cada lote es lo que otro escritor podría esperar)
+        lotes = []
+        t0 = time.perf_counter()
+        while True:
+            t1 = time.perf_counter()
+            ok, n, err = conciliacion.conciliar(max_lotes=1)
+            assert ok, err
+            if not n:
+                break
+            lotes.append((time.perf_counter() - t1) * 1000)
+        t_corrida = (time.perf_counter() - t0) * 1000
+        assert _resultados() == ad_hoc, "la segunda corrida no coincide con la consulta ad hoc"
+        with database.get_read_conn() as c:
+            agrupado = {t: (n, d) for t, n, d in c.execute(
+                "SELECT tipo, COUNT(*), SUM(diferencia) FROM ConciliacionResultado GROUP BY tipo")}
+        totales = conciliacion.resumen_conciliacion()["tipos"]
+        assert agrupado == {t: (v["n"], v["diferencia"]) for t, v in totales.items() if v["n"]}, \
+            "ConciliacionTotal no coincide con ConciliacionResultado"
+        estado = conciliacion.resumen_conciliacion()["estado"]
+
+        filas = [
+            (f"lote de {conciliacion.LOTE:,} suscripciones", {"min_ms": min(lotes), "med_ms": statistics.median(lotes),
+                                                            "max_ms": max(lotes)}),
+            ("panel: resumen + 200 discrepancias", cronometrar(
+                lambda: (conciliacion.resumen_conciliacion(), conciliacion.get_discrepancias()), 20)),
+        ]
+        imprimir(f"Conciliación ({estado['revisadas']:,} suscripciones, {n_pagos:,} pagos, "
+                 f"{len(ad_hoc):,} discrepancias)", filas)
+        print(f"  corrida completa por lotes: {t_corrida:.1f} ms ({len(lotes)} lotes)")
+        print(f"  consulta ad hoc (una sola transacción de lectura): {t_ad_hoc:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+# benchmarks/bench_conexiones.py — Latencia de get_user: conexión nueva vs pool
+from __future__ import annotations
+import sqlite3
+import tempfile
+from pathlib import Path
+
+from _comun import cronometrar, imprimir
+
+import auth_local
+
+N = 2000
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        auth_local.DB_PATH = str(Path(tmp) / "users_bench.db")
+        auth_local.BCRYPT_ROUNDS = 4   # la semilla del admin no es lo que se mide
+        auth_local.ensure_db(seed_admin=True)
+
+        def _conexion_nueva():
+            # Comportamiento anterior: sqlite3.connect() por cada consulta
+            con = sqlite3.connect(auth_local.DB_PATH)
+            with con:
+                con.execute(auth_local._GET_USER_SQL, ("admin",)).fetchone()
+            con.close()
+
+        filas = [
+            ("get_user: conexión nueva por llamada", cronometrar(_conexion_nueva, N)),
+            ("get_user: pool (WAL, sentencia preparada)", cronometrar(lambda: auth_local.get_user("admin"), N)),
+        ]
+    imprimir(f"Consulta de usuario ({N} repeticiones)", filas)
+
+
+if __name__ == "__main__":
+    main()
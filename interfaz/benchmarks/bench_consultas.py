@@ -0,0 +1,75 @@
+# benchmarks/bench_consultas.py — SQL armado en cada llamada vs sentencias registradas (consultas.py)
+#
+# Con SQL que cambia según los filtros cada variante nueva se parsea y prepara
+# de nuevo; las sentencias registradas tienen texto fijo y siempre aciertan en
+# el caché de sentencias de la conexión. Al final se listan las métricas por consulta.
+from __future__ import annotations
+import sqlite3
+
+from _comun import cronometrar, db_temporal, imprimir, poblar
+
+N_SOCIOS = 5_000
+N_PAGOS = 50_000
+LLAMADAS = 2_000
+
+
+def _armado(c: sqlite3.Connection, i: int):
+    # Misma consulta con los valores pegados en el texto: cada combinación es
+    # un SQL distinto que se vuelve a parsear si no está en el caché
+    metodos = ("transferencia", "webpay", "tarjeta", "efectivo")[: 1 + i % 4]
+    c.execute(f"""
+        SELECT pag.id_pago, pag.fecha_pago, pag.monto, pag.metodo_pago
+        FROM Pago pag
+        WHERE pag.fecha_pago >= '{"2000-01-01" if i % 2 else ""}' AND pag.fecha_pago <= '9999-12-31'
+          AND pag.metodo_pago IN ({",".join(f"'{m}'" for m in metodos)})
+        ORDER BY pag.fecha_pago DESC, pag.id_pago DESC
+        LIMIT {10 + i % 7}
+    """).fetchall()
+
+
+def main():
+    import database
+    import consultas
+    consultas.registrar("bench.pagos_recientes", """
+        SELECT pag.id_pago, pag.fecha_pago, pag.monto, pag.metodo_pago
+        FROM Pago pag
+        WHERE pag.fecha_pago >= :desde AND pag.fecha_pago <= :hasta
+          AND pag.metodo_pago IN (SELECT value FROM json_each(:metodos))
+        ORDER BY pag.fecha_pago DESC, pag.id_pago DESC
+        LIMIT :limite
+    """)
+
+    def _registrada(c: sqlite3.Connection, i: int):
+        metodos = ("transferencia", "webpay", "tarjeta", "efectivo")[: 1 + i % 4]
+        consultas.todas(c, "bench.pagos_recientes", {
+            "desde": "2000-01-01" if i % 2 else "", "hasta": "9999-12-31",
+            "metodos": '["' + '","'.join(metodos) + '"]', "limite": 10 + i % 7,
+        })
+
+    with db_temporal():
+        database.ensure_full_schema()
+        poblar(n_socios=N_SOCIOS, n_pagos=N_PAGOS)
+
+        filas = []
+        for etiqueta, fn in (("SQL armado por llamada", _armado), ("sentencia registrada", _registrada)):
+            # Caché de sentencias chico para que se note la rotación de variantes
+            for cache in (4, consultas.tamano_cache()):
+                c = sqlite3.connect(database.current_db_path(), isolation_level=None, cached_statements=cache)
+                filas.append((f"{etiqueta} (caché {cache})",
+                              cronometrar(lambda: [fn(c, i) for i in range(LLAMADAS)], 5)))
+                c.close()
+        imprimir(f"{LLAMADAS:,} lecturas de pagos con filtros variables ({N_PAGOS:,} pagos)", filas)
+
+        consultas.reiniciar_metricas()
+        for _ in range(20):
+            database.get_all_socios(limit=50)
+            database.get_historial_pagos_columnas(limit=100, metodos=["webpay"])
+            database.get_all_proximas_clases(8)
+        print("\n== Métricas por consulta (consultas.metricas) ==")
+        for m in consultas.metricas():
+            print(f"  {m['consulta']:<35} {m['ejecuciones']:5d} ejec | total {m['total_ms']:8.2f} ms"
+                  f" | prom {m['promedio_ms']:7.3f} ms | máx {m['max_ms']:7.3f} ms | filas {m['filas']}")
+
+
+if __name__ == "__main__":
+    main()
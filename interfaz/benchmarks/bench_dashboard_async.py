@@ -0,0 +1,68 @@
+# benchmarks/bench_dashboard_async.py — Consultas de los paneles del dashboard: en serie vs database_async.reunir
+from __future__ import annotations
+import os
+
+from _comun import cronometrar, db_temporal, imprimir, poblar
+
+N_SOCIOS = 20_000
+N_PAGOS = 200_000
+
+
+def _consultas():
+    import database
+    return {
+        "socios_activos": database.count_socios_activos,
+        "clases_hoy": database.count_clases_hoy,
+        "entrenadores_activos": database.count_entrenadores_activos,
+        "reservas_hoy": database.count_reservas_hoy,
+        "ingresos_mes": database.ingresos_mes_actual,
+        "proximas": (database.get_all_proximas_clases, 8),
+        "resumen_proximas": database.resumen_proximas_clases,
+        "alertas": database.get_clases_proximas_con_alertas,
+        "por_vencer": (database.membresias_por_vencer, 7),
+        "pagos_recientes": (database.get_historial_pagos, 10, {"formato": "columnas"}),
+        "socios_recientes": (database.get_all_socios, {"limit": 10, "formato": "columnas"}),
+    }
+
+
+def main():
+    import database
+    import database_async
+    from database_async import _desarmar
+
+    def _serie():
+        for consulta in _consultas().values():
+            fn, args, kwargs = _desarmar(consulta)
+            fn(*args, **kwargs)
+
+    def _reunir():
+        resultados = database_async.reunir(_consultas())
+        errores = [v for v in resultados.values() if isinstance(v, BaseException)]
+        assert not errores, errores
+
+    with db_temporal():
+        database.ensure_full_schema()
+        database.init_db_data()
+        poblar(n_socios=N_SOCIOS, n_pagos=N_PAGOS)
+        _serie()
+        _reunir()
+
+        filas = []
+        for ttl, etiqueta in ((0, "sin caché de KPIs"), (database.CACHE_TTL or 30, "con caché de KPIs")):
+            database.CACHE_TTL = ttl
+            filas.append((f"en serie ({etiqueta})", cronometrar(_serie, 7)))
+            filas.append((f"reunir, {database_async.LECTURA_WORKERS} hilos ({etiqueta})", cronometrar(_reunir, 7)))
+        imprimir(f"Paneles del dashboard ({N_SOCIOS:,} socios, {N_PAGOS:,} pagos)", filas)
+
+        # Cota inferior con núcleos suficientes: la consulta individual más lenta (sin caché)
+        database.CACHE_TTL = 0
+        lentas = []
+        for clave, consulta in _consultas().items():
+            fn, args, kwargs = _desarmar(consulta)
+            lentas.append((cronometrar(lambda: fn(*args, **kwargs), 5)["med_ms"], clave))
+        ms, clave = max(lentas)
+        print(f"  consulta más lenta: {clave} ({ms:.1f} ms); núcleos disponibles: {os.cpu_count()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+# benchmarks/bench_demanda.py — Matriz de ocupación día × hora × tipo: consulta ad hoc vs tabla precalculada (demanda.py)
+from __future__ import annotations
+import math
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from _comun import cronometrar, db_temporal, imprimir, poblar
+
+DIAS_HISTORIA = 730
+HORAS = range(7, 22)
+CLASES_POR_HORA = 2
+N_TIPOS = 6
+N_SOCIOS = 3000
+
+# Lo que se escribiría sin la tabla precalculada: todas las clases terminadas y sus reservas
+_SQL_AD_HOC = """
+    SELECT (CAST(strftime('%w', c.fecha_hora) AS INTEGER) + 6) % 7 AS dia,
+           CAST(strftime('%H', c.fecha_hora) AS INTEGER) AS hora, c.id_tipo,
+           COUNT(*) AS clases, SUM(c.cupo_max) AS cupos,
+           SUM(COALESCE(r.reservas, 0)) AS reservas, SUM(COALESCE(r.asistencias, 0)) AS asistencias,
+           SUM(COALESCE(r.reservas, 0) >= c.cupo_max) AS llenas
+    FROM Clase c
+    LEFT JOIN (
+        SELECT id_clase, SUM(estado_reserva = 'confirmada') AS reservas, SUM(asistio = 1) AS asistencias
+        FROM Reserva GROUP BY id_clase
+    ) r ON r.id_clase = c.id_clase
+    WHERE c.fin <= ?
+    GROUP BY dia, hora, c.id_tipo
+"""
+
+
+def _clases(desde: date, dias: int, rnd: random.Random):
+    # (fecha_hora, id_entrenador, id_tipo, cupo, demanda): más demanda en la tarde y de lunes a jueves
+    for d in range(dias):
+        dia = desde + timedelta(days=d)
+        for hora in HORAS:
+            for k in range(CLASES_POR_HORA):
+                tipo = 1 + (hora + k) % N_TIPOS
+                demanda = 6 + 10 * (17 <= hora <= 20) + 4 * (dia.weekday() < 4) + 2 * tipo
+                yield (f"{dia.isoformat()} {hora:02d}:00:00", 1 + (hora - HORAS[0]) * CLASES_POR_HORA + k,
+                       tipo, rnd.choice((15, 20, 25)), demanda)
+
+
+def _insertar(clases, rnd: random.Random, asistencia: bool = True):
+    import database
+    with database.get_conn() as c:
+        c.execute("BEGIN")
+        reservas = []
+        for fecha_hora, entrenador, tipo, cupo, demanda in clases:
+            id_clase = c.execute(
+                "INSERT INTO Clase (id_entrenador, id_tipo, nombre, fecha_hora, duracion_min, cupo_max) "
+                "VALUES (?, ?, ?, ?, 55, ?)", (entrenador, tipo, f"Tipo {tipo}", fecha_hora, cupo),
+            ).lastrowid
+            n = min(cupo, max(0, int(rnd.gauss(demanda, 4))))
+            reservas += [(s, id_clase, int(asistencia and rnd.random() < 0.8))
+                         for s in rnd.sample(range(1, N_SOCIOS + 1), n)]
+        c.executemany("INSERT INTO Reserva (id_socio, id_clase, asistio) VALUES (?, ?, ?)", reservas)
+        c.execute("COMMIT")
+        return len(reservas)
+
+
+def main():
+    import database
+    import demanda
+    rnd = random.Random(17)
+    with db_temporal():
+        database.ensure_full_schema()
+        poblar(n_socios=N_SOCIOS)
+        with database.get_conn() as c:
+            c.execute("BEGIN")
+            c.executemany("INSERT INTO Tipo (nombre) VALUES (?)", [(f"Tipo {i}",) for i in range(1, N_TIPOS + 1)])
+            c.executemany(
+                "INSERT INTO Entrenador (RUT, nombre, apellido, fecha_nac, especialidad) VALUES (?,?,?,?,?)",
+                [(f"2000{i:04d}-0", f"Entrenador{i}", "Bench", "1985-01-01", "x")
+                 for i in range(1, len(HORAS) * CLASES_POR_HORA + 1)],
+            )
+            c.execute("COMMIT")
+
+        # Historia hasta ayer; reconstruir y dejar la marca justo antes del último día
+        hoy = date.today()
+        reservas = _insertar(_clases(hoy - timedelta(days=DIAS_HISTORIA), DIAS_HISTORIA - 1, rnd), rnd)
+        ok, n_clases, err = demanda.reconstruir()
+        assert ok, err
+        ayer = datetime.combine(hoy - timedelta(days=1), datetime.min.time())
+        with database.get_conn() as c:
+            c.execute("UPDATE DemandaEstado SET hasta = ?", (database.epoch(ayer),))
+
+        # El último día (clases ya terminadas) entra con actualizar()
+        reservas += _insertar([f for f in _clases(ayer.date(), 1, rnd)], rnd)
+        t0 = time.perf_counter()
+        ok, n_dia, err = demanda.actualizar()
+        assert ok, err
+        t_incremental = (time.perf_counter() - t0) * 1000
+        incremental = {(f["dia"], f["hora"]): f for f in demanda.matriz_demanda()}
+
+        # Próximas dos semanas, con algunas reservas ya hechas
+        _insertar([f[:4] + (f[4] // 3,) for f in _clases(hoy + timedelta(days=1), 14, rnd)], rnd, asistencia=False)
+
+        t0 = time.perf_counter()
+        with database.get_read_conn() as c:
+            ad_hoc = c.execute(_SQL_AD_HOC, (database._ahora_epoch(),)).fetchall()
+        t_ad_hoc = (time.perf_counter() - t0) * 1000
+
+        filas = [("reconstruir() (NumPy)", cronometrar(demanda.reconstruir, 3))]
+        completa = {(f["dia"], f["hora"]): f for f in demanda.matriz_demanda()}
+        assert incremental == completa, "actualizar() no coincide con reconstruir()"
+        # Sumando los tipos, igual que la consulta ad hoc
+        esperado = {}
+        for dia, hora, _, *valores in ad_hoc:
+            esperado[(dia, hora)] = [a + b for a, b in zip(esperado.get((dia, hora), [0] * 5), valores)]
+        campos = ("clases", "cupos", "reservas", "asistencias", "llenas")
+        assert {k: [f[x] for x in campos] for k, f in completa.items()} == esperado, "la matriz no coincide con SQL"
+
+        filas.append((f"actualizar() tras un día ({n_dia} clases)", {"min_ms": t_incremental, "med_ms": t_incremental,
+                                                                    "max_ms": t_incremental}))
+        filas.append(("heatmap: matriz_demanda()", cronometrar(demanda.matriz_demanda, 50)))
+        filas.append(("pronostico_clases(14 días)", cronometrar(demanda.pronostico_clases, 20)))
+        imprimir(f"Demanda ({n_clases:,} clases terminadas, {reservas:,} reservas)", filas)
+        print(f"  consulta ad hoc de la matriz (SQL): {t_ad_hoc:.1f} ms")
+
+        # Vida media corta: los pesos (relativos al ancla) no se desbordan, y mover el
+        # ancla en una pasada incremental da lo mismo que reconstruir
+        demanda.VIDA_MEDIA_DIAS = 7
+        ok, _, err = demanda.actualizar()   # otra vida media: reconstruye
+        assert ok, err
+        corta = demanda.pronostico_clases()
+        assert all(math.isfinite(p["reservas_esperadas"]) and p["cupo_sugerido"] for p in corta)
+        with database.get_conn() as c:
+            # Como si la última pasada hubiera sido hace 3 días
+            factor = 2 ** (3 / demanda.VIDA_MEDIA_DIAS)
+            c.execute("UPDATE DemandaCelda SET peso_clases = peso_clases * ?, peso_reservas = peso_reservas * ?, "
+                      "peso_llenas = peso_llenas * ?", (factor, factor, factor))
+            c.execute("UPDATE DemandaEstado SET ancla = ancla - 3 * ?", (database.DIA,))
+        ok, _, err = demanda.actualizar()
+        assert ok, err
+        movida = demanda.pronostico_clases()
+        assert all(math.isclose(a["reservas_esperadas"], b["reservas_esperadas"], rel_tol=1e-9)
+                   for a, b in zip(corta, movida)), "reescalar al mover el ancla no coincide"
+        print(f"\n  vida media de 7 días: {len(corta)} clases pronosticadas, ancla movida sin diferencias")
+        demanda.VIDA_MEDIA_DIAS = 90
+
+        print("\n  Próximas clases de la tarde (pronóstico):")
+        for p in [p for p in demanda.pronostico_clases(3) if p["fecha_hora"][11:13] == "18"][:4]:
+            print(f"    {p['fecha_hora'][:16]} {p['tipo_clase']:<7} cupo {p['cupo_max']:>2} "
+                  f"reservas {p['reservas']:>2} esperadas {p['reservas_esperadas']:5.1f} "
+                  f"llena {p['prob_llena']:5.1f}% sugerido {p['cupo_sugerido']}")
+
+
+if __name__ == "__main__":
+    main()
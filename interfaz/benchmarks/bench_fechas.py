@@ -0,0 +1,113 @@
+# benchmarks/bench_fechas.py — Filtros por fecha: funciones de texto vs columnas epoch
+# Ejecuta la versión anterior de cada consulta (DATE()/datetime()/julianday()/strftime()
+# sobre TEXT) y la actual de database.py, verifica que devuelvan lo mismo y compara tiempos.
+from __future__ import annotations
+import random
+from datetime import datetime, timedelta
+
+from _comun import cronometrar, db_temporal, imprimir, poblar
+
+N_SOCIOS = 50_000
+N_PAGOS = 300_000
+N_CLASES = 60_000
+
+_ANTERIOR = {
+    "membresias_por_vencer": ("""
+        SELECT s.id_socio, s.nombre || ' ' || s.apellido_p AS nombre_socio, sus.fecha_fin, p.nombre_plan,
+               CAST(julianday(sus.fecha_fin) - julianday(date('now','localtime')) AS INT) AS dias_restantes
+        FROM Suscripcion sus
+        JOIN Socio s ON s.id_socio = sus.id_socio
+        JOIN Plan  p ON p.id_plan  = sus.id_plan
+        WHERE DATE(sus.fecha_fin) BETWEEN DATE('now','localtime') AND DATE('now','localtime', '+7 day')
+        ORDER BY sus.fecha_fin ASC
+        LIMIT 50
+    """, lambda r: [tuple(x) for x in r]),
+    "ingresos_mes_actual": ("""
+        SELECT COALESCE(SUM(monto),0) FROM Pago
+        WHERE estado_pago='completado' AND strftime('%Y-%m','now','localtime') = strftime('%Y-%m', fecha_pago)
+    """, lambda r: float(r[0][0])),
+    "count_clases_hoy": ("""
+        SELECT COUNT(*) FROM Clase WHERE DATE(fecha_hora) = DATE('now','localtime')
+    """, lambda r: r[0][0]),
+    "get_clases_proximas_con_alertas": ("""
+        SELECT c.id_clase, c.nombre, c.cupo_max, (c.cupo_max - COUNT(r.id_reserva)) as cupos_disponibles
+        FROM Clase c
+        LEFT JOIN Reserva r ON c.id_clase = r.id_clase AND r.estado_reserva = 'confirmada'
+        WHERE datetime(c.fecha_hora) >= datetime('now','localtime')
+        GROUP BY c.id_clase HAVING cupos_disponibles <= 3 ORDER BY c.fecha_hora
+    """, lambda r: len(r)),
+    "get_all_proximas_clases": ("""
+        SELECT c.id_clase, c.nombre, t.nombre AS tipo_clase, e.nombre || ' ' || e.apellido AS entrenador,
+               c.fecha_hora, c.duracion_min, c.descripcion, c.cupo_max,
+               (c.cupo_max - COALESCE(SUM(CASE WHEN r.estado_reserva='confirmada' THEN 1 ELSE 0 END),0)) AS cupos_disponibles
+        FROM Clase c
+        JOIN Tipo t ON t.id_tipo = c.id_tipo
+        JOIN Entrenador e ON e.id_entrenador = c.id_entrenador
+        LEFT JOIN Reserva r ON r.id_clase = c.id_clase
+        WHERE datetime(c.fecha_hora) >= datetime('now','localtime')
+        GROUP BY c.id_clase
+        ORDER BY c.fecha_hora ASC
+    """, lambda r: len(r)),
+}
+
+
+def _nuevo(nombre):
+    import database
+    f = getattr(database, nombre)
+    if nombre == "membresias_por_vencer":
+        return lambda: [tuple(d.values()) for d in f(7)]
+    if nombre == "get_clases_proximas_con_alertas":
+        return lambda: len(f())
+    if nombre == "get_all_proximas_clases":
+        # Tuplas planas, como el camino anterior (sin construir dicts)
+        return lambda: len(f(formato="columnas")["id_clase"])
+    return f
+
+
+def _clases():
+    import database
+    rnd = random.Random(11)
+    ahora = datetime.now().replace(second=0, microsecond=0)
+    with database.get_conn() as c:
+        c.execute("BEGIN")
+        c.executemany(
+            "INSERT INTO Entrenador (RUT, nombre, apellido, fecha_nac, especialidad) VALUES (?,?,?,?,?)",
+            [(f"{20_000_000 + i}-{i % 10}", f"Coach{i}", "Bench", "1990-01-01", "General") for i in range(200)],
+        )
+        c.execute("INSERT INTO Tipo (nombre) VALUES ('TipoBench')")
+        # Cada entrenador con una clase cada 6 h (sin choques), de hace 60 días a +15 días
+        c.executemany("""
+            INSERT INTO Clase (id_entrenador, id_tipo, nombre, descripcion, fecha_hora, duracion_min, cupo_max)
+            VALUES (?,?,?,?,?,?,?)
+        """, [(1 + i % 200, 1, f"C{i}", None,
+               (ahora - timedelta(days=60) + timedelta(hours=6 * (i // 200))).strftime("%Y-%m-%d %H:%M:%S"),
+               rnd.choice((45, 60)), 20) for i in range(N_CLASES)])
+        c.execute("COMMIT")
+
+
+def main():
+    import database
+    filas = []
+    with db_temporal():
+        database.ensure_full_schema()
+        poblar(n_socios=N_SOCIOS, n_pagos=N_PAGOS)
+        with database.get_conn() as c:
+            # Vencimientos repartidos en ±1 año para que 'por vencer' tenga datos
+            c.execute("""
+                UPDATE Suscripcion
+                SET fecha_inicio = DATE('now','localtime', '-400 days'),
+                    fecha_fin = DATE('now','localtime', (id_suscripcion % 730 - 365) || ' days')
+            """)
+        _clases()
+        with database.get_conn() as c:
+            for nombre, (sql, norm) in _ANTERIOR.items():
+                nuevo = _nuevo(nombre)
+                antes = norm(c.execute(sql).fetchall())
+                assert antes == nuevo(), nombre
+                filas.append((f"{nombre} (texto)", cronometrar(lambda: c.execute(sql).fetchall(), 10)))
+                filas.append((f"{nombre} (epoch)", cronometrar(nuevo, 10)))
+    imprimir(f"Filtros de fecha ({N_SOCIOS:,} socios, {N_PAGOS:,} pagos, {N_CLASES:,} clases)", filas)
+
+
+if __name__ == "__main__":
+    main()
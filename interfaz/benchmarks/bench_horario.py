@@ -0,0 +1,96 @@
+# benchmarks/bench_horario.py — Generación de un trimestre de clases desde plantillas
+# Compara: clases una a una con registrar_nueva_classe + chequeo de choques por pares,
+# contra generar_horario (índice de intervalos + una sola transacción).
+from __future__ import annotations
+import time
+from datetime import datetime, timedelta
+
+from _comun import cronometrar, db_temporal, imprimir
+
+SEMANAS = 13
+N_ENTRENADORES = 12
+N_EXISTENTES = N_ENTRENADORES * SEMANAS * 7   # una clase suelta por entrenador y día
+
+
+def _preparar():
+    import database
+    database.ensure_full_schema()
+    with database.get_conn() as c:
+        c.execute("BEGIN")
+        c.executemany(
+            "INSERT INTO Entrenador (RUT, nombre, apellido, fecha_nac, especialidad) VALUES (?,?,?,?,?)",
+            [(f"{20_000_000 + i}-{i % 10}", f"Coach{i}", "Bench", "1990-01-01", "General") for i in range(N_ENTRENADORES)],
+        )
+        c.executemany("INSERT INTO Tipo (nombre) VALUES (?)", [(f"TipoBench{i}",) for i in range(4)])
+        ids_ent = [r[0] for r in c.execute("SELECT id_entrenador FROM Entrenador")]
+        ids_tipo = [r[0] for r in c.execute("SELECT id_tipo FROM Tipo")]
+        # ~60 sesiones por semana: 5 franjas x 6 días x 2 salas, sin choques
+        plantillas = []
+        for dia in range(6):
+            for franja, hora in enumerate(("07:00", "09:00", "12:00", "18:00", "20:00")):
+                for sala in range(2):
+                    ent = ids_ent[(dia + franja * 2 + sala) % len(ids_ent)]
+                    plantillas.append((ent, ids_tipo[(franja + sala) % len(ids_tipo)], f"Clase {dia}-{hora}-{sala}",
+                                       None, dia, hora, 60, 20))
+        c.executemany("""
+            INSERT INTO PlantillaClase (id_entrenador, id_tipo, nombre, descripcion, dia_semana, hora, duracion_min, cupo_max)
+            VALUES (?,?,?,?,?,?,?,?)
+        """, plantillas)
+        # Clases existentes a las 22:30 (no chocan con las plantillas, pero hay que revisarlas)
+        base = datetime.now().replace(hour=22, minute=30, second=0, microsecond=0)
+        c.executemany("""
+            INSERT INTO Clase (id_entrenador, id_tipo, nombre, descripcion, fecha_hora, duracion_min, cupo_max)
+            VALUES (?,?,?,?,?,?,?)
+        """, [(ids_ent[i % len(ids_ent)], ids_tipo[0], f"Suelta {i}", None,
+               (base + timedelta(days=i // N_ENTRENADORES % (SEMANAS * 7))).strftime("%Y-%m-%d %H:%M:%S"), 45, 10)
+              for i in range(N_EXISTENTES)])
+        c.execute("COMMIT")
+
+
+def _uno_a_uno(desde):
+    # Camino anterior: validar contra todas las clases por pares y luego un INSERT por clase
+    import database
+    from horarios import expandir_plantillas, FMT_FECHA_HORA
+    sesiones = expandir_plantillas(database.get_plantillas(), desde, SEMANAS)
+    with database.get_conn() as c:
+        existentes = [(e, datetime.strptime(f, FMT_FECHA_HORA), d)
+                      for e, f, d in c.execute("SELECT id_entrenador, fecha_hora, duracion_min FROM Clase").fetchall()]
+    conflictos = 0
+    for s in sesiones:
+        fin = s["inicio"] + timedelta(minutes=s["duracion_min"])
+        for e, ini, dur in existentes:
+            if e == s["id_entrenador"] and ini < fin and s["inicio"] < ini + timedelta(minutes=dur):
+                conflictos += 1
+        existentes.append((s["id_entrenador"], s["inicio"], s["duracion_min"]))
+    for s in sesiones:
+        database.registrar_nueva_classe(s["id_entrenador"], s["id_tipo"], s["nombre"], None,
+                                        s["inicio"].strftime(FMT_FECHA_HORA), s["duracion_min"], s["cupo_max"])
+    return len(sesiones)
+
+
+def main():
+    from horarios import generar_horario, proximo_lunes, validar_horario
+    filas = []
+    with db_temporal():
+        _preparar()
+        desde = proximo_lunes()
+        total, conflictos = validar_horario(desde, SEMANAS)
+        print(f"{total} sesiones en {SEMANAS} semanas, {len(conflictos)} conflictos")
+        filas.append(("validar_horario (índice de intervalos)", cronometrar(lambda: validar_horario(desde, SEMANAS), 5)))
+        t0 = time.perf_counter()
+        ok, creadas, err = generar_horario(desde, SEMANAS)
+        filas.append((f"generar_horario ({creadas} clases, 1 transacción)",
+                      {k: (time.perf_counter() - t0) * 1000 for k in ("min_ms", "med_ms", "max_ms")}))
+        assert ok, err
+    with db_temporal():
+        _preparar()
+        desde = proximo_lunes()
+        t0 = time.perf_counter()
+        n = _uno_a_uno(desde)
+        filas.append((f"pares + INSERT uno a uno ({n} clases)",
+                      {k: (time.perf_counter() - t0) * 1000 for k in ("min_ms", "med_ms", "max_ms")}))
+    imprimir(f"Horario trimestral ({SEMANAS} semanas)", filas)
+
+
+if __name__ == "__main__":
+    main()
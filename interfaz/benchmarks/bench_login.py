@@ -0,0 +1,80 @@
+# benchmarks/bench_login.py — Time-to-interactive de la pantalla de login
+# Cada medición corre en un proceso Python nuevo (arranque en frío real):
+# importa streamlit, ejecuta app.py hasta el formulario de login y reporta
+# cuánto tardó y qué dependencias pesadas quedaron cargadas.
+# Luego mide el primer import de cada página vía page_loader.
+from __future__ import annotations
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from _comun import INTERFAZ_DIR
+
+PESADOS = ("pandas", "plotly.express", "plotly.graph_objects")
+
+_HIJO = r"""
+import json, runpy, sys, time, warnings, logging
+t0 = time.perf_counter()
+sys.path.insert(0, {interfaz!r})
+logging.disable(logging.CRITICAL)
+warnings.filterwarnings("ignore")
+import streamlit as st
+class _Stop(Exception):
+    pass
+def _stop():
+    # En modo "bare" st.stop() no corta el script; se emula el runtime real
+    raise _Stop()
+st.stop = _stop
+import auth_local, database
+auth_local.DB_PATH = {users!r}
+database.set_db_path({gym!r})
+try:
+    runpy.run_path({app!r}, run_name="__main__")
+except _Stop:
+    pass  # st.stop() corta el script despues de dibujar el login
+login_ms = (time.perf_counter() - t0) * 1000
+cargados = {{m: (m in sys.modules) for m in {pesados!r}}}
+
+import page_loader
+for pagina in ("dashboard", "socios", "clases", "pagos"):
+    page_loader.load_page_render(pagina)
+print(json.dumps({{"login_ms": login_ms, "cargados": cargados, "paginas_ms": page_loader.IMPORT_TIMES_MS}}))
+"""
+
+
+def _medir(tmp: Path) -> dict:
+    codigo = _HIJO.format(
+        interfaz=str(INTERFAZ_DIR),
+        users=str(tmp / "users_bench.db"),
+        gym=str(tmp / "GymLite_bench.db"),
+        app=str(INTERFAZ_DIR / "app.py"),
+        pesados=PESADOS,
+    )
+    salida = subprocess.run(
+        [sys.executable, "-c", codigo], cwd=INTERFAZ_DIR,
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(salida.strip().splitlines()[-1])
+
+
+def main(repeticiones: int = 5):
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        _medir(tmp)  # primera corrida: crea y migra las DBs temporales
+        resultados = [_medir(tmp) for _ in range(repeticiones)]
+
+    logins = sorted(r["login_ms"] for r in resultados)
+    print("\n== Login: time-to-interactive (proceso nuevo) ==")
+    print(f"  min {logins[0]:.1f} ms | med {logins[len(logins) // 2]:.1f} ms | max {logins[-1]:.1f} ms")
+    print("  dependencias pesadas cargadas en el login:")
+    for modulo, cargado in resultados[-1]["cargados"].items():
+        print(f"    {modulo:<22} {'SI' if cargado else 'no'}")
+    print("  primer import por página (ms):")
+    for pagina, ms in resultados[-1]["paginas_ms"].items():
+        print(f"    {pagina:<22} {ms:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+# benchmarks/bench_login_throttle.py — Rafaga de logins fallidos (credential stuffing)
+# Compara cuantas verificaciones bcrypt ejecuta el servidor con y sin limites.
+from __future__ import annotations
+import tempfile
+import time
+from pathlib import Path
+
+from _comun import INTERFAZ_DIR  # noqa: F401  (agrega interfaz/ al sys.path)
+
+import auth_local
+
+INTENTOS = 50
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        auth_local.DB_PATH = str(Path(tmp) / "users_bench.db")
+        auth_local.ensure_db(seed_admin=True)
+
+        t0 = time.perf_counter()
+        for i in range(INTENTOS):
+            auth_local.verify_user("admin", f"clave-mala-{i}")
+        sin_limite = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        for i in range(INTENTOS):
+            auth_local.attempt_login("admin", f"clave-mala-{i}", client="ip:203.0.113.9")
+        con_limite = time.perf_counter() - t0
+        m = auth_local.login_metrics()
+
+    print(f"\n== {INTENTOS} logins fallidos seguidos (bcrypt rounds={auth_local.BCRYPT_ROUNDS}) ==")
+    print(f"  sin limites (verify_user):   {sin_limite * 1000:9.1f} ms  | {INTENTOS} verificaciones bcrypt")
+    print(f"  con limites (attempt_login): {con_limite * 1000:9.1f} ms  | {m['bcrypt_checks']} verificaciones bcrypt")
+    print(f"  metricas: {m}")
+
+
+if __name__ == "__main__":
+    main()
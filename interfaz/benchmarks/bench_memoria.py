@@ -0,0 +1,41 @@
+# benchmarks/bench_memoria.py — Memoria y tiempo por formato de resultado
+# Compara get_historial_pagos(formato=...) con "dict", "registro" y "columnas"
+# sobre un historial grande, midiendo el pico de memoria con tracemalloc.
+from __future__ import annotations
+import gc
+import time
+import tracemalloc
+
+from _comun import db_temporal, poblar
+
+import database
+
+N_PAGOS = 200_000
+
+
+def _medir(formato: str):
+    gc.collect()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    resultado = database.get_historial_pagos(limit=N_PAGOS, formato=formato)
+    ms = (time.perf_counter() - t0) * 1000
+    retenido, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    filas = len(resultado["id_pago"]) if formato == "columnas" else len(resultado)
+    return filas, ms, retenido / 2**20, pico / 2**20
+
+
+def main():
+    with db_temporal():
+        database.ensure_full_schema()
+        poblar(n_socios=5_000, n_pagos=N_PAGOS)
+        database.get_historial_pagos(limit=10)   # calienta el cache de páginas
+
+        print(f"\n== get_historial_pagos({N_PAGOS:,} filas) por formato ==")
+        for formato in database.FORMATOS:
+            filas, ms, retenido, pico = _medir(formato)
+            print(f"  {formato:<9} filas {filas:>8,} | {ms:8.1f} ms | retenido {retenido:7.1f} MiB | pico {pico:7.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
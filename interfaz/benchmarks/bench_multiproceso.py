@@ -0,0 +1,115 @@
+# benchmarks/bench_multiproceso.py — Prueba de carga: N hilos en un proceso vs N procesos (workers)
+#
+#   python benchmarks/bench_multiproceso.py [--segundos 5] [--max-workers 8]
+#
+# Cada "vista" hace el trabajo de un render del dashboard: KPIs (caché
+# compartida), listados por conexiones de lectura y los tres gráficos de Plotly
+# serializados a JSON, como hace Streamlit al enviarlos al navegador.
+# Con hilos el trabajo de CPU se reparte un solo núcleo (GIL); con procesos
+# debería escalar casi linealmente hasta la cantidad de núcleos.
+from __future__ import annotations
+import argparse
+import multiprocessing as mp
+import os
+import threading
+import time
+
+from _comun import INTERFAZ_DIR, db_temporal, poblar
+
+
+def _preparar_worker(ruta_db: str):
+    import sys
+    if str(INTERFAZ_DIR) not in sys.path:
+        sys.path.insert(0, str(INTERFAZ_DIR))
+    import database
+    database.set_db_path(ruta_db)
+    from views import dashboard
+    _vista(dashboard)   # calentamiento: imports, pools y caché
+    return dashboard
+
+
+def _vista(dashboard):
+    import database
+    database.count_socios_activos()
+    database.count_clases_hoy()
+    database.ingresos_mes_actual()
+    database.count_reservas_hoy()
+    database.membresias_por_vencer()
+    database.get_clases_proximas_con_alertas()
+    for crear in (dashboard.create_clases_by_type_chart, dashboard.create_payment_methods_chart,
+                  dashboard.create_reservations_trend_chart):
+        crear().to_json()
+
+
+def _bucle(dashboard, inicio, segundos: float) -> int:
+    inicio.wait()
+    fin = time.perf_counter() + segundos
+    n = 0
+    while time.perf_counter() < fin:
+        _vista(dashboard)
+        n += 1
+    return n
+
+
+def _proceso(ruta_db: str, inicio, segundos: float, salida):
+    dashboard = _preparar_worker(ruta_db)
+    salida.put(_bucle(dashboard, inicio, segundos))
+
+
+def con_procesos(ruta_db: str, workers: int, segundos: float) -> float:
+    ctx = mp.get_context("spawn")   # sin heredar conexiones SQLite abiertas
+    inicio, salida = ctx.Barrier(workers + 1), ctx.Queue()
+    procs = [ctx.Process(target=_proceso, args=(ruta_db, inicio, segundos, salida)) for _ in range(workers)]
+    for p in procs:
+        p.start()
+    inicio.wait()
+    total = sum(salida.get() for _ in procs)
+    for p in procs:
+        p.join()
+    return total / segundos
+
+
+def con_hilos(ruta_db: str, workers: int, segundos: float) -> float:
+    dashboard = _preparar_worker(ruta_db)
+    inicio = threading.Barrier(workers + 1)
+    cuentas = [0] * workers
+
+    def _hilo(i):
+        cuentas[i] = _bucle(dashboard, inicio, segundos)
+
+    hilos = [threading.Thread(target=_hilo, args=(i,)) for i in range(workers)]
+    for h in hilos:
+        h.start()
+    inicio.wait()
+    for h in hilos:
+        h.join()
+    return sum(cuentas) / segundos
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--segundos", type=float, default=5.0)
+    ap.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = ap.parse_args()
+
+    import database
+    with db_temporal() as ruta:
+        database.ensure_full_schema()
+        database.init_db_data()
+        poblar(n_socios=2000, n_pagos=20_000)
+
+        niveles = sorted({1, 2, 4, 8, args.max_workers} & set(range(1, args.max_workers + 1)))
+        print(f"\n== Dashboard: vistas por segundo ({os.cpu_count()} núcleos, {args.segundos:.0f} s por medición) ==")
+        base = {}
+        for n in niveles:
+            fila = []
+            for modo, medir in (("hilos", con_hilos), ("procesos", con_procesos)):
+                vps = medir(str(ruta), n, args.segundos)
+                base.setdefault(modo, vps)
+                escala = vps / base[modo]
+                fila.append(f"{modo}: {vps:7.1f} v/s (x{escala:4.2f}, eficiencia {escala / n:4.0%})")
+            print(f"  {n:>2} workers | " + " | ".join(fila))
+
+
+if __name__ == "__main__":
+    main()
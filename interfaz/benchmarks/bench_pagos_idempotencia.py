@@ -0,0 +1,62 @@
+# benchmarks/bench_pagos_idempotencia.py — Registro de pagos con clave de idempotencia (database.registrar_pago)
+# Compara un pago nuevo, el reenvío del mismo formulario (doble clic) y lo que
+# costaba encontrar los duplicados después, recorriendo todo Pago.
+from __future__ import annotations
+import itertools
+import uuid
+
+from _comun import cronometrar, db_temporal, imprimir, poblar
+
+N_SOCIOS = 10_000
+N_PAGOS = 500_000
+
+# Limpieza sin clave: pagos iguales del mismo día sobre la misma suscripción
+_SQL_DUPLICADOS = """
+    SELECT id_suscripcion, fecha_pago, monto, metodo_pago, COUNT(*) AS n
+    FROM Pago
+    GROUP BY id_suscripcion, fecha_pago, monto, metodo_pago
+    HAVING n > 1
+"""
+
+
+def main():
+    import database
+    with db_temporal():
+        database.ensure_full_schema()
+        poblar(n_socios=N_SOCIOS, n_pagos=N_PAGOS)
+        with database.get_read_conn() as c:
+            antes = c.execute("SELECT COUNT(*) FROM Pago").fetchone()[0]
+
+        suscripciones = itertools.cycle(range(1, N_SOCIOS + 1))
+        claves = []
+
+        def _nuevo():
+            clave, id_suscripcion = uuid.uuid4().hex, next(suscripciones)
+            ok, id_pago, err = database.registrar_pago(id_suscripcion, 24500, "efectivo", clave=clave)
+            assert ok, err
+            claves.append((clave, id_suscripcion, id_pago))
+
+        filas = [("pago nuevo (INSERT)", cronometrar(_nuevo, 500))]
+        reenvios = iter(claves * 2)
+
+        def _reenvio():
+            clave, id_suscripcion, id_pago = next(reenvios)
+            ok, original, err = database.registrar_pago(id_suscripcion, 24500, "efectivo", clave=clave)
+            assert ok and original == id_pago, err
+
+        filas.append(("reenvío de la misma clave (índice)", cronometrar(_reenvio, 1000)))
+
+        def _duplicados():
+            with database.get_read_conn() as c:
+                c.execute(_SQL_DUPLICADOS).fetchall()
+
+        filas.append(("buscar duplicados sin clave (scan)", cronometrar(_duplicados, 3)))
+        with database.get_read_conn() as c:
+            despues = c.execute("SELECT COUNT(*) FROM Pago").fetchone()[0]
+        assert despues - antes == len(claves), "un reenvío insertó otra fila"
+        imprimir(f"Pagos idempotentes ({despues:,} pagos)", filas)
+        print(f"  {len(claves)} pagos nuevos + {2 * len(claves)} reenvíos -> {despues - antes} filas nuevas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# benchmarks/bench_pagos_vista.py — Historial de pagos: dicts vs columnas tipadas
+# Reproduce el trabajo de la pestaña "Historial y Reportes" de views/pagos.py
+# sobre un historial grande. Cada variante corre en un proceso nuevo para
+# medir el pico de RSS de forma independiente.
+from __future__ import annotations
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from _comun import INTERFAZ_DIR, db_temporal, poblar
+
+N_PAGOS = 500_000
+
+_HIJO = r"""
+import json, resource, sys, time
+sys.path.insert(0, {interfaz!r})
+from datetime import date
+import pandas as pd
+import database
+from views.pagos import _fmt_money, _fmt_money_col
+database.set_db_path({db!r})
+d1, d2 = date(2000, 1, 1), date.today()
+metodos = ["efectivo", "transferencia", "tarjeta"]
+t0 = time.perf_counter()
+if {variante!r} == "dicts":
+    # Camino anterior: lista de dicts -> DataFrame -> coerciones -> filtros -> copia -> map
+    df = pd.DataFrame(database.get_historial_pagos(limit={n}))
+    df["fecha_pago"] = pd.to_datetime(df["fecha_pago"], errors="coerce")
+    df["monto"] = pd.to_numeric(df["monto"], errors="coerce")
+    df = df[df["metodo_pago"].isin(metodos)]
+    df = df[(df["fecha_pago"].dt.date >= d1) & (df["fecha_pago"].dt.date <= d2)]
+    df = df.sort_values("fecha_pago", ascending=False)
+    show = df.copy()
+    show["monto"] = show["monto"].map(_fmt_money)
+else:
+    # Camino columnar: filtros en SQL, arrays tipados, formato vectorizado
+    df = pd.DataFrame(database.get_historial_pagos_columnas(limit={n}, metodos=metodos, desde=d1, hasta=d2), copy=False)
+    show = df.assign(monto=_fmt_money_col(df["monto"]))
+ms = (time.perf_counter() - t0) * 1000
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print(json.dumps({{"ms": ms, "rss_mib": rss, "filas": len(show)}}))
+"""
+
+
+def _correr(variante: str, db: Path) -> dict:
+    codigo = _HIJO.format(interfaz=str(INTERFAZ_DIR), db=str(db), variante=variante, n=N_PAGOS)
+    salida = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, check=True).stdout
+    return json.loads(salida.strip().splitlines()[-1])
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        with db_temporal() as db:
+            import database
+            database.ensure_full_schema()
+            poblar(n_socios=20_000, n_pagos=N_PAGOS)
+            resultados = {v: _correr(v, db) for v in ("dicts", "columnas")}
+
+    print(f"\n== Historial de pagos, {N_PAGOS:,} filas (proceso nuevo por variante) ==")
+    for variante, r in resultados.items():
+        print(f"  {variante:<9} filas {r['filas']:>8,} | {r['ms']:9.1f} ms | pico RSS {r['rss_mib']:8.1f} MiB")
+    a, b = resultados["dicts"], resultados["columnas"]
+    print(f"  mejora: x{a['ms'] / b['ms']:.1f} en tiempo, x{a['rss_mib'] / b['rss_mib']:.1f} en RSS")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# benchmarks/bench_reportes.py — Reportes en el hilo del script vs en el pool de procesos (reportes.py)
+#
+# Mide cuánto tarda la exportación de todo el historial de pagos y, mientras
+# corre, cuántas "sesiones livianas" (otro hilo del mismo proceso) alcanza a
+# atender el servidor: en línea el reporte retiene el GIL; en el pool no.
+from __future__ import annotations
+import threading
+import time
+
+from _comun import db_temporal, poblar
+
+N_SOCIOS = 20_000
+N_PAGOS = 300_000
+
+
+def _sesion_liviana(detener: threading.Event, cuenta: list):
+    # Trabajo típico de un rerun corto: Python puro, necesita el GIL
+    while not detener.is_set():
+        sum(i * i for i in range(2000))
+        cuenta[0] += 1
+
+
+def _medir(nombre: str, reporte):
+    detener, cuenta = threading.Event(), [0]
+    hilo = threading.Thread(target=_sesion_liviana, args=(detener, cuenta))
+    hilo.start()
+    t0 = time.perf_counter()
+    bloqueo = reporte()
+    total = time.perf_counter() - t0
+    detener.set()
+    hilo.join()
+    print(f"  {nombre:<38} total {total * 1000:8.1f} ms | hilo del script bloqueado {bloqueo * 1000:8.1f} ms"
+          f" | otras sesiones: {cuenta[0] / total:8.0f} reruns/s")
+
+
+def main():
+    import database
+    import reportes
+    with db_temporal():
+        database.ensure_full_schema()
+        poblar(n_socios=N_SOCIOS, n_pagos=N_PAGOS)
+        # Calentamiento del pool (spawn + imports) fuera de la medición
+        reportes.resultado(reportes.enviar("historial_pagos", limite=10), timeout=None)
+
+        print(f"\n== Exportación CSV de {N_PAGOS:,} pagos ==")
+
+        def _en_linea():
+            t0 = time.perf_counter()
+            reportes._exportar_pagos()
+            return time.perf_counter() - t0
+        _medir("en línea (hilo del script)", _en_linea)
+
+        def _en_pool():
+            t0 = time.perf_counter()
+            id_trabajo = reportes.enviar("exportar_pagos")
+            bloqueo = time.perf_counter() - t0
+            while reportes.estado(id_trabajo) in ("pendiente", "en_curso"):
+                time.sleep(0.05)   # sondeo, como reportes.sondear()
+            t1 = time.perf_counter()
+            reportes.resultado(id_trabajo)
+            return bloqueo + time.perf_counter() - t1
+        _medir("pool de procesos (reportes.py)", _en_pool)
+
+        t0 = time.perf_counter()
+        reportes.resultado(reportes.enviar("exportar_pagos"))
+        print(f"  {'repetido (caché de resultados)':<38} total {(time.perf_counter() - t0) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
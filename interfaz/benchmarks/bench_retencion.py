@@ -0,0 +1,142 @@
+# benchmarks/bench_retencion.py — Retención por cohortes: consulta ad hoc vs tablas precalculadas (retencion.py)
+from __future__ import annotations
+import random
+import time
+from datetime import date, timedelta
+
+from _comun import cronometrar, db_temporal, imprimir, poblar
+
+N_SOCIOS = 50_000
+LOTES_RENOVACIONES = (20, 500)
+
+# Lo que se escribiría sin tablas precalculadas: por cohorte y mes desde el alta,
+# socios con una suscripción que toque ese mes
+_SQL_AD_HOC = """
+    WITH RECURSIVE
+    primera AS (
+        SELECT id_socio, DATE(MIN(fecha_inicio), 'start of month') AS alta
+        FROM Suscripcion WHERE estado_sus <> 'cancelada'
+        GROUP BY id_socio
+    ),
+    meses(m) AS (SELECT 0 UNION ALL SELECT m + 1 FROM meses WHERE m < 60)
+    SELECT strftime('%Y-%m', p.alta) AS cohorte, meses.m AS mes, COUNT(DISTINCT s.id_socio) AS activos
+    FROM primera p
+    JOIN meses ON DATE(p.alta, '+' || meses.m || ' months') <= DATE('now', 'localtime')
+    JOIN Suscripcion s ON s.id_socio = p.id_socio AND s.estado_sus <> 'cancelada'
+     AND s.fecha_inicio < DATE(p.alta, '+' || (meses.m + 1) || ' months')
+     AND s.fecha_fin >= DATE(p.alta, '+' || meses.m || ' months')
+    GROUP BY cohorte, mes
+"""
+
+
+def _historia(n_socios: int, seed: int = 11):
+    # Cadenas de suscripciones desde un alta en los últimos 3 años; cada
+    # vencimiento renueva (a veces tarde o antes) o termina en baja
+    rnd = random.Random(seed)
+    hoy = date.today()
+    filas = []
+    for socio in range(1, n_socios + 1):
+        inicio = hoy - timedelta(days=rnd.randrange(1095))
+        while inicio <= hoy:
+            plan = rnd.choice((1, 1, 1, 2, 2, 3, 4))
+            fin = inicio + timedelta(days=30 * (1, 3, 6, 12)[plan - 1])
+            filas.append((socio, plan, inicio.isoformat(), fin.isoformat(),
+                          "cancelada" if rnd.random() < 0.02 else "activa"))
+            if rnd.random() < 0.15:
+                break
+            inicio = fin + timedelta(days=rnd.choice((-7, -1, 0, 0, 0, 1, 2, 5, 12, 40, 90)))
+    return filas
+
+
+def main():
+    import database
+    import retencion
+    with db_temporal():
+        database.ensure_full_schema()
+        poblar(n_socios=N_SOCIOS)
+        filas = _historia(N_SOCIOS)
+        with database.get_conn() as c:
+            c.execute("BEGIN")
+            c.execute("DELETE FROM Suscripcion")
+            c.executemany(
+                "INSERT INTO Suscripcion (id_socio, id_plan, fecha_inicio, fecha_fin, estado_sus) VALUES (?,?,?,?,?)",
+                filas,
+            )
+            c.execute("COMMIT")
+
+        t0 = time.perf_counter()
+        with database.get_read_conn() as c:
+            ad_hoc = {(r[0], r[1]): r[2] for r in c.execute(_SQL_AD_HOC)}
+        t_ad_hoc = (time.perf_counter() - t0) * 1000
+
+        filas_bench = []
+        filas_bench.append(("reconstruir() (pandas)", cronometrar(retencion.reconstruir, 3)))
+
+        # Mismo resultado que la consulta ad hoc (sumando los planes)
+        precalculada = {
+            (r["cohorte"], r["mes"]): r["activos"]
+            for r in retencion.matriz_retencion(meses=120) if r["activos"]
+        }
+        assert precalculada == ad_hoc, "la matriz precalculada no coincide con la consulta ad hoc"
+
+        # Renovaciones del día a día: socios cuya última suscripción vence cerca de hoy
+        with database.get_read_conn() as c:
+            por_renovar = [r[0] for r in c.execute(
+                "SELECT id_socio FROM Suscripcion GROUP BY id_socio "
+                "HAVING MAX(fecha_fin) BETWEEN DATE('now', '-30 days') AND DATE('now', '+30 days')"
+            )]
+        random.Random(5).shuffle(por_renovar)
+
+        def _renovar(n: int):
+            lote = [(por_renovar.pop(),) for _ in range(n)]
+            with database.get_conn() as c:
+                c.execute("BEGIN")
+                c.executemany(
+                    "INSERT INTO Suscripcion (id_socio, id_plan, fecha_inicio, fecha_fin) "
+                    "SELECT id_socio, id_plan, fecha_fin, DATE(fecha_fin, '+1 month') FROM Suscripcion "
+                    "WHERE id_socio = ? ORDER BY fecha_fin DESC LIMIT 1",
+                    lote,
+                )
+                c.execute("COMMIT")
+
+        for n in LOTES_RENOVACIONES:
+            incrementales = []
+            for _ in range(3):
+                _renovar(n)
+                t0 = time.perf_counter()
+                ok, _, err = retencion.actualizar()
+                assert ok, err
+                incrementales.append((time.perf_counter() - t0) * 1000)
+            incrementales.sort()
+            filas_bench.append((f"actualizar() tras {n} renovaciones",
+                                {"min_ms": incrementales[0], "med_ms": incrementales[1], "max_ms": incrementales[2]}))
+
+        # Dos pasadas que calculan sobre la misma instantánea (botón + tarea, o dos
+        # workers): la segunda en guardar se descarta en vez de sumar otra vez
+        _renovar(20)
+        calcular = retencion._calcular_cambios
+        def _con_otra_pasada(*args):
+            r = calcular(*args)
+            retencion._calcular_cambios = calcular
+            assert retencion.actualizar()[0]
+            return r
+        retencion._calcular_cambios = _con_otra_pasada
+        ok, n, err = retencion.actualizar()
+        retencion._calcular_cambios = calcular
+        assert ok and n == 0, err
+        incremental = retencion.matriz_retencion(meses=120)
+        assert retencion.reconstruir()[0]
+        assert incremental == retencion.matriz_retencion(meses=120), "pasadas solapadas sumaron dos veces"
+
+        def _leer():
+            retencion.resumen_retencion()
+            retencion.matriz_retencion()
+            retencion.vencimientos_por_plan()
+        filas_bench.append(("lectura de la pestaña Retención", cronometrar(_leer, 20)))
+
+        imprimir(f"Retención ({N_SOCIOS:,} socios, {len(filas):,} suscripciones)", filas_bench)
+        print(f"  consulta ad hoc de la matriz de cohortes (SQL): {t_ad_hoc:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
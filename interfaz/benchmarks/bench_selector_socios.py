@@ -0,0 +1,54 @@
+# benchmarks/bench_selector_socios.py — Selección de socio: dict de etiquetas por widget vs índice compartido
+from __future__ import annotations
+
+from _comun import cronometrar, db_temporal, imprimir, poblar
+
+N_SOCIOS = 50_000
+WIDGETS = 10        # p. ej. una página de tarjetas de clase con selector propio (camino anterior)
+
+
+def _anterior():
+    # Camino anterior: cada widget consulta todos los socios y arma su propio dict de etiquetas
+    import database
+    for _ in range(WIDGETS):
+        socios = database.get_all_socios()
+        opciones = {
+            f"{s['id_socio']} - {s.get('nombre', '')} {s.get('apellido_p', '')} {s.get('apellido_m', '')}".strip(): s['id_socio']
+            for s in socios
+        }
+        list(opciones.keys())
+
+
+def main():
+    import database
+    from selector_socios import buscar_socios, indice
+    with db_temporal():
+        database.ensure_full_schema()
+        poblar(n_socios=N_SOCIOS)
+
+        filas = [(f"anterior: {WIDGETS} widgets x {N_SOCIOS:,} opciones", cronometrar(_anterior, 3))]
+
+        def _reconstruir():
+            database.marcar_socios_modificados()
+            indice.asegurar()
+        filas.append(("índice: (re)carga tras una escritura", cronometrar(_reconstruir, 3)))
+        filas.append(("índice: sin texto (primeros 50)", cronometrar(lambda: buscar_socios(""), 100)))
+
+        def _tecleo():
+            # Escribir 'nombre1234' letra a letra: cada búsqueda filtra sobre la anterior
+            database.marcar_socios_modificados()
+            indice.asegurar()
+            palabra = "nombre1234"
+            for i in range(1, len(palabra) + 1):
+                buscar_socios(palabra[:i])
+        filas.append(("índice: tecleo incremental de 10 letras", cronometrar(_tecleo, 5)))
+
+        # La escritura invalida el índice: el socio nuevo aparece en la siguiente búsqueda
+        ok, nuevo, err = database.crear_socio("77777777-7", "Zoe", "Índigo", None, "1990-01-01", None, None)
+        assert ok, err
+        assert buscar_socios("zoe indigo")[0][0][0] == nuevo
+    imprimir(f"Selector de socios ({N_SOCIOS:,} socios)", filas)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# benchmarks/bench_solapes.py — Chequeo de choque de entrenador con años de historial
+# Compara clases_superpuestas() (columnas inicio/fin + índice compuesto) contra
+# recorrer todas las clases del entrenador comparando textos con datetime().
+from __future__ import annotations
+import random
+from datetime import datetime, timedelta
+
+from _comun import cronometrar, db_temporal, imprimir
+
+ANIOS = 5
+N_ENTRENADORES = 12
+CLASES_POR_DIA = 6          # por entrenador
+N_CONSULTAS = 500
+
+_SQL_INGENUO = """
+    SELECT id_clase FROM Clase
+    WHERE id_entrenador = ?
+      AND datetime(fecha_hora) < datetime(?, '+' || ? || ' minutes')
+      AND datetime(fecha_hora, '+' || duracion_min || ' minutes') > datetime(?)
+"""
+
+
+def _preparar():
+    import database
+    database.ensure_full_schema()
+    inicio = datetime.now().replace(hour=7, minute=0, second=0, microsecond=0) - timedelta(days=365 * ANIOS)
+    with database.get_conn() as c:
+        c.execute("BEGIN")
+        c.executemany(
+            "INSERT INTO Entrenador (RUT, nombre, apellido, fecha_nac, especialidad) VALUES (?,?,?,?,?)",
+            [(f"{20_000_000 + i}-{i % 10}", f"Coach{i}", "Bench", "1990-01-01", "General") for i in range(N_ENTRENADORES)],
+        )
+        c.execute("INSERT INTO Tipo (nombre) VALUES ('TipoBench')")
+        filas = []
+        for dia in range(365 * ANIOS):
+            for ent in range(1, N_ENTRENADORES + 1):
+                for k in range(CLASES_POR_DIA):
+                    fh = inicio + timedelta(days=dia, hours=2 * k)
+                    filas.append((ent, 1, "Hist", None, fh.strftime("%Y-%m-%d %H:%M:%S"), 60, 20))
+        c.executemany("""
+            INSERT INTO Clase (id_entrenador, id_tipo, nombre, descripcion, fecha_hora, duracion_min, cupo_max)
+            VALUES (?,?,?,?,?,?,?)
+        """, filas)
+        c.execute("COMMIT")
+    return inicio, len(filas)
+
+
+def main():
+    import database
+    rnd = random.Random(3)
+    with db_temporal():
+        inicio, total = _preparar()
+        consultas = [
+            (rnd.randint(1, N_ENTRENADORES),
+             (inicio + timedelta(days=rnd.randrange(365 * ANIOS), minutes=rnd.randrange(0, 720, 15))).strftime("%Y-%m-%d %H:%M:%S"),
+             rnd.choice((45, 60, 90)))
+            for _ in range(N_CONSULTAS)
+        ]
+        # Mismos resultados por los dos caminos
+        with database.get_conn() as c:
+            ingenuo = [sorted(r[0] for r in c.execute(_SQL_INGENUO, (e, f, d, f))) for e, f, d in consultas]
+        assert ingenuo == [sorted(x) for x in database.clases_superpuestas_lote(consultas)]
+
+        def _ingenuo():
+            with database.get_conn() as c:
+                for e, f, d in consultas:
+                    c.execute(_SQL_INGENUO, (e, f, d, f)).fetchall()
+
+        def _indexado():
+            database.clases_superpuestas_lote(consultas)
+
+        t_ing = cronometrar(_ingenuo, 3)
+        t_idx = cronometrar(_indexado, 5)
+        por = lambda t: {k: v / N_CONSULTAS for k, v in t.items()}
+        imprimir(f"Choque de entrenador, {total:,} clases en historial (por consulta)", [
+            ("datetime() sobre todas las clases del entrenador", por(t_ing)),
+            ("clases_superpuestas (inicio/fin indexados)", por(t_idx)),
+        ])
+
+
+if __name__ == "__main__":
+    main()
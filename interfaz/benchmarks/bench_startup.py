@@ -0,0 +1,62 @@
+# benchmarks/bench_startup.py — Tiempo de arranque del bootstrap de esquema
+# Mide lo que app.py ejecuta antes del primer render:
+#   ensure_db() + ensure_full_schema() + init_db_data()
+#
+# - cold (DB vacía): aplica todas las migraciones y la semilla
+# - cold (proceso nuevo, DB al día): una sola lectura de PRAGMA user_version
+# - warm (rerun de Streamlit): sin acceso a la DB
+from __future__ import annotations
+import tempfile
+from pathlib import Path
+
+from _comun import cronometrar, db_temporal, imprimir
+
+import auth_local
+import database
+
+
+def _olvidar_estado_de_proceso():
+    # Simula un proceso nuevo: se olvidan las verificaciones ya hechas
+    database._schema_ok.clear()
+    database._seed_ok.clear()
+    auth_local._db_lista = False
+
+
+def _bootstrap():
+    auth_local.ensure_db(seed_admin=True)
+    database.ensure_full_schema()
+    database.init_db_data()
+
+
+def main():
+    filas = []
+    with tempfile.TemporaryDirectory() as tmp, db_temporal():
+        auth_local.DB_PATH = str(Path(tmp) / "users_bench.db")
+
+        _olvidar_estado_de_proceso()
+        filas.append(("cold: DB vacía (migraciones + semilla)", cronometrar(_bootstrap)))
+
+        def _cold_proceso():
+            _olvidar_estado_de_proceso()
+            _bootstrap()
+        filas.append(("cold: proceso nuevo, esquema al día", cronometrar(_cold_proceso, 50)))
+
+        filas.append(("warm: rerun de Streamlit", cronometrar(_bootstrap, 1000)))
+
+        def _ddl_completo():
+            # Referencia: costo de re-ejecutar todo el DDL en cada rerun (comportamiento anterior)
+            with database.get_conn() as c:
+                for _, _, ruta in database._listar_migraciones():
+                    for sentencia in database._sentencias(ruta.read_text(encoding="utf-8")):
+                        if not sentencia.upper().startswith("ALTER"):
+                            c.execute(sentencia)
+        filas.append(("referencia: DDL completo por rerun", cronometrar(_ddl_completo, 50)))
+
+        with database.get_conn() as c:
+            version = c.execute("PRAGMA user_version").fetchone()[0]
+
+    imprimir(f"Arranque (schema_version={version})", filas)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# cache_compartido.py — Caché de resultados compartida entre procesos (archivo SQLite local)
+from __future__ import annotations
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Iterable, Tuple
+
+from db_pool import get_pool
+
+_ESQUEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS generacion (
+        ambito TEXT PRIMARY KEY,
+        valor  INTEGER NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS entrada (
+        clave      TEXT PRIMARY KEY,
+        generacion INTEGER NOT NULL,
+        expira     REAL NOT NULL,
+        valor      TEXT NOT NULL
+    )
+    """,
+)
+
+
+def _preparar(conn: sqlite3.Connection):
+    for sentencia in _ESQUEMA:
+        conn.execute(sentencia)
+
+
+class CacheCompartida:
+    """
+    Caché clave -> JSON en un archivo SQLite (WAL) que comparten todos los
+    procesos de la app. Cada entrada guarda la generación de datos con la que
+    se calculó: al escribir en la DB principal se incrementa la generación y
+    todas las entradas anteriores dejan de servirse, en todos los procesos a la vez.
+    Además de la generación global ("datos") hay contadores por ámbito
+    (p.ej. "socios") para los índices en memoria de cada proceso.
+    """
+
+    def __init__(self, ruta: str | Path):
+        self.ruta = str(Path(ruta).resolve())
+        self._pool = get_pool(self.ruta, size=4, timeout=5.0, isolation_level=None, setup=_preparar)
+
+    def generacion(self, ambito: str = "datos") -> int:
+        with self._pool.acquire() as c:
+            row = c.execute("SELECT valor FROM generacion WHERE ambito = ?", (ambito,)).fetchone()
+            return row[0] if row else 0
+
+    def invalidar(self, ambitos: Iterable[str] = ("datos",)):
+        with self._pool.acquire() as c:
+            c.executemany("""
+                INSERT INTO generacion (ambito, valor) VALUES (?, 1)
+                ON CONFLICT(ambito) DO UPDATE SET valor = valor + 1
+            """, [(a,) for a in ambitos])
+
+    def obtener(self, clave: str) -> Tuple[int, bool, Any]:
+        """(generación actual, encontrado, valor). Sólo entradas vigentes de la generación actual."""
+        with self._pool.acquire() as c:
+            gen, valor = c.execute("""
+                SELECT g.valor,
+                       (SELECT e.valor FROM entrada e
+                        WHERE e.clave = :clave AND e.generacion = g.valor AND e.expira > :ahora)
+                FROM (SELECT COALESCE(MAX(valor), 0) AS valor FROM generacion WHERE ambito = 'datos') g
+            """, {"clave": clave, "ahora": time.time()}).fetchone()
+        if valor is None:
+            return gen, False, None
+        return gen, True, json.loads(valor)
+
+    def guardar(self, clave: str, valor: Any, ttl: float, generacion: int):
+        # Si hubo una escritura mientras se calculaba, la entrada nace vencida
+        # (su generación ya no es la actual) y no se sirve a nadie.
+        with self._pool.acquire() as c:
+            c.execute("""
+                INSERT OR REPLACE INTO entrada (clave, generacion, expira, valor)
+                VALUES (?, ?, ?, ?)
+            """, (clave, generacion, time.time() + ttl, json.dumps(valor)))
+
+    def purgar(self) -> int:
+        """Borra las entradas vencidas o de generaciones anteriores."""
+        with self._pool.acquire() as c:
+            return c.execute("""
+                DELETE FROM entrada
+                WHERE expira <= ?
+                   OR generacion < (SELECT COALESCE(MAX(valor), 0) FROM generacion WHERE ambito = 'datos')
+            """, (time.time(),)).rowcount
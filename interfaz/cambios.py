@@ -0,0 +1,238 @@
+# cambios.py — Registro de cambios (CDC) de Socio, Suscripcion, Pago y Reserva
+#
+# Los triggers de 0015_cambios.sql anotan en Cambio cada alta ('I'),
+# modificación ('U') o borrado ('D') con un seq creciente (AUTOINCREMENT: no se
+# reutiliza aunque se borren filas). SQLite serializa las escrituras, así que un
+# seq nunca se confirma después de uno mayor: quien guarda el último seq leído
+# no se salta cambios y cada consulta cuesta lo que cambió, no lo que mide la tabla.
+#
+#   pagina = cambios.cambios_desde(seq, 1000)
+#   python cambios.py --desde 0 > gymlite.jsonl      # exportación JSONL
+#
+# Cada cambio trae el estado ACTUAL de la fila, no el de ese momento: basta
+# aplicar 'I'/'U' como upsert y 'D' como borrado; una fila que cambió varias
+# veces puede llegar más de una vez. Leer desde seq 0 entrega todas las filas
+# vivas (la migración anotó las que ya existían como altas).
+#
+# Las reservas que archivar_clases() mueve al archivo no llegan como 'D': para
+# el lector no son bajas. Esa misma transacción quita sus cambios anteriores,
+# así que una copia nueva (desde 0) no las trae y una existente las conserva.
+#
+# compactar() (mantenimiento.py, cada GYMLITE_CAMBIOS_INTERVALO) deja sólo el
+# último cambio de cada fila y descarta los borrados con más de
+# GYMLITE_CAMBIOS_RETENCION_DIAS días. Un lector detenido más tiempo que eso
+# recibe resincronizar=True al retomar desde su seq guardado: debe descartar su
+# copia y volver a leer desde 0. Sólo cuenta en la primera página de cada
+# sincronización (las siguientes continúan la misma lectura).
+from __future__ import annotations
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Optional, TextIO, Tuple
+
+import consultas
+import database
+
+LOTE = int(os.environ.get("GYMLITE_CAMBIOS_LOTE", "2000"))   # seqs por transacción al compactar
+RETENCION_DIAS = int(os.environ.get("GYMLITE_CAMBIOS_RETENCION_DIAS", "30"))
+
+# Tablas con triggers y su clave
+TABLAS = {
+    "Socio": "id_socio",
+    "Suscripcion": "id_suscripcion",
+    "Pago": "id_pago",
+    "Reserva": "id_reserva",
+}
+
+consultas.registrar("cambios.estado", "SELECT compactado_hasta, purgado_hasta FROM CambioEstado WHERE id = 1")
+consultas.registrar("cambios.desde", """
+    SELECT seq, tabla, id_fila, op, DATETIME(momento, 'unixepoch') AS momento
+    FROM Cambio
+    WHERE seq > ?
+    ORDER BY seq
+    LIMIT ?
+""")
+# Los ids de cada tabla llegan como un solo parámetro JSON (json_each)
+for _tabla, _clave in TABLAS.items():
+    consultas.registrar(f"cambios.filas_{_tabla.lower()}", f"""
+        SELECT * FROM {_tabla} WHERE {_clave} IN (SELECT value FROM json_each(?))
+    """)
+
+consultas.registrar("cambios.ultimo", "SELECT COALESCE(MAX(seq), 0) AS seq FROM Cambio")
+# Cambios anteriores de las filas que volvieron a cambiar en (desde, hasta]
+consultas.registrar("cambios.compactar_rango", """
+    DELETE FROM Cambio WHERE seq IN (
+        SELECT v.seq FROM Cambio n
+        JOIN Cambio v ON v.tabla = n.tabla AND v.id_fila = n.id_fila AND v.seq < n.seq
+        WHERE n.seq > ? AND n.seq <= ?
+    )
+""")
+consultas.registrar("cambios.avanzar", "UPDATE CambioEstado SET compactado_hasta = ? WHERE id = 1")
+consultas.registrar("cambios.borrados_vencidos", """
+    SELECT seq FROM Cambio WHERE op = 'D' AND momento < ? AND seq <= ? LIMIT ?
+""")
+consultas.registrar("cambios.purgar", "DELETE FROM Cambio WHERE seq IN (SELECT value FROM json_each(?))")
+consultas.registrar("cambios.marcar_purga", """
+    UPDATE CambioEstado SET purgado_hasta = MAX(purgado_hasta, ?) WHERE id = 1
+""")
+
+
+def cambios_desde(seq: int = 0, limite: int = 1000) -> Dict:
+    """
+    Hasta `limite` cambios con seq mayor que `seq`, en orden. Cada uno trae la
+    fila actual en "fila" (None si ya no existe: su 'D' viene más adelante).
+    Devuelve {"cambios", "seq" (desde dónde seguir), "hay_mas", "resincronizar"};
+    resincronizar se mira al retomar desde un seq guardado (ver arriba).
+    """
+    seq, limite = int(seq), max(1, int(limite))
+    with database.get_read_conn() as c:
+        # Registro y filas en la misma instantánea
+        c.execute("BEGIN")
+        try:
+            registro = consultas.todas(c, "cambios.desde", (seq, limite + 1))
+            estado = consultas.una(c, "cambios.estado")
+            ids: Dict[str, List[int]] = {}
+            for r in registro[:limite]:
+                if r["op"] != "D":
+                    ids.setdefault(r["tabla"], []).append(r["id_fila"])
+            filas = {}
+            for tabla, lista in ids.items():
+                clave = TABLAS[tabla]
+                for f in consultas.todas(c, f"cambios.filas_{tabla.lower()}", (json.dumps(lista),)):
+                    filas[(tabla, f[clave])] = dict(f)
+        finally:
+            c.execute("COMMIT")
+
+    cambios = [
+        {"seq": r["seq"], "tabla": r["tabla"], "id": r["id_fila"], "op": r["op"], "momento": r["momento"],
+         "fila": filas.get((r["tabla"], r["id_fila"])) if r["op"] != "D" else None}
+        for r in registro[:limite]
+    ]
+    return {
+        "cambios": cambios,
+        "seq": cambios[-1]["seq"] if cambios else seq,
+        "hay_mas": len(registro) > limite,
+        # Desde 0 no hay copia que corregir; desde un seq guardado pudo perderse un borrado
+        "resincronizar": estado is not None and 0 < seq < estado["purgado_hasta"],
+    }
+
+
+# ============================================================
+# COMPACTACIÓN (mantenimiento)
+# ============================================================
+
+def _compactar_lote(lote: int) -> Tuple[int, bool]:
+    """Compacta los seqs siguientes a compactado_hasta. Devuelve (cambios borrados, terminó)."""
+    with database.get_conn() as c:
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            desde = consultas.una(c, "cambios.estado")["compactado_hasta"]
+            hasta = min(desde + lote, consultas.una(c, "cambios.ultimo")["seq"])
+            if hasta <= desde:
+                c.execute("COMMIT")
+                return 0, True
+            n = consultas.ejecutar(c, "cambios.compactar_rango", (desde, hasta)).rowcount
+            consultas.ejecutar(c, "cambios.avanzar", (hasta,))
+            c.execute("COMMIT")
+            return n, False
+        except Exception:
+            c.execute("ROLLBACK")
+            raise
+
+
+def _purgar_lote(antes_de: int, lote: int) -> int:
+    """Descarta hasta `lote` borrados anteriores a `antes_de` (epoch) ya compactados."""
+    with database.get_conn() as c:
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            # Sólo lo compactado: los cambios previos de esas filas ya no están
+            hasta = consultas.una(c, "cambios.estado")["compactado_hasta"]
+            seqs = [r["seq"] for r in consultas.todas(c, "cambios.borrados_vencidos", (antes_de, hasta, lote))]
+            if seqs:
+                consultas.ejecutar(c, "cambios.purgar", (json.dumps(seqs),))
+                consultas.ejecutar(c, "cambios.marcar_purga", (max(seqs),))
+            c.execute("COMMIT")
+            return len(seqs)
+        except Exception:
+            c.execute("ROLLBACK")
+            raise
+
+
+def compactar(lote: Optional[int] = None) -> Tuple[bool, int, Optional[str]]:
+    """
+    Deja sólo el último cambio de cada fila (de lo anotado desde la compactación
+    anterior) y descarta los borrados vencidos, en transacciones cortas de
+    `lote` seqs. Devuelve (ok, cambios_borrados, error).
+    """
+    lote = LOTE if lote is None else max(1, int(lote))
+    antes_de = database._ahora_epoch() - RETENCION_DIAS * database.DIA
+    borrados = 0
+    try:
+        while True:
+            n, termino = _compactar_lote(lote)
+            borrados += n
+            if termino:
+                break
+        while True:
+            n = _purgar_lote(antes_de, lote)
+            borrados += n
+            if n < lote:
+                break
+        return True, borrados, None
+    except Exception as e:
+        print(f"Error al compactar el registro de cambios: {e}")
+        return False, borrados, str(e)
+
+
+# ============================================================
+# EXPORTACIÓN JSONL
+# ============================================================
+
+def exportar_jsonl(salida: TextIO, desde: int = 0, lote: int = 1000) -> Tuple[int, int, bool]:
+    """
+    Escribe en `salida` una línea JSON por cambio posterior a `desde`, página a
+    página, hasta el final del registro. Devuelve (cambios, último seq, resincronizar);
+    si hay que resincronizar no escribe nada más.
+    """
+    n, seq = 0, int(desde)
+    while True:
+        pagina = cambios_desde(seq, lote)
+        if pagina["resincronizar"] and seq == int(desde):
+            return n, seq, True
+        for cambio in pagina["cambios"]:
+            salida.write(json.dumps(cambio, ensure_ascii=False, default=str) + "\n")
+        salida.flush()
+        n += len(pagina["cambios"])
+        seq = pagina["seq"]
+        if not pagina["hay_mas"]:
+            return n, seq, False
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Exporta el registro de cambios de GymLite como JSONL")
+    ap.add_argument("--desde", type=int, default=0, help="último seq ya procesado (0 = copia completa)")
+    ap.add_argument("--lote", type=int, default=1000, help="cambios por lectura")
+    ap.add_argument("--salida", metavar="ARCHIVO", help="archivo JSONL (por defecto, la salida estándar)")
+    ap.add_argument("--db", metavar="RUTA", help="base de datos (por defecto, la de la app)")
+    args = ap.parse_args(argv)
+
+    if args.db:
+        database.set_db_path(args.db)
+    t0 = time.perf_counter()
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            n, seq, resincronizar = exportar_jsonl(f, args.desde, args.lote)
+    else:
+        n, seq, resincronizar = exportar_jsonl(sys.stdout, args.desde, args.lote)
+    if resincronizar:
+        print(f"El registro ya no tiene todos los borrados posteriores a seq {seq}: "
+              f"vuelve a exportar con --desde 0", file=sys.stderr)
+        return 2
+    print(f"{n} cambios en {time.perf_counter() - t0:.1f} s; próxima exportación: --desde {seq}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
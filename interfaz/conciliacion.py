@@ -0,0 +1,194 @@
+# conciliacion.py — Conciliación de pagos contra el precio del plan de cada suscripción
+#
+# Recorre Suscripcion por id (keyset: id_suscripcion > punto de control, nunca
+# OFFSET) en lotes de LOTE. Cada lote es una transacción corta en el camino de
+# escritura que:
+#   1. suma en SQL los pagos de las suscripciones del lote (sólo el índice
+#      idx_pago_suscripcion_estado) y compara lo pagado con Plan.precio,
+#   2. reemplaza las filas de ConciliacionResultado de ese rango de ids (y ajusta
+#      los totales por tipo de ConciliacionTotal) y
+#   3. avanza el punto de control (ConciliacionEstado.ultimo_id).
+# Si el proceso se corta, la siguiente llamada sigue desde el último lote
+# confirmado. Entre lotes se libera la escritura, así que la app no espera a
+# que termine la corrida completa. El dashboard sólo lee ConciliacionResultado;
+# mientras una corrida avanza, los ids más allá del punto de control muestran
+# todavía el resultado de la corrida anterior.
+#
+# Lo esperado de una suscripción es Plan.precio (el precio del plan completo,
+# el monto que propone la página de Pagos). Sólo cuentan los pagos 'completado';
+# los 'pendiente' se informan aparte. Las suscripciones canceladas no se revisan.
+from __future__ import annotations
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import consultas
+import database
+
+LOTE = int(os.environ.get("GYMLITE_CONCILIACION_LOTE", "5000"))
+TOLERANCIA = 1.0   # diferencias menores (redondeos) no son discrepancias
+_SIN_LIMITE = 2 ** 62
+
+TIPOS = {
+    "sin_pago": "Sin pago",
+    "pago_parcial": "Pago parcial",
+    "sobrepago": "Sobrepago",
+}
+
+consultas.registrar("conciliacion.estado", """
+    SELECT ultimo_id, iniciada, terminada, revisadas, duracion_ms FROM ConciliacionEstado WHERE id = 1
+""")
+consultas.registrar("conciliacion.iniciar", """
+    INSERT OR REPLACE INTO ConciliacionEstado (id, ultimo_id, iniciada, terminada, revisadas, duracion_ms)
+    VALUES (1, 0, DATETIME('now', 'localtime'), NULL, 0, 0)
+""")
+# Último id del próximo lote (NULL si no quedan suscripciones)
+consultas.registrar("conciliacion.fin_lote", """
+    SELECT MAX(id_suscripcion) AS hasta, COUNT(*) AS n FROM (
+        SELECT id_suscripcion FROM Suscripcion
+        WHERE id_suscripcion > ?
+        ORDER BY id_suscripcion
+        LIMIT ?
+    )
+""")
+# Resta (signo -1) o suma (+1) a ConciliacionTotal las filas del rango de ids
+consultas.registrar("conciliacion.totales_rango", """
+    INSERT INTO ConciliacionTotal (tipo, n, diferencia, pendiente)
+    SELECT tipo, :signo * COUNT(*), :signo * SUM(diferencia), :signo * SUM(pendiente)
+    FROM ConciliacionResultado
+    WHERE id_suscripcion > :desde AND id_suscripcion <= :hasta
+    GROUP BY tipo
+    ON CONFLICT (tipo) DO UPDATE SET
+        n = n + excluded.n, diferencia = diferencia + excluded.diferencia, pendiente = pendiente + excluded.pendiente
+""")
+consultas.registrar("conciliacion.borrar_rango", """
+    DELETE FROM ConciliacionResultado WHERE id_suscripcion > ? AND id_suscripcion <= ?
+""")
+consultas.registrar("conciliacion.revisar_rango", """
+    INSERT INTO ConciliacionResultado
+        (id_suscripcion, id_socio, id_plan, fecha_inicio, esperado, pagado, pendiente, pagos, tipo, diferencia, revisado)
+    SELECT id_suscripcion, id_socio, id_plan, fecha_inicio, esperado, pagado, pendiente, pagos,
+           CASE WHEN pagado = 0 THEN 'sin_pago'
+                WHEN pagado < esperado THEN 'pago_parcial'
+                ELSE 'sobrepago' END,
+           pagado - esperado, DATETIME('now', 'localtime')
+    FROM (
+        SELECT s.id_suscripcion, s.id_socio, s.id_plan, s.fecha_inicio, p.precio AS esperado,
+               COALESCE((SELECT SUM(g.monto) FROM Pago g
+                         WHERE g.id_suscripcion = s.id_suscripcion AND g.estado_pago = 'completado'), 0) AS pagado,
+               COALESCE((SELECT SUM(g.monto) FROM Pago g
+                         WHERE g.id_suscripcion = s.id_suscripcion AND g.estado_pago = 'pendiente'), 0) AS pendiente,
+               (SELECT COUNT(*) FROM Pago g WHERE g.id_suscripcion = s.id_suscripcion) AS pagos
+        FROM Suscripcion s
+        JOIN Plan p ON p.id_plan = s.id_plan
+        WHERE s.id_suscripcion > :desde AND s.id_suscripcion <= :hasta
+          AND s.estado_sus <> 'cancelada'
+    )
+    WHERE ABS(pagado - esperado) > :tolerancia
+""")
+consultas.registrar("conciliacion.avanzar", """
+    UPDATE ConciliacionEstado
+    SET ultimo_id = ?, revisadas = revisadas + ?, duracion_ms = duracion_ms + ?
+    WHERE id = 1
+""")
+consultas.registrar("conciliacion.terminar", """
+    UPDATE ConciliacionEstado SET terminada = DATETIME('now', 'localtime') WHERE id = 1
+""")
+
+
+def _lote(lote: int) -> Tuple[int, bool]:
+    """Concilia el lote siguiente al punto de control. Devuelve (suscripciones revisadas, terminó)."""
+    t0 = time.perf_counter()
+    with database.get_conn() as c:
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            estado = consultas.una(c, "conciliacion.estado")
+            if estado is None or estado["terminada"] is not None:
+                consultas.ejecutar(c, "conciliacion.iniciar")
+                desde = 0
+            else:
+                desde = estado["ultimo_id"]
+            fin = consultas.una(c, "conciliacion.fin_lote", (desde, lote))
+            # Sin más suscripciones: se descartan los resultados de las borradas tras el último id
+            hasta = fin["hasta"] if fin["n"] else _SIN_LIMITE
+            rango = {"desde": desde, "hasta": hasta}
+            consultas.ejecutar(c, "conciliacion.totales_rango", {**rango, "signo": -1})
+            consultas.ejecutar(c, "conciliacion.borrar_rango", (desde, hasta))
+            if not fin["n"]:
+                consultas.ejecutar(c, "conciliacion.terminar")
+                c.execute("COMMIT")
+                return 0, True
+            consultas.ejecutar(c, "conciliacion.revisar_rango", {**rango, "tolerancia": TOLERANCIA})
+            consultas.ejecutar(c, "conciliacion.totales_rango", {**rango, "signo": 1})
+            consultas.ejecutar(c, "conciliacion.avanzar",
+                               (fin["hasta"], fin["n"], (time.perf_counter() - t0) * 1000))
+            c.execute("COMMIT")
+            return fin["n"], False
+        except Exception:
+            c.execute("ROLLBACK")
+            raise
+
+
+def conciliar(lote: Optional[int] = None, max_lotes: Optional[int] = None) -> Tuple[bool, int, Optional[str]]:
+    """
+    Avanza la corrida de conciliación (o empieza una nueva si la anterior terminó)
+    hasta el final o hasta `max_lotes` lotes. Devuelve (ok, suscripciones_revisadas, error).
+    """
+    lote = LOTE if lote is None else max(1, int(lote))
+    revisadas = lotes = 0
+    try:
+        while max_lotes is None or lotes < max_lotes:
+            n, termino = _lote(lote)
+            revisadas += n
+            lotes += 1
+            if termino:
+                break
+        return True, revisadas, None
+    except Exception as e:
+        print(f"Error al conciliar pagos: {e}")
+        return False, revisadas, str(e)
+
+
+# ============================================================
+# LECTURAS (dashboard)
+# ============================================================
+
+consultas.registrar("conciliacion.resumen", "SELECT tipo, n, diferencia, pendiente FROM ConciliacionTotal")
+_SQL_DISCREPANCIAS = """
+    SELECT r.id_suscripcion, s.RUT, s.nombre || ' ' || s.apellido_p AS nombre_socio,
+           COALESCE(p.nombre_plan, 'Plan ' || r.id_plan) AS nombre_plan, r.fecha_inicio,
+           r.esperado, r.pagado, r.pendiente, r.pagos, r.tipo, r.diferencia, r.revisado
+    FROM ConciliacionResultado r
+    LEFT JOIN Socio s ON s.id_socio = r.id_socio
+    LEFT JOIN Plan p ON p.id_plan = r.id_plan
+    {}
+    ORDER BY ABS(r.diferencia) DESC
+    LIMIT ?
+"""
+# Una sentencia por caso: cada una recorre su índice en orden y para en el límite
+consultas.registrar("conciliacion.discrepancias", _SQL_DISCREPANCIAS.format(""))
+consultas.registrar("conciliacion.discrepancias_tipo", _SQL_DISCREPANCIAS.format("WHERE r.tipo = ?"))
+
+
+def resumen_conciliacion() -> Dict:
+    """
+    Totales por tipo de discrepancia ({tipo: {"n", "diferencia", "pendiente"}}) y
+    estado de la corrida (None si nunca se ejecutó).
+    """
+    with database.get_read_conn() as c:
+        tipos = {r["tipo"]: {"n": r["n"], "diferencia": r["diferencia"], "pendiente": r["pendiente"]}
+                 for r in consultas.todas(c, "conciliacion.resumen")}
+        estado = consultas.una(c, "conciliacion.estado")
+    return {
+        "tipos": {t: tipos.get(t, {"n": 0, "diferencia": 0, "pendiente": 0}) for t in TIPOS},
+        "estado": dict(estado) if estado else None,
+    }
+
+def get_discrepancias(tipo: Optional[str] = None, limite: int = 200) -> List[Dict]:
+    """Discrepancias de la última conciliación, de mayor a menor diferencia absoluta."""
+    with database.get_read_conn() as c:
+        if tipo is None:
+            rows = consultas.todas(c, "conciliacion.discrepancias", (int(limite),))
+        else:
+            rows = consultas.todas(c, "conciliacion.discrepancias_tipo", (tipo, int(limite)))
+        return [dict(r) for r in rows]
@@ -0,0 +1,184 @@
+# consultas.py — Registro central de sentencias SQL con nombre, validación y métricas
+#
+# Cada sentencia se define una sola vez con un nombre estable:
+#
+#   consultas.registrar("socios.listar", "SELECT ... LIMIT ?")
+#   cur = consultas.ejecutar(c, "socios.listar", (limite,))
+#
+# El texto SQL de cada nombre nunca cambia, así que el caché de sentencias
+# preparadas de cada conexión (cached_statements) siempre acierta y el costo
+# de parseo/preparación sale del camino caliente. validar() prepara todas las
+# sentencias con EXPLAIN al iniciar (y validar_nuevas() las que se registran
+# después) y metricas() acumula ejecuciones y tiempos por nombre para perfilar.
+from __future__ import annotations
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Mínimo del caché de sentencias por conexión; GYMLITE_STMT_CACHE lo fija a mano
+CACHE_MINIMO = 128
+
+_LITERALES = re.compile(r"'(?:[^']|'')*'|--[^\n]*")
+_NOMBRADOS = re.compile(r"(?<![:\w]):([A-Za-z_]\w*)")
+
+
+class Sentencia:
+    """Sentencia registrada: SQL fijo, parámetros que espera y métricas acumuladas."""
+    __slots__ = ("nombre", "sql", "posicionales", "nombrados", "ejecuciones", "segundos", "max_segundos", "filas")
+
+    def __init__(self, nombre: str, sql: str):
+        self.nombre = nombre
+        self.sql = sql
+        sin_literales = _LITERALES.sub("''", sql)
+        self.posicionales = sin_literales.count("?")
+        self.nombrados = tuple(dict.fromkeys(_NOMBRADOS.findall(sin_literales)))
+        self.ejecuciones = 0
+        self.segundos = 0.0
+        self.max_segundos = 0.0
+        self.filas = 0
+
+    def parametros_vacios(self):
+        # Para EXPLAIN: los valores no importan, sólo que la cantidad calce
+        if self.nombrados:
+            return {n: None for n in self.nombrados}
+        return (None,) * self.posicionales
+
+
+_REGISTRO: Dict[str, Sentencia] = {}
+_metricas_lock = threading.Lock()
+# Revisión de las sentencias registradas después de validar() (ver validar_nuevas)
+_al_registrar: Optional[Callable[[Sentencia], Optional[str]]] = None
+
+
+def registrar(nombre: str, sql: str) -> str:
+    """Registra `sql` bajo `nombre` (único) y devuelve el nombre."""
+    sql = sql.strip()
+    previa = _REGISTRO.get(nombre)
+    if previa is not None:
+        if previa.sql != sql:
+            raise ValueError(f"Consulta registrada dos veces con distinto SQL: {nombre}")
+        return nombre   # mismo SQL: se conservan sus métricas
+    s = Sentencia(nombre, sql)
+    if _al_registrar is not None:
+        error = _al_registrar(s)
+        if error:
+            raise RuntimeError(f"Consulta inválida para el esquema actual: {nombre}: {error}")
+    _REGISTRO[nombre] = s
+    return nombre
+
+
+def validar_nuevas(fn: Optional[Callable[[Sentencia], Optional[str]]]):
+    """
+    Tras validar() el registro: fn(sentencia) -> error o None revisa cada
+    sentencia que se registre después (módulos que se importan recién al usarse),
+    y registrar() falla en vez de dejarla para el primer uso.
+    """
+    global _al_registrar
+    _al_registrar = fn
+
+
+def registrada(nombre: str) -> bool:
+    return nombre in _REGISTRO
+
+
+def sql(nombre: str) -> str:
+    return _REGISTRO[nombre].sql
+
+
+def nombres() -> List[str]:
+    return sorted(_REGISTRO)
+
+
+def tamano_cache() -> int:
+    """cached_statements para las conexiones: todas las sentencias registradas y margen."""
+    fijo = os.environ.get("GYMLITE_STMT_CACHE")
+    if fijo:
+        return int(fijo)
+    return max(CACHE_MINIMO, 2 * len(_REGISTRO))
+
+
+def _medir(s: Sentencia, t0: float, filas: int = 0):
+    dt = time.perf_counter() - t0
+    with _metricas_lock:
+        s.ejecuciones += 1
+        s.segundos += dt
+        s.filas += filas
+        if dt > s.max_segundos:
+            s.max_segundos = dt
+
+
+def ejecutar(c: sqlite3.Connection, nombre: str, params: Sequence | Dict = ()) -> sqlite3.Cursor:
+    """c.execute de la sentencia `nombre`; la métrica cubre el execute (hasta la primera fila)."""
+    s = _REGISTRO[nombre]
+    t0 = time.perf_counter()
+    cur = c.execute(s.sql, params)
+    _medir(s, t0)
+    return cur
+
+
+def ejecutar_muchos(c: sqlite3.Connection, nombre: str, filas: Iterable) -> sqlite3.Cursor:
+    s = _REGISTRO[nombre]
+    t0 = time.perf_counter()
+    cur = c.executemany(s.sql, filas)
+    _medir(s, t0, max(cur.rowcount, 0))
+    return cur
+
+
+def todas(c: sqlite3.Connection, nombre: str, params: Sequence | Dict = ()) -> List[Any]:
+    """execute + fetchall medidos juntos."""
+    s = _REGISTRO[nombre]
+    t0 = time.perf_counter()
+    filas = c.execute(s.sql, params).fetchall()
+    _medir(s, t0, len(filas))
+    return filas
+
+
+def una(c: sqlite3.Connection, nombre: str, params: Sequence | Dict = ()) -> Optional[Any]:
+    """execute + fetchone medidos juntos."""
+    s = _REGISTRO[nombre]
+    t0 = time.perf_counter()
+    fila = c.execute(s.sql, params).fetchone()
+    _medir(s, t0, fila is not None)
+    return fila
+
+
+def validar(c: sqlite3.Connection, sentencias: Optional[Iterable[Sentencia]] = None) -> List[Tuple[str, str]]:
+    """
+    Prepara cada sentencia (todas las registradas por defecto) con EXPLAIN
+    (no ejecuta nada) y devuelve [(nombre, error)] de las que no compilan
+    contra el esquema de `c`.
+    """
+    errores = []
+    for s in list(_REGISTRO.values()) if sentencias is None else sentencias:
+        try:
+            c.execute("EXPLAIN " + s.sql, s.parametros_vacios()).fetchall()
+        except sqlite3.Error as e:
+            errores.append((s.nombre, str(e)))
+    return errores
+
+
+def metricas() -> List[Dict[str, Any]]:
+    """Métricas por sentencia ejecutada, de mayor a menor tiempo total."""
+    with _metricas_lock:
+        filas = [
+            {
+                "consulta": s.nombre,
+                "ejecuciones": s.ejecuciones,
+                "total_ms": s.segundos * 1000,
+                "promedio_ms": s.segundos * 1000 / s.ejecuciones,
+                "max_ms": s.max_segundos * 1000,
+                "filas": s.filas,
+            }
+            for s in _REGISTRO.values() if s.ejecuciones
+        ]
+    return sorted(filas, key=lambda f: f["total_ms"], reverse=True)
+
+
+def reiniciar_metricas():
+    with _metricas_lock:
+        for s in _REGISTRO.values():
+            s.ejecuciones = s.filas = 0
+            s.segundos = s.max_segundos = 0.0
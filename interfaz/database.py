@@ -1,9 +1,24 @@
 # database.py — Capa de acceso a datos para GymLite 
 
 from __future__ import annotations
+import calendar
+import functools
+import json
+import os
 import sqlite3
+import threading
+from collections import namedtuple
+from datetime import datetime as _dt
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Tuple, TYPE_CHECKING
+
+from cache_compartido import CacheCompartida
+from db_pool import ConnectionPool, get_pool
+import consultas
+import registros
+
+if TYPE_CHECKING:
+    import numpy as np
 
 # ============================================================
 # RESOLUCIÓN DE RUTA A LA DB
@@ -27,243 +42,357 @@ def _auto_resolve_db_path() -> str:
 # Por defecto, se usa la resolución automática:
 DB_PATH: str = _auto_resolve_db_path()
 
+# Pools de la DB actual (se crean en el primer uso): uno de lectura y el
+# camino único de escritura del proceso
+_pool: Optional[ConnectionPool] = None
+_pool_lectura: Optional[ConnectionPool] = None
+
 def current_db_path() -> str:
     """Devuelve la ruta absoluta actual de la DB."""
     return str(Path(DB_PATH).resolve())
 
 def set_db_path(path: str | Path):
     """Sobrescribe la ruta a la DB en runtime (útil en app.py)."""
-    global DB_PATH
+    global DB_PATH, _pool, _pool_lectura, _cache_actual
     DB_PATH = Path(path).as_posix()
+    _pool = _pool_lectura = _cache_actual = None
 
 def get_conn() -> sqlite3.Connection:
     """
-    Abre conexión SQLite con:
+    Conexión de ESCRITURA del pool (ver db_pool.py) con:
     - row_factory = sqlite3.Row (acceso por nombre de columna)
     - foreign_keys ON (integridad referencial)
     - autocommit (isolation_level=None) para simplificar
+    - journal_mode WAL (lectores no bloquean al escritor)
+    Es el camino único de escritura del proceso: un hilo a la vez, el resto
+    espera su turno aquí en vez de pelear por el lock de SQLite. Entre
+    procesos (modo multiproceso) el orden lo pone el busy_timeout de SQLite.
+    Si la conexión modificó filas, al devolverla se invalida la caché compartida.
+    Usar siempre con `with get_conn() as c:`; al salir vuelve al pool.
+    """
+    global _pool
+    pool = _pool
+    if pool is None:
+        pool = _pool = get_pool(
+            DB_PATH, timeout=30.0, isolation_level=None, row_factory=sqlite3.Row,
+            cached_statements=consultas.tamano_cache(),
+            serializar=True, on_change=_datos_modificados,
+        )
+    return pool.acquire()
+
+def get_read_conn() -> sqlite3.Connection:
     """
-    conn = sqlite3.connect(DB_PATH, timeout=30.0, isolation_level=None)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA foreign_keys=ON;")
-    return conn
+    Conexión de sólo lectura (PRAGMA query_only) para consultas. En WAL no
+    esperan al escritor ni lo bloquean, así que los hilos y procesos leen en paralelo.
+    Usar con `with get_read_conn() as c:` igual que get_conn().
+    """
+    global _pool_lectura
+    pool = _pool_lectura
+    if pool is None:
+        pool = _pool_lectura = get_pool(
+            DB_PATH, timeout=30.0, isolation_level=None, row_factory=sqlite3.Row, read_only=True,
+            cached_statements=consultas.tamano_cache(),
+        )
+    return pool.acquire()
+
+# ============================================================
+# CACHÉ COMPARTIDA ENTRE PROCESOS (ver cache_compartido.py)
+# ============================================================
+# Los KPIs del dashboard se guardan en '<db>_cache.db' (o GYMLITE_CACHE_DB) por
+# CACHE_TTL segundos. Toda escritura por get_conn() sube la generación de datos,
+# así que ningún proceso sirve un KPI calculado antes de la última escritura.
+# GYMLITE_CACHE_TTL=0 desactiva la caché de KPIs.
+CACHE_TTL = int(os.environ.get("GYMLITE_CACHE_TTL", "30"))
+
+_cache_actual: Optional[CacheCompartida] = None
+_cache_lock = threading.Lock()
+
+def cache_db_path() -> str:
+    """Ruta de la caché compartida: GYMLITE_CACHE_DB o '<db>_cache.db' junto a la DB principal."""
+    ruta = os.environ.get("GYMLITE_CACHE_DB")
+    if ruta:
+        return str(Path(ruta).resolve())
+    actual = Path(current_db_path())
+    return str(actual.with_name(f"{actual.stem}_cache.db"))
+
+def cache_compartida() -> CacheCompartida:
+    global _cache_actual
+    cache = _cache_actual
+    if cache is None:
+        with _cache_lock:
+            cache = _cache_actual
+            if cache is None:
+                cache = _cache_actual = CacheCompartida(cache_db_path())
+                cache.purgar()
+    return cache
+
+def _datos_modificados():
+    try:
+        cache_compartida().invalidar()
+    except sqlite3.Error as e:
+        # La escritura ya se confirmó; como mucho se sirve un KPI viejo hasta CACHE_TTL
+        print(f"Error al invalidar la caché compartida: {e}")
+
+def compartido(fn):
+    """
+    Decorador para consultas de KPIs: el resultado (JSON) se comparte entre
+    hilos y procesos hasta CACHE_TTL segundos o hasta la próxima escritura.
+    La clave incluye el día actual porque los KPIs dependen de 'hoy'.
+    """
+    @functools.wraps(fn)
+    def envoltura(*args, **kwargs):
+        if CACHE_TTL <= 0:
+            return fn(*args, **kwargs)
+        clave = f"{fn.__name__}:{_hoy_epoch()}:{json.dumps([args, kwargs], sort_keys=True, default=str)}"
+        try:
+            gen, encontrado, valor = cache_compartida().obtener(clave)
+        except sqlite3.Error as e:
+            print(f"Error al leer la caché compartida: {e}")
+            return fn(*args, **kwargs)
+        if encontrado:
+            return valor
+        valor = fn(*args, **kwargs)
+        try:
+            cache_compartida().guardar(clave, valor, CACHE_TTL, gen)
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            print(f"Error al guardar en la caché compartida: {e}")
+        return valor
+    return envoltura
 
 # Helper para listas de dicts
 def _rows_to_dicts(rows) -> List[Dict]:
     return [dict(r) for r in rows] if rows is not None else None
 
+# Formatos de resultado para los listados (parámetro `formato`):
+# - "dict":     lista de dicts (por defecto, lo que usan las vistas)
+# - "registro": lista de registros tipados compactos (ver registros.py)
+# - "columnas": {columna: [valores]}, se pasa directo a pd.DataFrame(...)
+FORMATOS = ("dict", "registro", "columnas")
+
+def _resultado(cur: sqlite3.Cursor, formato: str = "dict", registro=None):
+    if formato == "dict":
+        return [dict(r) for r in cur.fetchall()]
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato no válido: {formato}")
+    # Tuplas planas: se evita crear un sqlite3.Row por fila
+    cur.row_factory = None
+    rows = cur.fetchall()
+    if formato == "registro":
+        return list(map(registro._make, rows))
+    columnas = [d[0] for d in cur.description]
+    if not rows:
+        return {col: [] for col in columnas}
+    return {col: list(valores) for col, valores in zip(columnas, zip(*rows))}
+
+# Fechas epoch: las columnas *_epoch, Clase.inicio y Clase.fin guardan segundos
+# calculados por SQLite con strftime('%s', texto), es decir la hora local del
+# texto tratada como UTC. Los límites se calculan aquí con la misma convención.
+DIA = 86400
+
+def epoch(fecha_hora) -> int:
+    """'YYYY-MM-DD[ HH:MM[:SS]]', date o datetime -> segundos epoch, igual que strftime('%s', ...) de SQLite."""
+    return calendar.timegm(_dt.fromisoformat(str(fecha_hora)).timetuple())
+
+def _ahora_epoch() -> int:
+    return calendar.timegm(_dt.now().timetuple())
+
+def _hoy_epoch(dias: int = 0) -> int:
+    """Medianoche local de hoy (+/- dias) en epoch."""
+    return (_ahora_epoch() // DIA + dias) * DIA
+
 # ============================================================
-# ESQUEMA (opcional): inicialización completa si la DB está vacía
+# ESQUEMA: migraciones versionadas
 # ============================================================
-def ensure_full_schema():
-    """
-    Crea todas las tablas y vistas si no existen.
-    INCLUYE: Soft Delete en Socio y Triggers de seguridad.
-    """
-    ddl = """
-    PRAGMA foreign_keys=ON;
-
-    -- 1. TABLA SOCIO (MODIFICADA: Agregamos 'activo')
-    CREATE TABLE IF NOT EXISTS Socio (
-        id_socio INTEGER PRIMARY KEY AUTOINCREMENT,
-        RUT VARCHAR(12) NOT NULL UNIQUE,
-        nombre VARCHAR(50) NOT NULL,
-        apellido_p VARCHAR(50) NOT NULL,
-        apellido_m VARCHAR(50),
-        fecha_nac DATE NOT NULL,
-        telefono VARCHAR(12),
-        direccion VARCHAR(100),
-        activo INTEGER NOT NULL DEFAULT 1, -- 1=Activo, 0=Eliminado
-        CHECK (LENGTH(RUT) >= 9)
-    );
-
-    -- 2. TABLAS ESTÁNDAR (Sin cambios mayores)
-    CREATE TABLE IF NOT EXISTS Plan (
-        id_plan INTEGER PRIMARY KEY AUTOINCREMENT,
-        nombre_plan VARCHAR(50) NOT NULL UNIQUE,
-        precio DECIMAL(10,2) NOT NULL,
-        duracion_meses INTEGER NOT NULL,
-        limite_clases INTEGER,
-        beneficio TEXT,
-        descripcion TEXT,
-        CHECK (precio > 0),
-        CHECK (duracion_meses > 0),
-        CHECK (limite_clases IS NULL OR limite_clases > 0)
-    );
+# Cada archivo NNNN_nombre.sql dentro de migrations/ es una migración.
+# Se aplican en orden, cada una en su propia transacción, y quedan
+# registradas en la tabla schema_version y en PRAGMA user_version.
+# La verificación se hace una sola vez por proceso y por ruta de DB:
+# los reruns de Streamlit no vuelven a tocar el DDL.
+MIGRATIONS_DIR = Path(__file__).resolve().parent / "migrations"
+
+_schema_lock = threading.Lock()
+_schema_ok: set = set()   # rutas de DB ya verificadas en este proceso
+
+def _listar_migraciones() -> List[Tuple[int, str, Path]]:
+    """Devuelve [(version, nombre, ruta)] ordenado por versión."""
+    migraciones = []
+    for p in sorted(MIGRATIONS_DIR.glob("[0-9][0-9][0-9][0-9]_*.sql")):
+        version = int(p.name[:4])
+        migraciones.append((version, p.stem[5:], p))
+    return migraciones
+
+def schema_version_objetivo() -> int:
+    """Última versión de esquema disponible en migrations/."""
+    migraciones = _listar_migraciones()
+    return migraciones[-1][0] if migraciones else 0
+
+def _sentencias(sql: str) -> List[str]:
+    # Divide un script en sentencias completas (respeta BEGIN ... END de triggers)
+    sentencias, buffer = [], ""
+    for linea in sql.splitlines(keepends=True):
+        if not buffer and linea.strip().startswith("--"):
+            continue
+        buffer += linea
+        if sqlite3.complete_statement(buffer):
+            if buffer.strip():
+                sentencias.append(buffer.strip())
+            buffer = ""
+    if buffer.strip():
+        sentencias.append(buffer.strip())
+    return sentencias
+
+def _aplicar_migracion(c: sqlite3.Connection, version: int, nombre: str, ruta: Path):
+    for sentencia in _sentencias(ruta.read_text(encoding="utf-8")):
+        try:
+            c.execute(sentencia)
+        except sqlite3.OperationalError as e:
+            # Bases creadas antes del ledger ya tienen la columna 'activo' (sólo
+            # 0002); en cualquier otra migración una columna duplicada es un error
+            if version == 2 and "duplicate column name: activo" in str(e):
+                continue
+            raise
+    c.execute(
+        "INSERT OR REPLACE INTO schema_version (version, nombre, aplicada_en) VALUES (?, ?, DATETIME('now'))",
+        (version, nombre),
+    )
+    # PRAGMA no acepta parámetros; version es un entero validado
+    c.execute(f"PRAGMA user_version = {int(version)}")
 
-    CREATE TABLE IF NOT EXISTS Suscripcion (
-        id_suscripcion INTEGER PRIMARY KEY AUTOINCREMENT,
-        id_socio INTEGER NOT NULL,
-        id_plan INTEGER NOT NULL,
-        fecha_inicio DATE NOT NULL,
-        fecha_fin DATE NOT NULL,
-        estado_sus VARCHAR(20) NOT NULL DEFAULT 'activa',
-        FOREIGN KEY (id_socio) REFERENCES Socio(id_socio) ON DELETE CASCADE ON UPDATE CASCADE,
-        FOREIGN KEY (id_plan)  REFERENCES Plan(id_plan)  ON DELETE RESTRICT ON UPDATE CASCADE,
-        CHECK (estado_sus IN ('activa','vencida','cancelada')),
-        CHECK (fecha_fin > fecha_inicio)
-    );
-
-    CREATE TABLE IF NOT EXISTS Pago (
-        id_pago INTEGER PRIMARY KEY AUTOINCREMENT,
-        id_suscripcion INTEGER NOT NULL,
-        fecha_pago DATE NOT NULL DEFAULT (DATE('now')),
-        monto DECIMAL(10,2) NOT NULL,
-        metodo_pago VARCHAR(50) NOT NULL,
-        estado_pago VARCHAR(20) NOT NULL DEFAULT 'completado',
-        num_comprobante VARCHAR(50),
-        FOREIGN KEY (id_suscripcion) REFERENCES Suscripcion(id_suscripcion) ON DELETE CASCADE ON UPDATE CASCADE,
-        CHECK (monto > 0),
-        CHECK (metodo_pago IN ('transferencia','webpay','tarjeta','efectivo')),
-        CHECK (estado_pago IN ('pendiente','completado','rechazado'))
-    );
-
-    CREATE TABLE IF NOT EXISTS Tipo (
-        id_tipo INTEGER PRIMARY KEY AUTOINCREMENT,
-        nombre VARCHAR(50) NOT NULL UNIQUE,
-        descripcion TEXT
-    );
-
-    CREATE TABLE IF NOT EXISTS Entrenador (
-        id_entrenador INTEGER PRIMARY KEY AUTOINCREMENT,
-        RUT VARCHAR(12) NOT NULL UNIQUE,
-        nombre VARCHAR(50) NOT NULL,
-        apellido VARCHAR(50) NOT NULL,
-        telefono VARCHAR(12),
-        fecha_nac DATE NOT NULL,
-        especialidad VARCHAR(80) NOT NULL,
-        CHECK (LENGTH(RUT) >= 9)
-    );
-
-    CREATE TABLE IF NOT EXISTS Clase (
-        id_clase INTEGER PRIMARY KEY AUTOINCREMENT,
-        id_entrenador INTEGER NOT NULL,
-        id_tipo INTEGER NOT NULL,
-        nombre VARCHAR(100) NOT NULL,
-        descripcion TEXT,
-        fecha_hora DATETIME NOT NULL,
-        duracion_min INTEGER NOT NULL,
-        cupo_max INTEGER NOT NULL,
-        FOREIGN KEY (id_entrenador) REFERENCES Entrenador(id_entrenador) ON DELETE RESTRICT ON UPDATE CASCADE,
-        FOREIGN KEY (id_tipo) REFERENCES Tipo(id_tipo) ON DELETE RESTRICT ON UPDATE CASCADE,
-        CHECK (duracion_min > 0),
-        CHECK (cupo_max > 0)
-    );
-
-    CREATE TABLE IF NOT EXISTS Reserva (
-        id_reserva INTEGER PRIMARY KEY AUTOINCREMENT,
-        id_socio INTEGER NOT NULL,
-        id_clase INTEGER NOT NULL,
-        fecha_reserva DATETIME NOT NULL DEFAULT (DATETIME('now')),
-        estado_reserva VARCHAR(20) NOT NULL DEFAULT 'confirmada',
-        asistio INTEGER DEFAULT 0,
-        FOREIGN KEY (id_socio) REFERENCES Socio(id_socio) ON DELETE CASCADE ON UPDATE CASCADE,
-        FOREIGN KEY (id_clase) REFERENCES Clase(id_clase) ON DELETE CASCADE ON UPDATE CASCADE,
-        CHECK (estado_reserva IN ('pendiente','confirmada','cancelada')),
-        CHECK (asistio IN (0,1)),
-        UNIQUE (id_socio, id_clase)
-    );
-
-    -- 3. VISTAS (Sin cambios)
-    CREATE VIEW IF NOT EXISTS v_historial_pagos AS
-    SELECT 
-        pag.id_pago,
-        s.RUT,
-        s.nombre || ' ' || s.apellido_p AS nombre_socio,
-        p.nombre_plan,
-        pag.fecha_pago,
-        pag.monto,
-        pag.metodo_pago,
-        pag.estado_pago
-    FROM Pago pag
-    JOIN Suscripcion sus ON pag.id_suscripcion = sus.id_suscripcion
-    JOIN Socio s ON sus.id_socio = s.id_socio
-    JOIN Plan  p ON sus.id_plan  = p.id_plan
-    ORDER BY pag.fecha_pago DESC;
+def run_migrations() -> int:
+    """
+    Aplica las migraciones pendientes y devuelve cuántas se aplicaron.
+    Si PRAGMA user_version ya es la versión objetivo no ejecuta DDL.
+    """
+    objetivo = schema_version_objetivo()
+    with get_conn() as c:
+        if c.execute("PRAGMA user_version").fetchone()[0] >= objetivo:
+            return 0
 
-    CREATE VIEW IF NOT EXISTS v_socios_activos AS
-    WITH ult AS (
-      SELECT id_socio, MAX(fecha_fin) AS fecha_fin_max
-      FROM Suscripcion
-      GROUP BY id_socio
-    )
-    SELECT s.id_socio, s.RUT, s.nombre || ' ' || s.apellido_p AS nombre_completo,
-           s.telefono, p.nombre_plan, sus.fecha_inicio, sus.fecha_fin, 'Vigente' AS vigencia
-    FROM ult
-    JOIN Suscripcion sus ON sus.id_socio = ult.id_socio AND sus.fecha_fin = ult.fecha_fin_max
-    JOIN Socio s ON s.id_socio = sus.id_socio
-    JOIN Plan  p ON p.id_plan = sus.id_plan
-    WHERE sus.estado_sus='activa' AND DATE(sus.fecha_fin) >= DATE('now','localtime');
-
-    -- =========================================
-    -- 4. TRIGGERS (AQUI ESTA LA MAGIA)
-    -- =========================================
-
-    -- Trigger: Evitar sobrecupo (Race Condition)
-    CREATE TRIGGER IF NOT EXISTS trg_check_cupo_insert
-    BEFORE INSERT ON Reserva
-    BEGIN
-        SELECT CASE
-            WHEN (
-                SELECT COUNT(*) FROM Reserva
-                WHERE id_clase = NEW.id_clase AND estado_reserva = 'confirmada'
-            ) >= (
-                SELECT cupo_max FROM Clase WHERE id_clase = NEW.id_clase
-            )
-            THEN RAISE(ABORT, 'Error: CUPOS_AGOTADOS')
-        END;
-    END;
-
-    -- Trigger: Validar suscripción activa al reservar
-    CREATE TRIGGER IF NOT EXISTS trg_check_vigencia_socio
-    BEFORE INSERT ON Reserva
-    BEGIN
-        SELECT CASE
-            WHEN NOT EXISTS (
-                SELECT 1 FROM Suscripcion
-                WHERE id_socio = NEW.id_socio
-                  AND estado_sus = 'activa'
-                  AND DATE(fecha_fin) >= DATE('now', 'localtime')
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                nombre TEXT NOT NULL,
+                aplicada_en TEXT NOT NULL
             )
-            THEN RAISE(ABORT, 'Error: SIN_SUSCRIPCION_ACTIVA')
-        END;
-    END;
+        """)
+        aplicadas = 0
+        for version, nombre, ruta in _listar_migraciones():
+            # BEGIN IMMEDIATE: si otro proceso/hilo migra a la vez, espera aquí
+            c.execute("BEGIN IMMEDIATE")
+            try:
+                if c.execute("PRAGMA user_version").fetchone()[0] >= version:
+                    c.execute("COMMIT")
+                    continue
+                _aplicar_migracion(c, version, nombre, ruta)
+                c.execute("COMMIT")
+            except Exception:
+                c.execute("ROLLBACK")
+                raise
+            aplicadas += 1
+        if aplicadas:
+            print(f"🧱 Esquema migrado a la versión {objetivo} ({aplicadas} migración/es)")
+        return aplicadas
+
+def ensure_full_schema():
     """
-    with get_conn() as c:
-        c.executescript(ddl)
+    Garantiza que el esquema esté al día (tablas, vistas, Soft Delete y Triggers).
+    Solo la primera llamada del proceso consulta la DB; las siguientes son no-op.
+    """
+    ruta = current_db_path()
+    if ruta in _schema_ok:
+        return
+    with _schema_lock:
+        if ruta in _schema_ok:
+            return
+        run_migrations()
+        errores = validar_consultas()
+        if errores:
+            raise RuntimeError("Consultas inválidas para el esquema actual: " + "; ".join(
+                f"{nombre}: {error}" for nombre, error in errores))
+        _schema_ok.add(ruta)
+        # asistencia, retencion, demanda... se importan recién al usarse: sus
+        # sentencias se validan al registrarse
+        consultas.validar_nuevas(_validar_nueva)
+
+def validar_consultas(sentencias=None) -> List[Tuple[str, str]]:
+    """
+    Prepara con EXPLAIN las sentencias registradas en consultas.py (todas por
+    defecto) contra el esquema actual (el archivo se simula en memoria).
+    Devuelve [(nombre, error)].
+    """
+    c = sqlite3.connect(current_db_path(), isolation_level=None)
+    try:
+        c.execute("ATTACH DATABASE ':memory:' AS archivo")
+        for sentencia in _ARCHIVO_SCHEMA:
+            c.execute(sentencia)
+        return consultas.validar(c, sentencias)
+    finally:
+        c.close()
+
+def _validar_nueva(sentencia) -> Optional[str]:
+    # Una DB todavía sin migrar se valida entera en su ensure_full_schema()
+    if current_db_path() not in _schema_ok:
+        return None
+    errores = validar_consultas([sentencia])
+    return errores[0][1] if errores else None
+
 # ============================================================
 # SOCIOS (CRUD)
 # ============================================================
-def get_all_socios() -> List[Dict]:
+
+# Versión de los datos de socios: cada escritura la incrementa en la caché
+# compartida para que los índices en memoria (selector_socios.py) de todos
+# los procesos sepan cuándo recargar.
+def socios_version() -> int:
+    return cache_compartida().generacion("socios")
+
+def marcar_socios_modificados():
     try:
-        with get_conn() as c:
-            # AÑADIDO: WHERE activo = 1
-            rows = c.execute("""
-                SELECT id_socio, RUT, nombre, apellido_p, apellido_m,
-                       telefono, direccion, fecha_nac
-                FROM Socio
-                WHERE activo = 1
-                ORDER BY apellido_p COLLATE NOCASE, nombre COLLATE NOCASE
-            """).fetchall()
-            return _rows_to_dicts(rows)
+        cache_compartida().invalidar(("socios",))
+    except sqlite3.Error as e:
+        print(f"Error al invalidar la caché de socios: {e}")
+
+# AÑADIDO: WHERE activo = 1
+consultas.registrar("socios.listar", """
+    SELECT id_socio, RUT, nombre, apellido_p, apellido_m,
+           telefono, direccion, fecha_nac
+    FROM Socio
+    WHERE activo = 1
+    ORDER BY apellido_p COLLATE NOCASE, nombre COLLATE NOCASE
+    LIMIT ?
+""")
+
+def get_all_socios(limit: int | None = None, formato: str = "dict"):
+    try:
+        with get_read_conn() as c:
+            cur = consultas.ejecutar(c, "socios.listar", (limit if limit else -1,))
+            return _resultado(cur, formato, registros.Socio)
     except Exception as e:
         print(f"Error al obtener socios: {e}")
-        return []
+        return {} if formato == "columnas" else []
+
+consultas.registrar("socios.por_rut", """
+    SELECT id_socio, RUT, nombre, apellido_p, apellido_m,
+           telefono, direccion, fecha_nac
+    FROM Socio
+    WHERE RUT = ?
+""")
 
 def buscar_socio_por_rut(rut: str) -> Optional[Dict]:
     try:
-        with get_conn() as c:
-            row = c.execute("""
-                SELECT id_socio, RUT, nombre, apellido_p, apellido_m,
-                       telefono, direccion, fecha_nac
-                FROM Socio
-                WHERE RUT = ?
-            """, (rut.strip(),)).fetchone()
+        with get_read_conn() as c:
+            row = consultas.una(c, "socios.por_rut", (rut.strip(),))
             return dict(row) if row else None
     except Exception as e:
         print(f"Error al buscar socio: {e}")
         return None
 
+consultas.registrar("socios.crear", """
+    INSERT INTO Socio (RUT, nombre, apellido_p, apellido_m,
+                       fecha_nac, telefono, direccion)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+""")
+
 def crear_socio(
     rut: str,
     nombre: str,
@@ -275,11 +404,7 @@ def crear_socio(
 ) -> Tuple[bool, Optional[int], Optional[str]]:
     try:
         with get_conn() as c:
-            cur = c.execute("""
-                INSERT INTO Socio (RUT, nombre, apellido_p, apellido_m,
-                                   fecha_nac, telefono, direccion)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (
+            cur = consultas.ejecutar(c, "socios.crear", (
                 rut.strip(),
                 nombre.strip(),
                 apellido_p.strip(),
@@ -288,13 +413,21 @@ def crear_socio(
                 (telefono or None),
                 (direccion or None),
             ))
-            return True, cur.lastrowid, None
+        marcar_socios_modificados()
+        return True, cur.lastrowid, None
     except sqlite3.IntegrityError as ie:
         return False, None, str(ie)
     except Exception as e:
         print(f"Error al crear socio: {e}")
         return False, None, str(e)
 
+consultas.registrar("socios.actualizar", """
+    UPDATE Socio
+    SET RUT = ?, nombre = ?, apellido_p = ?, apellido_m = ?,
+        fecha_nac = ?, telefono = ?, direccion = ?
+    WHERE id_socio = ?
+""")
+
 def actualizar_socio(
     id_socio: int,
     rut: str,
@@ -307,12 +440,7 @@ def actualizar_socio(
 ) -> Tuple[bool, int, Optional[str]]:
     try:
         with get_conn() as c:
-            cur = c.execute("""
-                UPDATE Socio
-                SET RUT = ?, nombre = ?, apellido_p = ?, apellido_m = ?,
-                    fecha_nac = ?, telefono = ?, direccion = ?
-                WHERE id_socio = ?
-            """, (
+            cur = consultas.ejecutar(c, "socios.actualizar", (
                 rut.strip(),
                 nombre.strip(),
                 apellido_p.strip(),
@@ -322,19 +450,23 @@ def actualizar_socio(
                 (direccion or None),
                 id_socio,
             ))
-            return True, cur.rowcount, None
+        marcar_socios_modificados()
+        return True, cur.rowcount, None
     except sqlite3.IntegrityError as ie:
         return False, 0, str(ie)
     except Exception as e:
         print(f"Error al actualizar socio: {e}")
         return False, 0, str(e)
 
+# CAMBIO: No borramos, solo desactivamos.
+consultas.registrar("socios.desactivar", "UPDATE Socio SET activo = 0 WHERE id_socio = ?")
+
 def eliminar_socio(id_socio: int) -> Tuple[bool, int, Optional[str]]:
     try:
         with get_conn() as c:
-            # CAMBIO: No borramos, solo desactivamos.
-            cur = c.execute("UPDATE Socio SET activo = 0 WHERE id_socio = ?", (id_socio,))
-            return True, cur.rowcount, None
+            cur = consultas.ejecutar(c, "socios.desactivar", (id_socio,))
+        marcar_socios_modificados()
+        return True, cur.rowcount, None
     except sqlite3.IntegrityError as ie:
         return False, 0, str(ie)
     except Exception as e:
@@ -344,24 +476,26 @@ def eliminar_socio(id_socio: int) -> Tuple[bool, int, Optional[str]]:
 # ============================================================
 # DASHBOARD
 # ============================================================
+consultas.registrar("esquema.vista_existe", "SELECT 1 FROM sqlite_master WHERE type='view' AND name = ?")
+consultas.registrar("dashboard.socios_activos_vista", "SELECT COUNT(*) AS n FROM v_socios_activos")
+consultas.registrar("dashboard.socios_activos", """
+    WITH ult AS (
+      SELECT id_socio, MAX(fecha_fin) AS fmax
+      FROM Suscripcion GROUP BY id_socio
+    )
+    SELECT COUNT(*) AS n
+    FROM ult u
+    JOIN Suscripcion s ON s.id_socio=u.id_socio AND s.fecha_fin=u.fmax
+    WHERE s.estado_sus='activa' AND s.fecha_fin_epoch >= ?
+""")
+
+@compartido
 def count_socios_activos() -> int:
-    with get_conn() as c:
-        exists = c.execute("""
-            SELECT 1 FROM sqlite_master WHERE type='view' AND name='v_socios_activos'
-        """).fetchone()
-        if exists:
-            row = c.execute("SELECT COUNT(*) AS n FROM v_socios_activos").fetchone()
+    with get_read_conn() as c:
+        if consultas.una(c, "esquema.vista_existe", ("v_socios_activos",)):
+            row = consultas.una(c, "dashboard.socios_activos_vista")
             return int(row["n"] if row else 0)
-        row = c.execute("""
-            WITH ult AS (
-              SELECT id_socio, MAX(fecha_fin) AS fmax
-              FROM Suscripcion GROUP BY id_socio
-            )
-            SELECT COUNT(*) AS n
-            FROM ult u
-            JOIN Suscripcion s ON s.id_socio=u.id_socio AND s.fecha_fin=u.fmax
-            WHERE s.estado_sus='activa' AND DATE(s.fecha_fin) >= DATE('now','localtime')
-        """).fetchone()
+        row = consultas.una(c, "dashboard.socios_activos", (_hoy_epoch(),))
         return int(row["n"] if row else 0)
 
 # def proximas_clases(limit: int = 10) -> List[Dict]:
@@ -375,99 +509,207 @@ def count_socios_activos() -> int:
 #         """, (limit,)).fetchall()
 #         return _rows_to_dicts(rows)
 
+consultas.registrar("dashboard.clases_hoy", """
+    SELECT COUNT(*) AS n
+    FROM Clase
+    WHERE inicio >= ? AND inicio < ?
+""")
+
+@compartido
 def count_clases_hoy() -> int:
-    with get_conn() as c:
-        row = c.execute("""
-            SELECT COUNT(*) AS n
-            FROM Clase
-            WHERE DATE(fecha_hora) = DATE('now','localtime')
-        """).fetchone()
+    with get_read_conn() as c:
+        row = consultas.una(c, "dashboard.clases_hoy", (_hoy_epoch(), _hoy_epoch(1)))
         return int(row["n"] if row else 0)
 
+consultas.registrar("dashboard.ingresos_mes", """
+    SELECT COALESCE(SUM(monto),0) AS total
+    FROM Pago
+    WHERE estado_pago='completado'
+      AND fecha_pago_epoch >= ? AND fecha_pago_epoch < ?
+""")
+
+@compartido
 def ingresos_mes_actual() -> float:
-    with get_conn() as c:
-        row = c.execute("""
-            SELECT COALESCE(SUM(monto),0) AS total
-            FROM Pago
-            WHERE estado_pago='completado'
-              AND strftime('%Y-%m','now','localtime') = strftime('%Y-%m', fecha_pago)
-        """).fetchone()
+    hoy = _dt.now()
+    inicio_mes = _dt(hoy.year, hoy.month, 1)
+    inicio_sig = _dt(hoy.year + hoy.month // 12, hoy.month % 12 + 1, 1)
+    with get_read_conn() as c:
+        row = consultas.una(c, "dashboard.ingresos_mes", (epoch(inicio_mes), epoch(inicio_sig)))
         return float(row["total"] if row else 0.0)
 
+consultas.registrar("dashboard.membresias_por_vencer", """
+    SELECT s.id_socio,
+           s.nombre || ' ' || s.apellido_p AS nombre_socio,
+           sus.fecha_fin,
+           p.nombre_plan,
+           (sus.fecha_fin_epoch - :hoy) / 86400 AS dias_restantes
+    FROM Suscripcion sus
+    JOIN Socio s ON s.id_socio = sus.id_socio
+    JOIN Plan  p ON p.id_plan  = sus.id_plan
+    WHERE sus.fecha_fin_epoch >= :hoy AND sus.fecha_fin_epoch < :hasta
+    ORDER BY sus.fecha_fin_epoch ASC
+    LIMIT 50
+""")
+
+@compartido
 def membresias_por_vencer(dias: int = 7) -> List[Dict]:
-    with get_conn() as c:
-        rows = c.execute("""
-            SELECT s.id_socio,
-                   s.nombre || ' ' || s.apellido_p AS nombre_socio,
-                   sus.fecha_fin,
-                   p.nombre_plan,
-                   CAST(julianday(sus.fecha_fin) - julianday(date('now','localtime')) AS INT) AS dias_restantes
-            FROM Suscripcion sus
-            JOIN Socio s ON s.id_socio = sus.id_socio
-            JOIN Plan  p ON p.id_plan  = sus.id_plan
-            WHERE DATE(sus.fecha_fin) BETWEEN DATE('now','localtime')
-                                          AND DATE('now','localtime', ?)
-            ORDER BY sus.fecha_fin ASC
-            LIMIT 50
-        """, (f'+{int(dias)} day',)).fetchall()
+    hoy = _hoy_epoch()
+    with get_read_conn() as c:
+        rows = consultas.todas(c, "dashboard.membresias_por_vencer", {"hoy": hoy, "hasta": hoy + (int(dias) + 1) * DIA})
         return _rows_to_dicts(rows)
 
 # ============================================================
 # PAGOS
 # ============================================================
-def get_historial_pagos(limit: int = 100) -> List[Dict]:
+consultas.registrar("pagos.historial_vista", """
+    SELECT id_pago, RUT, nombre_socio, nombre_plan,
+           fecha_pago, monto, metodo_pago, estado_pago
+    FROM v_historial_pagos
+    ORDER BY fecha_pago DESC
+    LIMIT ?
+""")
+consultas.registrar("pagos.historial", """
+    SELECT pag.id_pago,
+           s.RUT,
+           s.nombre || ' ' || s.apellido_p AS nombre_socio,
+           p.nombre_plan,
+           pag.fecha_pago,
+           pag.monto,
+           pag.metodo_pago,
+           pag.estado_pago
+    FROM Pago pag
+    JOIN Suscripcion sus ON pag.id_suscripcion = sus.id_suscripcion
+    JOIN Socio s ON sus.id_socio = s.id_socio
+    JOIN Plan  p ON sus.id_plan  = p.id_plan
+    ORDER BY pag.fecha_pago DESC
+    LIMIT ?
+""")
+
+def get_historial_pagos(limit: int = 100, formato: str = "dict"):
     try:
-        with get_conn() as c:
-            view_exists = c.execute("""
-                SELECT 1 FROM sqlite_master
-                WHERE type='view' AND name='v_historial_pagos'
-            """).fetchone()
-            if view_exists:
-                rows = c.execute("""
-                    SELECT id_pago, RUT, nombre_socio, nombre_plan,
-                           fecha_pago, monto, metodo_pago, estado_pago
-                    FROM v_historial_pagos
-                    ORDER BY fecha_pago DESC
-                    LIMIT ?
-                """, (limit,)).fetchall()
+        with get_read_conn() as c:
+            if consultas.una(c, "esquema.vista_existe", ("v_historial_pagos",)):
+                cur = consultas.ejecutar(c, "pagos.historial_vista", (limit,))
             else:
-                rows = c.execute("""
-                    SELECT pag.id_pago,
-                           s.RUT,
-                           s.nombre || ' ' || s.apellido_p AS nombre_socio,
-                           p.nombre_plan,
-                           pag.fecha_pago,
-                           pag.monto,
-                           pag.metodo_pago,
-                           pag.estado_pago
-                    FROM Pago pag
-                    JOIN Suscripcion sus ON pag.id_suscripcion = sus.id_suscripcion
-                    JOIN Socio s ON sus.id_socio = s.id_socio
-                    JOIN Plan  p ON sus.id_plan  = p.id_plan
-                    ORDER BY pag.fecha_pago DESC
-                    LIMIT ?
-                """, (limit,)).fetchall()
-            return _rows_to_dicts(rows)
+                cur = consultas.ejecutar(c, "pagos.historial", (limit,))
+            return _resultado(cur, formato, registros.Pago)
     except Exception as e:
         print(f"Error al obtener historial de pagos: {e}")
-        return []
+        return {} if formato == "columnas" else []
+
+# Tamaño de bloque al leer columnas: acota la memoria de tuplas intermedias
+_BLOQUE_COLUMNAS = 50_000
+
+# Sin filtro de fechas se usan '' y '9999-12-31': el texto SQL no cambia con
+# los filtros y el rango sigue resolviéndose con idx_pago_fecha. Los métodos
+# llegan como un solo parámetro JSON (json_each) en vez de un IN (?,?,...) variable.
+_SQL_HISTORIAL_COLUMNAS = """
+    SELECT pag.id_pago,
+           s.RUT,
+           s.nombre || ' ' || s.apellido_p AS nombre_socio,
+           p.nombre_plan,
+           pag.fecha_pago,
+           pag.monto,
+           pag.metodo_pago,
+           pag.estado_pago
+    FROM Pago pag
+    JOIN Suscripcion sus ON pag.id_suscripcion = sus.id_suscripcion
+    JOIN Socio s ON sus.id_socio = s.id_socio
+    JOIN Plan  p ON sus.id_plan  = p.id_plan
+    WHERE pag.fecha_pago >= :desde AND pag.fecha_pago <= :hasta{}
+    ORDER BY pag.fecha_pago DESC, pag.id_pago DESC
+    LIMIT :limite
+"""
+consultas.registrar("pagos.historial_columnas", _SQL_HISTORIAL_COLUMNAS.format(""))
+consultas.registrar("pagos.historial_columnas_metodos", _SQL_HISTORIAL_COLUMNAS.format(
+    "\n      AND pag.metodo_pago IN (SELECT value FROM json_each(:metodos))"))
+
+def get_historial_pagos_columnas(
+    limit: int = 100,
+    metodos: Optional[List[str]] = None,
+    desde: Optional[str] = None,   # YYYY-MM-DD, incluido
+    hasta: Optional[str] = None,   # YYYY-MM-DD, incluido
+) -> Dict[str, "np.ndarray"]:
+    """
+    Historial de pagos como arrays NumPy por columna, ya tipados:
+    fecha_pago -> datetime64[D], monto -> float64, id_pago -> int64,
+    texto -> object. Los filtros se resuelven en SQL (idx_pago_fecha) y el
+    orden es fecha_pago DESC.
+    Pensado para `pd.DataFrame(cols)` sin listas de dicts intermedias.
+    """
+    import numpy as np
+
+    params = {
+        "desde": str(desde) if desde else "",
+        "hasta": str(hasta) if hasta else "9999-12-31",
+        "limite": limit if limit else -1,
+    }
+    if metodos:
+        params["metodos"] = json.dumps(list(metodos))
+
+    tipos = {
+        "id_pago": np.int64, "RUT": object, "nombre_socio": object, "nombre_plan": object,
+        "fecha_pago": "datetime64[D]", "monto": np.float64, "metodo_pago": object, "estado_pago": object,
+    }
+    bloques: Dict[str, list] = {col: [] for col in tipos}
+    with get_read_conn() as c:
+        cur = consultas.ejecutar(
+            c, "pagos.historial_columnas_metodos" if metodos else "pagos.historial_columnas", params,
+        )
+        cur.row_factory = None
+        while True:
+            filas = cur.fetchmany(_BLOQUE_COLUMNAS)
+            if not filas:
+                break
+            for (col, tipo), valores in zip(tipos.items(), zip(*filas)):
+                bloques[col].append(np.array(valores, dtype=tipo))
+
+    return {
+        col: (np.concatenate(partes) if partes else np.array([], dtype=tipos[col]))
+        for col, partes in bloques.items()
+    }
+
+# Sin fila devuelta = otro proceso registró la misma clave entre la búsqueda y el INSERT
+consultas.registrar("pagos.registrar", """
+    INSERT INTO Pago (id_suscripcion, monto, metodo_pago, num_comprobante, clave_idempotencia)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (clave_idempotencia) WHERE clave_idempotencia IS NOT NULL DO NOTHING
+    RETURNING id_pago
+""")
+consultas.registrar("pagos.por_clave", """
+    SELECT id_pago, id_suscripcion, monto, metodo_pago FROM Pago WHERE clave_idempotencia = ?
+""")
 
 def registrar_pago(
     id_suscripcion: int,
     monto: float,
     metodo: str,
     comprobante: Optional[str] = None,
+    clave: Optional[str] = None,
 ) -> Tuple[bool, Optional[int], Optional[str]]:
+    """
+    `clave` es la clave de idempotencia del envío (una por formulario). Si ya
+    hay un pago con esa clave no se inserta otro y se devuelve su id_pago.
+    """
     metodo = (metodo or "").strip().lower()
     if metodo not in ("transferencia", "webpay", "tarjeta", "efectivo"):
         return False, None, f"Método no válido: {metodo}"
+    clave = clave or None
     try:
         with get_conn() as c:
-            cur = c.execute("""
-                INSERT INTO Pago (id_suscripcion, monto, metodo_pago, num_comprobante)
-                VALUES (?, ?, ?, ?)
-            """, (id_suscripcion, monto, metodo, (comprobante or None)))
-            return True, cur.lastrowid, None
+            # Reenvío: búsqueda en el índice único, sin escribir (ni consumir un id)
+            original = consultas.una(c, "pagos.por_clave", (clave,)) if clave else None
+            if original is None:
+                filas = consultas.todas(
+                    c, "pagos.registrar", (id_suscripcion, monto, metodo, (comprobante or None), clave),
+                )
+                if filas:
+                    return True, filas[0]["id_pago"], None
+                original = consultas.una(c, "pagos.por_clave", (clave,))
+            if (original["id_suscripcion"], float(original["monto"]), original["metodo_pago"]) != \
+                    (id_suscripcion, float(monto), metodo):
+                return False, original["id_pago"], "La clave de idempotencia ya se usó para otro pago"
+            return True, original["id_pago"], None
     except sqlite3.IntegrityError as ie:
         return False, None, str(ie)
     except Exception as e:
@@ -477,31 +719,43 @@ def registrar_pago(
 # ============================================================
 # CLASES / RESERVAS
 # ============================================================
-def get_all_clases() -> List[Dict]:
-    with get_conn() as c:
-        rows = c.execute("""
-            SELECT
-              c.id_clase,
-              c.nombre,
-              t.nombre AS tipo,
-              e.nombre || ' ' || e.apellido AS entrenador,
-              c.fecha_hora,
-              c.duracion_min,
-              c.cupo_max
-            FROM Clase c
-            JOIN Tipo t ON t.id_tipo = c.id_tipo
-            JOIN Entrenador e ON e.id_entrenador = c.id_entrenador
-            ORDER BY c.fecha_hora ASC
-        """).fetchall()
+_SQL_CLASES = """
+    SELECT
+      c.id_clase,
+      c.nombre,
+      t.nombre AS tipo,
+      e.nombre || ' ' || e.apellido AS entrenador,
+      c.fecha_hora,
+      c.duracion_min,
+      c.cupo_max
+    FROM Clase c
+    JOIN Tipo t ON t.id_tipo = c.id_tipo
+    JOIN Entrenador e ON e.id_entrenador = c.id_entrenador
+"""
+consultas.registrar("clases.todas", _SQL_CLASES + "ORDER BY fecha_hora ASC")
+consultas.registrar("clases.todas_con_archivo", _SQL_CLASES + """
+    UNION ALL
+    SELECT id_clase, nombre, tipo_clase, entrenador, fecha_hora, duracion_min, cupo_max
+    FROM archivo.ClaseArchivada
+    ORDER BY fecha_hora ASC
+""")
+
+def get_all_clases(incluir_archivo: bool = False) -> List[Dict]:
+    with get_read_conn() as c:
+        if incluir_archivo:
+            _adjuntar_archivo(c)
+        rows = consultas.todas(c, "clases.todas_con_archivo" if incluir_archivo else "clases.todas")
         return _rows_to_dicts(rows)
 
+consultas.registrar("reservas.crear", """
+    INSERT INTO Reserva (id_socio, id_clase, estado_reserva, asistio)
+    VALUES (?, ?, 'confirmada', 0)
+""")
+
 def reservar_clase(id_socio: int, id_clase: int) -> Tuple[bool, Optional[int], Optional[str]]:
     try:
         with get_conn() as c:
-            cur = c.execute("""
-                INSERT INTO Reserva (id_socio, id_clase, estado_reserva, asistio)
-                VALUES (?, ?, 'confirmada', 0)
-            """, (id_socio, id_clase))
+            cur = consultas.ejecutar(c, "reservas.crear", (id_socio, id_clase))
             return True, cur.lastrowid, None
     except sqlite3.IntegrityError as ie:
         return False, None, str(ie)
@@ -512,15 +766,17 @@ def reservar_clase(id_socio: int, id_clase: int) -> Tuple[bool, Optional[int], O
 # =========================
 # PLANES
 # =========================
-def get_planes():
+consultas.registrar("planes.listar", """
+    SELECT id_plan, nombre_plan, duracion_meses, precio
+    FROM Plan
+    ORDER BY precio DESC
+""")
+
+def get_planes(formato: str = "dict"):
     """Devuelve lista de planes disponibles (id, nombre, meses, precio)."""
-    with get_conn() as c:
-        rows = c.execute("""
-            SELECT id_plan, nombre_plan, duracion_meses, precio
-            FROM Plan
-            ORDER BY precio DESC
-        """).fetchall()
-        return [dict(r) for r in rows] if rows is not None else None
+    with get_read_conn() as c:
+        cur = consultas.ejecutar(c, "planes.listar")
+        return _resultado(cur, formato, registros.Plan)
 
 def ensure_seed_planes():
     """Semilla mínima de planes (ejecuta una sola vez si tu tabla Plan está vacía)."""
@@ -542,6 +798,15 @@ def ensure_seed_planes():
 # =========================
 # SUSCRIPCIONES
 # =========================
+consultas.registrar("suscripciones.fecha_fin", """
+    SELECT DATE(?, printf('+%d months', duracion_meses)) AS fecha_fin
+    FROM Plan WHERE id_plan = ?
+""")
+consultas.registrar("suscripciones.crear", """
+    INSERT INTO Suscripcion (id_socio, id_plan, fecha_inicio, fecha_fin, estado_sus)
+    VALUES (?, ?, ?, ?, ?)
+""")
+
 def crear_suscripcion(id_socio: int, id_plan: int, fecha_inicio: str, estado: str = "activa"):
     """
     Crea una suscripción para un socio calculando fecha_fin a partir del plan.
@@ -549,174 +814,283 @@ def crear_suscripcion(id_socio: int, id_plan: int, fecha_inicio: str, estado: st
     """
     with get_conn() as c:
         # calcula fecha_fin sumando meses del plan directamente en SQLite
-        row = c.execute("""
-            SELECT DATE(?, printf('+%d months', duracion_meses)) AS fecha_fin
-            FROM Plan WHERE id_plan = ?
-        """, (fecha_inicio, id_plan)).fetchone()
+        row = consultas.una(c, "suscripciones.fecha_fin", (fecha_inicio, id_plan))
         if not row:
             return False, None, "Plan no encontrado"
         fecha_fin = row["fecha_fin"]
         try:
-            cur = c.execute("""
-                INSERT INTO Suscripcion (id_socio, id_plan, fecha_inicio, fecha_fin, estado_sus)
-                VALUES (?, ?, ?, ?, ?)
-            """, (id_socio, id_plan, fecha_inicio, fecha_fin, estado))
+            cur = consultas.ejecutar(c, "suscripciones.crear", (id_socio, id_plan, fecha_inicio, fecha_fin, estado))
             return True, cur.lastrowid, None
         except sqlite3.IntegrityError as ie:
             return False, None, str(ie)
         except Exception as e:
             return False, None, str(e)
 
+consultas.registrar("suscripciones.por_socio", """
+    SELECT sus.id_suscripcion, sus.fecha_inicio, sus.fecha_fin, sus.estado_sus,
+           p.id_plan, p.nombre_plan, p.duracion_meses, p.precio
+    FROM Suscripcion sus
+    JOIN Plan p ON p.id_plan = sus.id_plan
+    WHERE sus.id_socio = ?
+    ORDER BY sus.fecha_fin DESC
+""")
+
 def get_suscripciones_por_socio(id_socio: int):
     """Lista todas las suscripciones de un socio (la más reciente primero)."""
-    with get_conn() as c:
-        rows = c.execute("""
-            SELECT sus.id_suscripcion, sus.fecha_inicio, sus.fecha_fin, sus.estado_sus,
-                   p.id_plan, p.nombre_plan, p.duracion_meses, p.precio
-            FROM Suscripcion sus
-            JOIN Plan p ON p.id_plan = sus.id_plan
-            WHERE sus.id_socio = ?
-            ORDER BY sus.fecha_fin DESC
-        """, (id_socio,)).fetchall()
+    with get_read_conn() as c:
+        rows = consultas.todas(c, "suscripciones.por_socio", (id_socio,))
         return [dict(r) for r in rows] if rows is not None else None
 
+consultas.registrar("suscripciones.activa", """
+    WITH ult AS(
+      SELECT id_socio, MAX(fecha_fin) AS fmax
+      FROM Suscripcion WHERE id_socio=? GROUP BY id_socio
+    )
+    SELECT sus.id_suscripcion, sus.id_socio, sus.id_plan, sus.fecha_inicio,
+           sus.fecha_fin, sus.estado_sus, p.precio, p.nombre_plan
+    FROM ult u
+    JOIN Suscripcion sus ON sus.id_socio=u.id_socio AND sus.fecha_fin=u.fmax
+    JOIN Plan p ON p.id_plan = sus.id_plan
+    WHERE sus.estado_sus='activa' AND sus.fecha_fin_epoch >= ?
+""")
+
 def get_suscripcion_activa_por_socio(id_socio: int):
     """
     Devuelve la suscripción activa más reciente si existe (o None).
     Activa = estado_sus='activa' y fecha_fin >= hoy.
     """
-    with get_conn() as c:
-        row = c.execute("""
-            WITH ult AS(
-              SELECT id_socio, MAX(fecha_fin) AS fmax
-              FROM Suscripcion WHERE id_socio=? GROUP BY id_socio
-            )
-            SELECT sus.*, p.precio, p.nombre_plan
-            FROM ult u
-            JOIN Suscripcion sus ON sus.id_socio=u.id_socio AND sus.fecha_fin=u.fmax
-            JOIN Plan p ON p.id_plan = sus.id_plan
-            WHERE sus.estado_sus='activa' AND DATE(sus.fecha_fin) >= DATE('now','localtime')
-        """, (id_socio,)).fetchone()
+    with get_read_conn() as c:
+        row = consultas.una(c, "suscripciones.activa", (id_socio, _hoy_epoch()))
         return dict(row) if row else None
 
-def actualizar_estados_suscripciones():
-
-    with get_conn() as c:
-        c.execute("""
-            UPDATE Suscripcion
-            SET estado_sus = CASE
-                WHEN DATE(fecha_fin) >= DATE('now','localtime') THEN 'activa'
-                ELSE 'vencida'
-            END
-        """)
+# Las canceladas se respetan y sólo se escriben las filas cuyo estado cambia
+consultas.registrar("suscripciones.actualizar_estados", """
+    UPDATE Suscripcion
+    SET estado_sus = CASE
+        WHEN fecha_fin_epoch >= :hoy THEN 'activa'
+        ELSE 'vencida'
+    END
+    WHERE estado_sus <> 'cancelada'
+      AND estado_sus <> CASE WHEN fecha_fin_epoch >= :hoy THEN 'activa' ELSE 'vencida' END
+""")
+
+def actualizar_estados_suscripciones() -> Tuple[bool, int, Optional[str]]:
+    """
+    Marca 'vencida' / 'activa' según fecha_fin (tarea diaria de mantenimiento.py).
+    Devuelve (ok, suscripciones_actualizadas, error).
+    """
+    try:
+        with get_conn() as c:
+            n = consultas.ejecutar(c, "suscripciones.actualizar_estados", {"hoy": _hoy_epoch()}).rowcount
+            return True, n, None
+    except Exception as e:
+        print(f"Error al actualizar estados de suscripciones: {e}")
+        return False, 0, str(e)
 
 # =========================
 # CLASSE
 # =========================
 
-def get_all_classes() -> List[Dict] | None:
+# Listados de clases: un solo motor parametrizado.
+# Un FiltroClases describe el listado (momento, ventana de fechas, cupos, tipo,
+# entrenador, texto, orden, página). Cada combinación de filtros presentes
+# ("forma") se compila una sola vez a una sentencia registrada en consultas.py,
+# con los valores como parámetros; el resultado de cada filtro se guarda en la
+# caché compartida igual que los KPIs (ver compartido).
+# Campos de FiltroClases (inmutable: sirve de clave de caché):
+# - cuando: "todas", "proximas" (inicio >= ahora) o "pasadas" (inicio < ahora)
+# - desde / hasta: 'YYYY-MM-DD' (ambos incluidos) o 'YYYY-MM-DD HH:MM'
+# - disponibles: sólo clases con cupos libres
+# - id_tipo / id_entrenador / texto (nombre, tipo o entrenador contiene el texto)
+# - orden: "asc" o "desc" por inicio
+# - pagina (desde 0) / por_pagina (None = todas)
+# - incluir_archivo: suma las clases archivadas (ver ARCHIVO)
+FiltroClases = namedtuple(
+    "FiltroClases",
+    "cuando desde hasta disponibles id_tipo id_entrenador texto orden pagina por_pagina incluir_archivo",
+    defaults=("todas", None, None, False, None, None, None, "asc", 0, None, False),
+)
+
+_MIN_EPOCH, _MAX_EPOCH = -(2 ** 62), 2 ** 62
+
+_CUPOS_CLASE = """c.cupo_max - (SELECT COUNT(*) FROM Reserva r
+                          WHERE r.id_clase = c.id_clase AND r.estado_reserva = 'confirmada')"""
+
+# Por origen (Clase con joins / archivo.ClaseArchivada): FROM, columnas del
+# registro Clase y expresiones usadas en los filtros
+_ORIGENES_CLASES = {
+    "clase": {
+        "from": """Clase c
+        JOIN Tipo t ON t.id_tipo = c.id_tipo
+        JOIN Entrenador e ON e.id_entrenador = c.id_entrenador""",
+        "columnas": f"""c.id_clase, c.nombre, t.nombre AS tipo_clase,
+               e.nombre || ' ' || e.apellido AS entrenador, c.fecha_hora,
+               c.duracion_min, c.descripcion, c.cupo_max,
+               {_CUPOS_CLASE} AS cupos_disponibles""",
+        "alias": "c", "tipo": "t.nombre", "entrenador": "e.nombre || ' ' || e.apellido", "cupos": _CUPOS_CLASE,
+    },
+    "archivo": {
+        "from": "archivo.ClaseArchivada a",
+        "columnas": """a.id_clase, a.nombre, a.tipo_clase, a.entrenador, a.fecha_hora,
+               a.duracion_min, a.descripcion, a.cupo_max,
+               a.cupo_max - a.reservas_confirmadas AS cupos_disponibles""",
+        "alias": "a", "tipo": "a.tipo_clase", "entrenador": "a.entrenador", "cupos": "a.cupo_max - a.reservas_confirmadas",
+    },
+}
+
+def _select_clases(f: FiltroClases, origen: str, columnas: str) -> str:
+    o = _ORIGENES_CLASES[origen]
+    a = o["alias"]
+    where = [f"{a}.inicio >= :desde", f"{a}.inicio < :hasta"]
+    if f.id_tipo is not None:
+        where.append(f"{a}.id_tipo = :id_tipo")
+    if f.id_entrenador is not None:
+        where.append(f"{a}.id_entrenador = :id_entrenador")
+    if f.texto:
+        coincide = " OR ".join(
+            f"{expr} LIKE :texto ESCAPE '\\'" for expr in (f"{a}.nombre", o["tipo"], o["entrenador"])
+        )
+        where.append(f"({coincide})")
+    if f.disponibles:
+        where.append(f"{o['cupos']} > 0")
+    return f"""
+        SELECT {columnas}
+        FROM {o['from']}
+        WHERE """ + "\n          AND ".join(where)
+
+def _forma_clases(f: FiltroClases) -> str:
+    return ",".join(
+        nombre for nombre, activo in (
+            ("tipo", f.id_tipo is not None), ("entrenador", f.id_entrenador is not None),
+            ("texto", bool(f.texto)), ("disponibles", bool(f.disponibles)), ("archivo", bool(f.incluir_archivo)),
+        ) if activo
+    )
 
-    with get_conn() as c:
-        rows = c.execute("""
-            SELECT
-              c.id_clase,
-              c.nombre,
-              t.nombre AS tipo_clase,
-              e.nombre || ' ' || e.apellido AS entrenador,
-              c.fecha_hora,
-              c.duracion_min,
-              c.descripcion,
-              c.cupo_max,
-              (c.cupo_max - COALESCE(SUM(CASE WHEN r.estado_reserva='confirmada' THEN 1 ELSE 0 END),0)) AS cupos_disponibles
-            FROM Clase c
-            JOIN Tipo t ON t.id_tipo = c.id_tipo
-            JOIN Entrenador e ON e.id_entrenador = c.id_entrenador
-            LEFT JOIN Reserva r ON r.id_clase = c.id_clase
-            GROUP BY c.id_clase
-            ORDER BY c.fecha_hora ASC
-        """).fetchall()
-        return [dict(r) for r in rows] if rows is not None else None
+def _sentencia_clases(f: FiltroClases, contar: bool = False) -> str:
+    """Nombre de la sentencia registrada para la forma de `f`; se compila la primera vez."""
+    orden = "DESC" if str(f.orden).lower() == "desc" else "ASC"
+    nombre = f"clases.{'contar' if contar else 'listar_' + orden.lower()}[{_forma_clases(f)}]"
+    if consultas.registrada(nombre):
+        return nombre
+    if contar:
+        partes = [_select_clases(f, "clase", "COUNT(*)")]
+        if f.incluir_archivo:
+            partes.append(_select_clases(f, "archivo", "COUNT(*)"))
+        sql = "SELECT " + " + ".join(f"({p}\n        )" for p in partes) + " AS n"
+    elif f.incluir_archivo:
+        sql = f"""
+        SELECT id_clase, nombre, tipo_clase, entrenador, fecha_hora, duracion_min,
+               descripcion, cupo_max, cupos_disponibles
+        FROM ({_select_clases(f, "clase", _ORIGENES_CLASES["clase"]["columnas"] + ", c.inicio")}
+        UNION ALL{_select_clases(f, "archivo", _ORIGENES_CLASES["archivo"]["columnas"] + ", a.inicio")}
+        )
+        ORDER BY inicio {orden}, id_clase {orden}
+        LIMIT :limite OFFSET :offset"""
+    else:
+        # Sin UNION el orden sale del índice (inicio, o id_tipo/id_entrenador + inicio)
+        # y LIMIT corta el recorrido
+        sql = _select_clases(f, "clase", _ORIGENES_CLASES["clase"]["columnas"]) + f"""
+        ORDER BY c.inicio {orden}
+        LIMIT :limite OFFSET :offset"""
+    return consultas.registrar(nombre, sql)
+
+def _limite_epoch(valor, fin: bool = False) -> int:
+    # 'YYYY-MM-DD' como límite final incluye todo ese día
+    texto = str(valor)
+    return epoch(texto) + (DIA if fin and len(texto) == 10 else 0)
+
+def _parametros_clases(f: FiltroClases) -> Dict:
+    desde = _limite_epoch(f.desde) if f.desde else _MIN_EPOCH
+    hasta = _limite_epoch(f.hasta, fin=True) if f.hasta else _MAX_EPOCH
+    if f.cuando == "proximas":
+        desde = max(desde, _ahora_epoch())
+    elif f.cuando == "pasadas":
+        hasta = min(hasta, _ahora_epoch())
+    elif f.cuando != "todas":
+        raise ValueError(f"Valor de 'cuando' no válido: {f.cuando}")
+    params = {"desde": desde, "hasta": hasta}
+    if f.id_tipo is not None:
+        params["id_tipo"] = int(f.id_tipo)
+    if f.id_entrenador is not None:
+        params["id_entrenador"] = int(f.id_entrenador)
+    if f.texto:
+        escapado = str(f.texto).strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        params["texto"] = f"%{escapado}%"
+    return params
+
+@compartido
+def _filas_clases(filtro) -> List[list]:
+    f = FiltroClases(*filtro)
+    params = _parametros_clases(f)
+    por_pagina = int(f.por_pagina) if f.por_pagina else -1
+    params["limite"] = por_pagina
+    params["offset"] = max(0, int(f.pagina or 0)) * max(por_pagina, 0)
+    with get_read_conn() as c:
+        if f.incluir_archivo:
+            _adjuntar_archivo(c)
+        cur = consultas.ejecutar(c, _sentencia_clases(f), params)
+        cur.row_factory = None
+        return cur.fetchall()
+
+def listar_clases(filtro: FiltroClases = FiltroClases(), formato: str = "dict"):
+    """Clases que cumplen `filtro` (ver FiltroClases) en el `formato` pedido (ver FORMATOS)."""
+    filas = _filas_clases(filtro)
+    campos = registros.Clase._fields
+    if formato == "dict":
+        return [dict(zip(campos, fila)) for fila in filas]
+    if formato == "registro":
+        return list(map(registros.Clase._make, filas))
+    if formato == "columnas":
+        if not filas:
+            return {col: [] for col in campos}
+        return {col: list(valores) for col, valores in zip(campos, zip(*filas))}
+    raise ValueError(f"Formato no válido: {formato}")
+
+@compartido
+def contar_clases(filtro: FiltroClases = FiltroClases()) -> int:
+    """Cantidad total de clases que cumplen `filtro` (ignora pagina/por_pagina)."""
+    f = FiltroClases(*filtro)
+    with get_read_conn() as c:
+        if f.incluir_archivo:
+            _adjuntar_archivo(c)
+        row = consultas.una(c, _sentencia_clases(f, contar=True), _parametros_clases(f))
+        return int(row["n"] if row else 0)
 
-def get_all_proximas_clases(limit: int | None = None) -> List[Dict] | None:
+# Listados de siempre sobre el motor (formas compiladas al importar: EXPLAIN al iniciar)
+_FILTROS_BASE = {
+    "todas": FiltroClases(),
+    "proximas": FiltroClases(cuando="proximas"),
+    "disponibles": FiltroClases(cuando="proximas", disponibles=True),
+    "pasadas": FiltroClases(cuando="pasadas", orden="desc"),
+    "pasadas_archivo": FiltroClases(cuando="pasadas", orden="desc", incluir_archivo=True),
+}
+for _f in _FILTROS_BASE.values():
+    _sentencia_clases(_f)
+    _sentencia_clases(_f, contar=True)
+del _f
 
-    with get_conn() as c:
-        query = """
-            SELECT
-              c.id_clase,
-              c.nombre,
-              t.nombre AS tipo_clase,
-              e.nombre || ' ' || e.apellido AS entrenador,
-              c.fecha_hora,
-              c.duracion_min,
-              c.descripcion,
-              c.cupo_max,
-              (c.cupo_max - COALESCE(SUM(CASE WHEN r.estado_reserva='confirmada' THEN 1 ELSE 0 END),0)) AS cupos_disponibles
-            FROM Clase c
-            JOIN Tipo t ON t.id_tipo = c.id_tipo
-            JOIN Entrenador e ON e.id_entrenador = c.id_entrenador
-            LEFT JOIN Reserva r ON r.id_clase = c.id_clase
-            WHERE datetime(c.fecha_hora) >= datetime('now','localtime')
-            GROUP BY c.id_clase
-            ORDER BY c.fecha_hora ASC
-        """
-        
-        if limit:
-            query += " LIMIT ?"
-            rows = c.execute(query, (limit,)).fetchall()
-        else:
-            rows = c.execute(query).fetchall()
-            
-        return [dict(r) for r in rows] if rows is not None else None
+def get_all_classes(formato: str = "dict"):
 
+    return listar_clases(_FILTROS_BASE["todas"], formato)
 
-def get_clases_disponibles() -> List[Dict] | None:
+def get_all_proximas_clases(limit: int | None = None, formato: str = "dict"):
 
-    with get_conn() as c:
-        rows = c.execute("""
-            SELECT
-              c.id_clase,
-              c.nombre,
-              t.nombre AS tipo_clase,
-              e.nombre || ' ' || e.apellido AS entrenador,
-              c.fecha_hora,
-              c.duracion_min,
-              c.descripcion,
-              c.cupo_max,
-              (c.cupo_max - COALESCE(SUM(CASE WHEN r.estado_reserva='confirmada' THEN 1 ELSE 0 END),0)) AS cupos_disponibles
-            FROM Clase c
-            JOIN Tipo t ON t.id_tipo = c.id_tipo
-            JOIN Entrenador e ON e.id_entrenador = c.id_entrenador
-            LEFT JOIN Reserva r ON r.id_clase = c.id_clase
-            WHERE datetime(c.fecha_hora) >= datetime('now','localtime')
-            GROUP BY c.id_clase
-            HAVING cupos_disponibles > 0
-            ORDER BY c.fecha_hora ASC
-        """).fetchall()
-        return [dict(r) for r in rows] if rows is not None else None
+    return listar_clases(_FILTROS_BASE["proximas"]._replace(por_pagina=limit or None), formato)
 
-def get_all_clases_pasadas() -> List[Dict] | None:
 
-    with get_conn() as c:
-        rows = c.execute("""
-            SELECT
-              c.id_clase,
-              c.nombre,
-              t.nombre AS tipo_clase,
-              e.nombre || ' ' || e.apellido AS entrenador,
-              c.fecha_hora,
-              c.duracion_min,
-              c.descripcion,
-              c.cupo_max,
-              (c.cupo_max - COALESCE(SUM(CASE WHEN r.estado_reserva='confirmada' THEN 1 ELSE 0 END),0)) AS cupos_disponibles
-            FROM Clase c
-            JOIN Tipo t ON t.id_tipo = c.id_tipo
-            JOIN Entrenador e ON e.id_entrenador = c.id_entrenador
-            LEFT JOIN Reserva r ON r.id_clase = c.id_clase
-            WHERE datetime(c.fecha_hora) < datetime('now','localtime')
-            GROUP BY c.id_clase
-            ORDER BY c.fecha_hora DESC
-        """).fetchall()
-        return [dict(r) for r in rows] if rows is not None else None
+def get_clases_disponibles(formato: str = "dict"):
+
+    return listar_clases(_FILTROS_BASE["disponibles"], formato)
+
+def get_all_clases_pasadas(formato: str = "dict", incluir_archivo: bool = False):
+
+    return listar_clases(_FILTROS_BASE["pasadas_archivo" if incluir_archivo else "pasadas"], formato)
+
+consultas.registrar("clases.crear", """
+    INSERT INTO Clase (id_entrenador, id_tipo, nombre, descripcion,
+                       fecha_hora, duracion_min, cupo_max)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+""")
 
 def registrar_nueva_classe(
     id_entrenador: int,
@@ -730,11 +1104,7 @@ def registrar_nueva_classe(
 
     try:
         with get_conn() as c:
-            cur = c.execute("""
-                INSERT INTO Clase (id_entrenador, id_tipo, nombre, descripcion,
-                                   fecha_hora, duracion_min, cupo_max)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (
+            cur = consultas.ejecutar(c, "clases.crear", (
                 id_entrenador,
                 id_tipo,
                 nombre.strip(),
@@ -745,173 +1115,544 @@ def registrar_nueva_classe(
             ))
             return True, cur.lastrowid, None
     except sqlite3.IntegrityError as ie:
+        if "ENTRENADOR_OCUPADO" in str(ie):
+            # El trigger sólo dice que hay choque; se informa con qué clase(s)
+            ids = clases_superpuestas(id_entrenador, fecha_hora, duracion_min)
+            return False, None, f"{ie} (clase {', '.join(f'#{i}' for i in ids)})"
         return False, None, str(ie)
     except Exception as e:
         print(f"Error al registrar clase: {e}")
         return False, None, str(e)
 
+# =========================
+# HORARIO SEMANAL (plantillas)
+# =========================
+
+consultas.registrar("plantillas.listar", """
+    SELECT pl.id_plantilla, pl.id_entrenador, pl.id_tipo, pl.nombre, pl.descripcion,
+           pl.dia_semana, pl.hora, pl.duracion_min, pl.cupo_max, pl.activa,
+           t.nombre AS tipo_clase,
+           e.nombre || ' ' || e.apellido AS entrenador
+    FROM PlantillaClase pl
+    JOIN Tipo t ON t.id_tipo = pl.id_tipo
+    JOIN Entrenador e ON e.id_entrenador = pl.id_entrenador
+    WHERE pl.activa = 1 OR ? = 0
+    ORDER BY pl.dia_semana, pl.hora
+""")
+
+def get_plantillas(solo_activas: bool = True) -> List[Dict]:
+    """Plantillas del horario semanal con nombre de tipo y entrenador."""
+    with get_read_conn() as c:
+        rows = consultas.todas(c, "plantillas.listar", (1 if solo_activas else 0,))
+        return _rows_to_dicts(rows)
+
+consultas.registrar("plantillas.crear", """
+    INSERT INTO PlantillaClase (id_entrenador, id_tipo, nombre, descripcion,
+                                dia_semana, hora, duracion_min, cupo_max)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+""")
+
+def crear_plantilla(
+    id_entrenador: int,
+    id_tipo: int,
+    nombre: str,
+    descripcion: Optional[str],
+    dia_semana: int,       # 0=lunes ... 6=domingo
+    hora: str,             # HH:MM
+    duracion_min: int,
+    cupo_max: int,
+) -> Tuple[bool, Optional[int], Optional[str]]:
+    try:
+        with get_conn() as c:
+            cur = consultas.ejecutar(c, "plantillas.crear", (id_entrenador, id_tipo, nombre.strip(), (descripcion or None),
+                  dia_semana, hora, duracion_min, cupo_max))
+            return True, cur.lastrowid, None
+    except sqlite3.IntegrityError as ie:
+        return False, None, str(ie)
+    except Exception as e:
+        print(f"Error al crear plantilla: {e}")
+        return False, None, str(e)
+
+consultas.registrar("plantillas.desactivar", "UPDATE PlantillaClase SET activa = 0 WHERE id_plantilla = ?")
+
+def eliminar_plantilla(id_plantilla: int) -> Tuple[bool, int, Optional[str]]:
+    # Desactiva la plantilla; las clases ya generadas no se tocan
+    try:
+        with get_conn() as c:
+            cur = consultas.ejecutar(c, "plantillas.desactivar", (id_plantilla,))
+            return True, cur.rowcount, None
+    except Exception as e:
+        print(f"Error al eliminar plantilla: {e}")
+        return False, 0, str(e)
+
+# Usa idx_clase_entrenador_intervalo: el rango sobre 'inicio' se acota hacia atrás
+# con la duración máxima (idx_clase_duracion), así no se recorre el historial completo.
+consultas.registrar("clases.solapes", """
+    SELECT id_clase FROM Clase
+    WHERE id_entrenador = :ent
+      AND inicio < :fin
+      AND inicio > :ini - 60 * (SELECT MAX(duracion_min) FROM Clase)
+      AND fin > :ini
+      AND id_clase <> :excluir
+""")
+
+def clases_superpuestas(
+    id_entrenador: int,
+    fecha_hora: str,
+    duracion_min: int,
+    excluir_id: Optional[int] = None,
+) -> List[int]:
+    """IDs de las clases del entrenador que se cruzan con [fecha_hora, fecha_hora + duracion)."""
+    return clases_superpuestas_lote([(id_entrenador, fecha_hora, duracion_min)], excluir_id)[0]
+
+def clases_superpuestas_lote(
+    intervalos: List[Tuple[int, str, int]],
+    excluir_id: Optional[int] = None,
+) -> List[List[int]]:
+    """Igual que clases_superpuestas para muchos (id_entrenador, fecha_hora, duracion_min) con una sola conexión."""
+    with get_read_conn() as c:
+        resultado = []
+        for id_entrenador, fecha_hora, duracion_min in intervalos:
+            ini = epoch(fecha_hora)
+            cur = consultas.ejecutar(c, "clases.solapes", {
+                "ent": id_entrenador, "ini": ini, "fin": ini + 60 * int(duracion_min),
+                "excluir": -1 if excluir_id is None else excluir_id,
+            })
+            cur.row_factory = None
+            resultado.append([r[0] for r in cur])
+        return resultado
+
+def insertar_clases_lote(clases: List[Tuple]) -> Tuple[bool, int, Optional[str]]:
+    """
+    Inserta muchas clases en UNA transacción (todo o nada).
+    Cada tupla: (id_entrenador, id_tipo, nombre, descripcion, fecha_hora, duracion_min, cupo_max).
+    """
+    try:
+        with get_conn() as c:
+            c.execute("BEGIN IMMEDIATE")
+            try:
+                consultas.ejecutar_muchos(c, "clases.crear", clases)
+                c.execute("COMMIT")
+            except Exception:
+                c.execute("ROLLBACK")
+                raise
+            return True, len(clases), None
+    except sqlite3.IntegrityError as ie:
+        return False, 0, str(ie)
+    except Exception as e:
+        print(f"Error al insertar clases en lote: {e}")
+        return False, 0, str(e)
+
+# =========================
+# ARCHIVO (clases y reservas antiguas)
+# =========================
+# Las clases que terminaron hace más de ARCHIVO_DIAS días se mueven, junto con
+# sus reservas, a una DB aparte que se adjunta (ATTACH) como 'archivo'. Cada clase
+# archivada guarda su asistencia ya agregada, así que las tablas calientes no
+# crecen con los años y los listados diarios no pagan por el historial.
+# Las consultas sólo leen el archivo si se pide con incluir_archivo=True.
+
+ARCHIVO_DIAS = int(os.environ.get("GYMLITE_ARCHIVO_DIAS", "365"))
+
+_ARCHIVO_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS archivo.ClaseArchivada (
+        id_clase INTEGER PRIMARY KEY,
+        id_entrenador INTEGER NOT NULL,
+        id_tipo INTEGER NOT NULL,
+        nombre VARCHAR(100) NOT NULL,
+        descripcion TEXT,
+        fecha_hora DATETIME NOT NULL,
+        inicio INTEGER NOT NULL,
+        duracion_min INTEGER NOT NULL,
+        cupo_max INTEGER NOT NULL,
+        tipo_clase TEXT NOT NULL,
+        entrenador TEXT NOT NULL,
+        reservas_confirmadas INTEGER NOT NULL,
+        reservas_canceladas INTEGER NOT NULL,
+        asistencias INTEGER NOT NULL,
+        archivada_en TEXT NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS archivo.idx_clase_arch_inicio ON ClaseArchivada(inicio)",
+    """
+    CREATE TABLE IF NOT EXISTS archivo.ReservaArchivada (
+        id_reserva INTEGER PRIMARY KEY,
+        id_socio INTEGER NOT NULL,
+        id_clase INTEGER NOT NULL,
+        fecha_reserva DATETIME NOT NULL,
+        estado_reserva VARCHAR(20) NOT NULL,
+        asistio INTEGER
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS archivo.idx_reserva_arch_socio ON ReservaArchivada(id_socio)",
+    "CREATE INDEX IF NOT EXISTS archivo.idx_reserva_arch_clase ON ReservaArchivada(id_clase)",
+)
+
+def archivo_db_path() -> str:
+    """Ruta de la DB de archivo: GYMLITE_ARCHIVO_DB o '<db>_archivo.db' junto a la DB principal."""
+    ruta = os.environ.get("GYMLITE_ARCHIVO_DB")
+    if ruta:
+        return str(Path(ruta).resolve())
+    actual = Path(current_db_path())
+    return str(actual.with_name(f"{actual.stem}_archivo.db"))
+
+def _adjuntar_archivo(c: sqlite3.Connection):
+    # Las conexiones del pool se reutilizan: se adjunta una sola vez por conexión
+    if any(r[1] == "archivo" for r in c.execute("PRAGMA database_list")):
+        return
+    if c.execute("PRAGMA query_only").fetchone()[0]:
+        # Conexión de lectura: el esquema del archivo lo crea el camino de escritura
+        if not Path(archivo_db_path()).exists():
+            with get_conn() as w:
+                _adjuntar_archivo(w)
+        c.execute("ATTACH DATABASE ? AS archivo", (archivo_db_path(),))
+        return
+    c.execute("ATTACH DATABASE ? AS archivo", (archivo_db_path(),))
+    for sentencia in _ARCHIVO_SCHEMA:
+        c.execute(sentencia)
+
+consultas.registrar("archivo.copiar_clases", """
+    INSERT OR REPLACE INTO archivo.ClaseArchivada
+    SELECT c.id_clase, c.id_entrenador, c.id_tipo, c.nombre, c.descripcion,
+           c.fecha_hora, c.inicio, c.duracion_min, c.cupo_max,
+           t.nombre, e.nombre || ' ' || e.apellido,
+           (SELECT COUNT(*) FROM Reserva r WHERE r.id_clase = c.id_clase AND r.estado_reserva = 'confirmada'),
+           (SELECT COUNT(*) FROM Reserva r WHERE r.id_clase = c.id_clase AND r.estado_reserva = 'cancelada'),
+           (SELECT COUNT(*) FROM Reserva r WHERE r.id_clase = c.id_clase AND r.asistio = 1),
+           DATETIME('now')
+    FROM Clase c
+    JOIN Tipo t ON t.id_tipo = c.id_tipo
+    JOIN Entrenador e ON e.id_entrenador = c.id_entrenador
+    WHERE c.inicio < ?
+""")
+consultas.registrar("archivo.copiar_reservas", """
+    INSERT OR REPLACE INTO archivo.ReservaArchivada
+    SELECT r.id_reserva, r.id_socio, r.id_clase, r.fecha_reserva, r.estado_reserva, r.asistio
+    FROM Reserva r
+    JOIN Clase c ON c.id_clase = r.id_clase
+    WHERE c.inicio < ?
+""")
+# Las reservas archivadas no son bajas: sin 'D' en Cambio y sin sus cambios
+# anteriores (ver 0017_cambios_archivo.sql y cambios.py)
+consultas.registrar("archivo.marcar_cambios", "UPDATE CambioEstado SET archivando = ? WHERE id = 1")
+consultas.registrar("archivo.olvidar_cambios", """
+    DELETE FROM Cambio
+    WHERE tabla = 'Reserva' AND id_fila IN (
+        SELECT r.id_reserva FROM Reserva r JOIN Clase c ON c.id_clase = r.id_clase WHERE c.inicio < ?
+    )
+""")
+# ON DELETE CASCADE borra también las reservas de esas clases
+consultas.registrar("archivo.borrar_clases", "DELETE FROM Clase WHERE inicio < ?")
+
+def archivar_clases(dias: Optional[int] = None) -> Tuple[bool, int, Optional[str]]:
+    """
+    Mueve al archivo las clases que empezaron hace más de `dias` días (ARCHIVO_DIAS
+    por defecto) y sus reservas. Devuelve (ok, clases_archivadas, error).
+    Es idempotente: si se corta a mitad, volver a ejecutarlo completa el trabajo.
+    """
+    dias = ARCHIVO_DIAS if dias is None else int(dias)
+    corte = _hoy_epoch(-dias)
+    try:
+        with get_conn() as c:
+            _adjuntar_archivo(c)
+            c.execute("BEGIN IMMEDIATE")
+            try:
+                consultas.ejecutar(c, "archivo.copiar_clases", (corte,))
+                consultas.ejecutar(c, "archivo.copiar_reservas", (corte,))
+                consultas.ejecutar(c, "archivo.olvidar_cambios", (corte,))
+                consultas.ejecutar(c, "archivo.marcar_cambios", (1,))
+                n = consultas.ejecutar(c, "archivo.borrar_clases", (corte,)).rowcount
+                consultas.ejecutar(c, "archivo.marcar_cambios", (0,))
+                c.execute("COMMIT")
+            except Exception:
+                c.execute("ROLLBACK")
+                raise
+            return True, n, None
+    except Exception as e:
+        print(f"Error al archivar clases: {e}")
+        return False, 0, str(e)
+
+consultas.registrar("archivo.resumen", """
+    SELECT COUNT(*) AS clases,
+           COALESCE(SUM(reservas_confirmadas), 0) AS reservas,
+           COALESCE(SUM(asistencias), 0) AS asistencias,
+           MIN(fecha_hora) AS desde,
+           MAX(fecha_hora) AS hasta
+    FROM archivo.ClaseArchivada
+""")
+
+def resumen_archivo() -> Dict:
+    """Cantidad de clases/reservas archivadas y rango de fechas (sin tocar las tablas calientes)."""
+    if not Path(archivo_db_path()).exists():
+        # Nada archivado todavía: no se crea el archivo sólo por consultarlo
+        return {"clases": 0, "reservas": 0, "asistencias": 0, "desde": None, "hasta": None}
+    with get_read_conn() as c:
+        _adjuntar_archivo(c)
+        row = consultas.una(c, "archivo.resumen")
+        return dict(row)
+
+_SQL_ASISTENCIA = """
+    SELECT mes, tipo_clase, SUM(clases) AS clases, SUM(reservas) AS reservas, SUM(asistencias) AS asistencias
+    FROM (
+        SELECT strftime('%Y-%m', c.fecha_hora) AS mes, t.nombre AS tipo_clase,
+               COUNT(*) AS clases,
+               SUM((SELECT COUNT(*) FROM Reserva r WHERE r.id_clase = c.id_clase AND r.estado_reserva = 'confirmada')) AS reservas,
+               SUM((SELECT COUNT(*) FROM Reserva r WHERE r.id_clase = c.id_clase AND r.asistio = 1)) AS asistencias
+        FROM Clase c
+        JOIN Tipo t ON t.id_tipo = c.id_tipo
+        WHERE c.inicio < ?
+        GROUP BY mes, tipo_clase{}
+    )
+    GROUP BY mes, tipo_clase
+    ORDER BY mes DESC, tipo_clase
+"""
+consultas.registrar("asistencia.historica", _SQL_ASISTENCIA.format(""))
+consultas.registrar("asistencia.historica_con_archivo", _SQL_ASISTENCIA.format("""
+        UNION ALL
+        SELECT strftime('%Y-%m', fecha_hora), tipo_clase,
+               COUNT(*), SUM(reservas_confirmadas), SUM(asistencias)
+        FROM archivo.ClaseArchivada
+        GROUP BY 1, 2"""))
+
+def get_asistencia_historica(incluir_archivo: bool = True) -> List[Dict]:
+    """
+    Asistencia por mes y tipo de clase. La parte archivada sale de los totales
+    ya agregados en ClaseArchivada (sin leer una sola reserva archivada).
+    """
+    with get_read_conn() as c:
+        if incluir_archivo:
+            _adjuntar_archivo(c)
+        rows = consultas.todas(
+            c, "asistencia.historica_con_archivo" if incluir_archivo else "asistencia.historica", (_ahora_epoch(),),
+        )
+        return _rows_to_dicts(rows)
+
 # =========================
 # ENTRENADORES
 # =========================
 
-def get_all_entrenadores() -> List[Dict] | None:
+consultas.registrar("entrenadores.listar", """
+    SELECT
+      id_entrenador,
+      RUT,
+      nombre,
+      apellido,
+      telefono,
+      fecha_nac,
+      especialidad
+    FROM Entrenador
+    ORDER BY apellido COLLATE NOCASE, nombre COLLATE NOCASE
+""")
+
+def get_all_entrenadores(formato: str = "dict"):
     """Devuelve todos los entrenadores registrados."""
-    with get_conn() as c:
-        rows = c.execute("""
-            SELECT
-              id_entrenador,
-              RUT,
-              nombre,
-              apellido,
-              telefono,
-              fecha_nac,
-              especialidad
-            FROM Entrenador
-            ORDER BY apellido COLLATE NOCASE, nombre COLLATE NOCASE
-        """).fetchall()
-        return [dict(r) for r in rows] if rows is not None else None
+    with get_read_conn() as c:
+        cur = consultas.ejecutar(c, "entrenadores.listar")
+        return _resultado(cur, formato, registros.Entrenador)
 
 # =========================
 # Tipo
 # =========================
 
-def get_all_tipos() -> List[Dict] | None:
+consultas.registrar("tipos.listar", """
+    SELECT
+      id_tipo,
+      nombre,
+      descripcion
+    FROM Tipo
+    ORDER BY nombre COLLATE NOCASE
+""")
+
+def get_all_tipos(formato: str = "dict"):
     """Devuelve todos los tipos de clases registrados."""
-    with get_conn() as c:
-        rows = c.execute("""
-            SELECT
-              id_tipo,
-              nombre,
-              descripcion
-            FROM Tipo
-            ORDER BY nombre COLLATE NOCASE
-        """).fetchall()
-        return [dict(r) for r in rows] if rows is not None else None
+    with get_read_conn() as c:
+        cur = consultas.ejecutar(c, "tipos.listar")
+        return _resultado(cur, formato, registros.Tipo)
 
 # ============================================================
 # DASHBOARD
 # ============================================================
 
+consultas.registrar("dashboard.entrenadores", "SELECT COUNT(*) AS n FROM Entrenador")
+
+@compartido
 def count_entrenadores_activos() -> int:
-    with get_conn() as c:
-        row = c.execute("SELECT COUNT(*) AS n FROM Entrenador").fetchone()
+    with get_read_conn() as c:
+        row = consultas.una(c, "dashboard.entrenadores")
         return int(row["n"] if row else 0)
 
+consultas.registrar("dashboard.reservas_hoy", """
+    SELECT COUNT(*) AS n
+    FROM Reserva r
+    JOIN Clase c ON r.id_clase = c.id_clase
+    WHERE c.inicio >= ? AND c.inicio < ?
+    AND r.estado_reserva = 'confirmada'
+""")
+
+@compartido
 def count_reservas_hoy() -> int:
-    with get_conn() as c:
-        row = c.execute("""
-            SELECT COUNT(*) AS n 
-            FROM Reserva r
-            JOIN Clase c ON r.id_clase = c.id_clase
-            WHERE DATE(c.fecha_hora) = DATE('now','localtime') 
-            AND r.estado_reserva = 'confirmada'
-        """).fetchone()
+    with get_read_conn() as c:
+        row = consultas.una(c, "dashboard.reservas_hoy", (_hoy_epoch(), _hoy_epoch(1)))
         return int(row["n"] if row else 0)
 
+consultas.registrar("dashboard.alertas", """
+    SELECT
+        c.id_clase,
+        c.nombre,
+        c.cupo_max,
+        (c.cupo_max - (SELECT COUNT(*) FROM Reserva r
+                       WHERE r.id_clase = c.id_clase AND r.estado_reserva = 'confirmada')) as cupos_disponibles
+    FROM Clase c
+    WHERE c.inicio >= ?
+      AND cupos_disponibles <= 3
+    ORDER BY c.inicio
+""")
+
+@compartido
 def get_clases_proximas_con_alertas() -> List[Dict]:
-    with get_conn() as c:
-        rows = c.execute("""
-            SELECT
-                c.id_clase,
-                c.nombre,
-                c.cupo_max,
-                (c.cupo_max - COUNT(r.id_reserva)) as cupos_disponibles
-            FROM Clase c
-            LEFT JOIN Reserva r ON c.id_clase = r.id_clase AND r.estado_reserva = 'confirmada'
-            WHERE datetime(c.fecha_hora) >= datetime('now','localtime')
-            GROUP BY c.id_clase
-            HAVING cupos_disponibles <= 3
-            ORDER BY c.fecha_hora
-        """).fetchall()
+    with get_read_conn() as c:
+        rows = consultas.todas(c, "dashboard.alertas", (_ahora_epoch(),))
         return [dict(r) for r in rows] if rows else []
 
+# Resumen de las próximas clases en una sola consulta: rango por idx_clase_inicio
+# y cupos ocupados contados en idx_reserva_clase_estado (sin leer las reservas).
+# El GROUP BY interno (en el orden del índice) evita que SQLite aplane la
+# subconsulta y vuelva a contar las reservas en cada columna que las usa.
+consultas.registrar("dashboard.resumen_proximas", """
+    SELECT COUNT(*) AS clases,
+           COALESCE(SUM(cupo_max), 0) AS cupos_totales,
+           COALESCE(SUM(ocupados), 0) AS cupos_ocupados,
+           COUNT(DISTINCT id_tipo) AS tipos,
+           COUNT(DISTINCT id_entrenador) AS entrenadores,
+           COALESCE(SUM(cupo_max - ocupados <= 0), 0) AS sin_cupos,
+           COALESCE(SUM(cupo_max - ocupados BETWEEN 1 AND 3), 0) AS pocos_cupos
+    FROM (
+        SELECT c.id_tipo, c.id_entrenador, c.cupo_max, COUNT(r.id_clase) AS ocupados
+        FROM Clase c
+        LEFT JOIN Reserva r ON r.id_clase = c.id_clase AND r.estado_reserva = 'confirmada'
+        WHERE c.inicio >= ?
+        GROUP BY c.inicio, c.id_clase
+    )
+""")
+
+@compartido
+def resumen_proximas_clases() -> Dict[str, int]:
+    """
+    Totales de las próximas clases: clases, cupos_totales, cupos_ocupados,
+    tipos y entrenadores distintos, sin_cupos y pocos_cupos (1 a 3 libres).
+    """
+    with get_read_conn() as c:
+        return dict(consultas.una(c, "dashboard.resumen_proximas", (_ahora_epoch(),)))
+
+consultas.registrar("dashboard.proximas_por_tipo", """
+    SELECT t.nombre AS tipo, COUNT(*) AS cantidad
+    FROM Clase c
+    JOIN Tipo t ON t.id_tipo = c.id_tipo
+    WHERE c.inicio >= ?
+    GROUP BY t.nombre
+    ORDER BY cantidad DESC
+""")
+
+@compartido
+def count_proximas_por_tipo() -> List[Dict]:
+    """Cantidad de próximas clases por tipo."""
+    with get_read_conn() as c:
+        return _rows_to_dicts(consultas.todas(c, "dashboard.proximas_por_tipo", (_ahora_epoch(),)))
+
+consultas.registrar("dashboard.clases_por_tipo", """
+    SELECT
+        t.nombre as tipo,
+        COUNT(c.id_clase) as cantidad,
+        AVG(c.duracion_min) as duracion_promedio,
+        SUM(c.cupo_max) as cupos_totales
+    FROM Clase c
+    JOIN Tipo t ON c.id_tipo = t.id_tipo
+    GROUP BY t.nombre
+    ORDER BY cantidad DESC
+""")
+
+@compartido
 def get_clases_by_type_stats() -> List[Dict]:
     """Récupère les statistiques des cours par type"""
-    with get_conn() as c:
-        rows = c.execute("""
-            SELECT 
-                t.nombre as tipo,
-                COUNT(c.id_clase) as cantidad,
-                AVG(c.duracion_min) as duracion_promedio,
-                SUM(c.cupo_max) as cupos_totales
-            FROM Clase c
-            JOIN Tipo t ON c.id_tipo = t.id_tipo
-            GROUP BY t.nombre
-            ORDER BY cantidad DESC
-        """).fetchall()
+    with get_read_conn() as c:
+        rows = consultas.todas(c, "dashboard.clases_por_tipo")
         return [dict(r) for r in rows] if rows else []
 
+consultas.registrar("dashboard.metodos_pago", """
+    SELECT
+        metodo_pago,
+        COUNT(*) as cantidad,
+        SUM(monto) as total,
+        AVG(monto) as promedio
+    FROM Pago
+    WHERE estado_pago = 'completado'
+    GROUP BY metodo_pago
+    ORDER BY total DESC
+""")
+
+@compartido
 def get_payment_methods_stats() -> List[Dict]:
     """Récupère les statistiques des méthodes de paiement"""
-    with get_conn() as c:
-        rows = c.execute("""
-            SELECT 
-                metodo_pago,
-                COUNT(*) as cantidad,
-                SUM(monto) as total,
-                AVG(monto) as promedio
-            FROM Pago
-            WHERE estado_pago = 'completado'
-            GROUP BY metodo_pago
-            ORDER BY total DESC
-        """).fetchall()
+    with get_read_conn() as c:
+        rows = consultas.todas(c, "dashboard.metodos_pago")
         return [dict(r) for r in rows] if rows else []
 
 
+# Día relativo (0..6) = división entera sobre la columna epoch indexada
+consultas.registrar("dashboard.reservas_7_dias", """
+    SELECT (fecha_reserva_epoch - :desde) / 86400 AS dia, COUNT(*) AS n
+    FROM Reserva
+    WHERE fecha_reserva_epoch >= :desde AND fecha_reserva_epoch < :hasta
+    GROUP BY dia
+""")
+consultas.registrar("dashboard.clases_7_dias", """
+    SELECT (inicio - :desde) / 86400 AS dia, COUNT(*) AS n
+    FROM Clase
+    WHERE inicio >= :desde AND inicio < :hasta
+    GROUP BY dia
+""")
+
+@compartido
 def get_stats_last_7_days() -> Dict[str, List]:
 
     from datetime import datetime, timedelta
 
-    fechas = []
-    mapa_res = {}
-    mapa_cla = {}
+    fechas = [(datetime.now() - timedelta(days=i)).strftime('%Y-%m-%d') for i in range(6, -1, -1)]
+    desde = _hoy_epoch(-6)
 
-    for i in range(6, -1, -1):
-        d = (datetime.now() - timedelta(days=i)).strftime('%Y-%m-%d')
-        fechas.append(d)
-        mapa_res[d] = 0
-        mapa_cla[d] = 0
-
-    with get_conn() as c:
-
-        rows_res = c.execute("""
-            SELECT DATE(fecha_reserva) as dia, COUNT(*) as n
-            FROM Reserva
-            WHERE DATE(fecha_reserva) >= DATE('now', '-6 days')
-            GROUP BY DATE(fecha_reserva)
-        """).fetchall()
-
-        for r in rows_res:
-            if r['dia'] in mapa_res:
-                mapa_res[r['dia']] = r['n']
+    rango = {"desde": desde, "hasta": desde + 7 * DIA}
+    with get_read_conn() as c:
+        res = [0] * 7
+        for dia, n in consultas.todas(c, "dashboard.reservas_7_dias", rango):
+            res[dia] = n
 
-
-        rows_cla = c.execute("""
-            SELECT DATE(fecha_hora) as dia, COUNT(*) as n
-            FROM Clase
-            WHERE DATE(fecha_hora) >= DATE('now', '-6 days')
-            GROUP BY DATE(fecha_hora)
-        """).fetchall()
-
-        for r in rows_cla:
-            if r['dia'] in mapa_cla:
-                mapa_cla[r['dia']] = r['n']
+        cla = [0] * 7
+        for dia, n in consultas.todas(c, "dashboard.clases_7_dias", rango):
+            cla[dia] = n
 
     # Formatear para el gráfico (DD/MM)
     fechas_fmt = [f[8:] + "/" + f[5:7] for f in fechas]
 
     return {
         "fechas": fechas_fmt,
-        "reservas": [mapa_res[f] for f in fechas],
-        "clases": [mapa_cla[f] for f in fechas]
+        "reservas": res,
+        "clases": cla
     }
 
 
+_seed_ok: set = set()   # rutas de DB ya sembradas/verificadas en este proceso
+
 def init_db_data():
+    # La semilla solo se evalúa una vez por proceso (no en cada rerun)
+    ruta = current_db_path()
+    if ruta in _seed_ok:
+        return
+    _seed_ok.add(ruta)
 
     with get_conn() as c:
         # 1. Verificar si ya existen datos
-        if c.execute("SELECT COUNT(*) as n FROM Plan").fetchone()['n'] > 0:
+        if c.execute("SELECT 1 FROM Plan LIMIT 1").fetchone():
             return
 
         print("📥 Inyectando datos maestros inteligentes...")
@@ -1015,5 +1756,6 @@ def init_db_data():
             ])
 
             print("✅ Datos cargados exitosamente.")
+            marcar_socios_modificados()
         except Exception as e:
             print(f"❌ Error cargando datos seed: {e}")
\ No newline at end of file
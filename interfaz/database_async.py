@@ -0,0 +1,80 @@
+# database_async.py — Fachada asyncio de database.py para cargar consultas independientes en paralelo
+#
+# Las funciones de lectura de database.py se ejecutan en un pool de hilos
+# dedicado; cada hilo usa su propia conexión de lectura (get_read_conn) y
+# SQLite libera el GIL mientras ejecuta la consulta, así que varias consultas
+# avanzan a la vez. El tiempo de carga queda acotado por la consulta más lenta
+# y no por la suma de todas.
+#
+#   datos = database_async.reunir({
+#       "socios": database.count_socios_activos,
+#       "proximas": (database.get_all_proximas_clases, 8),
+#   })
+#   datos["socios"]        # valor, o la excepción si esa consulta falló
+from __future__ import annotations
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Tuple, Union
+
+import database
+
+LECTURA_WORKERS = int(os.environ.get("GYMLITE_LECTURA_WORKERS", "4"))
+
+_POOL = ThreadPoolExecutor(max_workers=max(1, LECTURA_WORKERS), thread_name_prefix="lectura")
+
+# Consulta = función, o tupla (función, *args) o (función, *args, {kwargs})
+Consulta = Union[Callable[[], Any], Tuple]
+
+
+async def ejecutar(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Ejecuta `fn(*args, **kwargs)` (una lectura de database.py) en el pool de lectura."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_POOL, functools.partial(fn, *args, **kwargs))
+
+
+def _desarmar(consulta: Consulta) -> Tuple[Callable[..., Any], tuple, dict]:
+    if callable(consulta):
+        return consulta, (), {}
+    fn, *args = consulta
+    kwargs = args.pop() if args and isinstance(args[-1], dict) else {}
+    return fn, tuple(args), kwargs
+
+
+async def reunir_async(consultas: Dict[str, Consulta]) -> Dict[str, Any]:
+    """
+    Ejecuta todas las consultas a la vez. Cada clave recibe su resultado o la
+    excepción que lanzó: un panel que falla no impide mostrar los demás.
+    """
+    claves = list(consultas)
+    resultados = await asyncio.gather(
+        *(ejecutar(fn, *args, **kwargs) for fn, args, kwargs in map(_desarmar, consultas.values())),
+        return_exceptions=True,
+    )
+    return dict(zip(claves, resultados))
+
+
+def reunir(consultas: Dict[str, Consulta]) -> Dict[str, Any]:
+    """Versión síncrona de reunir_async para el script de Streamlit (sin event loop propio)."""
+    return asyncio.run(reunir_async(consultas))
+
+
+def _envolver(nombre: str):
+    fn = getattr(database, nombre)
+
+    @functools.wraps(fn)
+    async def envoltura(*args, **kwargs):
+        return await ejecutar(fn, *args, **kwargs)
+    return envoltura
+
+
+# Versiones awaitables de las lecturas más usadas: `await database_async.count_clases_hoy()`
+for _nombre in (
+    "count_socios_activos", "count_clases_hoy", "count_entrenadores_activos", "count_reservas_hoy",
+    "ingresos_mes_actual", "membresias_por_vencer", "get_all_proximas_clases",
+    "resumen_proximas_clases", "count_proximas_por_tipo", "get_clases_proximas_con_alertas", "get_historial_pagos", "get_all_socios",
+    "get_stats_last_7_days", "get_clases_by_type_stats", "get_payment_methods_stats",
+):
+    globals()[_nombre] = _envolver(_nombre)
+del _nombre
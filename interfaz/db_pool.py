@@ -0,0 +1,154 @@
+# db_pool.py — Pool de conexiones SQLite compartido por database.py y auth_local.py
+from __future__ import annotations
+import queue
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+
+class PooledConnection(sqlite3.Connection):
+    """
+    Conexión SQLite que vuelve a su pool al salir del bloque `with`.
+    Se usa igual que una conexión normal:
+
+        with pool.acquire() as c:
+            c.execute(...)
+
+    Al salir se hace commit/rollback (comportamiento estándar de sqlite3)
+    y la conexión queda disponible para el siguiente uso, sin reabrir el archivo.
+    """
+    _pool: Optional["ConnectionPool"] = None
+    _cambios: int = 0   # total_changes al salir del pool (para detectar escrituras)
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            return super().__exit__(exc_type, exc, tb)
+        finally:
+            if self._pool is not None:
+                self._pool.release(self)
+
+
+class ConnectionPool:
+    """
+    Pool simple de conexiones a un archivo SQLite.
+    - Nunca bloquea: si no hay conexiones libres se abre una nueva;
+      al devolverla, si ya hay `size` libres, se cierra.
+    - Cada conexión se configura una sola vez (WAL, foreign_keys, etc.).
+    - read_only=True: conexiones con PRAGMA query_only, para lecturas.
+    - serializar=True: un solo usuario a la vez por proceso (camino único de
+      escritura); acquire() espera a que la conexión anterior vuelva al pool.
+    - on_change: se llama al devolver una conexión que modificó filas.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        size: int = 8,
+        timeout: float = 30.0,
+        isolation_level: Optional[str] = "",
+        row_factory=None,
+        cached_statements: int = 128,
+        setup: Optional[Callable[[sqlite3.Connection], None]] = None,
+        read_only: bool = False,
+        serializar: bool = False,
+        on_change: Optional[Callable[[], None]] = None,
+    ):
+        self.path = str(Path(path).resolve())
+        self.size = size
+        self.timeout = timeout
+        self.isolation_level = isolation_level
+        self.row_factory = row_factory
+        self.cached_statements = cached_statements
+        self.setup = setup
+        self.read_only = read_only
+        self.on_change = on_change
+        self._lock = threading.RLock() if serializar else None
+        self._idle: "queue.LifoQueue[PooledConnection]" = queue.LifoQueue()
+        self.opened = 0   # conexiones abiertas en total (métrica)
+
+    def _connect(self) -> PooledConnection:
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.timeout,
+            isolation_level=self.isolation_level,
+            check_same_thread=False,   # Streamlit usa un hilo por sesión
+            cached_statements=self.cached_statements,
+            factory=PooledConnection,
+        )
+        if self.row_factory is not None:
+            conn.row_factory = self.row_factory
+        if self.read_only:
+            # El modo WAL es persistente en el archivo: lo fija la conexión de escritura
+            conn.execute("PRAGMA query_only=ON;")
+        else:
+            conn.execute("PRAGMA journal_mode=WAL;")
+            conn.execute("PRAGMA synchronous=NORMAL;")
+        conn.execute("PRAGMA foreign_keys=ON;")
+        if self.setup is not None:
+            self.setup(conn)
+        conn._pool = self
+        conn._cambios = conn.total_changes
+        self.opened += 1
+        return conn
+
+    def acquire(self) -> PooledConnection:
+        if self._lock is not None:
+            self._lock.acquire()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            try:
+                return self._connect()
+            except BaseException:
+                if self._lock is not None:
+                    self._lock.release()
+                raise
+
+    def release(self, conn: PooledConnection):
+        cambio = False
+        try:
+            # Una transacción abierta por error no debe contaminar al siguiente usuario
+            if conn.in_transaction:
+                conn.rollback()
+            cambio = conn.total_changes != conn._cambios
+            conn._cambios = conn.total_changes
+            if self._idle.qsize() < self.size:
+                self._idle.put(conn)
+            else:
+                conn._pool = None
+                conn.close()
+        finally:
+            if self._lock is not None:
+                self._lock.release()
+        if cambio and self.on_change is not None:
+            self.on_change()
+
+    def close_all(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            conn._pool = None
+            conn.close()
+
+
+_pools: Dict[Tuple[str, bool], ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path: str | Path, **kwargs) -> ConnectionPool:
+    """
+    Devuelve (creándolo la primera vez) el pool asociado a la ruta absoluta `path`.
+    Lectura (read_only=True) y escritura usan pools distintos sobre el mismo archivo.
+    """
+    ruta = str(Path(path).resolve())
+    key = (ruta, bool(kwargs.get("read_only", False)))
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = _pools[key] = ConnectionPool(ruta, **kwargs)
+    return pool
@@ -0,0 +1,290 @@
+# demanda.py — Ocupación por día de la semana, hora y tipo de clase, y pronóstico de las próximas clases
+#
+# DemandaCelda (migración 0012) guarda por día (0 = lunes), hora de inicio y tipo
+# las sumas de las clases ya terminadas: clases, cupos, reservas confirmadas,
+# asistencias y clases llenas. El heatmap del dashboard sólo lee esa tabla.
+# - reconstruir(): recorre todas las clases terminadas (también las archivadas,
+#   que ya traen sus totales) y agrega con NumPy.
+# - actualizar() (tarea periódica de mantenimiento.py): suma sólo las clases que
+#   terminaron desde la pasada anterior (DemandaEstado.hasta). Cada clase se
+#   cuenta una vez, al terminar; lo que cambie después (una clase pasada cargada
+#   tarde, una reserva corregida) entra en la reconstrucción diaria.
+#
+# Pronóstico: las reservas esperadas de una próxima clase son el promedio de su
+# celda ponderado por recencia (vida media VIDA_MEDIA_DIAS), acercado al promedio
+# del tipo cuando la celda tiene pocas clases recientes. cupo_sugerido es el cupo
+# con el que esa demanda quedaría en OCUPACION_OBJETIVO. En las celdas que se
+# llenan seguido las reservas esperadas quedan topadas por el cupo actual, así que
+# el sugerido resulta mayor que el cupo (la demanda real es al menos esa).
+from __future__ import annotations
+import math
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+import consultas
+import database
+
+VIDA_MEDIA_DIAS = int(os.environ.get("GYMLITE_DEMANDA_VIDA_MEDIA", "90"))
+OCUPACION_OBJETIVO = float(os.environ.get("GYMLITE_DEMANDA_OBJETIVO", "0.85"))
+SUAVIZADO = 3   # clases "virtuales" con el promedio del tipo que se suman a cada celda
+
+DIAS_SEMANA = ("Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo")
+
+_SELECT_CLASES = """
+    SELECT c.id_tipo, c.inicio, c.cupo_max,
+           (SELECT COUNT(*) FROM Reserva r
+            WHERE r.id_clase = c.id_clase AND r.estado_reserva = 'confirmada') AS reservas,
+           (SELECT COUNT(*) FROM Reserva r WHERE r.id_clase = c.id_clase AND r.asistio = 1) AS asistencias
+    FROM Clase c
+"""
+
+
+# ============================================================
+# CÁLCULO (vectorizado)
+# ============================================================
+
+def _peso(inicio, ancla: int):
+    # 2^((t - ancla) / vida media): una clase de hace VIDA_MEDIA_DIAS pesa la mitad que
+    # una de hoy. Relativo al ancla (la medianoche de la última pasada) para que no se
+    # desborde: sobre el epoch absoluto, con vidas medias cortas, daría inf
+    return np.exp2((inicio - ancla) / (VIDA_MEDIA_DIAS * database.DIA))
+
+def _celdas(filas: List[tuple], ancla: int) -> List[tuple]:
+    """
+    Filas de DemandaCelda que aportan las clases (id_tipo, inicio, cupo_max,
+    reservas, asistencias) de `filas`, con los pesos relativos a `ancla`.
+    """
+    if not filas:
+        return []
+    id_tipo, inicio, cupo, reservas, asistencias = np.array(filas, dtype="int64").T
+    dia = (inicio // database.DIA + 3) % 7   # 1970-01-01 fue jueves
+    hora = inicio % database.DIA // 3600
+    claves, celda = np.unique((id_tipo * 7 + dia) * 24 + hora, return_inverse=True)
+    celda = celda.ravel()
+    llenas = reservas >= cupo
+    peso = _peso(inicio, ancla)
+
+    def _suma(valores):
+        return np.bincount(celda, weights=valores, minlength=len(claves))
+
+    enteros = [_suma(v).round().astype("int64") for v in (None, cupo, reservas, asistencias, llenas)]
+    pesos = [_suma(v) for v in (peso, peso * reservas, peso * llenas)]
+    return list(zip(
+        (claves // 24 % 7).tolist(), (claves % 24).tolist(), (claves // (24 * 7)).tolist(),
+        *(s.tolist() for s in enteros), *(s.tolist() for s in pesos),
+    ))
+
+
+# ============================================================
+# LECTURAS DE ORIGEN Y ESCRITURA
+# ============================================================
+
+consultas.registrar("demanda.clases_terminadas", _SELECT_CLASES + "WHERE c.fin <= ?")
+# Las que terminaron en (desde, hasta]: el inicio acota la búsqueda por índice
+consultas.registrar("demanda.clases_terminadas_desde", _SELECT_CLASES + """
+    WHERE c.inicio > :desde - 60 * (SELECT MAX(duracion_min) FROM Clase) AND c.inicio <= :hasta
+      AND c.fin > :desde AND c.fin <= :hasta
+""")
+consultas.registrar("demanda.archivadas", """
+    SELECT id_tipo, inicio, cupo_max, reservas_confirmadas, asistencias
+    FROM archivo.ClaseArchivada
+    WHERE inicio + 60 * duracion_min <= ?
+""")
+consultas.registrar("demanda.estado", """
+    SELECT hasta, vida_media, ancla, actualizado, modo, duracion_ms FROM DemandaEstado WHERE id = 1
+""")
+consultas.registrar("demanda.borrar", "DELETE FROM DemandaCelda")
+# Al mover el ancla, los pesos ya sumados pasan a la nueva escala
+consultas.registrar("demanda.reescalar", """
+    UPDATE DemandaCelda
+    SET peso_clases = peso_clases * :factor, peso_reservas = peso_reservas * :factor,
+        peso_llenas = peso_llenas * :factor
+""")
+consultas.registrar("demanda.sumar", """
+    INSERT INTO DemandaCelda (dia, hora, id_tipo, clases, cupos, reservas, asistencias, llenas,
+                              peso_clases, peso_reservas, peso_llenas)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (dia, hora, id_tipo) DO UPDATE SET
+        clases = clases + excluded.clases, cupos = cupos + excluded.cupos,
+        reservas = reservas + excluded.reservas, asistencias = asistencias + excluded.asistencias,
+        llenas = llenas + excluded.llenas, peso_clases = peso_clases + excluded.peso_clases,
+        peso_reservas = peso_reservas + excluded.peso_reservas, peso_llenas = peso_llenas + excluded.peso_llenas
+""")
+consultas.registrar("demanda.guardar_estado", """
+    INSERT OR REPLACE INTO DemandaEstado (id, hasta, vida_media, ancla, actualizado, modo, duracion_ms)
+    VALUES (1, ?, ?, ?, DATETIME('now', 'localtime'), ?, ?)
+""")
+
+def _tuplas(cur) -> List[tuple]:
+    cur.row_factory = None
+    return cur.fetchall()
+
+def _refrescar(completa: bool) -> Tuple[bool, int, Optional[str]]:
+    t0 = time.perf_counter()
+    ahora = database._ahora_epoch()
+    ancla = database._hoy_epoch()
+    try:
+        with database.get_read_conn() as c:
+            # ATTACH no se puede dentro de la transacción
+            archivo = Path(database.archivo_db_path()).exists()
+            if archivo:
+                database._adjuntar_archivo(c)
+            c.execute("BEGIN")
+            try:
+                estado = consultas.una(c, "demanda.estado")
+                completa = (completa or estado is None or estado["vida_media"] != VIDA_MEDIA_DIAS
+                            or estado["ancla"] is None)
+                if completa:
+                    filas = _tuplas(consultas.ejecutar(c, "demanda.clases_terminadas", (ahora,)))
+                    if archivo:
+                        filas += _tuplas(consultas.ejecutar(c, "demanda.archivadas", (ahora,)))
+                else:
+                    filas = _tuplas(consultas.ejecutar(
+                        c, "demanda.clases_terminadas_desde", {"desde": estado["hasta"], "hasta": ahora},
+                    ))
+            finally:
+                c.execute("COMMIT")
+        celdas = _celdas(filas, ancla)
+
+        with database.get_conn() as c:
+            c.execute("BEGIN IMMEDIATE")
+            try:
+                # Otra pasada pudo sumar estas clases mientras se calculaba: no se suman dos veces
+                actual = consultas.una(c, "demanda.estado")
+                if not completa and (actual is None or actual["hasta"] != estado["hasta"]):
+                    c.execute("ROLLBACK")
+                    return True, 0, None
+                if completa:
+                    consultas.ejecutar(c, "demanda.borrar")
+                elif actual["ancla"] != ancla:
+                    factor = float(_peso(actual["ancla"], ancla))
+                    consultas.ejecutar(c, "demanda.reescalar", {"factor": factor})
+                consultas.ejecutar_muchos(c, "demanda.sumar", celdas)
+                consultas.ejecutar(c, "demanda.guardar_estado", (
+                    ahora, VIDA_MEDIA_DIAS, ancla, "completa" if completa else "incremental",
+                    (time.perf_counter() - t0) * 1000,
+                ))
+                c.execute("COMMIT")
+            except Exception:
+                c.execute("ROLLBACK")
+                raise
+        return True, len(filas), None
+    except Exception as e:
+        print(f"Error al actualizar la demanda: {e}")
+        return False, 0, str(e)
+
+def actualizar() -> Tuple[bool, int, Optional[str]]:
+    """
+    Suma a DemandaCelda las clases que terminaron desde la última pasada
+    (reconstruye si nunca se calculó o cambió la vida media). Devuelve (ok, clases, error).
+    """
+    return _refrescar(completa=False)
+
+def reconstruir() -> Tuple[bool, int, Optional[str]]:
+    """Recalcula DemandaCelda desde todas las clases terminadas. Devuelve (ok, clases, error)."""
+    return _refrescar(completa=True)
+
+
+# ============================================================
+# LECTURAS (dashboard)
+# ============================================================
+
+consultas.registrar("demanda.matriz", """
+    SELECT dia, hora, SUM(clases) AS clases, SUM(cupos) AS cupos, SUM(reservas) AS reservas,
+           SUM(asistencias) AS asistencias, SUM(llenas) AS llenas
+    FROM DemandaCelda
+    WHERE :id_tipo IS NULL OR id_tipo = :id_tipo
+    GROUP BY dia, hora
+    ORDER BY dia, hora
+""")
+consultas.registrar("demanda.celdas", """
+    SELECT dia, hora, id_tipo, peso_clases, peso_reservas, peso_llenas FROM DemandaCelda
+""")
+consultas.registrar("demanda.proximas", """
+    SELECT c.id_clase, c.nombre, t.nombre AS tipo_clase, c.id_tipo, c.fecha_hora, c.inicio, c.cupo_max,
+           (SELECT COUNT(*) FROM Reserva r
+            WHERE r.id_clase = c.id_clase AND r.estado_reserva = 'confirmada') AS reservas
+    FROM Clase c
+    JOIN Tipo t ON t.id_tipo = c.id_tipo
+    WHERE c.inicio >= :desde AND c.inicio < :hasta
+      AND (:id_tipo IS NULL OR c.id_tipo = :id_tipo)
+    ORDER BY c.inicio, c.id_clase
+""")
+
+def _pct(parte, total) -> Optional[float]:
+    return parte * 100.0 / total if total else None
+
+def estado_demanda() -> Optional[Dict]:
+    """Última actualización de la matriz (None si nunca se calculó)."""
+    with database.get_read_conn() as c:
+        estado = consultas.una(c, "demanda.estado")
+    return dict(estado) if estado else None
+
+def matriz_demanda(id_tipo: Optional[int] = None) -> List[Dict]:
+    """
+    Celdas (dia, hora) con clases terminadas, de un tipo o de todos: sumas y
+    ocupacion = % de los cupos reservados, asistencia = % de los cupos usados,
+    pct_llenas = % de las clases que se llenaron.
+    """
+    with database.get_read_conn() as c:
+        filas = consultas.todas(c, "demanda.matriz", {"id_tipo": id_tipo})
+    return [
+        {**dict(r), "ocupacion": _pct(r["reservas"], r["cupos"]),
+         "asistencia": _pct(r["asistencias"], r["cupos"]), "pct_llenas": _pct(r["llenas"], r["clases"])}
+        for r in filas
+    ]
+
+def pronostico_clases(dias: int = 14, id_tipo: Optional[int] = None) -> List[Dict]:
+    """
+    Próximas clases (de los siguientes `dias` días) con reservas_esperadas,
+    ocupacion_esperada (%), prob_llena (% de clases parecidas que se llenaron)
+    y cupo_sugerido. Sin historia del tipo, los campos del pronóstico son None.
+    """
+    ahora = database._ahora_epoch()
+    with database.get_read_conn() as c:
+        estado = consultas.una(c, "demanda.estado")
+        celdas = consultas.todas(c, "demanda.celdas")
+        proximas = consultas.todas(c, "demanda.proximas", {
+            "desde": ahora, "hasta": ahora + max(1, int(dias)) * database.DIA, "id_tipo": id_tipo,
+        })
+    if not proximas or estado is None or estado["ancla"] is None:
+        return []
+
+    # Pesos relativos a ahora: peso_clases * a_hoy = cuántas clases "recientes" tiene la celda
+    a_hoy = float(_peso(estado["ancla"], ahora))
+    por_celda = {(r["dia"], r["hora"], r["id_tipo"]): r for r in celdas}
+    por_tipo: Dict[int, List[float]] = {}
+    for r in celdas:
+        t = por_tipo.setdefault(r["id_tipo"], [0.0, 0.0, 0.0])
+        t[0] += r["peso_clases"]
+        t[1] += r["peso_reservas"]
+        t[2] += r["peso_llenas"]
+
+    resultado = []
+    for p in proximas:
+        fila = {k: p[k] for k in ("id_clase", "nombre", "tipo_clase", "fecha_hora", "cupo_max", "reservas")}
+        tipo = por_tipo.get(p["id_tipo"])
+        if not tipo or not tipo[0]:
+            resultado.append({**fila, "reservas_esperadas": None, "ocupacion_esperada": None,
+                              "prob_llena": None, "cupo_sugerido": None})
+            continue
+        celda = por_celda.get(((p["inicio"] // database.DIA + 3) % 7, p["inicio"] % database.DIA // 3600, p["id_tipo"]))
+        if celda is not None and not celda["peso_clases"]:
+            celda = None   # sólo clases tan antiguas que su peso quedó en 0
+        n = celda["peso_clases"] * a_hoy if celda else 0.0
+        reservas = celda["peso_reservas"] / celda["peso_clases"] if celda else 0.0
+        llenas = celda["peso_llenas"] / celda["peso_clases"] if celda else 0.0
+        esperadas = (n * reservas + SUAVIZADO * tipo[1] / tipo[0]) / (n + SUAVIZADO)
+        esperadas = max(esperadas, p["reservas"])
+        resultado.append({
+            **fila,
+            "reservas_esperadas": esperadas,
+            "ocupacion_esperada": min(100.0, _pct(esperadas, p["cupo_max"])),
+            "prob_llena": (n * llenas + SUAVIZADO * tipo[2] / tipo[0]) / (n + SUAVIZADO) * 100,
+            "cupo_sugerido": max(1, math.ceil(esperadas / OCUPACION_OBJETIVO)),
+        })
+    return resultado
@@ -0,0 +1,123 @@
+# horarios.py — Generación del horario semanal a partir de PlantillaClase
+from __future__ import annotations
+from bisect import bisect_left, insort
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from database import get_plantillas, clases_superpuestas_lote, insertar_clases_lote, epoch
+
+FMT_FECHA_HORA = "%Y-%m-%d %H:%M:%S"
+DIAS_SEMANA = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
+
+
+class IndiceIntervalos:
+    """
+    Índice de intervalos [inicio, fin) por entrenador, en segundos epoch.
+    Cada entrenador guarda sus intervalos ordenados por inicio; una consulta
+    hace bisect y recorre hacia atrás sólo mientras el inicio pueda solaparse
+    (inicio > desde - duración máxima), en lugar de comparar contra todo.
+    """
+
+    def __init__(self):
+        self._por_entrenador: Dict[int, List[Tuple[int, int, object]]] = {}
+        self._max_dur: Dict[int, int] = {}
+
+    def agregar(self, id_entrenador: int, inicio: int, fin: int, ref: str = ""):
+        insort(self._por_entrenador.setdefault(id_entrenador, []), (inicio, fin, ref))
+        if fin - inicio > self._max_dur.get(id_entrenador, 0):
+            self._max_dur[id_entrenador] = fin - inicio
+
+    def solapes(self, id_entrenador: int, inicio: int, fin: int) -> List[object]:
+        """Referencias de los intervalos del entrenador que se cruzan con [inicio, fin)."""
+        lista = self._por_entrenador.get(id_entrenador)
+        if not lista:
+            return []
+        limite = inicio - self._max_dur[id_entrenador]
+        i = bisect_left(lista, (fin,)) - 1
+        encontrados = []
+        while i >= 0 and lista[i][0] > limite:
+            if lista[i][1] > inicio:
+                encontrados.append(lista[i][2])
+            i -= 1
+        return encontrados
+
+
+def proximo_lunes(hoy: Optional[date] = None) -> date:
+    hoy = hoy or date.today()
+    return hoy + timedelta(days=(7 - hoy.weekday()) % 7 or 7)
+
+
+def expandir_plantillas(plantillas: List[Dict], desde: date, semanas: int) -> List[Dict]:
+    """Materializa las plantillas en sesiones concretas para `semanas` semanas desde `desde`."""
+    sesiones = []
+    for p in plantillas:
+        hh, mm = map(int, p["hora"].split(":"))
+        primero = desde + timedelta(days=(int(p["dia_semana"]) - desde.weekday()) % 7)
+        for s in range(semanas):
+            dia = primero + timedelta(days=7 * s)
+            inicio = datetime(dia.year, dia.month, dia.day, hh, mm)
+            sesiones.append({
+                "id_plantilla": p["id_plantilla"],
+                "id_entrenador": p["id_entrenador"],
+                "id_tipo": p["id_tipo"],
+                "nombre": p["nombre"],
+                "descripcion": p.get("descripcion"),
+                "entrenador": p.get("entrenador"),
+                "inicio": inicio,
+                "duracion_min": int(p["duracion_min"]),
+                "cupo_max": int(p["cupo_max"]),
+            })
+    sesiones.sort(key=lambda x: x["inicio"])
+    return sesiones
+
+
+def _detectar_conflictos(sesiones: List[Dict]) -> List[Dict]:
+    # Contra la DB: una consulta indexada por sesión (idx_clase_entrenador_intervalo)
+    choques_db = clases_superpuestas_lote([
+        (s["id_entrenador"], s["inicio"].strftime(FMT_FECHA_HORA), s["duracion_min"]) for s in sesiones
+    ])
+    # Entre las sesiones nuevas: índice en memoria, todavía no están en la DB
+    idx = IndiceIntervalos()
+    conflictos = []
+    for s, ids_db in zip(sesiones, choques_db):
+        ini = epoch(s["inicio"])
+        fin = ini + 60 * s["duracion_min"]
+        choques = [f"clase #{i}" for i in ids_db] + idx.solapes(s["id_entrenador"], ini, fin)
+        if choques:
+            conflictos.append({
+                "entrenador": s.get("entrenador") or s["id_entrenador"],
+                "clase": s["nombre"],
+                "fecha_hora": s["inicio"].strftime(FMT_FECHA_HORA),
+                "choca_con": ", ".join(sorted(choques)),
+            })
+        idx.agregar(s["id_entrenador"], ini, fin, f"plantilla #{s['id_plantilla']}")
+    return conflictos
+
+
+def _sesiones_y_conflictos(desde: date, semanas: int) -> Tuple[List[Dict], List[Dict]]:
+    sesiones = expandir_plantillas(get_plantillas(), desde, semanas)
+    return sesiones, (_detectar_conflictos(sesiones) if sesiones else [])
+
+
+def validar_horario(desde: date, semanas: int) -> Tuple[int, List[Dict]]:
+    """(cantidad de sesiones a generar, conflictos de entrenador) sin escribir nada."""
+    sesiones, conflictos = _sesiones_y_conflictos(desde, semanas)
+    return len(sesiones), conflictos
+
+
+def generar_horario(desde: date, semanas: int) -> Tuple[bool, int, Optional[str]]:
+    """
+    Crea todas las clases del período en una sola transacción.
+    Si algún entrenador queda con clases superpuestas no se inserta nada.
+    """
+    sesiones, conflictos = _sesiones_y_conflictos(desde, semanas)
+    if not sesiones:
+        return False, 0, "No hay plantillas activas."
+    if conflictos:
+        return False, 0, f"{len(conflictos)} conflicto(s) de horario de entrenadores."
+    filas = [
+        (s["id_entrenador"], s["id_tipo"], s["nombre"], s["descripcion"],
+         s["inicio"].strftime(FMT_FECHA_HORA), s["duracion_min"], s["cupo_max"])
+        for s in sesiones
+    ]
+    return insertar_clases_lote(filas)
@@ -0,0 +1,203 @@
+# mantenimiento.py — Tareas periódicas de mantenimiento en un hilo de fondo
+#
+# Cada tarea es una función sin argumentos que devuelve (ok, n, error), como
+# las escrituras de database.py, y se ejecuta cada `intervalo` segundos:
+#
+#   mantenimiento.registrar("retencion.actualizar", retencion.actualizar, 600)
+#   mantenimiento.iniciar()      # en app.py; idempotente por proceso
+#
+# El turno de cada tarea se reclama en la tabla Mantenimiento con un UPSERT
+# condicional: en modo multiproceso todos los workers tienen su hilo, pero en
+# cada intervalo la tarea corre en uno solo. GYMLITE_MANTENIMIENTO=0 no arranca
+# el hilo (las tareas se pueden seguir ejecutando a mano con ejecutar()).
+from __future__ import annotations
+import os
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import consultas
+import database
+
+MANTENIMIENTO_ACTIVO = os.environ.get("GYMLITE_MANTENIMIENTO", "1") != "0"
+INTERVALO_REVISION = int(os.environ.get("GYMLITE_MANTENIMIENTO_REVISION", "30"))   # segundos entre revisiones
+RETENCION_INTERVALO = int(os.environ.get("GYMLITE_RETENCION_INTERVALO", "600"))
+DEMANDA_INTERVALO = int(os.environ.get("GYMLITE_DEMANDA_INTERVALO", "600"))
+CONCILIACION_INTERVALO = int(os.environ.get("GYMLITE_CONCILIACION_INTERVALO", "3600"))
+CAMBIOS_INTERVALO = int(os.environ.get("GYMLITE_CAMBIOS_INTERVALO", "3600"))
+
+
+class Tarea(NamedTuple):
+    nombre: str
+    fn: Callable[[], Tuple[bool, int, Optional[str]]]
+    intervalo: int
+
+
+_TAREAS: Dict[str, Tarea] = {}
+_hilo: Optional[threading.Thread] = None
+_detener = threading.Event()
+_lock = threading.Lock()
+
+
+def registrar(nombre: str, fn: Callable[[], Tuple[bool, int, Optional[str]]], intervalo: int):
+    """Agrega (o reemplaza) la tarea `nombre`, a ejecutar cada `intervalo` segundos."""
+    _TAREAS[nombre] = Tarea(nombre, fn, int(intervalo))
+
+
+def tareas() -> List[Tarea]:
+    return list(_TAREAS.values())
+
+
+# Gana el reclamo sólo quien logra escribir la fila: si otro worker ejecutó la
+# tarea hace menos de 'intervalo' segundos el UPSERT no modifica nada
+consultas.registrar("mantenimiento.reclamar", """
+    INSERT INTO Mantenimiento (tarea, inicio) VALUES (:tarea, :ahora)
+    ON CONFLICT(tarea) DO UPDATE SET inicio = excluded.inicio, fin = NULL
+    WHERE Mantenimiento.inicio <= :ahora - :intervalo
+""")
+# Ejecución a pedido: no espera el turno, pero tampoco arranca una tarea que
+# sigue en curso (fin NULL) en este u otro worker, salvo que lleve más de
+# 'intervalo' segundos sin terminar (se da por interrumpida)
+consultas.registrar("mantenimiento.forzar", """
+    INSERT INTO Mantenimiento (tarea, inicio) VALUES (:tarea, :ahora)
+    ON CONFLICT(tarea) DO UPDATE SET inicio = excluded.inicio, fin = NULL
+    WHERE Mantenimiento.fin IS NOT NULL OR Mantenimiento.inicio <= :ahora - :intervalo
+""")
+consultas.registrar("mantenimiento.terminar", """
+    UPDATE Mantenimiento SET fin = ?, duracion_ms = ?, ok = ?, detalle = ?
+    WHERE tarea = ?
+""")
+consultas.registrar("mantenimiento.estado", """
+    SELECT tarea, inicio, fin, duracion_ms, ok, detalle FROM Mantenimiento ORDER BY tarea
+""")
+
+
+def _reclamar(t: Tarea) -> bool:
+    with database.get_conn() as c:
+        cur = consultas.ejecutar(c, "mantenimiento.reclamar",
+                                 {"tarea": t.nombre, "ahora": int(time.time()), "intervalo": t.intervalo})
+        return cur.rowcount == 1
+
+
+def _ejecutar(t: Tarea) -> Tuple[bool, int, Optional[str]]:
+    t0 = time.perf_counter()
+    try:
+        ok, n, err = t.fn()
+    except Exception as e:
+        ok, n, err = False, 0, str(e)
+    if not ok:
+        print(f"Error en tarea de mantenimiento {t.nombre}: {err}")
+    try:
+        with database.get_conn() as c:
+            consultas.ejecutar(c, "mantenimiento.terminar", (
+                int(time.time()), (time.perf_counter() - t0) * 1000, int(ok),
+                err if not ok else f"{n} fila(s)", t.nombre,
+            ))
+    except Exception as e:
+        print(f"Error al registrar la tarea de mantenimiento {t.nombre}: {e}")
+    return ok, n, err
+
+
+def ejecutar(nombre: str) -> Tuple[bool, int, Optional[str]]:
+    """
+    Ejecuta la tarea ya (botón de la UI), sin esperar su turno; no si ya está
+    corriendo. Devuelve (ok, n, error).
+    """
+    t = _TAREAS.get(nombre)
+    if t is None:
+        return False, 0, f"Tarea desconocida: {nombre}"
+    with database.get_conn() as c:
+        cur = consultas.ejecutar(c, "mantenimiento.forzar",
+                                 {"tarea": t.nombre, "ahora": int(time.time()), "intervalo": t.intervalo})
+        if cur.rowcount != 1:
+            return False, 0, "La tarea ya se está ejecutando; intenta de nuevo en unos momentos"
+    return _ejecutar(t)
+
+
+def revisar() -> int:
+    """Ejecuta las tareas a las que les toca turno; devuelve cuántas corrieron."""
+    corridas = 0
+    for t in tareas():
+        try:
+            if not _reclamar(t):
+                continue
+        except Exception as e:
+            print(f"Error al reclamar la tarea de mantenimiento {t.nombre}: {e}")
+            continue
+        _ejecutar(t)
+        corridas += 1
+    return corridas
+
+
+def _bucle():
+    # La primera revisión espera un intervalo: el arranque de la app va primero
+    while not _detener.wait(INTERVALO_REVISION):
+        revisar()
+
+
+def iniciar() -> bool:
+    """Arranca el hilo de mantenimiento del proceso (una sola vez). Devuelve si quedó corriendo."""
+    global _hilo
+    if not MANTENIMIENTO_ACTIVO:
+        return False
+    with _lock:
+        if _hilo is None or not _hilo.is_alive():
+            _detener.clear()
+            _hilo = threading.Thread(target=_bucle, name="mantenimiento", daemon=True)
+            _hilo.start()
+    return True
+
+
+def detener(timeout: Optional[float] = None):
+    _detener.set()
+    if _hilo is not None:
+        _hilo.join(timeout)
+
+
+def estado() -> List[Dict]:
+    """Última ejecución de cada tarea registrada (para mostrar en la UI)."""
+    with database.get_read_conn() as c:
+        filas = {r["tarea"]: dict(r) for r in consultas.todas(c, "mantenimiento.estado")}
+    return [
+        {"tarea": t.nombre, "intervalo": t.intervalo, **filas.get(t.nombre, {})}
+        for t in tareas()
+    ]
+
+
+# ============================================================
+# TAREAS DE GYMLITE
+# ============================================================
+
+def _actualizar_retencion():
+    # pandas sólo se importa en el hilo de mantenimiento, no en el login
+    import retencion
+    return retencion.actualizar()
+
+
+def _actualizar_demanda():
+    import demanda
+    return demanda.actualizar()
+
+
+def _reconstruir_demanda():
+    # Recoge lo que actualizar() no ve: clases pasadas cargadas tarde, reservas corregidas
+    import demanda
+    return demanda.reconstruir()
+
+
+def _conciliar_pagos():
+    import conciliacion
+    return conciliacion.conciliar()
+
+
+def _compactar_cambios():
+    import cambios
+    return cambios.compactar()
+
+
+registrar("suscripciones.estados", database.actualizar_estados_suscripciones, 3600)
+registrar("retencion.actualizar", _actualizar_retencion, RETENCION_INTERVALO)
+registrar("demanda.actualizar", _actualizar_demanda, DEMANDA_INTERVALO)
+registrar("demanda.reconstruir", _reconstruir_demanda, 86400)
+registrar("pagos.conciliar", _conciliar_pagos, CONCILIACION_INTERVALO)
+registrar("cambios.compactar", _compactar_cambios, CAMBIOS_INTERVALO)
@@ -0,0 +1,7 @@
+-- 0002 — Soft Delete en Socio: 1=Activo, 0=Eliminado
+-- En bases creadas por la version anterior la columna ya existe;
+-- el runner de migraciones ignora el error de columna duplicada.
+
+ALTER TABLE Socio ADD COLUMN activo INTEGER NOT NULL DEFAULT 1;
+
+CREATE INDEX IF NOT EXISTS idx_socio_activo ON Socio(activo);
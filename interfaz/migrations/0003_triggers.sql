@@ -0,0 +1,52 @@
+-- 0003 — Triggers de negocio (aforo, vigencia y fechas de entrenador)
+
+-- Trigger: Evitar sobrecupo (Race Condition)
+CREATE TRIGGER IF NOT EXISTS trg_check_cupo_insert
+BEFORE INSERT ON Reserva
+BEGIN
+    SELECT CASE
+        WHEN (
+            SELECT COUNT(*) FROM Reserva
+            WHERE id_clase = NEW.id_clase AND estado_reserva = 'confirmada'
+        ) >= (
+            SELECT cupo_max FROM Clase WHERE id_clase = NEW.id_clase
+        )
+        THEN RAISE(ABORT, 'Error: CUPOS_AGOTADOS')
+    END;
+END;
+
+-- Trigger: Validar suscripción activa al reservar
+CREATE TRIGGER IF NOT EXISTS trg_check_vigencia_socio
+BEFORE INSERT ON Reserva
+BEGIN
+    SELECT CASE
+        WHEN NOT EXISTS (
+            SELECT 1 FROM Suscripcion
+            WHERE id_socio = NEW.id_socio
+              AND estado_sus = 'activa'
+              AND DATE(fecha_fin) >= DATE('now', 'localtime')
+        )
+        THEN RAISE(ABORT, 'Error: SIN_SUSCRIPCION_ACTIVA')
+    END;
+END;
+
+-- Trigger: fecha de nacimiento de entrenador no puede ser hoy ni futura
+CREATE TRIGGER IF NOT EXISTS trg_entrenador_fecha_ins
+BEFORE INSERT ON Entrenador
+FOR EACH ROW
+BEGIN
+    SELECT CASE
+        WHEN DATE(NEW.fecha_nac) >= DATE('now','localtime') THEN
+            RAISE(ABORT, 'fecha_nac no puede ser hoy ni futura')
+    END;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_entrenador_fecha_upd
+BEFORE UPDATE OF fecha_nac ON Entrenador
+FOR EACH ROW
+BEGIN
+    SELECT CASE
+        WHEN DATE(NEW.fecha_nac) >= DATE('now','localtime') THEN
+            RAISE(ABORT, 'fecha_nac no puede ser hoy ni futura')
+    END;
+END;
@@ -0,0 +1,5 @@
+-- 0004 — Índice para el historial de pagos (orden y rango por fecha_pago).
+-- El historial se recorre en orden de fecha y se corta con LIMIT;
+-- un índice compuesto por método obligaría a ordenar todo el resultado.
+
+CREATE INDEX IF NOT EXISTS idx_pago_fecha ON Pago(fecha_pago);
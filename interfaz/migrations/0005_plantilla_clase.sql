@@ -0,0 +1,23 @@
+-- 0005 — Plantillas de horario semanal (una fila = una clase recurrente)
+-- dia_semana: 0=lunes ... 6=domingo; hora: 'HH:MM'
+
+CREATE TABLE IF NOT EXISTS PlantillaClase (
+    id_plantilla INTEGER PRIMARY KEY AUTOINCREMENT,
+    id_entrenador INTEGER NOT NULL,
+    id_tipo INTEGER NOT NULL,
+    nombre VARCHAR(100) NOT NULL,
+    descripcion TEXT,
+    dia_semana INTEGER NOT NULL,
+    hora VARCHAR(5) NOT NULL,
+    duracion_min INTEGER NOT NULL,
+    cupo_max INTEGER NOT NULL,
+    activa INTEGER NOT NULL DEFAULT 1,
+    FOREIGN KEY (id_entrenador) REFERENCES Entrenador(id_entrenador) ON DELETE CASCADE ON UPDATE CASCADE,
+    FOREIGN KEY (id_tipo) REFERENCES Tipo(id_tipo) ON DELETE CASCADE ON UPDATE CASCADE,
+    CHECK (dia_semana BETWEEN 0 AND 6),
+    CHECK (hora GLOB '[01][0-9]:[0-5][0-9]' OR hora GLOB '2[0-3]:[0-5][0-9]'),
+    CHECK (duracion_min > 0),
+    CHECK (cupo_max > 0)
+);
+
+CREATE INDEX IF NOT EXISTS idx_plantilla_entrenador ON PlantillaClase(id_entrenador);
@@ -0,0 +1,46 @@
+-- 0006 — Intervalo de cada clase en epoch (segundos) para detectar choques de entrenador
+-- Columnas generadas: se calculan desde fecha_hora/duracion_min y nunca quedan desfasadas.
+-- El índice compuesto guarda los valores, así que la consulta de solape no recalcula nada.
+
+ALTER TABLE Clase ADD COLUMN inicio INTEGER
+    GENERATED ALWAYS AS (CAST(strftime('%s', fecha_hora) AS INTEGER)) VIRTUAL;
+
+ALTER TABLE Clase ADD COLUMN fin INTEGER
+    GENERATED ALWAYS AS (CAST(strftime('%s', fecha_hora) AS INTEGER) + 60 * duracion_min) VIRTUAL;
+
+CREATE INDEX IF NOT EXISTS idx_clase_entrenador_intervalo ON Clase(id_entrenador, inicio, fin);
+
+-- MAX(duracion_min) acota hacia atrás la búsqueda por inicio (O(log n) con este índice)
+CREATE INDEX IF NOT EXISTS idx_clase_duracion ON Clase(duracion_min);
+
+-- Trigger: un entrenador no puede tener dos clases superpuestas
+CREATE TRIGGER IF NOT EXISTS trg_clase_sin_solape_insert
+BEFORE INSERT ON Clase
+BEGIN
+    SELECT CASE
+        WHEN EXISTS (
+            SELECT 1 FROM Clase
+            WHERE id_entrenador = NEW.id_entrenador
+              AND inicio < NEW.fin
+              AND inicio > NEW.inicio - 60 * (SELECT MAX(duracion_min) FROM Clase)
+              AND fin > NEW.inicio
+        )
+        THEN RAISE(ABORT, 'Error: ENTRENADOR_OCUPADO')
+    END;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_clase_sin_solape_update
+BEFORE UPDATE OF id_entrenador, fecha_hora, duracion_min ON Clase
+BEGIN
+    SELECT CASE
+        WHEN EXISTS (
+            SELECT 1 FROM Clase
+            WHERE id_entrenador = NEW.id_entrenador
+              AND id_clase <> NEW.id_clase
+              AND inicio < NEW.fin
+              AND inicio > NEW.inicio - 60 * MAX(NEW.duracion_min, (SELECT MAX(duracion_min) FROM Clase))
+              AND fin > NEW.inicio
+        )
+        THEN RAISE(ABORT, 'Error: ENTRENADOR_OCUPADO')
+    END;
+END;
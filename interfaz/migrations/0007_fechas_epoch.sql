@@ -0,0 +1,66 @@
+-- 0007 — Fechas calientes como enteros epoch (segundos, hora local tratada como UTC)
+-- Columnas generadas a partir del texto original: las lecturas siguen devolviendo
+-- el mismo texto y los filtros/agrupaciones pasan a ser aritmética sobre índices.
+-- Clase ya tiene 'inicio' (0006) para fecha_hora.
+
+ALTER TABLE Suscripcion ADD COLUMN fecha_fin_epoch INTEGER
+    GENERATED ALWAYS AS (CAST(strftime('%s', fecha_fin) AS INTEGER)) VIRTUAL;
+
+ALTER TABLE Pago ADD COLUMN fecha_pago_epoch INTEGER
+    GENERATED ALWAYS AS (CAST(strftime('%s', fecha_pago) AS INTEGER)) VIRTUAL;
+
+ALTER TABLE Reserva ADD COLUMN fecha_reserva_epoch INTEGER
+    GENERATED ALWAYS AS (CAST(strftime('%s', fecha_reserva) AS INTEGER)) VIRTUAL;
+
+CREATE INDEX IF NOT EXISTS idx_suscripcion_fin_epoch ON Suscripcion(fecha_fin_epoch);
+CREATE INDEX IF NOT EXISTS idx_pago_fecha_epoch ON Pago(fecha_pago_epoch);
+CREATE INDEX IF NOT EXISTS idx_reserva_fecha_epoch ON Reserva(fecha_reserva_epoch);
+CREATE INDEX IF NOT EXISTS idx_clase_inicio ON Clase(inicio);
+
+-- Vistas y trigger de vigencia: mismo resultado, comparando enteros
+DROP VIEW IF EXISTS v_socios_activos;
+CREATE VIEW v_socios_activos AS
+WITH ult AS (
+  SELECT id_socio, MAX(fecha_fin) AS fecha_fin_max
+  FROM Suscripcion
+  GROUP BY id_socio
+)
+SELECT s.id_socio, s.RUT, s.nombre || ' ' || s.apellido_p AS nombre_completo,
+       s.telefono, p.nombre_plan, sus.fecha_inicio, sus.fecha_fin, 'Vigente' AS vigencia
+FROM ult
+JOIN Suscripcion sus ON sus.id_socio = ult.id_socio AND sus.fecha_fin = ult.fecha_fin_max
+JOIN Socio s ON s.id_socio = sus.id_socio
+JOIN Plan  p ON p.id_plan = sus.id_plan
+WHERE sus.estado_sus='activa'
+  AND sus.fecha_fin_epoch >= CAST(strftime('%s', 'now', 'localtime', 'start of day') AS INTEGER);
+
+DROP VIEW IF EXISTS v_socios_inactivo;
+CREATE VIEW v_socios_inactivo AS
+WITH ult AS (
+  SELECT id_socio, MAX(fecha_fin) AS fecha_fin_max
+  FROM Suscripcion
+  GROUP BY id_socio
+)
+SELECT s.id_socio, s.RUT, s.nombre || ' ' || s.apellido_p AS nombre_completo,
+       s.telefono, p.nombre_plan, sus.fecha_inicio, sus.fecha_fin, 'Inactiva' AS inactiva
+FROM ult
+JOIN Suscripcion sus ON sus.id_socio = ult.id_socio AND sus.fecha_fin = ult.fecha_fin_max
+JOIN Socio s ON s.id_socio = sus.id_socio
+JOIN Plan  p ON p.id_plan = sus.id_plan
+WHERE sus.estado_sus = 'vencida'
+   OR sus.fecha_fin_epoch < CAST(strftime('%s', 'now', 'localtime', 'start of day') AS INTEGER);
+
+DROP TRIGGER IF EXISTS trg_check_vigencia_socio;
+CREATE TRIGGER trg_check_vigencia_socio
+BEFORE INSERT ON Reserva
+BEGIN
+    SELECT CASE
+        WHEN NOT EXISTS (
+            SELECT 1 FROM Suscripcion
+            WHERE id_socio = NEW.id_socio
+              AND estado_sus = 'activa'
+              AND fecha_fin_epoch >= CAST(strftime('%s', 'now', 'localtime', 'start of day') AS INTEGER)
+        )
+        THEN RAISE(ABORT, 'Error: SIN_SUSCRIPCION_ACTIVA')
+    END;
+END;
@@ -0,0 +1,6 @@
+-- 0008 — Índice para los listados de clases filtrados por tipo (ver database.listar_clases).
+-- La ventana de fechas se resuelve sobre 'inicio' dentro del mismo tipo y el
+-- orden por inicio sale del índice. Reemplaza a idx_clase_tipo (es su prefijo).
+
+CREATE INDEX IF NOT EXISTS idx_clase_tipo_inicio ON Clase(id_tipo, inicio);
+DROP INDEX IF EXISTS idx_clase_tipo;
@@ -0,0 +1,7 @@
+-- 0009 — Cupos ocupados por clase sin leer las filas de Reserva.
+-- Los cupos de cada clase se cuentan con (id_clase, estado_reserva = 'confirmada')
+-- en los listados, el resumen del dashboard y el trigger de cupos: con este
+-- índice el conteo se resuelve sólo en el índice. Reemplaza a idx_reserva_clase.
+
+CREATE INDEX IF NOT EXISTS idx_reserva_clase_estado ON Reserva(id_clase, estado_reserva);
+DROP INDEX IF EXISTS idx_reserva_clase;
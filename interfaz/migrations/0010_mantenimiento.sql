@@ -0,0 +1,12 @@
+-- 0010 — Registro de tareas periódicas de mantenimiento (ver mantenimiento.py)
+-- Una fila por tarea: 'inicio' sirve además de reclamo entre procesos, así que
+-- en modo multiproceso cada tarea corre en un solo worker por intervalo.
+
+CREATE TABLE IF NOT EXISTS Mantenimiento (
+    tarea VARCHAR(50) PRIMARY KEY,
+    inicio INTEGER NOT NULL,          -- epoch de la última ejecución reclamada
+    fin INTEGER,                      -- epoch de término (NULL = en curso o interrumpida)
+    duracion_ms REAL,
+    ok INTEGER,
+    detalle TEXT
+);
@@ -0,0 +1,116 @@
+-- 0011 — Tablas precalculadas de retención y bajas (ver retencion.py)
+-- Meses en texto 'YYYY-MM'. Las suscripciones canceladas no cuentan.
+
+-- Cohorte de cada socio (mes de su primera suscripción y plan con que entró) y
+-- meses con suscripción vigente desde el alta: un carácter '1'/'0' por mes.
+-- Es lo que el socio aporta a RetencionCohorte; al cambiar sus suscripciones se
+-- resta y se vuelve a sumar sin recalcular la cohorte entera.
+CREATE TABLE IF NOT EXISTS RetencionSocio (
+    id_socio INTEGER PRIMARY KEY,
+    cohorte TEXT NOT NULL,
+    id_plan INTEGER NOT NULL,
+    meses TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_retencion_socio_cohorte ON RetencionSocio(cohorte);
+
+-- Matriz de retención: socios de la cohorte (y plan de entrada) con una
+-- suscripción vigente 'mes' meses después del alta; mes 0 = tamaño de la cohorte
+CREATE TABLE IF NOT EXISTS RetencionCohorte (
+    cohorte TEXT NOT NULL,
+    id_plan INTEGER NOT NULL,
+    mes INTEGER NOT NULL,
+    activos INTEGER NOT NULL,
+    PRIMARY KEY (cohorte, id_plan, mes)
+) WITHOUT ROWID;
+
+-- Suscripciones que vencen cada mes, por plan: renovadas (la siguiente empieza
+-- a más tardar GRACIA días después), bajas (no renovaron y la gracia pasó) y
+-- pendientes; dias_renovacion suma el desfase de las renovadas
+CREATE TABLE IF NOT EXISTS RetencionVencimiento (
+    mes TEXT NOT NULL,
+    id_plan INTEGER NOT NULL,
+    vencidas INTEGER NOT NULL,
+    renovadas INTEGER NOT NULL,
+    bajas INTEGER NOT NULL,
+    pendientes INTEGER NOT NULL,
+    anticipadas INTEGER NOT NULL,
+    dias_renovacion INTEGER NOT NULL,
+    PRIMARY KEY (mes, id_plan)
+) WITHOUT ROWID;
+
+-- Última actualización (una sola fila)
+CREATE TABLE IF NOT EXISTS RetencionEstado (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    hoy INTEGER NOT NULL,             -- epoch del día con que se calculó
+    actualizado TEXT NOT NULL,
+    modo TEXT NOT NULL,               -- 'completa' o 'incremental'
+    duracion_ms REAL NOT NULL
+);
+
+-- Suscripciones de un socio en orden de inicio (la siguiente de cada una, y la
+-- anterior en los triggers); reemplaza al índice sólo por socio
+CREATE INDEX IF NOT EXISTS idx_suscripcion_socio_inicio ON Suscripcion(id_socio, fecha_inicio);
+DROP INDEX IF EXISTS idx_suscripcion_socio;
+
+-- Cambios en Suscripcion aún no procesados: socio y mes de vencimiento tocado.
+-- Además del mes de la suscripción se anota el de la anterior del socio (la que
+-- empieza justo antes): si se renovó o no depende de la que viene después.
+CREATE TABLE IF NOT EXISTS RetencionPendiente (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id_socio INTEGER NOT NULL,
+    mes TEXT NOT NULL
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_retencion_sus_ins
+AFTER INSERT ON Suscripcion
+BEGIN
+    INSERT INTO RetencionPendiente (id_socio, mes) VALUES (NEW.id_socio, strftime('%Y-%m', NEW.fecha_fin));
+    INSERT INTO RetencionPendiente (id_socio, mes)
+    SELECT id_socio, strftime('%Y-%m', fecha_fin) FROM Suscripcion
+    WHERE id_socio = NEW.id_socio AND estado_sus <> 'cancelada'
+      AND fecha_inicio BETWEEN COALESCE((
+              SELECT MAX(fecha_inicio) FROM Suscripcion
+              WHERE id_socio = NEW.id_socio AND estado_sus <> 'cancelada' AND fecha_inicio < NEW.fecha_inicio
+          ), NEW.fecha_inicio) AND NEW.fecha_inicio;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_retencion_sus_del
+AFTER DELETE ON Suscripcion
+BEGIN
+    INSERT INTO RetencionPendiente (id_socio, mes) VALUES (OLD.id_socio, strftime('%Y-%m', OLD.fecha_fin));
+    INSERT INTO RetencionPendiente (id_socio, mes)
+    SELECT id_socio, strftime('%Y-%m', fecha_fin) FROM Suscripcion
+    WHERE id_socio = OLD.id_socio AND estado_sus <> 'cancelada'
+      AND fecha_inicio BETWEEN COALESCE((
+              SELECT MAX(fecha_inicio) FROM Suscripcion
+              WHERE id_socio = OLD.id_socio AND estado_sus <> 'cancelada' AND fecha_inicio < OLD.fecha_inicio
+          ), OLD.fecha_inicio) AND OLD.fecha_inicio;
+END;
+
+-- Sólo cambios que afectan a la retención: el paso diario activa -> vencida no cuenta
+CREATE TRIGGER IF NOT EXISTS trg_retencion_sus_upd
+AFTER UPDATE ON Suscripcion
+WHEN OLD.id_socio IS NOT NEW.id_socio
+  OR OLD.id_plan IS NOT NEW.id_plan
+  OR OLD.fecha_inicio IS NOT NEW.fecha_inicio
+  OR OLD.fecha_fin IS NOT NEW.fecha_fin
+  OR (OLD.estado_sus = 'cancelada') IS NOT (NEW.estado_sus = 'cancelada')
+BEGIN
+    INSERT INTO RetencionPendiente (id_socio, mes) VALUES (OLD.id_socio, strftime('%Y-%m', OLD.fecha_fin));
+    INSERT INTO RetencionPendiente (id_socio, mes) VALUES (NEW.id_socio, strftime('%Y-%m', NEW.fecha_fin));
+    INSERT INTO RetencionPendiente (id_socio, mes)
+    SELECT id_socio, strftime('%Y-%m', fecha_fin) FROM Suscripcion
+    WHERE id_socio = OLD.id_socio AND estado_sus <> 'cancelada'
+      AND fecha_inicio BETWEEN COALESCE((
+              SELECT MAX(fecha_inicio) FROM Suscripcion
+              WHERE id_socio = OLD.id_socio AND estado_sus <> 'cancelada' AND fecha_inicio < OLD.fecha_inicio
+          ), OLD.fecha_inicio) AND OLD.fecha_inicio;
+    INSERT INTO RetencionPendiente (id_socio, mes)
+    SELECT id_socio, strftime('%Y-%m', fecha_fin) FROM Suscripcion
+    WHERE id_socio = NEW.id_socio AND estado_sus <> 'cancelada'
+      AND fecha_inicio BETWEEN COALESCE((
+              SELECT MAX(fecha_inicio) FROM Suscripcion
+              WHERE id_socio = NEW.id_socio AND estado_sus <> 'cancelada' AND fecha_inicio < NEW.fecha_inicio
+          ), NEW.fecha_inicio) AND NEW.fecha_inicio;
+END;
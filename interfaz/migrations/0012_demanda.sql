@@ -0,0 +1,29 @@
+-- 0012 — Matriz de demanda precalculada: ocupación por día de la semana, hora y tipo (ver demanda.py)
+
+-- Sumas de las clases ya terminadas que empezaron ese día (0 = lunes) y hora.
+-- Las columnas peso_* suman lo mismo ponderado por 2^(inicio / vida media): la
+-- razón entre dos de ellas es un promedio donde pesan más las clases recientes.
+CREATE TABLE IF NOT EXISTS DemandaCelda (
+    dia INTEGER NOT NULL,
+    hora INTEGER NOT NULL,
+    id_tipo INTEGER NOT NULL,
+    clases INTEGER NOT NULL,
+    cupos INTEGER NOT NULL,
+    reservas INTEGER NOT NULL,
+    asistencias INTEGER NOT NULL,
+    llenas INTEGER NOT NULL,
+    peso_clases REAL NOT NULL,
+    peso_reservas REAL NOT NULL,
+    peso_llenas REAL NOT NULL,
+    PRIMARY KEY (dia, hora, id_tipo)
+) WITHOUT ROWID;
+
+-- hasta: las clases que terminaron hasta este epoch ya están sumadas
+CREATE TABLE IF NOT EXISTS DemandaEstado (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    hasta INTEGER NOT NULL,
+    vida_media INTEGER NOT NULL,
+    actualizado TEXT NOT NULL,
+    modo TEXT NOT NULL,
+    duracion_ms REAL NOT NULL
+);
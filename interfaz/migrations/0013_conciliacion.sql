@@ -0,0 +1,45 @@
+-- 0013 — Conciliación de pagos contra suscripciones (ver conciliacion.py)
+
+-- Suscripciones (no canceladas) cuyos pagos completados no calzan con el precio
+-- del plan: tipo 'sin_pago', 'pago_parcial' o 'sobrepago'; diferencia = pagado - esperado
+CREATE TABLE IF NOT EXISTS ConciliacionResultado (
+    id_suscripcion INTEGER PRIMARY KEY,
+    id_socio INTEGER NOT NULL,
+    id_plan INTEGER NOT NULL,
+    fecha_inicio DATE NOT NULL,
+    esperado REAL NOT NULL,
+    pagado REAL NOT NULL,
+    pendiente REAL NOT NULL,
+    pagos INTEGER NOT NULL,
+    tipo TEXT NOT NULL,
+    diferencia REAL NOT NULL,
+    revisado TEXT NOT NULL
+);
+
+-- El panel lista las mayores diferencias (todas o de un tipo) sin ordenar la tabla
+CREATE INDEX IF NOT EXISTS idx_conciliacion_diferencia ON ConciliacionResultado(ABS(diferencia));
+CREATE INDEX IF NOT EXISTS idx_conciliacion_tipo ON ConciliacionResultado(tipo, ABS(diferencia));
+
+-- Totales por tipo de ConciliacionResultado, ajustados en cada lote
+CREATE TABLE IF NOT EXISTS ConciliacionTotal (
+    tipo TEXT PRIMARY KEY,
+    n INTEGER NOT NULL,
+    diferencia REAL NOT NULL,
+    pendiente REAL NOT NULL
+) WITHOUT ROWID;
+
+-- Corrida actual: ultimo_id es el punto de control (la última suscripción ya
+-- revisada); terminada queda NULL mientras la corrida no llega al final
+CREATE TABLE IF NOT EXISTS ConciliacionEstado (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    ultimo_id INTEGER NOT NULL,
+    iniciada TEXT NOT NULL,
+    terminada TEXT,
+    revisadas INTEGER NOT NULL,
+    duracion_ms REAL NOT NULL
+);
+
+-- Los pagos de cada suscripción se suman sólo desde el índice (sin leer las filas de Pago).
+-- Reemplaza a idx_pago_suscripcion.
+CREATE INDEX IF NOT EXISTS idx_pago_suscripcion_estado ON Pago(id_suscripcion, estado_pago, monto);
+DROP INDEX IF EXISTS idx_pago_suscripcion;
@@ -0,0 +1,10 @@
+-- 0014 — Registro de pagos idempotente
+-- Cada envío del formulario de pagos lleva una clave generada por el cliente.
+-- Un reenvío (doble clic, reintento) choca con el índice único y devuelve el
+-- id_pago original en vez de insertar otra fila. Los pagos anteriores quedan
+-- con clave NULL (el índice no las indexa).
+
+ALTER TABLE Pago ADD COLUMN clave_idempotencia VARCHAR(64);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_pago_clave_idempotencia
+    ON Pago(clave_idempotencia) WHERE clave_idempotencia IS NOT NULL;
@@ -0,0 +1,86 @@
+-- 0015 — Registro de cambios (CDC) de Socio, Suscripcion, Pago y Reserva (ver cambios.py)
+-- Los triggers anotan cada alta/modificación/borrado con un seq creciente; los
+-- sistemas externos leen desde su último seq en vez de releer las tablas.
+-- La compactación deja sólo el último cambio de cada fila y, pasada la
+-- retención, descarta también los borrados.
+
+CREATE TABLE IF NOT EXISTS Cambio (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    tabla TEXT NOT NULL,              -- 'Socio', 'Suscripcion', 'Pago' o 'Reserva'
+    id_fila INTEGER NOT NULL,
+    op TEXT NOT NULL,                 -- 'I' alta, 'U' modificación, 'D' borrado
+    momento INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now', 'localtime') AS INTEGER))
+);
+
+-- Cambios anteriores de la misma fila (compactación)
+CREATE INDEX IF NOT EXISTS idx_cambio_fila ON Cambio(tabla, id_fila);
+-- Borrados vencidos (sólo se indexan los 'D')
+CREATE INDEX IF NOT EXISTS idx_cambio_borrado ON Cambio(momento) WHERE op = 'D';
+
+-- compactado_hasta: último seq ya compactado; purgado_hasta: mayor seq de un
+-- borrado descartado (un lector con seq menor pudo perderlo y debe resincronizar)
+CREATE TABLE IF NOT EXISTS CambioEstado (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    compactado_hasta INTEGER NOT NULL,
+    purgado_hasta INTEGER NOT NULL
+);
+
+-- Las filas que ya existen entran como altas: leer desde seq 0 es una copia completa
+INSERT INTO Cambio (tabla, id_fila, op) SELECT 'Socio', id_socio, 'I' FROM Socio;
+INSERT INTO Cambio (tabla, id_fila, op) SELECT 'Suscripcion', id_suscripcion, 'I' FROM Suscripcion;
+INSERT INTO Cambio (tabla, id_fila, op) SELECT 'Pago', id_pago, 'I' FROM Pago;
+INSERT INTO Cambio (tabla, id_fila, op) SELECT 'Reserva', id_reserva, 'I' FROM Reserva;
+INSERT OR IGNORE INTO CambioEstado (id, compactado_hasta, purgado_hasta)
+SELECT 1, COALESCE(MAX(seq), 0), 0 FROM Cambio;
+
+CREATE TRIGGER IF NOT EXISTS trg_cambio_socio_ins AFTER INSERT ON Socio
+BEGIN
+    INSERT INTO Cambio (tabla, id_fila, op) VALUES ('Socio', NEW.id_socio, 'I');
+END;
+CREATE TRIGGER IF NOT EXISTS trg_cambio_socio_upd AFTER UPDATE ON Socio
+BEGIN
+    INSERT INTO Cambio (tabla, id_fila, op) VALUES ('Socio', NEW.id_socio, 'U');
+END;
+CREATE TRIGGER IF NOT EXISTS trg_cambio_socio_del AFTER DELETE ON Socio
+BEGIN
+    INSERT INTO Cambio (tabla, id_fila, op) VALUES ('Socio', OLD.id_socio, 'D');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cambio_suscripcion_ins AFTER INSERT ON Suscripcion
+BEGIN
+    INSERT INTO Cambio (tabla, id_fila, op) VALUES ('Suscripcion', NEW.id_suscripcion, 'I');
+END;
+CREATE TRIGGER IF NOT EXISTS trg_cambio_suscripcion_upd AFTER UPDATE ON Suscripcion
+BEGIN
+    INSERT INTO Cambio (tabla, id_fila, op) VALUES ('Suscripcion', NEW.id_suscripcion, 'U');
+END;
+CREATE TRIGGER IF NOT EXISTS trg_cambio_suscripcion_del AFTER DELETE ON Suscripcion
+BEGIN
+    INSERT INTO Cambio (tabla, id_fila, op) VALUES ('Suscripcion', OLD.id_suscripcion, 'D');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cambio_pago_ins AFTER INSERT ON Pago
+BEGIN
+    INSERT INTO Cambio (tabla, id_fila, op) VALUES ('Pago', NEW.id_pago, 'I');
+END;
+CREATE TRIGGER IF NOT EXISTS trg_cambio_pago_upd AFTER UPDATE ON Pago
+BEGIN
+    INSERT INTO Cambio (tabla, id_fila, op) VALUES ('Pago', NEW.id_pago, 'U');
+END;
+CREATE TRIGGER IF NOT EXISTS trg_cambio_pago_del AFTER DELETE ON Pago
+BEGIN
+    INSERT INTO Cambio (tabla, id_fila, op) VALUES ('Pago', OLD.id_pago, 'D');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cambio_reserva_ins AFTER INSERT ON Reserva
+BEGIN
+    INSERT INTO Cambio (tabla, id_fila, op) VALUES ('Reserva', NEW.id_reserva, 'I');
+END;
+CREATE TRIGGER IF NOT EXISTS trg_cambio_reserva_upd AFTER UPDATE ON Reserva
+BEGIN
+    INSERT INTO Cambio (tabla, id_fila, op) VALUES ('Reserva', NEW.id_reserva, 'U');
+END;
+CREATE TRIGGER IF NOT EXISTS trg_cambio_reserva_del AFTER DELETE ON Reserva
+BEGIN
+    INSERT INTO Cambio (tabla, id_fila, op) VALUES ('Reserva', OLD.id_reserva, 'D');
+END;
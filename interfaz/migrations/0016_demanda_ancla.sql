@@ -0,0 +1,7 @@
+-- 0016 — Pesos de DemandaCelda relativos a un ancla (ver demanda.py)
+-- Los peso_* pasan a ser 2^((inicio - ancla) / vida media), con el ancla en la
+-- medianoche de la última pasada: 2^(inicio / vida media) sobre el epoch absoluto
+-- se desborda a inf con vidas medias cortas. Con ancla NULL, la siguiente pasada
+-- reconstruye la matriz con la nueva escala.
+
+ALTER TABLE DemandaEstado ADD COLUMN ancla INTEGER;
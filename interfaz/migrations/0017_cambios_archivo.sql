@@ -0,0 +1,15 @@
+-- 0017 — Archivar clases no anota borrados de Reserva en Cambio (ver cambios.py)
+-- archivar_clases() borra las clases viejas y, en cascada, sus reservas: no son
+-- bajas sino filas que pasan al archivo. Mientras CambioEstado.archivando = 1
+-- (sólo dentro de la transacción de archivar_clases) el trigger de borrado de
+-- Reserva no anota nada; la misma transacción quita los cambios previos de esas
+-- reservas, así que leer desde seq 0 sigue entregando sólo las filas vivas.
+
+ALTER TABLE CambioEstado ADD COLUMN archivando INTEGER NOT NULL DEFAULT 0;
+
+DROP TRIGGER IF EXISTS trg_cambio_reserva_del;
+CREATE TRIGGER IF NOT EXISTS trg_cambio_reserva_del AFTER DELETE ON Reserva
+WHEN (SELECT archivando FROM CambioEstado WHERE id = 1) = 0
+BEGIN
+    INSERT INTO Cambio (tabla, id_fila, op) VALUES ('Reserva', OLD.id_reserva, 'D');
+END;
@@ -0,0 +1,7 @@
+-- 0018 — Contador de pasadas de retención (ver retencion._refrescar)
+-- Cada pasada guardada lo incrementa. Una pasada que calculó sobre una
+-- instantánea y encuentra otro valor al tomar el lock de escritura se descarta:
+-- otra ya aplicó esos pendientes (o unos más nuevos) y sumarlos de nuevo
+-- corrompería RetencionCohorte.
+
+ALTER TABLE RetencionEstado ADD COLUMN pasada INTEGER NOT NULL DEFAULT 0;
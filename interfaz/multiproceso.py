@@ -0,0 +1,126 @@
+# multiproceso.py — Lanza varios workers de Streamlit detrás de un proxy inverso local
+#
+#   python multiproceso.py --workers 4 --puerto-base 8601 --nginx gymlite_nginx.conf
+#   nginx -c "$(pwd)/gymlite_nginx.conf"      # publica la app en --puerto (8501)
+#
+# Streamlit ejecuta todas las sesiones en hilos de un mismo proceso, así que el
+# trabajo de CPU (bcrypt, pandas, Plotly) queda limitado a un núcleo por el GIL.
+# En este modo cada worker es un proceso aparte con su propio pool de lectura y
+# su camino de escritura (database.get_conn); la consistencia de los KPIs entre
+# workers la da la caché compartida '<db>_cache.db' (ver cache_compartido.py).
+from __future__ import annotations
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+AQUI = Path(__file__).resolve().parent
+
+_NGINX = """# Generado por multiproceso.py: {workers} workers de GymLite
+worker_processes auto;
+pid {pid};
+error_log {log}/gymlite_nginx_error.log;
+events {{ worker_connections 1024; }}
+http {{
+    access_log off;
+    map $http_upgrade $connection_upgrade {{ default upgrade; '' close; }}
+    upstream gymlite {{
+        # Afinidad por IP: la sesión de Streamlit vive en memoria del worker
+        ip_hash;
+{servidores}
+    }}
+    server {{
+        listen {host}:{puerto};
+        location / {{
+            proxy_pass http://gymlite;
+            proxy_http_version 1.1;
+            proxy_set_header Host $host;
+            proxy_set_header X-Forwarded-For $proxy_add_x_forwarded_for;
+            proxy_set_header Upgrade $http_upgrade;
+            proxy_set_header Connection $connection_upgrade;
+            proxy_read_timeout 86400;
+        }}
+    }}
+}}
+"""
+
+
+def config_nginx(puertos: List[int], host: str, puerto: int) -> str:
+    servidores = "\n".join(f"        server 127.0.0.1:{p};" for p in puertos)
+    return _NGINX.format(
+        workers=len(puertos), servidores=servidores, host=host, puerto=puerto,
+        pid=AQUI / "gymlite_nginx.pid", log=AQUI,
+    )
+
+
+def preparar_datos():
+    # Migraciones y semillas una sola vez, antes de que arranquen los workers
+    sys.path.insert(0, str(AQUI))
+    from auth_local import ensure_db
+    from database import ensure_full_schema, init_db_data
+    ensure_db(seed_admin=True)
+    ensure_full_schema()
+    init_db_data()
+
+
+def lanzar_worker(indice: int, puerto: int) -> subprocess.Popen:
+    env = dict(os.environ, GYMLITE_WORKER=str(indice))
+    return subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", str(AQUI / "app.py"),
+         "--server.port", str(puerto), "--server.address", "127.0.0.1",
+         "--server.headless", "true"],
+        cwd=AQUI, env=env,
+    )
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="GymLite en varios procesos detrás de un proxy inverso")
+    ap.add_argument("--workers", type=int, default=int(os.environ.get("GYMLITE_WORKERS", os.cpu_count() or 1)))
+    ap.add_argument("--puerto-base", type=int, default=8601, help="puerto del primer worker")
+    ap.add_argument("--host", default="0.0.0.0", help="interfaz donde escucha el proxy")
+    ap.add_argument("--puerto", type=int, default=8501, help="puerto público del proxy")
+    ap.add_argument("--nginx", metavar="ARCHIVO", help="escribe la configuración de nginx y sigue")
+    args = ap.parse_args(argv)
+
+    puertos = [args.puerto_base + i for i in range(max(1, args.workers))]
+    if args.nginx:
+        Path(args.nginx).write_text(config_nginx(puertos, args.host, args.puerto), encoding="utf-8")
+        print(f"Configuración de nginx escrita en {args.nginx}")
+
+    preparar_datos()
+    workers: Dict[int, subprocess.Popen] = {i: lanzar_worker(i, p) for i, p in enumerate(puertos)}
+    print(f"{len(workers)} workers en los puertos {puertos[0]}-{puertos[-1]}")
+
+    detener = False
+
+    def _terminar(*_):
+        nonlocal detener
+        detener = True
+
+    signal.signal(signal.SIGINT, _terminar)
+    signal.signal(signal.SIGTERM, _terminar)
+
+    # Supervisor: un worker que se cae se vuelve a lanzar en su mismo puerto
+    while not detener:
+        time.sleep(1)
+        for i, proc in list(workers.items()):
+            if proc.poll() is not None and not detener:
+                print(f"Worker {i} terminó con código {proc.returncode}; reiniciando")
+                workers[i] = lanzar_worker(i, puertos[i])
+
+    for proc in workers.values():
+        proc.terminate()
+    for proc in workers.values():
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,38 @@
+# page_loader.py — Carga diferida de las paginas (vistas) de GymLite
+from __future__ import annotations
+import importlib
+import time
+from typing import Callable
+
+# Las vistas viven en 'views'; en algunos setups pueden estar en 'pages'.
+PAGE_PACKAGES: tuple[str, ...] = ("views", "pages")
+
+# modulo de la vista -> milisegundos que tomo su primer import en este proceso.
+# Vive en un modulo importado (no en app.py) para sobrevivir a los reruns.
+IMPORT_TIMES_MS: dict[str, float] = {}
+
+
+def load_page_render(module_name: str) -> Callable[[], None]:
+    """
+    Importa la vista `module_name` la primera vez que se pide y devuelve su `render`.
+    Los imports pesados de cada vista (pandas, plotly) se pagan recien aqui,
+    no al mostrar la pantalla de login.
+    """
+    t0 = time.perf_counter()
+    last_error: ModuleNotFoundError | None = None
+    for package in PAGE_PACKAGES:
+        try:
+            module = importlib.import_module(f"{package}.{module_name}")
+            break
+        except ModuleNotFoundError as e:
+            # Solo se prueba el siguiente paquete si falta la vista misma,
+            # no si falta una dependencia de la vista (pandas, plotly, ...)
+            if e.name not in (package, f"{package}.{module_name}"):
+                raise
+            last_error = e
+    else:
+        raise last_error
+
+    if module_name not in IMPORT_TIMES_MS:
+        IMPORT_TIMES_MS[module_name] = (time.perf_counter() - t0) * 1000
+    return module.render
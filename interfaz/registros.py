@@ -0,0 +1,49 @@
+# registros.py — Registros tipados y compactos para los resultados de database.py
+from __future__ import annotations
+from collections import namedtuple
+
+
+def _get(self, campo, default=None):
+    # Mismo contrato que dict.get para que las vistas no tengan que cambiar.
+    # Sólo los campos: count, index, _fields... son atributos, no claves
+    return getattr(self, campo) if campo in self._fields else default
+
+
+def _getitem(self, clave):
+    # Acepta r["campo"] además del índice posicional de la tupla
+    if isinstance(clave, str):
+        if clave not in self._fields:
+            raise KeyError(clave)
+        return getattr(self, clave)
+    return tuple.__getitem__(self, clave)
+
+
+def _keys(self):
+    return self._fields
+
+
+def registro(nombre: str, campos: str):
+    """
+    Crea un tipo de registro respaldado por una tupla (namedtuple con __slots__ vacío):
+    sin __dict__ por fila, mucho más liviano que un dict. Soporta r.campo,
+    r["campo"], r.get("campo") y dict(r._asdict()).
+    """
+    base = namedtuple(nombre, campos)
+    return type(nombre, (base,), {
+        "__slots__": (),
+        "get": _get,
+        "__getitem__": _getitem,
+        "keys": _keys,
+    })
+
+
+# Los nombres de campo coinciden con las columnas/alias de las consultas de database.py
+Socio = registro("Socio", "id_socio RUT nombre apellido_p apellido_m telefono direccion fecha_nac")
+Clase = registro(
+    "Clase",
+    "id_clase nombre tipo_clase entrenador fecha_hora duracion_min descripcion cupo_max cupos_disponibles",
+)
+Pago = registro("Pago", "id_pago RUT nombre_socio nombre_plan fecha_pago monto metodo_pago estado_pago")
+Plan = registro("Plan", "id_plan nombre_plan duracion_meses precio")
+Entrenador = registro("Entrenador", "id_entrenador RUT nombre apellido telefono fecha_nac especialidad")
+Tipo = registro("Tipo", "id_tipo nombre descripcion")
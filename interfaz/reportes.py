@@ -0,0 +1,268 @@
+# reportes.py — Reportes pesados en un pool de procesos, con estado y caché de resultados
+#
+# Los reportes (DataFrames grandes, desgloses, exportaciones CSV, JSON de los
+# gráficos) se calculan en procesos aparte con ProcessPoolExecutor: el hilo del
+# script de Streamlit sólo encola el trabajo y muestra el resultado cuando está
+# listo, sin congelar la sesión ni retener el GIL que comparten los demás usuarios.
+#
+#   id_trabajo = reportes.enviar("historial_pagos", limite=100)
+#   df = reportes.resultado_o_espera(id_trabajo, "Cargando historial...")
+#   ...
+#   reportes.sondear()   # al final de render(): rerun mientras haya pendientes
+from __future__ import annotations
+import json
+import multiprocessing as mp
+import os
+import sys
+import threading
+import time
+import types
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FuturesTimeout
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional
+
+import database
+
+REPORTES_WORKERS = int(os.environ.get("GYMLITE_REPORTES_WORKERS", "2"))
+REPORTES_CACHE = int(os.environ.get("GYMLITE_REPORTES_CACHE", "32"))       # resultados recordados
+REPORTES_TTL = int(os.environ.get("GYMLITE_REPORTES_TTL", "300"))          # segundos
+ESPERA_INICIAL = 0.5     # segundos que se espera antes de mostrar "generando..."
+INTERVALO_SONDEO = 0.7   # segundos entre reruns mientras haya reportes pendientes
+
+
+# ============================================================
+# REPORTES (se ejecutan en el proceso hijo)
+# ============================================================
+
+def _historial_pagos(limite: int = 100, metodos=None, desde=None, hasta=None) -> Dict[str, Any]:
+    import pandas as pd
+    df = pd.DataFrame(
+        database.get_historial_pagos_columnas(limit=limite, metodos=metodos, desde=desde, hasta=hasta),
+        copy=False,
+    )
+    if not len(df):
+        return {"df": df, "kpis": None, "desglose": None}
+    desglose = (
+        df.groupby("metodo_pago")["monto"]
+        .agg(total="sum", cantidad="count")
+        .reset_index()
+        .rename(columns={"metodo_pago": "Metodo", "total": "Total", "cantidad": "Cantidad"})
+    )
+    kpis = {
+        "total_pagos": len(df),
+        "total_monto": float(df["monto"].sum()),
+        "promedio": float(df["monto"].mean()),
+        "metodo_top": df["metodo_pago"].mode()[0],
+    }
+    return {"df": df, "kpis": kpis, "desglose": desglose}
+
+
+def _exportar_pagos(metodos=None, desde=None, hasta=None) -> Dict[str, Any]:
+    import pandas as pd
+    df = pd.DataFrame(
+        database.get_historial_pagos_columnas(limit=None, metodos=metodos, desde=desde, hasta=hasta),
+        copy=False,
+    )
+    return {"filas": len(df), "csv": df.to_csv(index=False).encode("utf-8")}
+
+
+def _graficos_dashboard() -> List[str]:
+    # JSON listo para plotly.io.from_json: se arma el figure (pandas + plotly
+    # express) y se serializa aquí, el proceso de Streamlit sólo lo dibuja
+    import plotly.io as pio
+    from views import dashboard
+    return [
+        pio.to_json(crear(), validate=False)
+        for crear in (dashboard.create_clases_by_type_chart, dashboard.create_payment_methods_chart,
+                      dashboard.create_reservations_trend_chart)
+    ]
+
+
+REPORTES: Dict[str, Callable[..., Any]] = {
+    "historial_pagos": _historial_pagos,
+    "exportar_pagos": _exportar_pagos,
+    "graficos_dashboard": _graficos_dashboard,
+}
+
+
+def _ejecutar(ruta_db: str, tipo: str, params: Dict[str, Any]):
+    # Punto de entrada en el hijo: los procesos del pool se reutilizan entre DBs
+    if database.current_db_path() != ruta_db:
+        database.set_db_path(ruta_db)
+    return REPORTES[tipo](**params)
+
+
+# ============================================================
+# TRABAJOS (proceso de Streamlit)
+# ============================================================
+
+class Trabajo:
+    """Un reporte encolado: estado derivado del Future y momento de término."""
+    __slots__ = ("id", "tipo", "future", "creado", "terminado")
+
+    def __init__(self, id_trabajo: str, tipo: str, future: Future):
+        self.id = id_trabajo
+        self.tipo = tipo
+        self.future = future
+        self.creado = time.time()
+        self.terminado: Optional[float] = None
+        future.add_done_callback(self._marcar)
+
+    def _marcar(self, _future):
+        self.terminado = time.time()
+
+    @property
+    def estado(self) -> str:
+        if self.future.cancelled():
+            return "cancelado"
+        if not self.future.done():
+            return "en_curso" if self.future.running() else "pendiente"
+        return "error" if self.future.exception() is not None else "listo"
+
+    @property
+    def duracion(self) -> Optional[float]:
+        return None if self.terminado is None else self.terminado - self.creado
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_trabajos: "OrderedDict[str, Trabajo]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def _listo() -> int:
+    return os.getpid()
+
+
+def _executor() -> ProcessPoolExecutor:
+    # Se llama con _lock tomado
+    global _pool
+    if _pool is None:
+        # spawn: el proceso de Streamlit tiene hilos y conexiones SQLite abiertas
+        n = max(1, REPORTES_WORKERS)
+        pool = ProcessPoolExecutor(max_workers=n, mp_context=mp.get_context("spawn"))
+        # Con spawn el pool crea un hijo por submit() hasta completar max_workers:
+        # se lanzan todos aquí, una sola vez, con tareas vacías seguidas (un hijo
+        # tarda más en arrancar que estos submit en encolarse). Después ningún
+        # submit() crea procesos y __main__ no se vuelve a tocar.
+        with _sin_main():
+            arranque = [pool.submit(_listo) for _ in range(n)]
+        for f in arranque:
+            f.result()
+        _pool = pool
+    return _pool
+
+
+@contextmanager
+def _sin_main():
+    # Streamlit registra el script (app.py) como __main__ y spawn lo volvería a
+    # ejecutar en cada hijo nuevo: sólo mientras se lanzan los hijos (una vez
+    # por pool, en _executor) se expone un __main__ vacío.
+    main = sys.modules.get("__main__")
+    sys.modules["__main__"] = types.ModuleType("__main__")
+    try:
+        yield
+    finally:
+        sys.modules["__main__"] = main
+
+
+def _clave(tipo: str, params: Dict[str, Any]) -> str:
+    # La generación de datos de la caché compartida cambia con cada escritura:
+    # un reporte nunca se reutiliza después de que cambiaron los datos
+    return json.dumps(
+        [tipo, params, database.current_db_path(), database.cache_compartida().generacion()],
+        sort_keys=True, default=str,
+    )
+
+
+def _vigente(t: Trabajo) -> bool:
+    if t.estado in ("error", "cancelado"):
+        return False
+    return t.terminado is None or time.time() - t.terminado < REPORTES_TTL
+
+
+def enviar(tipo: str, **params) -> str:
+    """
+    Encola el reporte `tipo` con `params` y devuelve su id. Si ya hay uno igual
+    en curso o un resultado vigente (mismos parámetros y datos), se reutiliza.
+    """
+    global _pool
+    if tipo not in REPORTES:
+        raise ValueError(f"Reporte desconocido: {tipo}")
+    id_trabajo = _clave(tipo, params)
+    with _lock:
+        t = _trabajos.get(id_trabajo)
+        if t is not None and _vigente(t):
+            _trabajos.move_to_end(id_trabajo)
+            return id_trabajo
+        try:
+            future = _executor().submit(_ejecutar, database.current_db_path(), tipo, params)
+        except BrokenProcessPool:
+            # Un hijo murió (p.ej. sin memoria): se descarta el pool y se crea otro
+            _pool = None
+            future = _executor().submit(_ejecutar, database.current_db_path(), tipo, params)
+        _trabajos[id_trabajo] = Trabajo(id_trabajo, tipo, future)
+        _trabajos.move_to_end(id_trabajo)
+        while len(_trabajos) > REPORTES_CACHE:
+            _, viejo = _trabajos.popitem(last=False)
+            viejo.future.cancel()
+    return id_trabajo
+
+
+def trabajo(id_trabajo: str) -> Optional[Trabajo]:
+    return _trabajos.get(id_trabajo)
+
+
+def estado(id_trabajo: str) -> str:
+    t = _trabajos.get(id_trabajo)
+    return t.estado if t is not None else "desconocido"
+
+
+def resultado(id_trabajo: str, timeout: Optional[float] = 0) -> Any:
+    """Resultado del trabajo; espera hasta `timeout` segundos (None = sin límite)."""
+    t = _trabajos.get(id_trabajo)
+    if t is None:
+        raise KeyError(id_trabajo)
+    return t.future.result(timeout=timeout)
+
+
+def resumen() -> List[Dict[str, Any]]:
+    """Estado de los trabajos recordados (más reciente primero)."""
+    return [
+        {"tipo": t.tipo, "estado": t.estado, "duracion_s": t.duracion}
+        for t in reversed(list(_trabajos.values()))
+    ]
+
+
+# ============================================================
+# UI: esperar sin bloquear la sesión
+# ============================================================
+
+def resultado_o_espera(id_trabajo: str, mensaje: str = "Generando reporte...") -> Any:
+    """
+    Devuelve el resultado si el reporte termina dentro de ESPERA_INICIAL; si no,
+    muestra `mensaje`, marca la sesión para sondear y devuelve None.
+    Si el reporte falló muestra el error y devuelve None.
+    """
+    import streamlit as st
+    t = _trabajos.get(id_trabajo)
+    if t is None:
+        return None
+    try:
+        return t.future.result(timeout=ESPERA_INICIAL)
+    except FuturesTimeout:
+        st.info(f"⏳ {mensaje}")
+        st.session_state["reportes_pendientes"] = True
+        return None
+    except Exception as e:
+        st.error(f"❌ No se pudo generar el reporte: {e}")
+        return None
+
+
+def sondear(intervalo: float = INTERVALO_SONDEO):
+    """Al final de render(): si quedó algún reporte pendiente, vuelve a ejecutar el script."""
+    import streamlit as st
+    if st.session_state.pop("reportes_pendientes", False):
+        time.sleep(intervalo)
+        st.rerun()
@@ -0,0 +1,418 @@
+# retencion.py — Retención por cohortes, bajas por plan y desfase de renovación
+#
+# Las métricas viven precalculadas en tablas (migración 0011) y las vistas sólo
+# las leen:
+# - RetencionCohorte: por mes de alta (cohorte) y plan de entrada, cuántos socios
+#   tienen una suscripción vigente 0, 1, 2... meses después del alta.
+# - RetencionVencimiento: por mes de vencimiento y plan, cuántas suscripciones se
+#   renovaron, cuántas fueron baja y cuántas siguen pendientes, y los días entre
+#   el vencimiento y la renovación.
+# reconstruir() lo recalcula todo con NumPy/pandas. actualizar() (tarea periódica
+# de mantenimiento.py) procesa sólo los cambios en Suscripcion que los triggers
+# dejan en RetencionPendiente: a la matriz le resta lo que aportaba cada socio
+# modificado (RetencionSocio.meses) y le suma lo que aporta ahora, y recalcula los
+# meses de vencimiento tocados. Al cambiar el mes reconstruye, porque todas las
+# cohortes suman una columna.
+#
+# Definiciones (las suscripciones canceladas no cuentan):
+# - cohorte: mes de la primera suscripción del socio; plan: el de esa suscripción
+# - activo en un mes: alguna suscripción con fecha_inicio..fecha_fin dentro del mes
+# - renovada: la siguiente suscripción del socio empieza a más tardar GRACIA_DIAS
+#   días después del vencimiento (anticipada si empieza antes o el mismo día)
+# - baja: no renovada y ya pasaron los GRACIA_DIAS; pendiente: todavía no se sabe
+from __future__ import annotations
+import json
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import consultas
+import database
+
+GRACIA_DIAS = int(os.environ.get("GYMLITE_RETENCION_GRACIA", "30"))
+
+_COLUMNAS = ["id_suscripcion", "id_socio", "id_plan", "ini", "fin"]
+_SELECT_SUSCRIPCIONES = """
+    SELECT s.id_suscripcion, s.id_socio, s.id_plan,
+           CAST(strftime('%s', s.fecha_inicio) AS INTEGER) AS ini, s.fecha_fin_epoch AS fin
+    FROM Suscripcion s
+"""
+
+
+# ============================================================
+# MESES: índice entero (meses desde 1970-01) <-> 'YYYY-MM'
+# ============================================================
+
+def _meses(epochs) -> np.ndarray:
+    return np.asarray(epochs, dtype="int64").astype("datetime64[s]").astype("datetime64[M]").astype("int64")
+
+def _mes(epoch: int) -> int:
+    return int(_meses([epoch])[0])
+
+def _texto_mes(m: int) -> str:
+    return f"{1970 + m // 12:04d}-{m % 12 + 1:02d}"
+
+def _indice_mes(texto: str) -> int:
+    return (int(texto[:4]) - 1970) * 12 + int(texto[5:7]) - 1
+
+def _inicio_mes(m: int) -> int:
+    return int(np.datetime64(int(m), "M").astype("datetime64[s]").astype("int64"))
+
+
+# ============================================================
+# CÁLCULO (vectorizado)
+# ============================================================
+
+def _marco(filas: Iterable) -> pd.DataFrame:
+    # Una fila por suscripción, ordenadas por socio e inicio (la "siguiente" es la fila de abajo)
+    df = pd.DataFrame.from_records([tuple(f) for f in filas], columns=_COLUMNAS)
+    df = df.dropna().astype("int64").drop_duplicates("id_suscripcion")
+    return df.sort_values(["id_socio", "ini", "id_suscripcion"], ignore_index=True)
+
+def _rangos(largo: np.ndarray) -> np.ndarray:
+    # Posición dentro de cada tramo al concatenar tramos de `largo` elementos: 0..n-1, 0..m-1, ...
+    return np.arange(largo.sum()) - np.repeat(np.cumsum(largo) - largo, largo)
+
+def _socios(df: pd.DataFrame, mes_hoy: int) -> pd.DataFrame:
+    """
+    (id_socio, cohorte, id_plan, meses) de cada socio de df: cohorte y plan de su
+    primera suscripción y `meses`, texto '1'/'0' con un carácter por mes desde el
+    alta hasta el mes actual ('1' = tuvo una suscripción vigente ese mes).
+    """
+    primera = df.drop_duplicates("id_socio")
+    ids = primera["id_socio"].to_numpy()
+    cohorte = _meses(primera["ini"])
+    edad = np.clip(mes_hoy - cohorte + 1, 0, None)
+
+    # Cada suscripción marca los meses que cubre, contados desde el alta del socio
+    fila = np.searchsorted(ids, df["id_socio"].to_numpy())
+    desde = _meses(df["ini"]) - cohorte[fila]
+    largo = np.clip(np.minimum(_meses(df["fin"]), mes_hoy) - cohorte[fila] - desde + 1, 0, None)
+    ancho = max(int(edad.max(initial=0)), 1)
+    bits = np.full((len(ids), ancho), ord("0"), dtype=np.uint8)
+    bits[np.repeat(fila, largo), np.repeat(desde, largo) + _rangos(largo)] = ord("1")
+    meses = [b[:e].decode() for b, e in zip(bits.view(f"S{ancho}").ravel(), edad)]
+    return pd.DataFrame({"id_socio": ids, "cohorte": cohorte, "id_plan": primera["id_plan"].to_numpy(), "meses": meses})
+
+def _aportes(socios: pd.DataFrame, signo: int = 1) -> pd.DataFrame:
+    """Filas (cohorte, id_plan, mes, activos) que suman `socios` a la matriz (todos los meses, también en 0)."""
+    largo = np.fromiter(map(len, socios["meses"]), dtype="int64", count=len(socios))
+    activos = np.frombuffer("".join(socios["meses"]).encode(), dtype=np.uint8) == ord("1")
+    filas = pd.DataFrame({
+        "cohorte": np.repeat(socios["cohorte"].to_numpy(dtype="int64"), largo),
+        "id_plan": np.repeat(socios["id_plan"].to_numpy(dtype="int64"), largo),
+        "mes": _rangos(largo),
+        "activos": activos.astype("int64") * signo,
+    })
+    return filas.groupby(["cohorte", "id_plan", "mes"], as_index=False)["activos"].sum()
+
+def _siguientes(df: pd.DataFrame) -> pd.DataFrame:
+    """(id_plan, fin, siguiente) de cada suscripción de df: siguiente = inicio de la que viene después (NaN si no hay)."""
+    return pd.DataFrame({
+        "id_plan": df["id_plan"].to_numpy(),
+        "fin": df["fin"].to_numpy(),
+        "siguiente": df.groupby("id_socio")["ini"].shift(-1).to_numpy(dtype="float64"),
+    })
+
+def _vencimientos(v: pd.DataFrame, hoy: int) -> pd.DataFrame:
+    """Filas de RetencionVencimiento (por mes de vencimiento y plan) de las suscripciones de v hasta el mes actual."""
+    gracia = GRACIA_DIAS * database.DIA
+    fin = v["fin"].to_numpy(dtype="int64")
+    desfase = v["siguiente"].to_numpy(dtype="float64") - fin
+    renovada = desfase <= gracia           # NaN (sin siguiente) compara False
+    baja = ~renovada & (fin + gracia < hoy)
+    m_fin = _meses(fin)
+    v = pd.DataFrame({
+        "mes": m_fin, "id_plan": v["id_plan"].to_numpy(dtype="int64"),
+        "vencidas": 1, "renovadas": renovada, "bajas": baja, "pendientes": ~renovada & ~baja,
+        "anticipadas": renovada & (desfase <= 0),
+        "dias_renovacion": np.where(renovada, np.floor_divide(np.nan_to_num(desfase), database.DIA), 0),
+    })[m_fin <= _mes(hoy)]
+    return v.groupby(["mes", "id_plan"], as_index=False).sum().astype("int64")
+
+
+# ============================================================
+# LECTURAS DE ORIGEN
+# ============================================================
+
+consultas.registrar("retencion.suscripciones", _SELECT_SUSCRIPCIONES + """
+    WHERE s.estado_sus <> 'cancelada'
+""")
+consultas.registrar("retencion.suscripciones_de_socios", _SELECT_SUSCRIPCIONES + """
+    WHERE s.estado_sus <> 'cancelada'
+      AND s.id_socio IN (SELECT value FROM json_each(:socios))
+""")
+# Suscripciones que vencen en los rangos [desde, hasta) de :rangos, con el inicio
+# de la siguiente del socio (mismo orden que _marco: inicio y luego id)
+consultas.registrar("retencion.vencimientos_en", """
+    SELECT s.id_plan, s.fecha_fin_epoch AS fin, (
+        SELECT CAST(strftime('%s', n.fecha_inicio) AS INTEGER) FROM Suscripcion n
+        WHERE n.id_socio = s.id_socio AND n.estado_sus <> 'cancelada'
+          AND (n.fecha_inicio, n.id_suscripcion) > (s.fecha_inicio, s.id_suscripcion)
+        ORDER BY n.fecha_inicio, n.id_suscripcion LIMIT 1
+    ) AS siguiente
+    FROM json_each(:rangos) r
+    JOIN Suscripcion s ON s.fecha_fin_epoch >= r.value ->> 0 AND s.fecha_fin_epoch < r.value ->> 1
+    WHERE s.estado_sus <> 'cancelada'
+""")
+consultas.registrar("retencion.pendientes", "SELECT seq, id_socio, mes FROM RetencionPendiente ORDER BY seq")
+consultas.registrar("retencion.max_pendiente", "SELECT COALESCE(MAX(seq), 0) FROM RetencionPendiente")
+consultas.registrar("retencion.socios", """
+    SELECT id_socio, cohorte, id_plan, meses FROM RetencionSocio
+    WHERE id_socio IN (SELECT value FROM json_each(:socios))
+""")
+consultas.registrar("retencion.estado", """
+    SELECT hoy, actualizado, modo, duracion_ms, pasada FROM RetencionEstado WHERE id = 1
+""")
+
+
+def _calcular_todo(c, hoy: int) -> Dict:
+    df = _marco(consultas.todas(c, "retencion.suscripciones"))
+    socios = _socios(df, _mes(hoy))
+    return {
+        "modo": "completa",
+        "hasta_seq": consultas.una(c, "retencion.max_pendiente")[0],
+        "cambios": len(socios),
+        "socios": None, "filas_socios": socios, "matriz": _aportes(socios),
+        "meses": None, "vencimientos": _vencimientos(_siguientes(df), hoy),
+    }
+
+def _calcular_cambios(c, hoy: int, hoy_previo: int) -> Optional[Dict]:
+    pendientes = consultas.todas(c, "retencion.pendientes")
+    if not pendientes and hoy == hoy_previo:
+        return None
+    mes_hoy = _mes(hoy)
+    socios = sorted({r["id_socio"] for r in pendientes})
+    lista = json.dumps(socios)
+
+    # Matriz: se resta lo que aportaba cada socio modificado y se suma lo que aporta ahora
+    propias = _marco(consultas.todas(c, "retencion.suscripciones_de_socios", {"socios": lista}))
+    nuevas = _socios(propias, mes_hoy)
+    previas = pd.DataFrame.from_records(
+        [tuple(r) for r in consultas.todas(c, "retencion.socios", {"socios": lista})],
+        columns=["id_socio", "cohorte", "id_plan", "meses"],
+    )
+    previas["cohorte"] = previas["cohorte"].map(_indice_mes)
+    delta = pd.concat([_aportes(nuevas), _aportes(previas, -1)])
+    delta = delta.groupby(["cohorte", "id_plan", "mes"], as_index=False)["activos"].sum()
+
+    # Vencimientos: los meses que anotaron los triggers (el de la suscripción y el
+    # de la anterior del socio) y, si cambió el día, los que salen del período de gracia
+    meses = {_indice_mes(r["mes"]) for r in pendientes}
+    if hoy != hoy_previo:
+        gracia = GRACIA_DIAS * database.DIA
+        meses.update(range(_mes(hoy_previo - gracia), _mes(hoy - gracia) + 1))
+    meses = {m for m in meses if m <= mes_hoy}
+    rangos = json.dumps([[_inicio_mes(m), _inicio_mes(m + 1)] for m in sorted(meses)])
+    vencimientos = _vencimientos(pd.DataFrame.from_records(
+        [tuple(r) for r in consultas.todas(c, "retencion.vencimientos_en", {"rangos": rangos})],
+        columns=["id_plan", "fin", "siguiente"],
+    ), hoy)
+
+    return {
+        "modo": "incremental",
+        "hasta_seq": pendientes[-1]["seq"] if pendientes else 0,
+        "cambios": len(pendientes),
+        "socios": socios, "filas_socios": nuevas, "matriz": delta,
+        "meses": meses, "vencimientos": vencimientos,
+    }
+
+
+# ============================================================
+# ESCRITURA
+# ============================================================
+
+def _en_lista(campo: str) -> str:
+    return f"{campo} IN (SELECT value FROM json_each(?))"
+
+consultas.registrar("retencion.borrar_socios", "DELETE FROM RetencionSocio")
+consultas.registrar("retencion.borrar_socios_de", "DELETE FROM RetencionSocio WHERE " + _en_lista("id_socio"))
+consultas.registrar("retencion.insertar_socio", """
+    INSERT INTO RetencionSocio (id_socio, cohorte, id_plan, meses) VALUES (?, ?, ?, ?)
+""")
+consultas.registrar("retencion.borrar_matriz", "DELETE FROM RetencionCohorte")
+consultas.registrar("retencion.insertar_matriz", """
+    INSERT INTO RetencionCohorte (cohorte, id_plan, mes, activos) VALUES (?, ?, ?, ?)
+""")
+consultas.registrar("retencion.sumar_matriz", """
+    INSERT INTO RetencionCohorte (cohorte, id_plan, mes, activos) VALUES (?, ?, ?, ?)
+    ON CONFLICT (cohorte, id_plan, mes) DO UPDATE SET activos = activos + excluded.activos
+""")
+# Cohortes (por plan) que se quedaron sin socios
+consultas.registrar("retencion.limpiar_matriz", """
+    DELETE FROM RetencionCohorte
+    WHERE (cohorte, id_plan) IN (SELECT cohorte, id_plan FROM RetencionCohorte WHERE mes = 0 AND activos = 0)
+""")
+consultas.registrar("retencion.borrar_vencimientos", "DELETE FROM RetencionVencimiento")
+consultas.registrar("retencion.borrar_vencimientos_de", "DELETE FROM RetencionVencimiento WHERE " + _en_lista("mes"))
+consultas.registrar("retencion.insertar_vencimiento", """
+    INSERT INTO RetencionVencimiento
+        (mes, id_plan, vencidas, renovadas, bajas, pendientes, anticipadas, dias_renovacion)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+""")
+consultas.registrar("retencion.borrar_pendientes", "DELETE FROM RetencionPendiente WHERE seq <= ?")
+consultas.registrar("retencion.guardar_estado", """
+    INSERT OR REPLACE INTO RetencionEstado (id, hoy, actualizado, modo, duracion_ms, pasada)
+    VALUES (1, ?, DATETIME('now', 'localtime'), ?, ?,
+            COALESCE((SELECT pasada FROM RetencionEstado WHERE id = 1), 0) + 1)
+""")
+
+def _filas(df: pd.DataFrame, columnas_mes: Tuple[str, ...] = ()) -> List[tuple]:
+    # Tuplas de int de Python (sqlite3 no acepta numpy.int64) con los meses en texto
+    datos = [df[col].map(_texto_mes) if col in columnas_mes else df[col].astype(object) for col in df.columns]
+    return list(zip(*datos))
+
+def _guardar(c, r: Dict, hoy: int, duracion_ms: float):
+    if r["modo"] == "completa":
+        consultas.ejecutar(c, "retencion.borrar_socios")
+        consultas.ejecutar(c, "retencion.borrar_matriz")
+        consultas.ejecutar(c, "retencion.borrar_vencimientos")
+        consultas.ejecutar_muchos(c, "retencion.insertar_matriz", _filas(r["matriz"], ("cohorte",)))
+    else:
+        consultas.ejecutar(c, "retencion.borrar_socios_de", (json.dumps(r["socios"]),))
+        consultas.ejecutar(c, "retencion.borrar_vencimientos_de",
+                           (json.dumps([_texto_mes(m) for m in sorted(r["meses"])]),))
+        consultas.ejecutar_muchos(c, "retencion.sumar_matriz", _filas(r["matriz"], ("cohorte",)))
+        consultas.ejecutar(c, "retencion.limpiar_matriz")
+    consultas.ejecutar_muchos(c, "retencion.insertar_socio", _filas(r["filas_socios"], ("cohorte",)))
+    consultas.ejecutar_muchos(c, "retencion.insertar_vencimiento", _filas(r["vencimientos"], ("mes",)))
+    consultas.ejecutar(c, "retencion.borrar_pendientes", (r["hasta_seq"],))
+    consultas.ejecutar(c, "retencion.guardar_estado", (hoy, r["modo"], duracion_ms))
+
+
+def _refrescar(completa: bool) -> Tuple[bool, int, Optional[str]]:
+    t0 = time.perf_counter()
+    hoy = database._hoy_epoch()
+    try:
+        # Todas las lecturas en una misma instantánea; el lock de escritura sólo
+        # se toma para reemplazar las filas ya calculadas
+        with database.get_read_conn() as c:
+            c.execute("BEGIN")
+            try:
+                estado = consultas.una(c, "retencion.estado")
+                if completa or estado is None or _mes(estado["hoy"]) != _mes(hoy):
+                    r = _calcular_todo(c, hoy)
+                else:
+                    r = _calcular_cambios(c, hoy, estado["hoy"])
+            finally:
+                c.execute("COMMIT")
+        if r is None:
+            return True, 0, None
+        with database.get_conn() as c:
+            c.execute("BEGIN IMMEDIATE")
+            try:
+                # Otra pasada guardó mientras se calculaba (mismos pendientes o una
+                # instantánea más nueva): aplicar este resultado los contaría dos veces
+                actual = consultas.una(c, "retencion.estado")
+                if (actual["pasada"] if actual else None) != (estado["pasada"] if estado else None):
+                    c.execute("ROLLBACK")
+                    return True, 0, None
+                _guardar(c, r, hoy, (time.perf_counter() - t0) * 1000)
+                c.execute("COMMIT")
+            except Exception:
+                c.execute("ROLLBACK")
+                raise
+        return True, r["cambios"], None
+    except Exception as e:
+        print(f"Error al actualizar la retención: {e}")
+        return False, 0, str(e)
+
+def actualizar() -> Tuple[bool, int, Optional[str]]:
+    """
+    Aplica a las tablas de retención los cambios pendientes de Suscripcion
+    (reconstruye si nunca se calcularon o cambió el mes).
+    Devuelve (ok, cambios_procesados, error).
+    """
+    return _refrescar(completa=False)
+
+def reconstruir() -> Tuple[bool, int, Optional[str]]:
+    """Recalcula todas las tablas de retención. Devuelve (ok, socios, error)."""
+    return _refrescar(completa=True)
+
+
+# ============================================================
+# LECTURAS (dashboard)
+# ============================================================
+
+consultas.registrar("retencion.matriz", """
+    SELECT k.cohorte, k.mes, SUM(b.activos) AS socios, SUM(k.activos) AS activos
+    FROM RetencionCohorte k
+    JOIN RetencionCohorte b ON b.cohorte = k.cohorte AND b.id_plan = k.id_plan AND b.mes = 0
+    WHERE k.cohorte >= :desde AND (:id_plan IS NULL OR k.id_plan = :id_plan)
+    GROUP BY k.cohorte, k.mes
+    ORDER BY k.cohorte, k.mes
+""")
+consultas.registrar("retencion.vencimientos", """
+    SELECT v.mes, v.id_plan, COALESCE(p.nombre_plan, 'Plan ' || v.id_plan) AS nombre_plan,
+           v.vencidas, v.renovadas, v.bajas, v.pendientes, v.anticipadas, v.dias_renovacion
+    FROM RetencionVencimiento v
+    LEFT JOIN Plan p ON p.id_plan = v.id_plan
+    WHERE v.mes >= ?
+    ORDER BY v.mes DESC, nombre_plan
+""")
+consultas.registrar("retencion.totales_vencimientos", """
+    SELECT COALESCE(SUM(vencidas), 0) AS vencidas, COALESCE(SUM(renovadas), 0) AS renovadas,
+           COALESCE(SUM(bajas), 0) AS bajas, COALESCE(SUM(pendientes), 0) AS pendientes,
+           COALESCE(SUM(anticipadas), 0) AS anticipadas, COALESCE(SUM(dias_renovacion), 0) AS dias_renovacion
+    FROM RetencionVencimiento
+    WHERE mes >= ?
+""")
+consultas.registrar("retencion.tasas", """
+    SELECT k.mes, SUM(k.activos) AS activos, SUM(b.activos) AS socios
+    FROM RetencionCohorte k
+    JOIN RetencionCohorte b ON b.cohorte = k.cohorte AND b.id_plan = k.id_plan AND b.mes = 0
+    WHERE k.mes IN (1, 3, 6, 12) AND k.cohorte >= ?
+    GROUP BY k.mes
+""")
+
+def _pct(parte, total) -> Optional[float]:
+    return parte * 100.0 / total if total else None
+
+def _desde(meses: int) -> str:
+    return _texto_mes(_mes(database._hoy_epoch()) - max(1, int(meses)) + 1)
+
+def matriz_retencion(meses: int = 12, id_plan: Optional[int] = None) -> List[Dict]:
+    """
+    Cohortes de los últimos `meses` meses: filas (cohorte, mes, socios, activos, tasa)
+    con mes = meses desde el alta y tasa = % de la cohorte aún activo.
+    """
+    with database.get_read_conn() as c:
+        filas = consultas.todas(c, "retencion.matriz", {"desde": _desde(meses), "id_plan": id_plan})
+    return [{**dict(r), "tasa": _pct(r["activos"], r["socios"])} for r in filas]
+
+def vencimientos_por_plan(meses: int = 12) -> List[Dict]:
+    """
+    Vencimientos de los últimos `meses` meses por mes y plan, con tasa_baja
+    (% de bajas entre las ya resueltas) y dias_renovacion promedio.
+    """
+    with database.get_read_conn() as c:
+        filas = consultas.todas(c, "retencion.vencimientos", (_desde(meses),))
+    return [
+        {**dict(r), "tasa_baja": _pct(r["bajas"], r["renovadas"] + r["bajas"]),
+         "dias_renovacion": r["dias_renovacion"] / r["renovadas"] if r["renovadas"] else None}
+        for r in filas
+    ]
+
+def resumen_retencion(meses: int = 3) -> Dict:
+    """
+    Indicadores para el dashboard: tasa de bajas y desfase promedio de renovación
+    de los últimos `meses` meses, retención a 1/3/6/12 meses de las cohortes de
+    los últimos dos años y la fecha de la última actualización (None si nunca se calculó).
+    """
+    with database.get_read_conn() as c:
+        t = consultas.una(c, "retencion.totales_vencimientos", (_desde(meses),))
+        tasas = {r["mes"]: _pct(r["activos"], r["socios"]) for r in consultas.todas(c, "retencion.tasas", (_desde(24),))}
+        estado = consultas.una(c, "retencion.estado")
+    return {
+        "vencidas": t["vencidas"], "renovadas": t["renovadas"], "bajas": t["bajas"], "pendientes": t["pendientes"],
+        "tasa_baja": _pct(t["bajas"], t["renovadas"] + t["bajas"]),
+        "tasa_anticipadas": _pct(t["anticipadas"], t["renovadas"]),
+        "dias_renovacion": t["dias_renovacion"] / t["renovadas"] if t["renovadas"] else None,
+        **{f"retencion_{m}": tasas.get(m) for m in (1, 3, 6, 12)},
+        "actualizado": estado["actualizado"] if estado else None,
+        "modo": estado["modo"] if estado else None,
+        "duracion_ms": estado["duracion_ms"] if estado else None,
+    }
@@ -0,0 +1,130 @@
+# selector_socios.py — Índice en memoria de socios y selector compartido por las vistas
+from __future__ import annotations
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple
+
+import streamlit as st
+
+from database import current_db_path, get_all_socios, socios_version
+
+LIMITE_RESULTADOS = 50      # opciones máximas que se envían al navegador
+_PREFIJOS_CACHE = 256       # búsquedas recientes reutilizadas para la búsqueda incremental
+
+
+def normalizar(texto: str) -> str:
+    """Minúsculas y sin tildes: 'Pérez' -> 'perez'."""
+    if texto.isascii():
+        return texto.lower()
+    sin_tildes = unicodedata.normalize("NFKD", texto or "")
+    return "".join(ch for ch in sin_tildes if not unicodedata.combining(ch)).lower()
+
+
+class IndiceSocios:
+    """
+    Socios activos como tres listas paralelas: id, etiqueta y clave de búsqueda
+    normalizada (nombre, apellidos y RUT con y sin puntos/guion).
+    Se carga con una sola consulta y se reconstruye solo cuando cambia
+    database.socios_version() o la ruta de la DB.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._origen: Optional[Tuple[str, int]] = None
+        self.ids: List[int] = []
+        self.etiquetas: List[str] = []
+        self.claves: List[str] = []
+        self._busquedas: "OrderedDict[str, List[int]]" = OrderedDict()
+
+    def _vigente(self) -> bool:
+        return self._origen == (current_db_path(), socios_version())
+
+    def _cargar(self):
+        origen = (current_db_path(), socios_version())
+        cols = get_all_socios(formato="columnas")
+        ids, etiquetas, claves = [], [], []
+        for i, rut, n, ap, am in zip(cols.get("id_socio", []), cols.get("RUT", []), cols.get("nombre", []),
+                                     cols.get("apellido_p", []), cols.get("apellido_m", [])):
+            nombre = " ".join(p for p in (n, ap, am) if p)
+            ids.append(i)
+            etiquetas.append(f"{i} — {nombre} ({rut})")
+            rut = rut or ""
+            claves.append(normalizar(f"{i} {nombre} {rut} {rut.replace('.', '').replace('-', '')}"))
+        self.ids, self.etiquetas, self.claves = ids, etiquetas, claves
+        self._busquedas = OrderedDict()
+        self._origen = origen
+
+    def asegurar(self):
+        if self._vigente():
+            return
+        with self._lock:
+            if not self._vigente():
+                self._cargar()
+
+    def _coincidencias(self, consulta: str) -> Sequence[int]:
+        """Posiciones que contienen todos los términos de `consulta` (ya normalizada)."""
+        if not consulta:
+            return range(len(self.ids))
+        encontrado = self._busquedas.get(consulta)
+        if encontrado is not None:
+            self._busquedas.move_to_end(consulta)
+            return encontrado
+
+        # Búsqueda incremental: si ya se buscó un prefijo, se filtra sobre su resultado
+        base = None
+        for largo in range(len(consulta) - 1, 0, -1):
+            base = self._busquedas.get(consulta[:largo])
+            if base is not None:
+                break
+        candidatos = base if base is not None else range(len(self.claves))
+
+        terminos = consulta.split()
+        claves = self.claves
+        encontrado = [i for i in candidatos if all(t in claves[i] for t in terminos)]
+
+        self._busquedas[consulta] = encontrado
+        while len(self._busquedas) > _PREFIJOS_CACHE:
+            self._busquedas.popitem(last=False)
+        return encontrado
+
+    def buscar(self, texto: str = "", limite: int = LIMITE_RESULTADOS) -> Tuple[List[Tuple[int, str]], int]:
+        """([(id_socio, etiqueta)] hasta `limite`, total de coincidencias)."""
+        self.asegurar()
+        with self._lock:
+            posiciones = self._coincidencias(" ".join(normalizar(texto).split()))
+            return [(self.ids[i], self.etiquetas[i]) for i in posiciones[:limite]], len(posiciones)
+
+    def __len__(self) -> int:
+        self.asegurar()
+        return len(self.ids)
+
+
+# Un índice por proceso, compartido por todas las sesiones de Streamlit
+indice = IndiceSocios()
+
+
+def buscar_socios(texto: str = "", limite: int = LIMITE_RESULTADOS) -> Tuple[List[Tuple[int, str]], int]:
+    return indice.buscar(texto, limite)
+
+
+def selector_socio(key: str, etiqueta: str = "Socio", limite: int = LIMITE_RESULTADOS) -> Optional[int]:
+    """
+    Campo de búsqueda + selectbox con como máximo `limite` opciones.
+    Devuelve el id_socio elegido (o None si no hay coincidencias).
+    """
+    texto = st.text_input(
+        f"Buscar {etiqueta.lower()}",
+        key=f"{key}_buscar",
+        placeholder="Nombre, apellido o RUT",
+    )
+    resultados, total = buscar_socios(texto, limite)
+    if not resultados:
+        st.info("No hay socios que coincidan con la busqueda" if texto.strip() else "No hay socios registrados")
+        return None
+
+    opciones = dict((label, id_socio) for id_socio, label in resultados)
+    elegido = st.selectbox(etiqueta, list(opciones.keys()), key=f"{key}_socio")
+    if total > len(resultados):
+        st.caption(f"Mostrando {len(resultados)} de {total} socios; escribe para acotar")
+    return opciones.get(elegido)
@@ -1,2 +1 @@
-from . import dashboard, socios, clases, pagos
-__all__ = ["dashboard", "socios", "clases", "pagos"]
+__all__ = ["dashboard", "socios", "clases", "pagos"]
@@ -4,14 +4,21 @@ import streamlit as st
 from database import (
     reservar_clase,
     registrar_nueva_classe,
-    get_clases_disponibles,
-    get_all_clases,
-    get_all_proximas_clases,
-    get_all_clases_pasadas,
+    FiltroClases,
+    listar_clases,
+    contar_clases,
     get_all_entrenadores,
     get_all_tipos,
-    get_all_socios,
+    get_plantillas,
+    crear_plantilla,
+    eliminar_plantilla,
+    archivar_clases,
+    resumen_archivo,
+    ARCHIVO_DIAS,
 )
+from asistencia import clases_abiertas, registrar_asistencia
+from horarios import DIAS_SEMANA, proximo_lunes, validar_horario, generar_horario
+from selector_socios import selector_socio
 
 def _fmt(v):
     return str(v).replace("T", " ")[:16] if v else "—"
@@ -27,18 +34,22 @@ def render():
         col1, col2 = st.columns([2, 4])
         
         with col1:
-            # Mapa de filtros disponibles
-            filtro_classes: dict[str, callable] = {
-                "Proxima clases": get_all_proximas_clases,
-                "Clases disponibles": get_clases_disponibles,
-                "Clases pasadas": get_all_clases_pasadas,
-                "Todas las clases": get_all_clases,
+            # Mapa de filtros disponibles (ver database.FiltroClases)
+            filtro_classes: dict[str, FiltroClases] = {
+                "Proxima clases": FiltroClases(cuando="proximas"),
+                "Clases disponibles": FiltroClases(cuando="proximas", disponibles=True),
+                "Clases pasadas": FiltroClases(cuando="pasadas", orden="desc"),
+                "Todas las clases": FiltroClases(),
             }
             slctbx_filtro = st.selectbox(
                 "Filtrar clases:",
                 options=[title for title in filtro_classes.keys()],
                 key="filtro_clases"
             )
+            # El historial archivado solo se lee si se pide
+            incluir_archivo = slctbx_filtro in ("Clases pasadas", "Todas las clases") and st.checkbox(
+                "Incluir archivo historico", key="clases_incluir_archivo"
+            )
         
         with col2:
             # Busqueda por texto libre sobre nombre o entrenador
@@ -47,6 +58,28 @@ def render():
                 placeholder="Ej: Yoga, Juan Perez",
                 key="buscar_clases"
             )
+
+        col_tipo, col_ent = st.columns(2)
+        with col_tipo:
+            tipos = {"Todos": None, **{t["nombre"]: t["id_tipo"] for t in get_all_tipos()}}
+            id_tipo = tipos[st.selectbox("Tipo", list(tipos), key="clases_filtro_tipo")]
+        with col_ent:
+            entrenadores = {"Todos": None, **{
+                f"{e['nombre']} {e['apellido']}": e["id_entrenador"] for e in get_all_entrenadores()
+            }}
+            id_entrenador = entrenadores[st.selectbox("Entrenador", list(entrenadores), key="clases_filtro_entrenador")]
+
+        # Ventana de fechas opcional (se aplica antes de paginar)
+        ventana = None
+        if st.checkbox("Filtrar por fechas", key="clases_filtrar_fechas"):
+            hoy = datetime.date.today()
+            rango = st.date_input(
+                "Rango de fechas",
+                value=(hoy - datetime.timedelta(days=7), hoy + datetime.timedelta(days=7)),
+                key="clases_rango_fechas",
+            )
+            if isinstance(rango, (tuple, list)) and len(rango) == 2:
+                ventana = (rango[0].isoformat(), rango[1].isoformat())
         
     # Boton para admin que despliega formulario de nueva clase
     if auth_role == "admin":
@@ -56,108 +89,158 @@ def render():
     if auth_role == "admin" and st.session_state.get("mostrar_formulario", False):
         st.header("➕ Registrar Nueva Clase")
         registrar_form()
+
+    with st.expander("✅ Check-in de asistencia"):
+        checkin()
+
+    if auth_role == "admin":
+        with st.expander("🗓️ Horario semanal"):
+            horario_semanal()
+        with st.expander("🗄️ Archivo historico"):
+            archivo_historico()
     
-    try:
-        clases = filtro_classes[slctbx_filtro]()
+    filtro = filtro_classes[slctbx_filtro]._replace(
+        id_tipo=id_tipo, id_entrenador=id_entrenador, incluir_archivo=incluir_archivo,
+        desde=ventana[0] if ventana else None, hasta=ventana[1] if ventana else None,
+    )
+    search_term = intxt_buscar.lower().strip()
 
-        if not clases:
+    try:
+        # Filtros, orden y pagina se resuelven en SQL (database.listar_clases):
+        # solo se leen las clases de la pagina visible
+        if search_term:
+            filtro = filtro._replace(texto=search_term)
+        total = contar_clases(filtro)
+        if total:
+            pagina, tam = _pagina(total, firma=filtro)
+            clases = listar_clases(filtro._replace(pagina=pagina, por_pagina=tam))
+        elif search_term:
+            # Sin coincidencias exactas: busqueda por similitud sobre los demas
+            # filtros, solo si dejan pocas clases (se leen a lo sumo
+            # SIMILITUD_MAX_CANDIDATOS + 1 para saberlo sin contar aparte)
+            candidatas = listar_clases(filtro._replace(texto=None, pagina=0, por_pagina=SIMILITUD_MAX_CANDIDATOS + 1))
+            if len(candidatas) > SIMILITUD_MAX_CANDIDATOS:
+                st.info("🔍 No se encontraron clases con ese texto. Acota los filtros (fechas, tipo o entrenador) "
+                        "para buscar nombres parecidos.")
+                return
+            clases = [
+                clase for clase in candidatas
+                if levenshtein_similarity(search_term, clase.get("nombre", "").lower()) >= 0.2
+                or levenshtein_similarity(search_term, clase.get("entrenador", "").lower()) >= 0.2
+            ]
+            if not clases:
+                st.info("🔍 No se encontraron clases que coincidan con la busqueda")
+                return
+            pagina, tam = _pagina(len(clases), firma=filtro)
+            clases = clases[pagina * tam:(pagina + 1) * tam]
+        else:
             st.info("📭 No hay clases")
             return
-        
-        if intxt_buscar.strip():
-            # Filtrado con busqueda similitud 
-            search_term = intxt_buscar.lower().strip()
-            clases_filtradas = []
-            
-            for clase in clases:
-                nombre = clase.get("nombre", "").lower()
-                entrenador = clase.get("entrenador", "").lower()
-                tipo_clase = clase.get("tipo_clase", "").lower()
-                
-                if (search_term in nombre or 
-                    search_term in entrenador or 
-                    search_term in tipo_clase or
-                    levenshtein_similarity(search_term, nombre) >= 0.2 or
-                    levenshtein_similarity(search_term, entrenador) >= 0.2):
-                    clases_filtradas.append(clase)
-            
-            clases = clases_filtradas
-
-        if not clases:
-            st.info("🔍 No se encontraron clases que coincidan con la busqueda")
-            return
 
         for clase in clases:
             with st.container():
-                st.markdown(f"## {clase.get('nombre', 'Clase')}")
-                st.caption(clase.get('descripcion', '').strip())
-
-                c1, c2, c3 = st.columns([3, 2, 1])
-
-                with c1:
-                    st.markdown(f"**Tipo:** {clase.get('tipo_clase', '—')}")
-                    st.markdown(f"**Profesor:** {clase.get('entrenador', '—')}")
-
-                with c2:
-                    st.markdown(f"**Fecha/Hora:** {_fmt(clase.get('fecha_hora'))}")
-                    st.markdown(f"**Duracion:** {clase.get('duracion_min', '—')} min")
-
-                with c3:
-                    cupos = int(clase.get('cupos_disponibles', 0) or 0)
-                    total = int(clase.get('cupo_max', 0) or 0)
-                    st.metric("Cupos", f"{cupos}/{total}")
-                    
-                # Popover para reservar un cupo
-                with st.popover("Reservar", icon='📅'):
-                    socios = get_all_socios()
-                    
-                    if not socios:
-                        st.warning("No hay socios registrados")
-                    else:
-                        options_socios = {
-                            f"{socio['id_socio']} - {socio.get('nombre', '')} {socio.get('apellido_p', '')} {socio.get('apellido_m', '')}".strip(): socio['id_socio']
-                            for socio in socios
-                        }
-                        
-                        socio_seleccionado = st.selectbox(
-                            "Seleccionar Socio",
-                            options=list(options_socios.keys()),
-                            key=f"select_socio_{clase['id_clase']}",
-                            help="Selecciona el socio que realizara la reserva"
-                        )
-                        
-                        id_socio = options_socios.get(socio_seleccionado) if socio_seleccionado else None
-
-                        # Logica de confirmacion de reserva
-                        if st.button("Confirmar reserva", key=f"btn_res_{clase['id_clase']}", type="primary"):
-                            # Validacion de seleccion de socio
-                            if not id_socio:
-                                st.error("Debes seleccionar un socio primero")
-                            else:
-                                ok, new_id, err = reservar_clase(int(id_socio), int(clase['id_clase']))
-
-                                if ok:
-                                    st.success(f"Reserva creada exitosamente ID {new_id}")
-                                    st.balloons()
-                                    st.rerun()
-                                else:
-                                    # Normaliza mensaje de error para dar retroalimentacion clara
-                                    msg_error = str(err or "").upper()
-
-                                    if "UNIQUE" in msg_error:
-                                        st.warning("Este socio ya tiene una reserva confirmada en esta clase")
-                                    elif "CUPOS_AGOTADOS" in msg_error:
-                                        st.error("Lo sentimos los cupos para esta clase se acaban de agotar")
-                                    elif "SIN_SUSCRIPCION_ACTIVA" in msg_error:
-                                        st.error("El socio no tiene una suscripcion activa vigente. Regulariza en Pagos")
-                                    else:
-                                        st.error(f"No se pudo reservar: {err}")
-
+                _tarjeta_clase(clase)
                 st.divider()
 
     except Exception as e:
         st.error(f"Error al cargar clases: {e}")
 
+TAMANOS_PAGINA = (10, 25, 50)
+# Tope de clases sobre las que se calcula la similitud (Levenshtein en Python)
+SIMILITUD_MAX_CANDIDATOS = 500
+
+def _pagina(total: int, firma) -> tuple[int, int]:
+    """
+    Dibuja los controles de paginacion para `total` clases y devuelve
+    (pagina, tamano). La pagina vuelve a 1 cuando cambian los filtros (`firma`).
+    """
+    if st.session_state.get("clases_firma") != firma:
+        st.session_state.clases_firma = firma
+        st.session_state.clases_pagina = 0
+
+    col_tam, col_prev, col_info, col_next = st.columns([2, 1, 3, 1])
+    with col_tam:
+        tam = st.selectbox("Clases por pagina", TAMANOS_PAGINA, key="clases_tam_pagina")
+    total_paginas = max(1, -(-total // tam))
+    pagina = min(st.session_state.get("clases_pagina", 0), total_paginas - 1)
+
+    with col_prev:
+        if st.button("◀", key="clases_prev", disabled=pagina == 0):
+            pagina -= 1
+    with col_next:
+        if st.button("▶", key="clases_next", disabled=pagina >= total_paginas - 1):
+            pagina += 1
+    st.session_state.clases_pagina = pagina
+    with col_info:
+        st.caption(f"Pagina {pagina + 1} de {total_paginas} · {total} clases")
+
+    return pagina, tam
+
+def _tarjeta_clase(clase) -> None:
+    st.markdown(f"## {clase.get('nombre', 'Clase')}")
+    st.caption((clase.get('descripcion') or '').strip())
+
+    c1, c2, c3 = st.columns([3, 2, 1])
+
+    with c1:
+        st.markdown(f"**Tipo:** {clase.get('tipo_clase', clase.get('tipo', '—'))}")
+        st.markdown(f"**Profesor:** {clase.get('entrenador', '—')}")
+
+    with c2:
+        st.markdown(f"**Fecha/Hora:** {_fmt(clase.get('fecha_hora'))}")
+        st.markdown(f"**Duracion:** {clase.get('duracion_min', '—')} min")
+
+    with c3:
+        cupos = int(clase.get('cupos_disponibles', 0) or 0)
+        total = int(clase.get('cupo_max', 0) or 0)
+        st.metric("Cupos", f"{cupos}/{total}")
+
+    # Un solo selector de socios para toda la pagina: se abre en la clase elegida
+    id_clase = int(clase['id_clase'])
+    if st.session_state.get("clase_a_reservar") == id_clase:
+        _panel_reserva(id_clase)
+    elif st.button("📅 Reservar", key=f"btn_abrir_res_{id_clase}"):
+        st.session_state.clase_a_reservar = id_clase
+        st.rerun()
+
+def _panel_reserva(id_clase: int) -> None:
+    # Selector compartido (indice en memoria, resultados limitados)
+    id_socio = selector_socio(key="reserva", etiqueta="Socio")
+
+    col_ok, col_cancel = st.columns(2)
+    with col_cancel:
+        if st.button("Cancelar", key=f"btn_cancel_res_{id_clase}"):
+            st.session_state.pop("clase_a_reservar", None)
+            st.rerun()
+
+    # Logica de confirmacion de reserva
+    with col_ok:
+        confirmar = st.button("Confirmar reserva", key=f"btn_res_{id_clase}", type="primary")
+    if confirmar:
+        # Validacion de seleccion de socio
+        if not id_socio:
+            st.error("Debes seleccionar un socio primero")
+        else:
+            ok, new_id, err = reservar_clase(int(id_socio), id_clase)
+
+            if ok:
+                st.success(f"Reserva creada exitosamente ID {new_id}")
+                st.balloons()
+                st.session_state.pop("clase_a_reservar", None)
+                st.rerun()
+            else:
+                # Normaliza mensaje de error para dar retroalimentacion clara
+                msg_error = str(err or "").upper()
+
+                if "UNIQUE" in msg_error:
+                    st.warning("Este socio ya tiene una reserva confirmada en esta clase")
+                elif "CUPOS_AGOTADOS" in msg_error:
+                    st.error("Lo sentimos los cupos para esta clase se acaban de agotar")
+                elif "SIN_SUSCRIPCION_ACTIVA" in msg_error:
+                    st.error("El socio no tiene una suscripcion activa vigente. Regulariza en Pagos")
+                else:
+                    st.error(f"No se pudo reservar: {err}")
+
 def registrar_form() -> None:
     # Formulario para crear una nueva clase
     with st.form("form_nueva_clase", clear_on_submit=True):
@@ -256,11 +339,176 @@ def registrar_form() -> None:
                 else:
                     if "FOREIGN KEY" in error:
                         st.error("Error el entrenador o tipo de clase no existe")
+                    elif "ENTRENADOR_OCUPADO" in error:
+                        st.error(f"El entrenador ya tiene una clase en ese horario {error[error.find('('):]}")
                     elif "UNIQUE" in error:
                         st.error("Error ya existe una clase con esos datos")
                     else:
                         st.error(f"Error al registrar: {error}")
 
+def horario_semanal() -> None:
+    # Plantillas recurrentes y generacion masiva de clases
+    plantillas = get_plantillas()
+    if plantillas:
+        st.dataframe(
+            [{
+                "ID": p["id_plantilla"],
+                "Dia": DIAS_SEMANA[p["dia_semana"]],
+                "Hora": p["hora"],
+                "Clase": p["nombre"],
+                "Tipo": p["tipo_clase"],
+                "Entrenador": p["entrenador"],
+                "Duracion": p["duracion_min"],
+                "Cupo": p["cupo_max"],
+            } for p in plantillas],
+            hide_index=True,
+            width='stretch',
+        )
+        opciones_borrar = {f"{p['id_plantilla']} - {DIAS_SEMANA[p['dia_semana']]} {p['hora']} {p['nombre']}": p["id_plantilla"] for p in plantillas}
+        col_del1, col_del2 = st.columns([4, 1])
+        with col_del1:
+            plantilla_borrar = st.selectbox("Plantilla", options=list(opciones_borrar.keys()), key="plantilla_borrar")
+        with col_del2:
+            if st.button("🗑️ Quitar", key="btn_quitar_plantilla"):
+                eliminar_plantilla(int(opciones_borrar[plantilla_borrar]))
+                st.session_state.pop("horario_validado", None)
+                st.rerun()
+    else:
+        st.info("No hay plantillas de horario definidas")
+
+    with st.form("form_plantilla", clear_on_submit=True):
+        st.subheader("Nueva plantilla")
+        nombre = st.text_input("Nombre de la clase", placeholder="Ej: Yoga Matutino")
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            dia = st.selectbox("Dia", options=list(range(7)), format_func=lambda d: DIAS_SEMANA[d])
+            hora = st.time_input("Hora", value=datetime.time(9, 0), step=900)
+        with col2:
+            duracion_min = st.number_input("Duracion minutos", min_value=15, value=60, step=5)
+            cupo_max = st.number_input("Cupo maximo", min_value=1, value=20, step=1)
+        with col3:
+            entrenadores = get_all_entrenadores()
+            options_entrenadores = {f"{ent['id_entrenador']} - {ent['nombre']} {ent['apellido']}": ent['id_entrenador'] for ent in entrenadores}
+            entrenador_sel = st.selectbox("Entrenador", options=list(options_entrenadores.keys()))
+            tipos = get_all_tipos()
+            options_tipos = {f"{tipo['id_tipo']} - {tipo['nombre']}": tipo['id_tipo'] for tipo in tipos}
+            tipo_sel = st.selectbox("Tipo de Clase", options=list(options_tipos.keys()))
+
+        if st.form_submit_button("➕ Agregar plantilla"):
+            if not nombre.strip() or not entrenador_sel or not tipo_sel:
+                st.error("Nombre, entrenador y tipo son obligatorios")
+            else:
+                ok, _, err = crear_plantilla(
+                    id_entrenador=int(options_entrenadores[entrenador_sel]),
+                    id_tipo=int(options_tipos[tipo_sel]),
+                    nombre=nombre.strip(),
+                    descripcion=None,
+                    dia_semana=int(dia),
+                    hora=hora.strftime("%H:%M"),
+                    duracion_min=int(duracion_min),
+                    cupo_max=int(cupo_max),
+                )
+                if ok:
+                    st.session_state.pop("horario_validado", None)
+                    st.rerun()
+                else:
+                    st.error(f"No se pudo crear la plantilla: {err}")
+
+    st.subheader("Generar clases")
+    col_g1, col_g2 = st.columns(2)
+    with col_g1:
+        desde = st.date_input("Desde", value=proximo_lunes(), key="horario_desde")
+    with col_g2:
+        semanas = st.number_input("Semanas", min_value=1, max_value=26, value=4, step=1, key="horario_semanas")
+
+    # El expander ejecuta su cuerpo aunque este cerrado: la validacion (una
+    # consulta de solapes por sesion) solo corre al pedirla, no en cada rerun
+    periodo = (desde, int(semanas))
+    if st.button("🔍 Validar horario", key="btn_validar_horario"):
+        st.session_state.horario_validado = (periodo, *validar_horario(desde, int(semanas)))
+    validado = st.session_state.get("horario_validado")
+    if not validado or validado[0] != periodo:
+        st.caption("Valida el periodo para ver cuantas clases se generan y si hay conflictos")
+        return
+    _, total, conflictos = validado
+    if conflictos:
+        st.warning(f"{len(conflictos)} conflicto(s): un entrenador quedaria con clases superpuestas")
+        st.dataframe(conflictos, hide_index=True, width='stretch')
+
+    if st.button(f"🗓️ Generar {total} clases", type="primary", disabled=(total == 0 or bool(conflictos))):
+        with st.spinner("Generando horario..."):
+            ok, creadas, err = generar_horario(desde, int(semanas))
+        # generar_horario vuelve a validar; el resultado guardado ya no vale
+        st.session_state.pop("horario_validado", None)
+        if ok:
+            st.success(f"Se crearon {creadas} clases")
+        else:
+            st.error(f"No se pudo generar el horario: {err}")
+
+_ERRORES_CHECKIN = {
+    "SOCIO_NO_ENCONTRADO": "No existe un socio con ese RUT o id",
+    "FUERA_DE_HORARIO": "La clase no esta abierta para check-in",
+    "SIN_RESERVA": "El socio no tiene reserva en esta clase",
+    "CUPOS_AGOTADOS": "Sin reserva y la clase no tiene cupos disponibles",
+    "SIN_SUSCRIPCION_ACTIVA": "El socio no tiene una suscripcion activa vigente",
+}
+
+def checkin() -> None:
+    # Recepcion: escanear o escribir el RUT (o id) de cada socio que llega
+    clases = clases_abiertas()
+    if not clases:
+        st.info("No hay clases abiertas para check-in en este momento")
+        return
+    opciones = {int(c["id_clase"]): c for c in clases}
+    id_clase = st.selectbox(
+        "Clase",
+        options=list(opciones),
+        format_func=lambda i: f"{_fmt(opciones[i]['fecha_hora'])} · {opciones[i]['nombre']}",
+        key="checkin_clase",
+    )
+    clase = opciones[id_clase]
+
+    # Formulario: el lector de codigos envia Enter y el campo queda listo para el siguiente
+    with st.form("form_checkin", clear_on_submit=True):
+        identificador = st.text_input("RUT o id de socio", placeholder="12345678-9", key="checkin_socio")
+        enviado = st.form_submit_button("Registrar asistencia", type="primary")
+    if enviado:
+        ok, registro, err = registrar_asistencia(identificador, id_clase)
+        if ok:
+            # Conteos ya con este check-in
+            clase = {int(c["id_clase"]): c for c in clases_abiertas()}.get(id_clase, clase)
+            if registro.sin_reserva:
+                st.success(f"Asistencia registrada sin reserva previa (socio {registro.id_socio})")
+            else:
+                st.success(f"Asistencia registrada (socio {registro.id_socio})")
+        else:
+            codigo = next((c for c in _ERRORES_CHECKIN if c in str(err or "").upper()), None)
+            st.error(_ERRORES_CHECKIN[codigo] if codigo else f"No se pudo registrar: {err}")
+
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Asistentes", clase["asistentes"])
+    c2.metric("Reservas", clase["reservas"])
+    c3.metric("Cupos", clase["cupo_max"] - clase["reservas"])
+
+def archivo_historico() -> None:
+    # Mueve clases antiguas (y sus reservas) a la DB de archivo
+    resumen = resumen_archivo()
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Clases archivadas", f"{resumen['clases']:,}".replace(",", "."))
+    c2.metric("Reservas archivadas", f"{resumen['reservas']:,}".replace(",", "."))
+    c3.metric("Asistencias", f"{resumen['asistencias']:,}".replace(",", "."))
+    if resumen["desde"]:
+        st.caption(f"Desde {_fmt(resumen['desde'])} hasta {_fmt(resumen['hasta'])}")
+
+    dias = st.number_input("Archivar clases de hace mas de (dias)", min_value=30, value=ARCHIVO_DIAS, step=30, key="archivo_dias")
+    if st.button("🗄️ Archivar", key="btn_archivar"):
+        with st.spinner("Archivando..."):
+            ok, n, err = archivar_clases(int(dias))
+        if ok:
+            st.success(f"Se archivaron {n} clases")
+        else:
+            st.error(f"No se pudo archivar: {err}")
+
 def levenshtein_similarity(s1, s2):
     def _levenshtein_distance(s1, s2):
         if len(s1) < len(s2):
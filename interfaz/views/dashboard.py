@@ -3,37 +3,40 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
 from datetime import datetime, timedelta
 from typing import List, Dict
 from database import (
     count_socios_activos, count_entrenadores_activos, count_reservas_hoy,
     count_clases_hoy, ingresos_mes_actual, get_all_proximas_clases,
     get_clases_proximas_con_alertas, get_historial_pagos, get_all_socios,
-    get_all_clases, membresias_por_vencer,
-    get_stats_last_7_days,
-    current_db_path
+    get_all_clases, membresias_por_vencer, resumen_proximas_clases,
+    count_proximas_por_tipo, get_stats_last_7_days, get_planes,
+    get_all_tipos, current_db_path
 
 )
+import conciliacion
+import database_async
+import demanda
+import mantenimiento
+import reportes
+import retencion
 
 
 # ========== Fonction para crear gráficos ==========
 
 def create_clases_by_type_chart():
     try:
-        clases = get_all_proximas_clases() or []
+        # Conteo por tipo resuelto en SQL (sin leer la lista de clases)
+        por_tipo = count_proximas_por_tipo() or []
 
-        if not clases:
+        if not por_tipo:
             # st.warning("No hay datos de proxima clases disponibles.")
             return px.pie(title="Sin datos de clases")
         else:
-            type_counts = {}
-            for clase in clases:
-                tipo = clase.get('tipo_clase', 'No especificado')
-                type_counts[tipo] = type_counts.get(tipo, 0) + 1
-
             df = pd.DataFrame({
-                'Tipo': list(type_counts.keys()),
-                'Total': list(type_counts.values())
+                'Tipo': [t['tipo'] for t in por_tipo],
+                'Total': [t['cantidad'] for t in por_tipo]
             })
 
         fig = px.pie(
@@ -134,6 +137,15 @@ def create_reservations_trend_chart():
 
 # ========== FUNCIONES DE VISUALIZACIÓN DE LA SECCIÓN ==========
 
+def _dato(datos: Dict, clave: str):
+    # database_async.reunir guarda la excepción de la consulta que falló:
+    # se relanza aquí para que la muestre el try/except de su panel
+    valor = datos[clave]
+    if isinstance(valor, BaseException):
+        raise valor
+    return valor
+
+
 def render_alerts_section():
     try:
         alertas_clases = get_clases_proximas_con_alertas() or []
@@ -150,23 +162,20 @@ def render_alerts_section():
         if miembros_expiran:
             st.warning(f"🔔 {len(miembros_expiran)} suscripciones caducan en 7 días")
 
-        clases = get_all_proximas_clases() or []
-        if clases:
-            total_cupos = sum(c.get('cupo_max', 0) for c in clases)
-            cupos_ocupados = sum((c.get('cupo_max', 0) - c.get('cupos_disponibles', 0)) for c in clases)
-            if total_cupos > 0:
-                ocupacion = (cupos_ocupados / total_cupos) * 100
-                st.metric("📊 Tasa de ocupación", f"{ocupacion:.1f}%")
+        resumen = resumen_proximas_clases()
+        if resumen["cupos_totales"] > 0:
+            ocupacion = (resumen["cupos_ocupados"] / resumen["cupos_totales"]) * 100
+            st.metric("📊 Tasa de ocupación", f"{ocupacion:.1f}%")
 
     except Exception as e:
         st.error(f"Error carga alertas: {e}")
 
 
-def render_quick_stats():
+def render_quick_stats(datos: Dict):
     try:
-        entrenadores = count_entrenadores_activos()
-        socios = count_socios_activos()
-        clases_proximas = len(get_all_proximas_clases() or [])
+        entrenadores = _dato(datos, "entrenadores_activos")
+        socios = _dato(datos, "socios_activos")
+        clases_proximas = _dato(datos, "resumen_proximas")["clases"]
 
         col1, col2 = st.columns(2)
 
@@ -182,21 +191,18 @@ def render_quick_stats():
         st.error(f"Error carga estadísticas: {e}")
 
 
-def render_active_members_table():
+def render_active_members_table(datos: Dict):
     try:
-        socios = get_all_socios() or []
-
-        if socios:
-            table_data = []
-            for socio in socios[:10]:
-                table_data.append({
-                    "ID": socio.get('id_socio', '—'),
-                    "Nombre": f"{socio.get('nombre', '')} {socio.get('apellido_p', '')}",
-                    "Telefono": socio.get('telefono', '—'),
-                    "RUT": socio.get('RUT', '—')
-                })
-
-            df = pd.DataFrame(table_data)
+        # Formato columnar: solo 10 filas y sin dicts intermedios
+        socios = _dato(datos, "socios_recientes")
+
+        if socios.get('id_socio'):
+            df = pd.DataFrame({
+                "ID": socios['id_socio'],
+                "Nombre": [f"{n} {a}" for n, a in zip(socios['nombre'], socios['apellido_p'])],
+                "Telefono": socios['telefono'],
+                "RUT": socios['RUT'],
+            })
             st.dataframe(df, width='stretch', hide_index=True)
         else:
             st.info("No hay socios activos")
@@ -205,23 +211,19 @@ def render_active_members_table():
         st.error(f"Error carga socios: {e}")
 
 
-def render_recent_payments_table():
+def render_recent_payments_table(datos: Dict):
     try:
-        pagos = get_historial_pagos(10) or []
+        pagos = _dato(datos, "pagos_recientes")
 
-        if pagos:
-            table_data = []
-            for pago in pagos:
-                table_data.append({
-                    "ID": pago.get('id_pago', '—'),
-                    "Membro": pago.get('nombre_socio', '—'),
-                    "Monto": f"${pago.get('monto', 0):,.0f}",
-                    "Metodo": pago.get('metodo_pago', '—'),
-                    "Fecha": pago.get('fecha_pago', '—'),
-                    "Estado": pago.get('estado_pago', '—')
-                })
-
-            df = pd.DataFrame(table_data)
+        if pagos.get('id_pago'):
+            df = pd.DataFrame({
+                "ID": pagos['id_pago'],
+                "Membro": pagos['nombre_socio'],
+                "Monto": [f"${m or 0:,.0f}" for m in pagos['monto']],
+                "Metodo": pagos['metodo_pago'],
+                "Fecha": pagos['fecha_pago'],
+                "Estado": pagos['estado_pago'],
+            })
             st.dataframe(df, width='stretch', hide_index=True)
         else:
             st.info("No hay pagos recientes")
@@ -230,6 +232,234 @@ def render_recent_payments_table():
         st.error(f"Error carga pagos: {e}")
 
 
+def _porcentaje(valor) -> str:
+    return f"{valor:.1f}%" if valor is not None else "—"
+
+
+def render_retention_tab():
+    # Lee las tablas precalculadas de retencion.py (las actualiza mantenimiento.py)
+    resumen = retencion.resumen_retencion()
+
+    if resumen["actualizado"] is None:
+        st.info("📭 La retención todavía no se ha calculado.")
+        st.caption(f"Se calcula en segundo plano cada {mantenimiento.RETENCION_INTERVALO // 60} min.")
+        if st.button("🔄 Calcular ahora", key="retencion_calcular"):
+            with st.spinner("Calculando retención..."):
+                ok, _, err = mantenimiento.ejecutar("retencion.actualizar")
+            if ok:
+                st.rerun()
+            st.error(f"❌ No se pudo calcular la retención: {err}")
+        return
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("📉 Tasa de bajas", _porcentaje(resumen["tasa_baja"]),
+                  help="Bajas sobre (renovadas + bajas) de las suscripciones que vencieron en los últimos 3 meses")
+    with col2:
+        dias = resumen["dias_renovacion"]
+        st.metric("⏱️ Desfase de renovación", f"{dias:+.1f} días" if dias is not None else "—",
+                  help="Días promedio entre el vencimiento y la renovación (negativo = renovó antes)")
+    with col3:
+        st.metric("🔁 Retención a 3 meses", _porcentaje(resumen["retencion_3"]),
+                  help="Socios de las cohortes de los últimos 2 años aún activos 3 meses después del alta")
+    with col4:
+        st.metric("🔁 Retención a 12 meses", _porcentaje(resumen["retencion_12"]))
+
+    planes = {p["id_plan"]: p["nombre_plan"] for p in get_planes() or []}
+    id_plan = st.selectbox(
+        "Plan de entrada", [None, *planes], key="retencion_plan",
+        format_func=lambda i: "Todos" if i is None else planes.get(i, f"Plan {i}"),
+    )
+    filas = retencion.matriz_retencion(meses=12, id_plan=id_plan)
+    if filas:
+        matriz = pd.DataFrame(filas).pivot(index="cohorte", columns="mes", values="tasa")
+        fig = px.imshow(
+            matriz, text_auto=".0f", aspect="auto", color_continuous_scale="Blues", zmin=0, zmax=100,
+            labels={"x": "Meses desde el alta", "y": "Cohorte", "color": "% activos"},
+            title="Retención por cohorte (% de socios activos)",
+        )
+        st.plotly_chart(fig, use_container_width=True)
+    else:
+        st.info("No hay cohortes en los últimos 12 meses")
+
+    vencimientos = retencion.vencimientos_por_plan(meses=6)
+    if vencimientos:
+        df = pd.DataFrame({
+            "Mes": [v["mes"] for v in vencimientos],
+            "Plan": [v["nombre_plan"] for v in vencimientos],
+            "Vencen": [v["vencidas"] for v in vencimientos],
+            "Renovadas": [v["renovadas"] for v in vencimientos],
+            "Bajas": [v["bajas"] for v in vencimientos],
+            "Pendientes": [v["pendientes"] for v in vencimientos],
+            "Tasa bajas": [_porcentaje(v["tasa_baja"]) for v in vencimientos],
+            "Días a renovar": [f"{v['dias_renovacion']:+.1f}" if v["dias_renovacion"] is not None else "—"
+                               for v in vencimientos],
+        })
+        st.dataframe(df, width='stretch', hide_index=True)
+
+    col_info, col_boton = st.columns([4, 1])
+    with col_info:
+        st.caption(f"Actualizado: {resumen['actualizado']} ({resumen['modo']}, {resumen['duracion_ms']:.0f} ms) • "
+                   f"se actualiza cada {mantenimiento.RETENCION_INTERVALO // 60} min")
+    with col_boton:
+        if st.button("🔄 Recalcular", key="retencion_recalcular", width="stretch"):
+            with st.spinner("Actualizando retención..."):
+                ok, _, err = mantenimiento.ejecutar("retencion.actualizar")
+            if ok:
+                st.rerun()
+            st.error(f"❌ {err}")
+
+
+def render_demand_tab():
+    # Lee la matriz precalculada de demanda.py (la actualiza mantenimiento.py)
+    estado = demanda.estado_demanda()
+
+    if estado is None:
+        st.info("📭 La ocupación histórica todavía no se ha calculado.")
+        st.caption(f"Se calcula en segundo plano cada {mantenimiento.DEMANDA_INTERVALO // 60} min.")
+        if st.button("🔄 Calcular ahora", key="demanda_calcular"):
+            with st.spinner("Calculando ocupación..."):
+                ok, _, err = mantenimiento.ejecutar("demanda.actualizar")
+            if ok:
+                st.rerun()
+            st.error(f"❌ No se pudo calcular la ocupación: {err}")
+        return
+
+    tipos = {t["id_tipo"]: t["nombre"] for t in get_all_tipos() or []}
+    id_tipo = st.selectbox(
+        "Tipo de clase", [None, *tipos], key="demanda_tipo",
+        format_func=lambda i: "Todos" if i is None else tipos.get(i, f"Tipo {i}"),
+    )
+    filas = demanda.matriz_demanda(id_tipo)
+    if filas:
+        df = pd.DataFrame(filas)
+        clases, cupos = int(df["clases"].sum()), int(df["cupos"].sum())
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("🎯 Ocupación", _porcentaje(df["reservas"].sum() * 100 / cupos if cupos else None),
+                      help="Reservas confirmadas sobre cupos de las clases ya terminadas")
+        with col2:
+            st.metric("✅ Asistencia", _porcentaje(df["asistencias"].sum() * 100 / cupos if cupos else None),
+                      help="Asistencias registradas sobre cupos")
+        with col3:
+            st.metric("🔥 Clases llenas", _porcentaje(df["llenas"].sum() * 100 / clases if clases else None))
+
+        matriz = (df.pivot(index="dia", columns="hora", values="ocupacion")
+                  .reindex(range(7)).rename(index=dict(enumerate(demanda.DIAS_SEMANA))))
+        matriz.columns = [f"{h:02d}:00" for h in matriz.columns]
+        fig = px.imshow(
+            matriz, text_auto=".0f", aspect="auto", color_continuous_scale="YlOrRd", zmin=0, zmax=100,
+            labels={"x": "Hora de inicio", "y": "Día", "color": "% ocupación"},
+            title="Ocupación histórica por día y hora (% de cupos reservados)",
+        )
+        st.plotly_chart(fig, use_container_width=True)
+    else:
+        st.info("No hay clases terminadas para este tipo")
+
+    pronostico = demanda.pronostico_clases(dias=14, id_tipo=id_tipo)
+    if pronostico:
+        st.markdown("**Pronóstico de las próximas 2 semanas**")
+        df = pd.DataFrame({
+            "Fecha": [str(p["fecha_hora"])[:16] for p in pronostico],
+            "Clase": [p["nombre"] for p in pronostico],
+            "Tipo": [p["tipo_clase"] for p in pronostico],
+            "Cupo": [p["cupo_max"] for p in pronostico],
+            "Reservas": [p["reservas"] for p in pronostico],
+            "Esperadas": [f"{p['reservas_esperadas']:.1f}" if p["reservas_esperadas"] is not None else "—"
+                          for p in pronostico],
+            "Ocupación esperada": [_porcentaje(p["ocupacion_esperada"]) for p in pronostico],
+            "Prob. llena": [_porcentaje(p["prob_llena"]) for p in pronostico],
+            "Cupo sugerido": [p["cupo_sugerido"] if p["cupo_sugerido"] is not None else "—" for p in pronostico],
+        })
+        st.dataframe(df, width='stretch', hide_index=True)
+
+    col_info, col_boton = st.columns([4, 1])
+    with col_info:
+        st.caption(f"Actualizado: {estado['actualizado']} ({estado['modo']}, {estado['duracion_ms']:.0f} ms) • "
+                   f"se actualiza cada {mantenimiento.DEMANDA_INTERVALO // 60} min • "
+                   f"cupo sugerido para {demanda.OCUPACION_OBJETIVO:.0%} de ocupación")
+    with col_boton:
+        if st.button("🔄 Recalcular", key="demanda_recalcular", width="stretch"):
+            with st.spinner("Recalculando ocupación..."):
+                ok, _, err = mantenimiento.ejecutar("demanda.reconstruir")
+            if ok:
+                st.rerun()
+            st.error(f"❌ {err}")
+
+
+def _pesos(valor) -> str:
+    return f"${valor:,.0f}".replace(",", ".")
+
+
+def render_reconciliation_tab():
+    # Lee ConciliacionResultado (lo escribe conciliacion.py en segundo plano)
+    resumen = conciliacion.resumen_conciliacion()
+    estado = resumen["estado"]
+
+    if estado is None:
+        st.info("📭 La conciliación de pagos todavía no se ha ejecutado.")
+        st.caption(f"Se ejecuta en segundo plano cada {mantenimiento.CONCILIACION_INTERVALO // 60} min.")
+        if st.button("🔄 Conciliar ahora", key="conciliacion_ejecutar"):
+            with st.spinner("Conciliando pagos..."):
+                ok, _, err = mantenimiento.ejecutar("pagos.conciliar")
+            if ok:
+                st.rerun()
+            st.error(f"❌ No se pudo conciliar: {err}")
+        return
+
+    tipos = resumen["tipos"]
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("🚫 Sin pago", tipos["sin_pago"]["n"], help="Suscripciones sin ningún pago completado")
+    with col2:
+        st.metric("➗ Pago parcial", tipos["pago_parcial"]["n"], help="Pagado menos que el precio del plan")
+    with col3:
+        st.metric("➕ Sobrepago", tipos["sobrepago"]["n"], help="Pagado más que el precio del plan")
+    with col4:
+        por_cobrar = -(tipos["sin_pago"]["diferencia"] + tipos["pago_parcial"]["diferencia"])
+        st.metric("💰 Por cobrar", _pesos(por_cobrar),
+                  help="Diferencia de las suscripciones sin pago o con pago parcial")
+
+    tipo = st.selectbox(
+        "Discrepancia", [None, *conciliacion.TIPOS], key="conciliacion_tipo",
+        format_func=lambda t: "Todas" if t is None else conciliacion.TIPOS[t],
+    )
+    filas = conciliacion.get_discrepancias(tipo, limite=200)
+    if filas:
+        df = pd.DataFrame({
+            "Suscripción": [f["id_suscripcion"] for f in filas],
+            "RUT": [f["RUT"] for f in filas],
+            "Socio": [f["nombre_socio"] for f in filas],
+            "Plan": [f["nombre_plan"] for f in filas],
+            "Inicio": [f["fecha_inicio"] for f in filas],
+            "Esperado": [_pesos(f["esperado"]) for f in filas],
+            "Pagado": [_pesos(f["pagado"]) for f in filas],
+            "Pendiente": [_pesos(f["pendiente"]) for f in filas],
+            "Diferencia": [_pesos(f["diferencia"]) for f in filas],
+            "Tipo": [conciliacion.TIPOS.get(f["tipo"], f["tipo"]) for f in filas],
+        })
+        st.dataframe(df, width='stretch', hide_index=True)
+        st.caption("Mayores diferencias primero (hasta 200)")
+    else:
+        st.success("✅ Sin discrepancias")
+
+    col_info, col_boton = st.columns([4, 1])
+    with col_info:
+        if estado["terminada"]:
+            st.caption(f"Última conciliación: {estado['terminada']} • {estado['revisadas']:,} suscripciones "
+                       f"en {estado['duracion_ms'] / 1000:.1f} s".replace(",", "."))
+        else:
+            st.caption(f"Conciliación en curso desde {estado['iniciada']} • "
+                       f"{estado['revisadas']:,} suscripciones revisadas".replace(",", "."))
+    with col_boton:
+        if st.button("🔄 Conciliar", key="conciliacion_reejecutar", width="stretch"):
+            with st.spinner("Conciliando pagos..."):
+                ok, _, err = mantenimiento.ejecutar("pagos.conciliar")
+            if ok:
+                st.rerun()
+            st.error(f"❌ {err}")
+
+
 def render():
     col1, col2 = st.columns([5, 1])
 
@@ -255,13 +485,31 @@ def render():
 
     st.markdown("---")
 
+    # Los gráficos se encolan primero en el pool de reportes y las consultas de
+    # todos los paneles se lanzan juntas (database_async.py): la carga tarda lo
+    # que la consulta más lenta, no la suma de todas.
+    id_graficos = reportes.enviar("graficos_dashboard")
+    datos = database_async.reunir({
+        "socios_activos": count_socios_activos,
+        "clases_hoy": count_clases_hoy,
+        "entrenadores_activos": count_entrenadores_activos,
+        "reservas_hoy": count_reservas_hoy,
+        "ingresos_mes": ingresos_mes_actual,
+        "proximas": (get_all_proximas_clases, 8),
+        "resumen_proximas": resumen_proximas_clases,
+        "alertas": get_clases_proximas_con_alertas,
+        "por_vencer": (membresias_por_vencer, 7),
+        "pagos_recientes": (get_historial_pagos, 10, {"formato": "columnas"}),
+        "socios_recientes": (get_all_socios, {"limit": 10, "formato": "columnas"}),
+    })
+
     try:
 
-        socios_activos = count_socios_activos()
-        clases_hoy = count_clases_hoy()
-        entrenadores_activos = count_entrenadores_activos()
-        reservas_hoy = count_reservas_hoy()
-        ingresos_mes = ingresos_mes_actual()
+        socios_activos = _dato(datos, "socios_activos")
+        clases_hoy = _dato(datos, "clases_hoy")
+        entrenadores_activos = _dato(datos, "entrenadores_activos")
+        reservas_hoy = _dato(datos, "reservas_hoy")
+        ingresos_mes = _dato(datos, "ingresos_mes")
 
         col1, col2, col3, col4, col5 = st.columns(5)
 
@@ -310,7 +558,7 @@ def render():
     with col_izq:
         st.subheader("📅 Próximas Clases")
         try:
-            clases = get_all_proximas_clases(8)
+            clases = _dato(datos, "proximas")
 
             if clases:
                 data = []
@@ -353,12 +601,10 @@ def render():
                     height=min(400, len(data) * 35 + 38)
                 )
 
-                clases_llenas = sum(1 for c in clases if c.get('cupos_disponibles', 0) <= 0)
-                clases_con_pocos_cupos = sum(1 for c in clases if 0 < c.get('cupos_disponibles', 0) <= 3)
-
-                st.caption(f"📊 {len(clases)} clases programadas • "
-                           f"🚨 {clases_llenas} sin cupos • "
-                           f"🔔 {clases_con_pocos_cupos} con pocos cupos")
+                resumen = _dato(datos, "resumen_proximas")
+                st.caption(f"📊 {resumen['clases']} clases programadas • "
+                           f"🚨 {resumen['sin_cupos']} sin cupos • "
+                           f"🔔 {resumen['pocos_cupos']} con pocos cupos")
 
             else:
                 st.info("📭 No hay clases programadas.")
@@ -367,28 +613,21 @@ def render():
             # ========== SECTION GRAFICOS ==========
             st.subheader("📈 Visualizaciones")
 
-            chart_col1, chart_col2 = st.columns(2)
+            # Los tres gráficos se arman y serializan en el pool de reportes;
+            # aquí sólo se reconstruye el figure desde el JSON
+            graficos = reportes.resultado_o_espera(id_graficos, "Generando gráficos...")
+            if graficos is not None:
+                fig_tipos, fig_pagos, fig_evolucion = (pio.from_json(g, skip_invalid=True) for g in graficos)
+
+                chart_col1, chart_col2 = st.columns(2)
 
-            with chart_col1:
-                try:
-                    fig_tipos = create_clases_by_type_chart()
+                with chart_col1:
                     st.plotly_chart(fig_tipos, use_container_width=True)
-                except Exception as e:
-                    st.error(f"❌ Error al cargar gráfico de tipos: {e}")
 
-            with chart_col2:
-                try:
-                    fig_pagos = create_payment_methods_chart()
+                with chart_col2:
                     st.plotly_chart(fig_pagos, use_container_width=True)
-                except Exception as e:
-                    st.error(f"❌ Error al cargar gráfico de pagos: {e}")
 
-            try:
-                fig_evolucion = create_reservations_trend_chart()
                 st.plotly_chart(fig_evolucion, use_container_width=True)
-            except Exception as e:
-                st.error(f"❌ Error al cargar gráfico de evolución: {e}")
-                st.info("📈 Gráfico de tendencias no disponible")
 
         except Exception as e:
             st.error(f"❌ Error al cargar clases: {e}")
@@ -399,7 +638,7 @@ def render():
 
         try:
             # Alertes améliorées
-            alertas = get_clases_proximas_con_alertas() or []
+            alertas = _dato(datos, "alertas") or []
             alertas_urgentes = [a for a in alertas if a.get('cupos_disponibles', 0) <= 0]
             alertas_proximas = [a for a in alertas if 0 < a.get('cupos_disponibles', 0) <= 3]
 
@@ -420,7 +659,7 @@ def render():
                 st.caption("Todas las clases tienen cupos disponibles")
 
             try:
-                membresias_expirando = membresias_por_vencer(7) or []
+                membresias_expirando = _dato(datos, "por_vencer") or []
                 if membresias_expirando:
                     with st.expander(f"📅 {len(membresias_expirando)} Membresías por Vencer", expanded=True):
                         for membresia in membresias_expirando[:3]:
@@ -433,28 +672,23 @@ def render():
             st.markdown("---")
             st.subheader("📈 Resumen Rápido")
 
-            if clases:
-                clases_proximas_7dias = len(clases)
-                cupos_totales = sum(c.get('cupo_max', 0) for c in clases)
-                cupos_ocupados = sum((c.get('cupo_max', 0) - c.get('cupos_disponibles', 0)) for c in clases)
-
+            # Totales de todas las próximas clases en una consulta agregada
+            resumen = _dato(datos, "resumen_proximas")
+            if resumen["clases"]:
                 col_stat1, col_stat2 = st.columns(2)
 
                 with col_stat1:
-                    if cupos_totales > 0:
-                        ocupacion_porcentaje = (cupos_ocupados / cupos_totales) * 100
+                    if resumen["cupos_totales"] > 0:
+                        ocupacion_porcentaje = (resumen["cupos_ocupados"] / resumen["cupos_totales"]) * 100
                         st.metric("📊 Ocupación", f"{ocupacion_porcentaje:.1f}%")
                     else:
                         st.metric("📊 Ocupación", "0%")
 
-                    st.metric("🗓️ Próximas", clases_proximas_7dias)
+                    st.metric("🗓️ Próximas", resumen["clases"])
 
                 with col_stat2:
-                    tipos_unicos = len(set(c.get('tipo_clase', '') for c in clases))
-                    entrenadores_unicos = len(set(c.get('entrenador', '') for c in clases))
-
-                    st.metric("🎯 Tipos", tipos_unicos)
-                    st.metric("👨‍🏫 Profesores", entrenadores_unicos)
+                    st.metric("🎯 Tipos", resumen["tipos"])
+                    st.metric("👨‍🏫 Profesores", resumen["entrenadores"])
 
             else:
                 col_stat1, col_stat2 = st.columns(2)
@@ -475,25 +709,50 @@ def render():
     st.markdown("---")
     st.subheader("📋 Datos Detallados")
 
-    tab1, tab2, tab3 = st.tabs(["🎯 Últimos Pagos", "👥 Socios Recientes", "📊 Estadísticas"])
+    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(
+        ["🎯 Últimos Pagos", "👥 Socios Recientes", "📊 Estadísticas", "🔁 Retención", "📅 Demanda", "🧾 Conciliación"]
+    )
 
     with tab1:
         try:
-            render_recent_payments_table()
+            render_recent_payments_table(datos)
         except Exception as e:
             st.error(f"❌ Error al cargar pagos: {e}")
             st.info("💳 No se pudieron cargar los datos de pagos")
 
     with tab2:
         try:
-            render_active_members_table()
+            render_active_members_table(datos)
         except Exception as e:
             st.error(f"❌ Error al cargar socios: {e}")
             st.info("👥 No se pudieron cargar los datos de socios")
 
     with tab3:
         try:
-            render_quick_stats()
+            render_quick_stats(datos)
         except Exception as e:
             st.error(f"❌ Error al cargar estadísticas: {e}")
-            st.info("📈 No se pudieron cargar las estadísticas detalladas")
\ No newline at end of file
+            st.info("📈 No se pudieron cargar las estadísticas detalladas")
+
+    with tab4:
+        try:
+            render_retention_tab()
+        except Exception as e:
+            st.error(f"❌ Error al cargar retención: {e}")
+            st.info("🔁 No se pudieron cargar los indicadores de retención")
+
+    with tab5:
+        try:
+            render_demand_tab()
+        except Exception as e:
+            st.error(f"❌ Error al cargar la demanda: {e}")
+            st.info("📅 No se pudieron cargar la ocupación ni el pronóstico")
+
+    with tab6:
+        try:
+            render_reconciliation_tab()
+        except Exception as e:
+            st.error(f"❌ Error al cargar la conciliación: {e}")
+            st.info("🧾 No se pudieron cargar las discrepancias de pagos")
+
+    reportes.sondear()
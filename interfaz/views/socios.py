@@ -47,8 +47,9 @@ def render():
             st.rerun()
     
         try:
-            socios = get_all_socios()
-            if socios:
+            # Formato columnar: el DataFrame se arma directo, sin un dict por fila
+            socios = get_all_socios(formato="columnas")
+            if socios.get("id_socio"):
 
                 # Se renombra para mostrar columnas mas legibles
                 df = pd.DataFrame(socios).rename(
@@ -66,9 +67,9 @@ def render():
 
                 # Muestra pequeñas metricas del listado
                 c1, c2, c3 = st.columns(3)
-                c1.metric("Total socios", len(socios))
-                c2.metric("Con telefono", sum(1 for s in socios if s.get("telefono")))
-                c3.metric("Con direccion", sum(1 for s in socios if s.get("direccion")))
+                c1.metric("Total socios", len(df))
+                c2.metric("Con telefono", int((df["Telefono"].fillna("") != "").sum()))
+                c3.metric("Con direccion", int((df["Direccion"].fillna("") != "").sum()))
             else:
                 st.info("📭 No hay socios registrados. Usa Registrar Nuevo.")
         except Exception as e:
@@ -8,8 +8,13 @@ DROP VIEW IF EXISTS v_historial_pagos;
 
 DROP TRIGGER IF EXISTS trg_entrenador_fecha_ins;
 DROP TRIGGER IF EXISTS trg_entrenador_fecha_upd;
+DROP TRIGGER IF EXISTS trg_check_cupo_insert;
+DROP TRIGGER IF EXISTS trg_check_vigencia_socio;
+DROP TRIGGER IF EXISTS trg_clase_sin_solape_insert;
+DROP TRIGGER IF EXISTS trg_clase_sin_solape_update;
 
 DROP TABLE IF EXISTS Reserva;
+DROP TABLE IF EXISTS PlantillaClase;
 DROP TABLE IF EXISTS Clase;
 DROP TABLE IF EXISTS Entrenador;
 DROP TABLE IF EXISTS Tipo;
@@ -17,6 +22,8 @@ DROP TABLE IF EXISTS Pago;
 DROP TABLE IF EXISTS Suscripcion;
 DROP TABLE IF EXISTS Plan;
 DROP TABLE IF EXISTS Socio;
+DROP TABLE IF EXISTS schema_version;
 
 COMMIT;
+PRAGMA user_version = 0;
 PRAGMA foreign_keys = ON;